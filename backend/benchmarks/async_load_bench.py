@@ -0,0 +1,179 @@
+"""1ワーカープロセスで多数の研究実行を同時に処理する負荷ベンチマーク。
+
+同期実行（実行ごとに1スレッドで `invoke`）と非同期実行（1つのイベントループで
+`ainvoke`）を比較します。LLM・検索は一定のレイテンシを持つフェイクで、
+モード・同時実行数ごとに別プロセスで実行して次の値を測定します。
+
+- スループット（runs/s）と実行時間のパーセンタイル
+- ピークのスレッド数とメモリ（RSS）
+- 負荷をかける前からのメモリ増加量を同時実行数で割った、1実行あたりのメモリと
+  1GBのメモリで同時に処理できる実行数の目安
+
+使い方:
+    python -m benchmarks.async_load_bench --concurrency 16 64 256
+"""
+
+import argparse
+import asyncio
+import json
+import resource
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+
+from langchain_core.messages import HumanMessage
+
+from benchmarks.fakes import FakeChatModel, FakeSearchProvider, use_fake_providers
+from src.graphs import research_graph
+from src.providers import LLM_PROVIDER, configure_limiter
+
+QUESTION = "再生可能エネルギーの導入状況と今後の課題は？"
+MODES = ("threads", "async")
+
+
+def _max_rss_mb() -> float:
+    """プロセスのピークRSS（MB）。"""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _inputs(index: int, args: argparse.Namespace) -> Dict[str, Any]:
+    """1回の実行の入力状態。"""
+    return {
+        "messages": [HumanMessage(content=f"{QUESTION} ({index})")],
+        "initial_search_query_count": args.initial_queries,
+        "max_research_loops": args.max_loops,
+    }
+
+
+def _config(index: int) -> Dict[str, Any]:
+    """1回の実行の設定。"""
+    return {"configurable": {"thread_id": f"load-{index}"}}
+
+
+def _run_threads(args: argparse.Namespace, runs: int) -> List[float]:
+    """同時実行数と同じ数のスレッドで同期実行し、各実行の所要時間を返す。"""
+
+    def one(index: int) -> float:
+        start = time.perf_counter()
+        research_graph.invoke(_inputs(index, args), _config(index))
+        return time.perf_counter() - start
+
+    with ThreadPoolExecutor(max_workers=args.child_concurrency) as pool:
+        return list(pool.map(one, range(runs)))
+
+
+async def _run_async(args: argparse.Namespace, runs: int) -> List[float]:
+    """1つのイベントループで同時実行数まで並行に非同期実行し、各実行の所要時間を返す。"""
+    semaphore = asyncio.Semaphore(args.child_concurrency)
+
+    async def one(index: int) -> float:
+        async with semaphore:
+            start = time.perf_counter()
+            await research_graph.ainvoke(_inputs(index, args), _config(index))
+            return time.perf_counter() - start
+
+    return await asyncio.gather(*(one(index) for index in range(runs)))
+
+
+def run_child(args: argparse.Namespace) -> Dict[str, Any]:
+    """1つのモード・同時実行数で負荷をかけて測定（子プロセスで実行）。"""
+    # プロバイダーのレート制限ではなくワーカー自体の処理能力を測るためリミッターは無効化
+    configure_limiter(LLM_PROVIDER, None)
+    llm = FakeChatModel(latency=args.llm_latency, follow_up_queries=1)
+    search = FakeSearchProvider(latency=args.search_latency)
+    runs = args.child_concurrency * args.waves
+
+    with use_fake_providers(llm, search):
+        research_graph.invoke(_inputs(-1, args), _config(-1))  # ウォームアップ
+        baseline_mb = _max_rss_mb()
+
+        peak_threads = threading.active_count()
+        stop = threading.Event()
+
+        def watch_threads() -> None:
+            nonlocal peak_threads
+            while not stop.wait(0.01):
+                peak_threads = max(peak_threads, threading.active_count())
+
+        watcher = threading.Thread(target=watch_threads, daemon=True)
+        watcher.start()
+        start = time.perf_counter()
+        if args.child == "async":
+            latencies = asyncio.run(_run_async(args, runs))
+        else:
+            latencies = _run_threads(args, runs)
+        wall = time.perf_counter() - start
+        stop.set()
+        watcher.join()
+
+    peak_mb = _max_rss_mb()
+    mb_per_run = max(peak_mb - baseline_mb, 0.0) / args.child_concurrency
+    ordered = sorted(latencies)
+    return {
+        "mode": args.child,
+        "concurrency": args.child_concurrency,
+        "runs": runs,
+        "wall_seconds": wall,
+        "runs_per_second": runs / wall,
+        "run_seconds_p50": statistics.median(ordered),
+        "run_seconds_p95": ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))],
+        "peak_threads": peak_threads,
+        "baseline_rss_mb": baseline_mb,
+        "peak_rss_mb": peak_mb,
+        "mb_per_concurrent_run": mb_per_run,
+        "concurrent_runs_per_gb": 1024 / mb_per_run if mb_per_run else None,
+    }
+
+
+def main() -> None:
+    """モード・同時実行数ごとに子プロセスで負荷をかけ、結果をJSONで出力。"""
+    parser = argparse.ArgumentParser(description="Async vs thread worker load test")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[16, 64, 256])
+    parser.add_argument("--waves", type=int, default=2)
+    parser.add_argument("--llm-latency", type=float, default=0.2)
+    parser.add_argument("--search-latency", type=float, default=0.2)
+    parser.add_argument("--initial-queries", type=int, default=3)
+    parser.add_argument("--max-loops", type=int, default=2)
+    parser.add_argument("--child", choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument("--child-concurrency", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_child(args)))
+        return
+
+    common = [
+        "--waves", str(args.waves),
+        "--llm-latency", str(args.llm_latency),
+        "--search-latency", str(args.search_latency),
+        "--initial-queries", str(args.initial_queries),
+        "--max-loops", str(args.max_loops),
+    ]  # fmt: skip
+    reports = []
+    for concurrency in args.concurrency:
+        for mode in MODES:
+            completed = subprocess.run(
+                [
+                    sys.executable,
+                    "-m",
+                    "benchmarks.async_load_bench",
+                    "--child",
+                    mode,
+                    "--child-concurrency",
+                    str(concurrency),
+                    *common,
+                ],
+                capture_output=True,
+                text=True,
+                check=True,
+            )
+            reports.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+    print(json.dumps(reports, indent=2))
+
+
+if __name__ == "__main__":
+    main()
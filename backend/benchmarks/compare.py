@@ -0,0 +1,62 @@
+"""2つのベンチマークレポート（JSON）の数値を比較する。
+
+使い方:
+    python -m benchmarks.compare baseline.json candidate.json [--threshold 0.1]
+"""
+
+import argparse
+import json
+import sys
+from typing import Any, Dict
+
+
+def flatten(value: Any, prefix: str = "") -> Dict[str, float]:
+    """レポートの数値をドット区切りのキーに平坦化。"""
+    items: Dict[str, float] = {}
+    if isinstance(value, dict):
+        for key, child in value.items():
+            if key == "meta":
+                continue
+            items.update(flatten(child, f"{prefix}{key}."))
+    elif isinstance(value, list):
+        for index, child in enumerate(value):
+            items.update(flatten(child, f"{prefix}{index}."))
+    elif isinstance(value, (int, float)) and not isinstance(value, bool):
+        items[prefix.rstrip(".")] = float(value)
+    return items
+
+
+def main() -> None:
+    """2つのレポートを比較し、変化率が閾値を超えた項目を表示。"""
+    parser = argparse.ArgumentParser(description="Compare two benchmark reports")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.0,
+        help="Only show metrics whose relative change exceeds this ratio",
+    )
+    args = parser.parse_args()
+
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = flatten(json.load(f))
+    with open(args.candidate, encoding="utf-8") as f:
+        candidate = flatten(json.load(f))
+
+    width = max((len(key) for key in baseline.keys() | candidate.keys()), default=10)
+    print(f"{'metric':<{width}}  {'baseline':>14}  {'candidate':>14}  {'change':>9}")
+    for key in sorted(baseline.keys() | candidate.keys()):
+        old = baseline.get(key)
+        new = candidate.get(key)
+        if old is None or new is None:
+            print(f"{key:<{width}}  {old!s:>14}  {new!s:>14}  {'n/a':>9}")
+            continue
+        change = (new - old) / old if old else 0.0
+        if abs(change) < args.threshold:
+            continue
+        print(f"{key:<{width}}  {old:>14.6g}  {new:>14.6g}  {change:>+8.1%}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,289 @@
+"""設定のグリッドごとのコストとレイテンシを比較するスイープ。
+
+固定の質問の集合を、`Configuration` の値のグリッドのそれぞれで研究グラフに通し、
+設定ごとのトークン数・検索回数・模擬レイテンシ・引用の網羅率を表にします。
+トークン数・検索回数・レイテンシが小さく網羅率が高いという基準で、他の設定に
+すべての指標で劣らない設定（パレートフロンティア）に印を付けます。
+
+プロバイダーの応答は `--cassette` のカセットから記録したレイテンシで再生します
+（`benchmarks.replay`）。`--record` を付けると実際のプロバイダー（OpenAI と既定の
+検索プロバイダー）を呼び出してグリッド全体の応答を記録します。カセットに無い呼び出しは
+フェイクの応答で補い、その回数を `misses` 列に表示します（カセットを指定しなければ
+すべてフェイクです）。
+
+模擬レイテンシは再生中の待ち時間を `--time-scale` 倍に縮めて実行し、実測の所要時間を
+`--time-scale` で割り戻した値です（グラフ自体の処理時間も同じ倍率で拡大されます）。
+引用の網羅率は、最終回答の文のうちソースへのリンクを含む文の割合です。
+
+使い方:
+    # 実際のプロバイダーでグリッド全体の応答を記録
+    python -m benchmarks.config_sweep --record --cassette sweep.jsonl
+    # 記録を再生してスイープ（設定は4並列）
+    python -m benchmarks.config_sweep --cassette sweep.jsonl --workers 4 \\
+        --grid number_of_initial_queries=1,3,5 --grid answer_model=gpt-4o,gpt-4o-mini
+"""
+
+import argparse
+import itertools
+import json
+import re
+import statistics
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, fields
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from langchain_core.messages import HumanMessage
+
+from benchmarks.fakes import FakeChatModel, FakeSearchProvider
+from benchmarks.replay import (
+    Cassette,
+    collect_replay_stats,
+    use_recording_providers,
+    use_replay_providers,
+)
+from src.config.configuration import Configuration
+from src.graphs.research_graph import research_graph
+from src.providers import configure_limiter
+from src.providers.llm import LLM_PROVIDER
+
+QUESTIONS = (
+    "再生可能エネルギーの導入状況と今後の課題は？",
+    "量子コンピューターの実用化の見通しは？",
+    "リモートワークが都市の不動産市場に与えた影響は？",
+    "半導体のサプライチェーンの主要なリスクは？",
+    "生成AIの著作権をめぐる各国の規制の違いは？",
+)
+
+DEFAULT_GRID = (
+    "number_of_initial_queries=1,3",
+    "max_research_loops=1,2",
+    "max_follow_up_queries=1,3",
+    "max_results=3,5",
+)
+
+# (指標, 大きいほど良いか)
+OBJECTIVES: Tuple[Tuple[str, bool], ...] = (
+    ("tokens", False),
+    ("searches", False),
+    ("latency_seconds", False),
+    ("citation_coverage", True),
+)
+
+_SENTENCE_END = re.compile(r"(?<=[。．！？!?])|\n+")
+_LINK = re.compile(r"\]\(https?://")
+
+
+def citation_coverage(answer: str) -> float:
+    """回答の文のうち、ソースへのリンクを含む文の割合。"""
+    sentences = [
+        sentence for sentence in _SENTENCE_END.split(answer) if sentence.strip()
+    ]
+    if not sentences:
+        return 0.0
+    return sum(1 for sentence in sentences if _LINK.search(sentence)) / len(sentences)
+
+
+def _setting_names() -> Dict[str, Any]:
+    """グリッドに指定できる設定名と既定値。"""
+    config = Configuration()
+    return {
+        field.name: getattr(section, field.name)
+        for section in vars(config).values()
+        for field in fields(section)
+    }
+
+
+def _parse_value(text: str) -> Any:
+    """グリッドの値をJSONとして解釈（解釈できなければ文字列）。"""
+    try:
+        return json.loads(text)
+    except ValueError:
+        return text
+
+
+def parse_grid(specs: Sequence[str]) -> List[Dict[str, Any]]:
+    """`name=v1,v2` の指定から設定の組み合わせの一覧を作成。"""
+    names = _setting_names()
+    axes: Dict[str, List[Any]] = {}
+    for spec in specs:
+        name, _, values = spec.partition("=")
+        if name not in names:
+            raise SystemExit(f"未知の設定です: {name}")
+        axes[name] = [_parse_value(value) for value in values.split(",") if value]
+    return [dict(zip(axes, values)) for values in itertools.product(*axes.values())]
+
+
+def run_setting(
+    setting: Dict[str, Any], questions: Sequence[str]
+) -> Dict[str, Any]:
+    """1つの設定で質問の集合を順に実行して測定（レイテンシは実測の秒数）。"""
+    runs: List[Dict[str, Any]] = []
+    with collect_replay_stats() as stats:
+        for question in questions:
+            # 並列の実行が近似重複のインデックスなどを共有しないよう実行ごとのキーを付ける
+            config = {
+                "configurable": {**setting, "thread_id": f"sweep-{uuid.uuid4().hex}"}
+            }
+            start = time.perf_counter()
+            output = research_graph.invoke(
+                {"messages": [HumanMessage(content=question)]}, config
+            )
+            seconds = time.perf_counter() - start
+            usage = output.get("budget_usage") or {}
+            runs.append(
+                {
+                    "tokens": usage.get("tokens_used", 0),
+                    "searches": usage.get("search_count", 0),
+                    "seconds": seconds,
+                    "coverage": citation_coverage(
+                        str(output["messages"][-1].content)
+                    ),
+                }
+            )
+    return {
+        "setting": setting,
+        "tokens": statistics.mean(run["tokens"] for run in runs),
+        "searches": statistics.mean(run["searches"] for run in runs),
+        "seconds": statistics.mean(run["seconds"] for run in runs),
+        "seconds_max": max(run["seconds"] for run in runs),
+        "citation_coverage": statistics.mean(run["coverage"] for run in runs),
+        "replay": asdict(stats),
+    }
+
+
+def _dominates(a: Dict[str, Any], b: Dict[str, Any], tolerance: float) -> bool:
+    """aがbにすべての指標で劣らず、いずれかの指標で勝るか。
+
+    実測のレイテンシは実行ごとにばらつくため、相対差が `tolerance` 以内なら同等とみなします。
+    """
+    better = False
+    for name, maximize in OBJECTIVES:
+        x, y = (a[name], b[name]) if maximize else (b[name], a[name])
+        if name == "latency_seconds" and abs(x - y) <= tolerance * max(x, y):
+            continue
+        if x < y:
+            return False
+        better = better or x > y
+    return better
+
+
+def mark_pareto_frontier(
+    results: List[Dict[str, Any]], latency_tolerance: float = 0.1
+) -> None:
+    """他のどの設定にも支配されない設定に `pareto` を付ける。"""
+    for result in results:
+        result["pareto"] = not any(
+            _dominates(other, result, latency_tolerance)
+            for other in results
+            if other is not result
+        )
+
+
+def format_table(results: List[Dict[str, Any]]) -> str:
+    """結果をMarkdownの表に整形（パレートフロンティアの設定は★、トークン数の順）。"""
+    names = list(results[0]["setting"]) if results else []
+    header = [
+        "",
+        *names,
+        "tokens",
+        "searches",
+        "latency (s)",
+        "coverage",
+        "misses",
+    ]
+    lines = [
+        "| " + " | ".join(header) + " |",
+        "|" + "---|" * len(header),
+    ]
+    for result in sorted(results, key=lambda result: result["tokens"]):
+        replay = result["replay"]
+        cells = [
+            "★" if result["pareto"] else "",
+            *(str(result["setting"][name]) for name in names),
+            f"{result['tokens']:,.0f}",
+            f"{result['searches']:.1f}",
+            f"{result['latency_seconds']:.1f}",
+            f"{result['citation_coverage']:.0%}",
+            str(replay["llm_misses"] + replay["search_misses"]),
+        ]
+        lines.append("| " + " | ".join(cells) + " |")
+    return "\n".join(lines)
+
+
+def _load_questions(path: Optional[str], count: int) -> List[str]:
+    """質問の集合（ファイルがあれば1行1問で読み込み）。"""
+    if path:
+        with open(path, encoding="utf-8") as f:
+            questions = [line.strip() for line in f if line.strip()]
+    else:
+        questions = list(QUESTIONS)
+    return questions[:count] if count else questions
+
+
+def main() -> None:
+    """設定のグリッドをスイープして表（または `--json` でJSON）を出力。"""
+    parser = argparse.ArgumentParser(description="Configuration sweep")
+    parser.add_argument("--grid", action="append", default=None)
+    parser.add_argument("--questions-file", default=None)
+    parser.add_argument("--questions", type=int, default=0)
+    parser.add_argument("--cassette", default=None)
+    parser.add_argument("--record", action="store_true")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--time-scale", type=float, default=0.1)
+    # カセットに無い呼び出しを補うフェイクのレイテンシ（秒、縮める前の値）
+    parser.add_argument("--fallback-llm-latency", type=float, default=1.0)
+    parser.add_argument("--fallback-search-latency", type=float, default=0.8)
+    # レイテンシの相対差がこれ以内の設定はパレートフロンティアの判定で同等とみなす
+    parser.add_argument("--latency-tolerance", type=float, default=0.1)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    settings = parse_grid(args.grid or DEFAULT_GRID)
+    questions = _load_questions(args.questions_file, args.questions)
+    cassette = Cassette(args.cassette) if args.cassette else None
+    if args.record:
+        if cassette is None:
+            raise SystemExit("--record には --cassette が必要です")
+        # 記録は実際の時間で行い、検索はグリッドの最大の件数で記録して再生時に切り詰める
+        time_scale = 1.0
+        max_results = max(
+            [setting.get("max_results", 0) for setting in settings]
+            + [Configuration.get_config().search.max_results]
+        )
+        providers = use_recording_providers(cassette, max_results)
+    else:
+        time_scale = args.time_scale
+        # 設定を並列に実行するため、プロセス全体のLLMの同時実行数の制限を外す
+        configure_limiter(LLM_PROVIDER, None)
+        providers = use_replay_providers(
+            cassette,
+            time_scale,
+            FakeChatModel(
+                latency=args.fallback_llm_latency * time_scale, follow_up_queries=3
+            ),
+            FakeSearchProvider(
+                max_results=10, latency=args.fallback_search_latency * time_scale
+            ),
+        )
+
+    with providers, ThreadPoolExecutor(max_workers=args.workers) as executor:
+        results = list(
+            executor.map(lambda setting: run_setting(setting, questions), settings)
+        )
+    for result in results:
+        result["latency_seconds"] = result.pop("seconds") / time_scale
+        result["latency_seconds_max"] = result.pop("seconds_max") / time_scale
+    mark_pareto_frontier(results, args.latency_tolerance)
+
+    if args.json:
+        print(json.dumps(results, indent=2, ensure_ascii=False))
+        return
+    print(format_table(results))
+    if cassette is not None:
+        print(f"\ncassette: {args.cassette} ({len(cassette)} responses)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""CPU負荷の高い後処理をプロセスプールで実行した場合のスケーリングを測定するベンチマーク。
+
+ページ本文付きのフェイク検索結果のバッチに対して、`web_research` ノードの本文の準備
+（パッセージ抽出・SimHash計算）を複数スレッド（並列の検索ブランチに相当）から実行し、
+プロセスプールのサイズごとに次の値を測定します。
+
+- スループット（batches/s）とプールなし（その場で実行）に対する速度向上
+- 同じプロセスで1msごとに起床するスレッドの遅延（GILを握られている間のI/Oの待ち）
+
+使い方:
+    python -m benchmarks.cpu_pool_bench --pool-sizes 0 1 2 4 8 --batches 64
+"""
+
+import argparse
+import json
+import os
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+
+from benchmarks.fakes import FakeSearchProvider
+from src.config.configuration import Configuration
+from src.nodes import WebResearchNode
+from src.parallel import configure_process_pool, shutdown_process_pool
+from src.states import WebSearchState
+
+QUESTION = "再生可能エネルギーの導入状況と今後の課題"
+
+
+def _heartbeat(stop: threading.Event, lags: List[float]) -> None:
+    """1msごとに起床し、予定より遅れた時間を記録。"""
+    while not stop.is_set():
+        start = time.perf_counter()
+        time.sleep(0.001)
+        lags.append(time.perf_counter() - start - 0.001)
+
+
+def run(args: argparse.Namespace, pool_size: int) -> Dict[str, Any]:
+    """1つのプールサイズでバッチを処理して測定。"""
+    configure_process_pool(pool_size)
+    config_obj = Configuration.get_config(
+        {
+            "configurable": {
+                "include_raw_content": True,
+                "cpu_pool_min_chars": args.min_chars,
+            }
+        }
+    )
+    provider = FakeSearchProvider(
+        max_results=args.results_per_batch, raw_content_chars=args.page_chars
+    )
+    node = WebResearchNode()
+    batches = [
+        (
+            provider.search(f"{QUESTION} {index}"),
+            WebSearchState(
+                search_query=f"{QUESTION} {index}", id=index, research_topic=QUESTION
+            ),
+        )
+        for index in range(args.batches)
+    ]
+
+    def prepare(batch) -> None:
+        node._prepare_contents(batch[0], batch[1], config_obj)
+
+    with ThreadPoolExecutor(max_workers=args.concurrency) as threads:
+        # ワーカープロセスの起動を測定から除くためのウォームアップ
+        list(threads.map(prepare, batches[: max(pool_size, 1) * 2]))
+
+        stop = threading.Event()
+        lags: List[float] = []
+        heartbeat = threading.Thread(target=_heartbeat, args=(stop, lags), daemon=True)
+        heartbeat.start()
+        start = time.perf_counter()
+        list(threads.map(prepare, batches))
+        wall = time.perf_counter() - start
+        stop.set()
+        heartbeat.join()
+
+    shutdown_process_pool()
+    ordered = sorted(lags) or [0.0]
+    return {
+        "pool_size": pool_size,
+        "batches": args.batches,
+        "wall_seconds": wall,
+        "batches_per_second": args.batches / wall,
+        "heartbeat_lag_ms_p50": statistics.median(ordered) * 1000,
+        "heartbeat_lag_ms_p99": ordered[int(0.99 * (len(ordered) - 1))] * 1000,
+    }
+
+
+def main() -> None:
+    """プールサイズごとの結果とプールなしに対する速度向上をJSONで出力。"""
+    parser = argparse.ArgumentParser(description="CPU post-processing pool benchmark")
+    parser.add_argument("--pool-sizes", type=int, nargs="+", default=[0, 1, 2, 4, 8])
+    parser.add_argument("--batches", type=int, default=64)
+    parser.add_argument("--results-per-batch", type=int, default=5)
+    parser.add_argument("--page-chars", type=int, default=50000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--min-chars", type=int, default=20000)
+    args = parser.parse_args()
+
+    reports = [run(args, size) for size in args.pool_sizes]
+    baseline = reports[0]["batches_per_second"]
+    for report in reports:
+        report["speedup"] = report["batches_per_second"] / baseline
+    print(json.dumps({"cpu_count": os.cpu_count(), "results": reports}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,380 @@
+"""オフラインベンチマーク用の決定的なフェイクLLM・検索プロバイダー"""
+
+import asyncio
+import hashlib
+import json
+import random
+import re
+import time
+from contextlib import contextmanager
+from dataclasses import replace
+from typing import Any, Dict, Iterator, List, Optional, Type
+
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForLLMRun,
+    CallbackManagerForLLMRun,
+)
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.runnables import Runnable, RunnableLambda
+from pydantic import BaseModel, Field
+
+from src.config.configuration import Configuration, SearchConfig
+from src.providers import (
+    SearchProvider,
+    SearchResult,
+    register_search_provider,
+    set_chat_model_factory,
+    unregister_search_provider,
+)
+
+QUERY_COUNT_PATTERN = re.compile(r"(\d+)個を超えるクエリ")
+CITATION_PATTERN = re.compile(r"【\d+-\d+】")
+TOPIC_PATTERN = re.compile(r"コンテキスト: (.*)\Z", re.S)
+
+
+def _digest(text: str) -> str:
+    """テキストから短い決定的ハッシュを作成。"""
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:8]
+
+
+def estimate_tokens(text: str) -> int:
+    """トークン数を概算（日本語を含むため2文字=1トークンとみなす）。"""
+    return max(1, len(text) // 2)
+
+
+# ダミーテキストの語彙（シードごとに異なる語の並びにして近似重複とみなされないようにする）
+_VOCABULARY = tuple(f"lorem{i}" for i in range(500)) + (
+    "データ",
+    "検証",
+    "導入",
+    "課題",
+    "市場",
+    "技術",
+)
+
+
+def _filler(seed: str, length: int) -> str:
+    """指定長の決定的なダミーテキストを作成。"""
+    rng = random.Random(seed)
+    words = [seed]
+    size = len(seed)
+    while size < length:
+        word = rng.choice(_VOCABULARY)
+        words.append(word)
+        size += len(word) + 1
+    return " ".join(words)[:length]
+
+
+def fake_page(seed: str, length: int, paragraph_chars: int = 400) -> str:
+    """ナビゲーション・フッター付きのダミーのページ本文（raw content）を作成。"""
+    lines = ["ホーム | ニュース | お問い合わせ", "メニュー"]
+    size = 0
+    index = 0
+    while size < length:
+        paragraph = _filler(f"{seed}-p{index}", paragraph_chars)
+        lines.append(paragraph)
+        size += len(paragraph) + 1
+        index += 1
+    lines.append("Copyright © example.com All rights reserved.")
+    return "\n".join(lines)
+
+
+class FakeChatModel(BaseChatModel):
+    """プロンプトから決定的な応答を返すフェイクチャットモデル。
+
+    - クエリ生成: プロンプト中の「N個を超えるクエリ」からN個のクエリを生成
+      （`echo_topic_query` なら1件目は研究トピックそのもの）
+    - リフレクション: `follow_up_queries` 件のフォローアップクエリを返す
+    - フォローアップの判断: `prior_sources_sufficient` なら追加検索なし、そうでなければ
+      `follow_up_queries` 件のクエリを返す
+    - サブ質問への分解: `sub_questions` 個のサブ質問（`sub_question_dependencies` なら
+      最後のサブ質問がそれより前のすべてに依存）
+    - 最終回答: プロンプト中の引用マーカーを引用した `answer_chars` 文字の回答
+
+    構造化出力は `malformed_json_rate` の確率でコードフェンス・コメント・末尾のカンマ付きの
+    崩れたJSONに、`unparseable_json_rate` の確率でJSONを含まない応答になる。
+    """
+
+    model_name: str = "fake-model"
+    latency: float = 0.0
+    # モデル名ごとの固定レイテンシ（指定の無いモデルは `latency`）
+    model_latencies: Dict[str, float] = Field(default_factory=dict)
+    # 入力1000トークンあたりの追加レイテンシ（プロンプトの処理時間を模擬）
+    latency_per_1k_tokens: float = 0.0
+    answer_chars: int = 400
+    follow_up_queries: int = 1
+    is_sufficient: bool = False
+    prior_sources_sufficient: bool = True
+    sub_questions: int = 3
+    sub_question_dependencies: bool = False
+    echo_topic_query: bool = False
+    max_citations: int = 10
+    malformed_json_rate: float = 0.0
+    unparseable_json_rate: float = 0.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat-model"
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return {"model_name": self.model_name}
+
+    def _respond(self, prompt: str, schema_name: Optional[str]) -> str:
+        """プロンプトとスキーマ名から応答テキストを作成。"""
+        seed = _digest(prompt)
+        if schema_name == "SearchQueryList":
+            match = QUERY_COUNT_PATTERN.search(prompt)
+            count = int(match.group(1)) if match else 3
+            queries = [f"fake query {seed}-{i}" for i in range(count)]
+            topic = TOPIC_PATTERN.search(prompt)
+            if self.echo_topic_query and topic and queries:
+                queries[0] = topic.group(1).strip()
+            return json.dumps(
+                {"rationale": f"fake rationale {seed}", "query": queries},
+                ensure_ascii=False,
+            )
+        if schema_name == "Reflection":
+            follow_ups = (
+                []
+                if self.is_sufficient
+                else [f"follow-up {seed}-{i}" for i in range(self.follow_up_queries)]
+            )
+            return json.dumps(
+                {
+                    "is_sufficient": self.is_sufficient,
+                    "knowledge_gap": "" if self.is_sufficient else f"gap {seed}",
+                    "follow_up_queries": follow_ups,
+                },
+                ensure_ascii=False,
+            )
+
+        if schema_name == "FollowUpPlan":
+            sufficient = self.prior_sources_sufficient
+            queries = (
+                []
+                if sufficient
+                else [f"new aspect {seed}-{i}" for i in range(self.follow_up_queries)]
+            )
+            return json.dumps(
+                {
+                    "is_sufficient": sufficient,
+                    "missing_aspects": "" if sufficient else f"missing {seed}",
+                    "queries": queries,
+                },
+                ensure_ascii=False,
+            )
+
+        if schema_name == "SubQuestionPlan":
+            last = self.sub_questions - 1
+            return json.dumps(
+                {
+                    "rationale": f"fake rationale {seed}",
+                    "sub_questions": [
+                        {
+                            "question": f"sub-question {seed}-{i}",
+                            "depends_on": (
+                                list(range(1, last + 1))
+                                if self.sub_question_dependencies and i == last
+                                else []
+                            ),
+                        }
+                        for i in range(self.sub_questions)
+                    ],
+                },
+                ensure_ascii=False,
+            )
+
+        markers = CITATION_PATTERN.findall(prompt)[: self.max_citations]
+        citations = "".join(f"事実{i}{marker}。" for i, marker in enumerate(markers))
+        return citations + _filler(seed, max(0, self.answer_chars - len(citations)))
+
+    def _corrupt(self, content: str) -> str:
+        """構造化出力の応答を、設定した確率で崩れたJSONまたはJSONの無い応答にする。"""
+        draw = random.random()
+        if draw < self.unparseable_json_rate:
+            return "申し訳ありませんが、指定の形式で回答できませんでした。"
+        if draw < self.unparseable_json_rate + self.malformed_json_rate:
+            body = "{\n  // 生成した結果\n  " + content[1:-1] + ",\n}"
+            return f"以下が結果です。\n```json\n{body}\n```"
+        return content
+
+    def _build_result(self, messages: List[BaseMessage], **kwargs: Any) -> ChatResult:
+        """応答メッセージとトークン使用量を作成。"""
+        prompt = "\n".join(str(message.content) for message in messages)
+        content = self._respond(prompt, kwargs.get("schema_name"))
+        if kwargs.get("schema_name"):
+            content = self._corrupt(content)
+        input_tokens = estimate_tokens(prompt)
+        output_tokens = estimate_tokens(content)
+        message = AIMessage(
+            content=content,
+            usage_metadata={
+                "input_tokens": input_tokens,
+                "output_tokens": output_tokens,
+                "total_tokens": input_tokens + output_tokens,
+            },
+            response_metadata={"model_name": self.model_name},
+        )
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _latency(self, messages: List[BaseMessage]) -> float:
+        """1回の呼び出しのレイテンシ（固定分と入力トークン数に比例する分）。"""
+        latency = self.model_latencies.get(self.model_name, self.latency)
+        if not self.latency_per_1k_tokens:
+            return latency
+        prompt = "\n".join(str(message.content) for message in messages)
+        per_token = self.latency_per_1k_tokens / 1000
+        return latency + per_token * estimate_tokens(prompt)
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        latency = self._latency(messages)
+        if latency:
+            time.sleep(latency)
+        return self._build_result(messages, **kwargs)
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        latency = self._latency(messages)
+        if latency:
+            await asyncio.sleep(latency)
+        return self._build_result(messages, **kwargs)
+
+    def _get_ls_params(self, stop: Optional[List[str]] = None, **kwargs: Any) -> Any:
+        params = super()._get_ls_params(stop=stop, **kwargs)
+        params["ls_model_name"] = self.model_name
+        return params
+
+    def with_structured_output(  # type: ignore[override]
+        self, schema: Type[BaseModel], **kwargs: Any
+    ) -> Runnable:
+        """スキーマのJSONを返し、Pydanticモデルとしてパースするランナブル。
+
+        `include_raw=True` なら `with_structured_output` と同じく、パースに失敗しても
+        例外にせず応答メッセージとエラーを返す。
+        """
+        include_raw = kwargs.get("include_raw", False)
+
+        def parse(message: AIMessage) -> Any:
+            try:
+                parsed, error = schema.model_validate_json(str(message.content)), None
+            except ValueError as e:
+                parsed, error = None, e
+            if include_raw:
+                return {"raw": message, "parsed": parsed, "parsing_error": error}
+            if error is not None:
+                raise error
+            return parsed
+
+        return self.bind(schema_name=schema.__name__) | RunnableLambda(parse)
+
+
+class FakeSearchProvider(SearchProvider):
+    """クエリから決定的な検索結果を返すフェイク検索プロバイダー。
+
+    `tail_probability` の確率で `tail_latency` 秒かかる（レイテンシのロングテール）。
+    `raw_content_chars` を指定するとその長さのページ本文（raw content）も返す。
+    `revision` を変えると同じURLで本文だけが変わる（ページの更新を再現）。
+    """
+
+    name = "fake"
+
+    def __init__(
+        self,
+        max_results: int = 5,
+        content_chars: int = 500,
+        latency: float = 0.0,
+        config: Optional[SearchConfig] = None,
+        tail_latency: float = 0.0,
+        tail_probability: float = 0.0,
+        raw_content_chars: int = 0,
+        revision: str = "",
+    ):
+        """フェイク検索プロバイダーを初期化。"""
+        super().__init__(config or SearchConfig(search_provider=self.name))
+        self.max_results = max_results
+        self.content_chars = content_chars
+        self.latency = latency
+        self.tail_latency = tail_latency
+        self.tail_probability = tail_probability
+        self.raw_content_chars = raw_content_chars
+        self.revision = revision
+
+    def _latency(self) -> float:
+        """1回の検索のレイテンシを決定。"""
+        if self.tail_probability and random.random() < self.tail_probability:
+            return self.tail_latency
+        return self.latency
+
+    def _results(self, query: str) -> List[SearchResult]:
+        """クエリに対する検索結果を作成。"""
+        seed = _digest(query)
+        results: List[SearchResult] = []
+        for i in range(self.max_results):
+            result: SearchResult = {
+                "url": f"https://example.com/{seed}/{i}",
+                "title": f"{query} - result {i}",
+                "content": _filler(f"{seed}-{i}{self.revision}", self.content_chars),
+            }
+            if self.raw_content_chars:
+                result["raw_content"] = fake_page(f"{seed}-{i}", self.raw_content_chars)
+            results.append(result)
+        return results
+
+    def search(self, query: str) -> List[SearchResult]:
+        """検索を実行。"""
+        latency = self._latency()
+        if latency:
+            time.sleep(latency)
+        return self._results(query)
+
+    async def asearch(self, query: str) -> List[SearchResult]:
+        """検索を非同期で実行。"""
+        latency = self._latency()
+        if latency:
+            await asyncio.sleep(latency)
+        return self._results(query)
+
+
+@contextmanager
+def use_fake_providers(
+    llm: Optional[FakeChatModel] = None,
+    search: Optional[FakeSearchProvider] = None,
+) -> Iterator[None]:
+    """研究グラフのLLM・検索をフェイクに差し替えるコンテキストマネージャー。
+
+    フェイク検索プロバイダーを "fake" として登録し、デフォルト設定の
+    `search_provider` を一時的に切り替えます。
+    """
+    llm = llm or FakeChatModel()
+    search = search or FakeSearchProvider()
+
+    def chat_model_factory(
+        model: str, temperature: float, max_retries: int
+    ) -> BaseChatModel:
+        return llm.model_copy(update={"model_name": model})
+
+    default_config = Configuration.get_config()
+    original_search = default_config.search
+    set_chat_model_factory(chat_model_factory)
+    register_search_provider(search.name, lambda config: search)
+    default_config.search = replace(original_search, search_provider=search.name)
+    try:
+        yield
+    finally:
+        set_chat_model_factory(None)
+        unregister_search_provider(search.name)
+        default_config.search = original_search
@@ -0,0 +1,101 @@
+"""フォローアップの質問で前のターンのソースを再利用した場合の速度を比較するベンチマーク。
+
+チェックポインター付きの研究グラフで、1ターン目の質問に続けてフォローアップの質問を
+送り、`reuse_prior_sources` の有効・無効ごとにフォローアップのターンの所要時間・
+検索回数・トークン数を集計します。LLM・検索は一定のレイテンシを持つフェイクです。
+
+使い方:
+    python -m benchmarks.follow_up_bench --follow-ups 3 --llm-latency 0.2
+"""
+
+import argparse
+import json
+import statistics
+import time
+import uuid
+from typing import Any, Dict, List
+
+from langchain_core.messages import HumanMessage
+from langgraph.checkpoint.memory import MemorySaver
+
+from benchmarks.fakes import FakeChatModel, FakeSearchProvider, use_fake_providers
+from src.graphs.research_graph import builder
+
+QUESTION = "再生可能エネルギーの導入状況と今後の課題は？"
+FOLLOW_UPS = (
+    "太陽光発電の導入状況は？",
+    "再生可能エネルギーの課題をもう少し詳しく",
+    "風力発電の課題は？",
+    "導入状況のデータの出典は？",
+)
+
+
+def run(args: argparse.Namespace, reuse: bool, sufficient: bool) -> Dict[str, Any]:
+    """1つのスレッドで1ターン目とフォローアップのターンを実行して測定。"""
+    graph = builder.compile(checkpointer=MemorySaver())
+    thread_id = f"follow-up-{uuid.uuid4()}"
+    llm = FakeChatModel(
+        latency=args.llm_latency,
+        follow_up_queries=args.follow_up_queries,
+        prior_sources_sufficient=sufficient,
+    )
+    search = FakeSearchProvider(latency=args.search_latency)
+    turns: List[Dict[str, Any]] = []
+    with use_fake_providers(llm, search):
+        for index in range(args.follow_ups + 1):
+            question = FOLLOW_UPS[(index - 1) % len(FOLLOW_UPS)] if index else QUESTION
+            config = {
+                "configurable": {
+                    "thread_id": thread_id,
+                    "reuse_prior_sources": reuse,
+                    "max_research_loops": args.max_loops,
+                }
+            }
+            start = time.perf_counter()
+            inputs = {"messages": [HumanMessage(content=question)]}
+            final_state = graph.invoke(inputs, config)
+            usage = final_state["budget_usage"]
+            turns.append(
+                {
+                    "seconds": time.perf_counter() - start,
+                    "searches": usage["search_count"],
+                    "tokens": usage["tokens_used"],
+                }
+            )
+
+    follow_ups = turns[1:]
+    return {
+        "reuse_prior_sources": reuse,
+        "prior_sources_sufficient": sufficient,
+        "first_turn_seconds": turns[0]["seconds"],
+        "follow_up_seconds_mean": statistics.mean(t["seconds"] for t in follow_ups),
+        "follow_up_searches_mean": statistics.mean(t["searches"] for t in follow_ups),
+        "follow_up_tokens_mean": statistics.mean(t["tokens"] for t in follow_ups),
+    }
+
+
+def main() -> None:
+    """再利用の有効・無効と、収集済みソースの十分性ごとの結果をJSONで出力。"""
+    parser = argparse.ArgumentParser(description="Follow-up turn benchmark")
+    parser.add_argument("--follow-ups", type=int, default=3)
+    parser.add_argument("--llm-latency", type=float, default=0.2)
+    parser.add_argument("--search-latency", type=float, default=0.2)
+    parser.add_argument("--follow-up-queries", type=int, default=1)
+    parser.add_argument("--max-loops", type=int, default=2)
+    args = parser.parse_args()
+
+    baseline = run(args, reuse=False, sufficient=False)
+    reports = [
+        baseline,
+        run(args, reuse=True, sufficient=True),
+        run(args, reuse=True, sufficient=False),
+    ]
+    for report in reports:
+        report["follow_up_speedup"] = (
+            baseline["follow_up_seconds_mean"] / report["follow_up_seconds_mean"]
+        )
+    print(json.dumps(reports, indent=2))
+
+
+if __name__ == "__main__":
+    main()
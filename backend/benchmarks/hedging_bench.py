@@ -0,0 +1,91 @@
+"""レイテンシのロングテールがある検索に対するヘッジの効果を測定するベンチマーク。
+
+フェイク検索プロバイダーで `fanout` 件の並列検索（1スーパーステップ相当）を
+`rounds` 回繰り返し、ヘッジなし・ありでスーパーステップの所要時間の
+パーセンタイルと追加呼び出しの割合を比較します。
+
+使い方:
+    python -m benchmarks.hedging_bench --rounds 200 --fanout 8
+"""
+
+import argparse
+import json
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+
+from benchmarks.fakes import FakeSearchProvider, use_fake_providers
+from src.config.configuration import Configuration
+from src.nodes.research import WebResearchNode
+from src.observability.metrics import REGISTRY, SEARCH_HEDGES, SEARCH_REQUESTS
+
+
+def _percentile(values: List[float], q: float) -> float:
+    """パーセンタイルを計算。"""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def run(args: argparse.Namespace, hedge_enabled: bool) -> Dict[str, Any]:
+    """ヘッジの有無を指定してスーパーステップを繰り返し実行。"""
+    config_obj = Configuration.get_config(
+        {
+            "configurable": {
+                "hedge_enabled": hedge_enabled,
+                "hedge_mode": args.hedge_mode,
+                "hedge_percentile": args.hedge_percentile,
+                "hedge_max_extra_ratio": args.max_extra_ratio,
+            }
+        }
+    )
+    node = WebResearchNode()
+    REGISTRY.reset()
+    rounds = []
+    with ThreadPoolExecutor(max_workers=args.fanout) as pool:
+        for round_index in range(args.rounds):
+            queries = [f"query {round_index}-{i}" for i in range(args.fanout)]
+            start = time.perf_counter()
+            list(pool.map(lambda q: node._execute_search(q, config_obj), queries))
+            rounds.append(time.perf_counter() - start)
+
+    searches = SEARCH_REQUESTS.get("unknown", "fake")
+    issued = SEARCH_HEDGES.get("fake", "issued")
+    return {
+        "hedge_enabled": hedge_enabled,
+        "superstep_p50_seconds": statistics.median(rounds),
+        "superstep_p90_seconds": _percentile(rounds, 0.9),
+        "superstep_p99_seconds": _percentile(rounds, 0.99),
+        "searches": searches,
+        "hedges_issued": issued,
+        "hedges_won": SEARCH_HEDGES.get("fake", "won"),
+        "extra_call_ratio": issued / searches if searches else 0.0,
+    }
+
+
+def main() -> None:
+    """ヘッジなし・ありの結果をJSONで出力。"""
+    parser = argparse.ArgumentParser(description="Hedged search benchmark")
+    parser.add_argument("--rounds", type=int, default=200)
+    parser.add_argument("--fanout", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--tail-latency", type=float, default=0.5)
+    parser.add_argument("--tail-probability", type=float, default=0.02)
+    parser.add_argument("--hedge-mode", default="duplicate")
+    parser.add_argument("--hedge-percentile", type=float, default=0.9)
+    parser.add_argument("--max-extra-ratio", type=float, default=0.1)
+    args = parser.parse_args()
+
+    search = FakeSearchProvider(
+        latency=args.latency,
+        tail_latency=args.tail_latency,
+        tail_probability=args.tail_probability,
+    )
+    with use_fake_providers(search=search):
+        # ヘッジなしの実行でレイテンシの分布を観測してからヘッジありを実行
+        reports = [run(args, False), run(args, True)]
+    print(json.dumps(reports, indent=2))
+
+
+if __name__ == "__main__":
+    main()
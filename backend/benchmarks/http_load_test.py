@@ -0,0 +1,363 @@
+"""デプロイしたアプリにHTTPで負荷をかける負荷試験ツール。
+
+OpenAI・Tavily のスタンドインサーバー（`benchmarks.stand_ins`）を起動し、それを
+参照するようにしたアプリ（`langgraph.json` のグラフと `src/api/app.py`）を
+`--server-command`（デフォルトは `langgraph dev`）で起動して、LangGraph API の
+`/runs/wait` に研究の実行を送ります。外部サービスは使わず1台のLinuxマシンで完結します。
+
+同時実行数（`--concurrency`）ごとの段階で負荷をかけ、次の値を測定します。
+
+- スループット（完了した実行数/秒）と実行時間の p50 / p95 / p99
+- エラー率（HTTPステータス・タイムアウト・実行中のエラーの別）
+- ワーカー（サーバーのプロセスツリー）のメモリ（RSS）の推移
+- スタンドインが受けたリクエスト数と、注入したエラーの数
+
+`--rate` を指定すると、その平均到着率（実行/秒、ポアソン到着）で `--duration` 秒間
+実行を送ります（同時実行数は `--concurrency` が上限）。指定しない場合は各段階で
+`--runs-per-stage` 回の実行を、同時実行数を保ったまま送ります。
+起動済みのサーバーを使う場合は `--target-url` を指定し、そのサーバーの環境変数に
+表示されるスタンドインのURLを設定します（`--server-pid` でメモリも測定できます）。
+
+使い方:
+    python -m benchmarks.http_load_test --concurrency 10 100 500
+    python -m benchmarks.http_load_test --concurrency 100 --rate 20 --duration 60 \\
+        --llm-distribution lognormal --llm-throttle-rate 0.02
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import shlex
+import socket
+import statistics
+import subprocess
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+from benchmarks.stand_ins import (
+    DISTRIBUTIONS,
+    FaultProfile,
+    OpenAIStandIn,
+    StandInServer,
+    TavilyStandIn,
+)
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+DEFAULT_SERVER_COMMAND = (
+    "langgraph dev --no-browser --no-reload --host 127.0.0.1 --port {port}"
+)
+QUESTIONS = (
+    "再生可能エネルギーの導入状況と今後の課題は？",
+    "太陽光発電のコストの推移は？",
+    "蓄電池の技術動向は？",
+    "洋上風力発電の課題は？",
+)
+
+
+def _percentile(values: List[float], q: float) -> Optional[float]:
+    """値の q 分位点（値が無ければNone）。"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def _free_port() -> int:
+    """空いているローカルのポート番号。"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _process_tree(pid: int) -> List[int]:
+    """プロセスとその子孫のPID（Linuxの `/proc` から取得）。"""
+    pids = [pid]
+    for current in pids:
+        for children in Path(f"/proc/{current}/task").glob("*/children"):
+            try:
+                pids.extend(int(child) for child in children.read_text().split())
+            except OSError:
+                continue
+    return pids
+
+
+def _rss_mb(pid: int) -> Optional[float]:
+    """プロセスツリー全体のRSS（MB）。"""
+    total_kb = 0
+    found = False
+    for current in _process_tree(pid):
+        try:
+            status = Path(f"/proc/{current}/status").read_text()
+        except OSError:
+            continue
+        for line in status.splitlines():
+            if line.startswith("VmRSS:"):
+                total_kb += int(line.split()[1])
+                found = True
+    return total_kb / 1024 if found else None
+
+
+class MemorySampler:
+    """ワーカーのメモリ（RSS）を一定間隔で記録するスレッド。"""
+
+    def __init__(self, pid: Optional[int], interval: float):
+        """サンプラーを初期化（PIDが無ければ何も記録しない）。"""
+        self.pid = pid
+        self.interval = interval
+        self.stage: Optional[int] = None
+        self.samples: List[Dict[str, Any]] = []
+        self._started = time.perf_counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            rss = _rss_mb(self.pid) if self.pid else None
+            if rss is not None:
+                self.samples.append(
+                    {
+                        "seconds": round(time.perf_counter() - self._started, 2),
+                        "stage": self.stage,
+                        "rss_mb": round(rss, 1),
+                    }
+                )
+
+    def start(self) -> "MemorySampler":
+        """記録を開始。"""
+        if self.pid:
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """記録を終了。"""
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+
+    def peak(self, stage: int) -> Optional[float]:
+        """段階中のピークのRSS（MB）。"""
+        values = [s["rss_mb"] for s in self.samples if s["stage"] == stage]
+        return max(values) if values else None
+
+
+def start_server(
+    args: argparse.Namespace, stand_ins: List[StandInServer]
+) -> Tuple[subprocess.Popen, str]:
+    """スタンドインを参照する環境変数でアプリを起動し、応答するまで待つ。"""
+    port = _free_port()
+    env = {**os.environ, **_stand_in_env(stand_ins)}
+    # 子プロセスはファイルを複製して受け取るため、起動後は閉じてよい
+    with open(args.server_log, "w") as log:
+        process = subprocess.Popen(
+            shlex.split(args.server_command.format(port=port)),
+            cwd=BACKEND_DIR,
+            env=env,
+            stdout=log,
+            stderr=subprocess.STDOUT,
+        )
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + args.startup_timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(
+                f"サーバーが終了しました（ログ: {args.server_log}）"
+            )
+        try:
+            if httpx.get(f"{url}{args.health_path}", timeout=1.0).status_code == 200:
+                return process, url
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    process.terminate()
+    raise TimeoutError(f"サーバーが起動しませんでした（ログ: {args.server_log}）")
+
+
+def _stand_in_env(stand_ins: List[StandInServer]) -> Dict[str, str]:
+    """アプリにスタンドインを参照させる環境変数。"""
+    openai, tavily = stand_ins
+    return {
+        "OPENAI_BASE_URL": openai.base_url,
+        "OPENAI_API_BASE": openai.base_url,
+        "OPENAI_API_KEY": "sk-stand-in",
+        "TAVILY_API_URL": tavily.base_url,
+        "TAVILY_API_KEY": "tvly-stand-in",
+        "LANGSMITH_TRACING": "false",
+        "LANGGRAPH_CLI_NO_ANALYTICS": "1",
+    }
+
+
+def _payload(index: int, args: argparse.Namespace) -> Dict[str, Any]:
+    """1回の実行のリクエストボディ（`/runs/wait`）。"""
+    question = QUESTIONS[index % len(QUESTIONS)]
+    return {
+        "assistant_id": args.assistant_id,
+        "input": {
+            "messages": [{"type": "human", "content": f"{question} ({index})"}],
+            "initial_search_query_count": args.initial_queries,
+            "max_research_loops": args.max_loops,
+        },
+        "config": {"configurable": {"search_provider": "tavily"}},
+    }
+
+
+async def _one_run(
+    client: httpx.AsyncClient, url: str, index: int, args: argparse.Namespace
+) -> Tuple[float, str]:
+    """1回の実行を送り、所要時間と結果（"ok" またはエラーの種類）を返す。"""
+    start = time.perf_counter()
+    try:
+        response = await client.post(
+            f"{url}/runs/wait", json=_payload(index, args), timeout=args.timeout
+        )
+    except httpx.HTTPError as e:
+        return time.perf_counter() - start, type(e).__name__
+    elapsed = time.perf_counter() - start
+    if response.status_code != 200:
+        return elapsed, f"http_{response.status_code}"
+    try:
+        body = response.json()
+    except ValueError:
+        return elapsed, "invalid_response"
+    if isinstance(body, dict) and "__error__" in body:
+        return elapsed, "run_error"
+    return elapsed, "ok"
+
+
+async def run_stage(
+    url: str, concurrency: int, args: argparse.Namespace
+) -> Dict[str, Any]:
+    """1つの同時実行数で負荷をかけて測定。"""
+    semaphore = asyncio.Semaphore(concurrency)
+    results: List[Tuple[float, str]] = []
+    limits = httpx.Limits(
+        max_connections=concurrency, max_keepalive_connections=concurrency
+    )
+
+    async with httpx.AsyncClient(limits=limits) as client:
+
+        async def one(index: int) -> None:
+            async with semaphore:
+                results.append(await _one_run(client, url, index, args))
+
+        start = time.perf_counter()
+        if args.rate > 0:
+            # ポアソン到着（同時実行数の上限を超えた分はクライアント側で待つ）
+            rng = random.Random(concurrency)
+            tasks = []
+            index = 0
+            while time.perf_counter() - start < args.duration:
+                tasks.append(asyncio.create_task(one(index)))
+                index += 1
+                await asyncio.sleep(rng.expovariate(args.rate))
+            await asyncio.gather(*tasks)
+        else:
+            runs = args.runs_per_stage or 2 * concurrency
+            await asyncio.gather(*(one(index) for index in range(runs)))
+        wall = time.perf_counter() - start
+
+    latencies = [elapsed for elapsed, outcome in results if outcome == "ok"]
+    errors: Dict[str, int] = {}
+    for _, outcome in results:
+        if outcome != "ok":
+            errors[outcome] = errors.get(outcome, 0) + 1
+    return {
+        "concurrency": concurrency,
+        "arrival_rate": args.rate or None,
+        "runs": len(results),
+        "completed": len(latencies),
+        "wall_seconds": round(wall, 2),
+        "throughput_runs_per_second": round(len(latencies) / wall, 3),
+        "latency_p50": _percentile(latencies, 0.5),
+        "latency_p95": _percentile(latencies, 0.95),
+        "latency_p99": _percentile(latencies, 0.99),
+        "latency_mean": statistics.mean(latencies) if latencies else None,
+        "error_rate": round(1 - len(latencies) / len(results), 4) if results else None,
+        "errors": errors,
+    }
+
+
+def _profile(args: argparse.Namespace, prefix: str) -> FaultProfile:
+    """コマンドライン引数からスタンドインのレイテンシ・エラーの設定を作成。"""
+    return FaultProfile(
+        latency=getattr(args, f"{prefix}_latency"),
+        distribution=getattr(args, f"{prefix}_distribution"),
+        error_rate=getattr(args, f"{prefix}_error_rate"),
+        throttle_rate=getattr(args, f"{prefix}_throttle_rate"),
+    )
+
+
+def main() -> None:
+    """スタンドインとアプリを起動し、段階ごとの結果をJSONで出力。"""
+    parser = argparse.ArgumentParser(description="HTTP load test with stand-ins")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[10, 100, 500])
+    parser.add_argument("--runs-per-stage", type=int, default=0)
+    parser.add_argument("--rate", type=float, default=0.0)
+    parser.add_argument("--duration", type=float, default=60.0)
+    parser.add_argument("--target-url")
+    parser.add_argument("--server-pid", type=int)
+    parser.add_argument("--server-command", default=DEFAULT_SERVER_COMMAND)
+    parser.add_argument("--server-log", default="load-test-server.log")
+    parser.add_argument("--health-path", default="/ok")
+    parser.add_argument("--startup-timeout", type=float, default=120.0)
+    parser.add_argument("--assistant-id", default="agent")
+    parser.add_argument("--timeout", type=float, default=600.0)
+    parser.add_argument("--initial-queries", type=int, default=3)
+    parser.add_argument("--max-loops", type=int, default=2)
+    parser.add_argument("--sample-interval", type=float, default=0.5)
+    for prefix, latency in (("llm", 0.5), ("search", 0.3)):
+        flag = f"--{prefix}"
+        parser.add_argument(f"{flag}-latency", type=float, default=latency)
+        parser.add_argument(
+            f"{flag}-distribution", choices=DISTRIBUTIONS, default="lognormal"
+        )
+        parser.add_argument(f"{flag}-error-rate", type=float, default=0.0)
+        parser.add_argument(f"{flag}-throttle-rate", type=float, default=0.0)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    stand_ins: List[StandInServer] = [
+        OpenAIStandIn(_profile(args, "llm"), seed=1).start(),
+        TavilyStandIn(_profile(args, "search"), seed=2).start(),
+    ]
+    process: Optional[subprocess.Popen] = None
+    try:
+        if args.target_url:
+            url, pid = args.target_url.rstrip("/"), args.server_pid
+            print(json.dumps({"stand_in_env": _stand_in_env(stand_ins)}, indent=2))
+        else:
+            process, url = start_server(args, stand_ins)
+            pid = process.pid
+        sampler = MemorySampler(pid, args.sample_interval).start()
+        stages = []
+        for concurrency in args.concurrency:
+            sampler.stage = concurrency
+            stage = asyncio.run(run_stage(url, concurrency, args))
+            stage["peak_worker_rss_mb"] = sampler.peak(concurrency)
+            stages.append(stage)
+        sampler.stop()
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=30)
+        for stand_in in stand_ins:
+            stand_in.stop()
+
+    report = {
+        "stages": stages,
+        "stand_ins": {stand_in.name: stand_in.stats() for stand_in in stand_ins},
+        "worker_memory": sampler.samples,
+    }
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        Path(args.output).write_text(text)
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
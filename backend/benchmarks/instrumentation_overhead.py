@@ -0,0 +1,78 @@
+"""ノード計測フックのオーバーヘッドを測定するベンチマーク。
+
+使い方:
+    python -m benchmarks.instrumentation_overhead --iterations 200000
+"""
+
+import argparse
+import json
+import time
+from typing import Any, Callable, Dict
+
+from src.observability import instrument_node
+from src.observability.metrics import REGISTRY
+
+
+class _RawNode:
+    """計測なしの空ノード。"""
+
+    def __call__(self, state: Any, config: Any) -> Any:
+        return state
+
+
+class _InstrumentedNode:
+    """計測フック付きの空ノード。"""
+
+    @instrument_node("benchmark_node")
+    def __call__(self, state: Any, config: Any) -> Any:
+        return state
+
+
+def _time_per_call(node: Callable[[Any, Any], Any], iterations: int) -> float:
+    """1回あたりの平均呼び出し時間（ナノ秒）を測定。"""
+    state: Dict[str, Any] = {}
+    config: Dict[str, Any] = {}
+    start = time.perf_counter_ns()
+    for _ in range(iterations):
+        node(state, config)
+    return (time.perf_counter_ns() - start) / iterations
+
+
+def run(iterations: int, repeats: int) -> Dict[str, float]:
+    """計測あり/なしの呼び出しコストを比較。"""
+    raw_node = _RawNode()
+    instrumented_node = _InstrumentedNode()
+
+    # ウォームアップ
+    _time_per_call(raw_node, 1000)
+    _time_per_call(instrumented_node, 1000)
+
+    raw_ns = min(_time_per_call(raw_node, iterations) for _ in range(repeats))
+    instrumented_ns = min(
+        _time_per_call(instrumented_node, iterations) for _ in range(repeats)
+    )
+    render_start = time.perf_counter_ns()
+    REGISTRY.render()
+    render_ns = time.perf_counter_ns() - render_start
+
+    return {
+        "iterations": iterations,
+        "raw_call_ns": round(raw_ns, 1),
+        "instrumented_call_ns": round(instrumented_ns, 1),
+        "overhead_per_call_ns": round(instrumented_ns - raw_ns, 1),
+        "metrics_render_ns": render_ns,
+    }
+
+
+def main() -> None:
+    """ベンチマークを実行し、結果をJSONで出力。"""
+    parser = argparse.ArgumentParser(description="Measure instrumentation overhead")
+    parser.add_argument("--iterations", type=int, default=200_000)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    print(json.dumps(run(args.iterations, args.repeats), indent=2))
+
+
+if __name__ == "__main__":
+    main()
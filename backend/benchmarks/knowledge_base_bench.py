@@ -0,0 +1,107 @@
+"""実行をまたいだ知識ベースの有無で、検索回数と所要時間を比較するベンチマーク。
+
+同じ質問を含む質問の列を研究グラフで順に実行し、知識ベースを使わない場合と、
+一時ディレクトリの知識ベースに各実行のソースを蓄積して検索前に参照する場合とで、
+検索プロバイダーへのリクエスト数・知識ベースのヒット率・省いたレイテンシの見積もり・
+実行ごとの所要時間を集計します。LLM・検索は一定のレイテンシを持つフェイクです。
+
+使い方:
+    python -m benchmarks.knowledge_base_bench --runs 20 --distinct-questions 5
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import tempfile
+import time
+from typing import Any, Dict, List
+
+from langchain_core.messages import HumanMessage
+
+from benchmarks.fakes import FakeChatModel, FakeSearchProvider, use_fake_providers
+from src.graphs.research_graph import research_graph
+from src.observability.metrics import KB_LATENCY_SAVED, KB_LOOKUPS, SEARCH_REQUESTS
+
+QUESTIONS = (
+    "再生可能エネルギーの導入状況と今後の課題は？",
+    "太陽光発電の導入状況は？",
+    "風力発電の課題は？",
+    "蓄電池のコストの見通しは？",
+    "水素エネルギーの仕組みとは？",
+    "地熱発電の歴史は？",
+)
+
+
+def _lookups(result: str) -> float:
+    """知識ベースの参照回数（クエリの種類の合計）。"""
+    return sum(
+        KB_LOOKUPS.get(query_type, result)
+        for query_type in ("news", "reference", "default")
+    )
+
+
+def run(args: argparse.Namespace, kb_enabled: bool) -> Dict[str, Any]:
+    """1つの設定で `--runs` 回実行して測定。"""
+    llm = FakeChatModel(latency=args.llm_latency)
+    search = FakeSearchProvider(latency=args.search_latency)
+    seconds: List[float] = []
+    requests_before = SEARCH_REQUESTS.get("web_research", search.name)
+    hits_before, misses_before = _lookups("hit"), _lookups("miss")
+    saved_before = KB_LATENCY_SAVED.get()
+    with tempfile.TemporaryDirectory() as kb_path, use_fake_providers(llm, search):
+        config = {
+            "configurable": {
+                "kb_enabled": kb_enabled,
+                "kb_path": kb_path,
+                "max_research_loops": args.max_loops,
+            }
+        }
+        for index in range(args.runs):
+            question = QUESTIONS[index % min(args.distinct_questions, len(QUESTIONS))]
+            inputs = {"messages": [HumanMessage(content=question)]}
+            start = time.perf_counter()
+            if args.use_async:
+                asyncio.run(research_graph.ainvoke(inputs, config))
+            else:
+                research_graph.invoke(inputs, config)
+            seconds.append(time.perf_counter() - start)
+
+    hits = _lookups("hit") - hits_before
+    lookups = hits + _lookups("miss") - misses_before
+    return {
+        "kb_enabled": kb_enabled,
+        "runs": args.runs,
+        "provider_requests": SEARCH_REQUESTS.get("web_research", search.name)
+        - requests_before,
+        "kb_hit_rate": hits / lookups if lookups else None,
+        "kb_latency_saved_seconds": KB_LATENCY_SAVED.get() - saved_before,
+        "seconds_mean": statistics.mean(seconds),
+        "seconds_mean_after_first_pass": statistics.mean(
+            seconds[args.distinct_questions :] or seconds
+        ),
+    }
+
+
+def main() -> None:
+    """知識ベースの有無の結果をJSONで出力。"""
+    parser = argparse.ArgumentParser(description="Knowledge base benchmark")
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--distinct-questions", type=int, default=5)
+    parser.add_argument("--max-loops", type=int, default=2)
+    parser.add_argument("--llm-latency", type=float, default=0.05)
+    parser.add_argument("--search-latency", type=float, default=0.2)
+    parser.add_argument("--use-async", action="store_true")
+    args = parser.parse_args()
+
+    baseline = run(args, kb_enabled=False)
+    knowledge_base = run(args, kb_enabled=True)
+    knowledge_base["speedup_after_first_pass"] = (
+        baseline["seconds_mean_after_first_pass"]
+        / knowledge_base["seconds_mean_after_first_pass"]
+    )
+    print(json.dumps([baseline, knowledge_base], indent=2))
+
+
+if __name__ == "__main__":
+    main()
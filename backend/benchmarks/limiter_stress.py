@@ -0,0 +1,215 @@
+"""429を返すローカルのスタンドインサーバーに対してリミッターを検証するベンチマーク。
+
+サーバーは同時処理数とリクエストレートの上限を超えたリクエストに
+429（Retry-Afterなし）を返します。リミッター経由の呼び出しと、
+リミッターなしで即時再試行する呼び出しの成功数・429数・待ち時間を比較します。
+
+使い方:
+    python -m benchmarks.limiter_stress --requests 200 --workers 64
+"""
+
+import argparse
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional
+
+import requests
+
+from src.observability.metrics import (
+    PROVIDER_CALL,
+    PROVIDER_QUEUED,
+    PROVIDER_RETRIES,
+    REGISTRY,
+)
+from src.providers import LimiterSettings, configure_limiter
+
+PROVIDER = "stand-in"
+
+
+class _Server(ThreadingHTTPServer):
+    """多数の同時接続を受け付けられるよう待ち行列を大きくしたサーバー。"""
+
+    daemon_threads = True
+    request_queue_size = 1024
+
+
+class StandInServer:
+    """同時処理数・レートの上限を超えると429を返すHTTPサーバー。"""
+
+    def __init__(self, capacity: int, requests_per_second: float, service_time: float):
+        """サーバーを初期化。"""
+        self.capacity = capacity
+        self.requests_per_second = requests_per_second
+        self.service_time = service_time
+        self.in_flight = 0
+        self.accepted = 0
+        self.rejected = 0
+        self._tokens = float(capacity)
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+        self._server = _Server(("127.0.0.1", 0), self._handler_class())
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        """検索エンドポイントのURL。"""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/search"
+
+    def _admit(self) -> bool:
+        """リクエストを受け付けるか判定。"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                float(self.capacity),
+                self._tokens + (now - self._last_refill) * self.requests_per_second,
+            )
+            self._last_refill = now
+            if self.in_flight >= self.capacity or self._tokens < 1.0:
+                self.rejected += 1
+                return False
+            self._tokens -= 1.0
+            self.in_flight += 1
+            self.accepted += 1
+            return True
+
+    def _done(self) -> None:
+        """処理中のリクエストを終了。"""
+        with self._lock:
+            self.in_flight -= 1
+
+    def _handler_class(self) -> type:
+        """このサーバーを参照するリクエストハンドラーを作成。"""
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self) -> None:
+                self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                if not server._admit():
+                    self.send_response(429)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                try:
+                    time.sleep(server.service_time)
+                    body = json.dumps({"results": []}).encode()
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                finally:
+                    server._done()
+
+            def log_message(self, format: str, *args: Any) -> None:
+                pass
+
+        return Handler
+
+    def __enter__(self) -> "StandInServer":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def _post(session: requests.Session, url: str) -> Dict[str, Any]:
+    """スタンドインサーバーに検索リクエストを送る。"""
+    response = session.post(url, json={"query": "test"}, timeout=10)
+    response.raise_for_status()
+    return response.json()
+
+
+def run(args: argparse.Namespace, settings: Optional[LimiterSettings]) -> Dict[str, Any]:
+    """1つのモードでリクエストを実行し、結果を集計。"""
+    REGISTRY.reset()
+    limiter = configure_limiter(PROVIDER, settings)
+    local = threading.local()
+
+    def session() -> requests.Session:
+        if not hasattr(local, "session"):
+            local.session = requests.Session()
+        return local.session
+
+    def one_request(_: int) -> bool:
+        try:
+            if limiter is not None:
+                limiter.call(_post, session(), server.url)
+            else:
+                # リミッターなし: 429を受けたら待たずに再試行
+                for attempt in range(args.max_attempts):
+                    try:
+                        _post(session(), server.url)
+                        break
+                    except requests.RequestException:
+                        if attempt + 1 == args.max_attempts:
+                            raise
+            return True
+        except requests.RequestException:
+            return False
+
+    with StandInServer(
+        args.server_capacity, args.server_rps, args.service_time
+    ) as server:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.workers) as pool:
+            outcomes = list(pool.map(one_request, range(args.requests)))
+        wall = time.perf_counter() - start
+
+    report: Dict[str, Any] = {
+        "mode": "limiter" if limiter else "naive",
+        "wall_seconds": wall,
+        "succeeded": sum(outcomes),
+        "failed": len(outcomes) - sum(outcomes),
+        "server_accepted": server.accepted,
+        "server_rejected_429": server.rejected,
+    }
+    if limiter is not None:
+        queued_count = PROVIDER_QUEUED.count(PROVIDER)
+        call_count = PROVIDER_CALL.count(PROVIDER, "success")
+        report.update(
+            {
+                "retries": PROVIDER_RETRIES.get(PROVIDER),
+                "mean_queued_seconds": PROVIDER_QUEUED.total(PROVIDER) / queued_count,
+                "mean_call_seconds": PROVIDER_CALL.total(PROVIDER, "success")
+                / max(1, call_count),
+                "final_concurrency_limit": limiter.limit,
+            }
+        )
+    configure_limiter(PROVIDER, None)
+    return report
+
+
+def main() -> None:
+    """リミッターあり・なしでスタンドインサーバーに負荷をかけて比較。"""
+    parser = argparse.ArgumentParser(description="Adaptive limiter stress test")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=64)
+    parser.add_argument("--server-capacity", type=int, default=4)
+    parser.add_argument("--server-rps", type=float, default=100.0)
+    parser.add_argument("--service-time", type=float, default=0.02)
+    parser.add_argument("--max-concurrency", type=int, default=32)
+    parser.add_argument("--requests-per-second", type=float, default=0.0)
+    parser.add_argument("--max-attempts", type=int, default=8)
+    parser.add_argument("--backoff-base", type=float, default=0.05)
+    args = parser.parse_args()
+
+    settings = LimiterSettings(
+        max_concurrency=args.max_concurrency,
+        requests_per_second=args.requests_per_second,
+        burst=args.max_concurrency,
+        max_attempts=args.max_attempts,
+        backoff_base_seconds=args.backoff_base,
+        backoff_max_seconds=2.0,
+    )
+    reports = [run(args, None), run(args, settings)]
+    print(json.dumps(reports, indent=2))
+
+
+if __name__ == "__main__":
+    main()
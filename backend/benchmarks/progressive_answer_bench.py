@@ -0,0 +1,114 @@
+"""段階的な回答（暫定回答を先に返す）の有無で、最初の回答までの時間を比較するベンチマーク。
+
+研究グラフを `stream_mode="updates"` で実行し、回答のメッセージを含む最初の更新が
+届くまでの時間（time-to-useful-answer）と全体の所要時間を、`progressive_answer` の
+有効・無効ごとに集計します。暫定回答は `draft_model` に `--draft-latency` の
+レイテンシを持たせたフェイクで作成します。LLM・検索は一定のレイテンシを持つフェイクです。
+
+使い方:
+    python -m benchmarks.progressive_answer_bench --runs 10 --max-loops 3
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from typing import Any, Dict, List, Optional
+
+from langchain_core.messages import HumanMessage
+
+from benchmarks.fakes import FakeChatModel, FakeSearchProvider, use_fake_providers
+from src.config.configuration import Configuration
+from src.graphs.research_graph import research_graph
+
+QUESTION = "再生可能エネルギーの導入状況と今後の課題は？"
+
+
+def _has_answer(update: Dict[str, Any]) -> bool:
+    """ノードの更新に回答のメッセージが含まれるか。"""
+    return any(
+        isinstance(delta, dict) and delta.get("messages") for delta in update.values()
+    )
+
+
+def measure_once(config: Dict[str, Any], use_async: bool) -> Dict[str, Any]:
+    """1回実行して、最初の回答までの時間と所要時間を測定。"""
+    inputs = {"messages": [HumanMessage(content=QUESTION)]}
+    first_answer: Optional[float] = None
+    start = time.perf_counter()
+
+    def observe(update: Dict[str, Any]) -> None:
+        nonlocal first_answer
+        if first_answer is None and _has_answer(update):
+            first_answer = time.perf_counter() - start
+
+    if use_async:
+
+        async def consume() -> None:
+            async for update in research_graph.astream(
+                inputs, config, stream_mode="updates"
+            ):
+                observe(update)
+
+        asyncio.run(consume())
+    else:
+        for update in research_graph.stream(inputs, config, stream_mode="updates"):
+            observe(update)
+    return {
+        "first_answer_seconds": first_answer,
+        "seconds": time.perf_counter() - start,
+    }
+
+
+def run(args: argparse.Namespace, progressive: bool) -> Dict[str, Any]:
+    """1つの設定で `--runs` 回実行して測定。"""
+    draft_model = Configuration.get_config().model.draft_model
+    llm = FakeChatModel(
+        latency=args.llm_latency,
+        model_latencies={draft_model: args.draft_latency},
+    )
+    search = FakeSearchProvider(latency=args.search_latency)
+    config = {
+        "configurable": {
+            "progressive_answer": progressive,
+            "max_research_loops": args.max_loops,
+        }
+    }
+    measurements: List[Dict[str, Any]] = []
+    with use_fake_providers(llm, search):
+        for _ in range(args.runs):
+            measurements.append(measure_once(config, args.use_async))
+
+    return {
+        "progressive_answer": progressive,
+        "runs": args.runs,
+        "first_answer_seconds_mean": statistics.mean(
+            m["first_answer_seconds"] for m in measurements
+        ),
+        "seconds_mean": statistics.mean(m["seconds"] for m in measurements),
+    }
+
+
+def main() -> None:
+    """段階的な回答の有無の結果と、最初の回答までの時間の短縮をJSONで出力。"""
+    parser = argparse.ArgumentParser(description="Progressive answer benchmark")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--max-loops", type=int, default=3)
+    parser.add_argument("--llm-latency", type=float, default=0.3)
+    parser.add_argument("--draft-latency", type=float, default=0.1)
+    parser.add_argument("--search-latency", type=float, default=0.2)
+    parser.add_argument("--use-async", action="store_true")
+    args = parser.parse_args()
+
+    baseline = run(args, progressive=False)
+    progressive = run(args, progressive=True)
+    progressive["first_answer_speedup"] = (
+        baseline["first_answer_seconds_mean"]
+        / progressive["first_answer_seconds_mean"]
+    )
+    print(json.dumps([baseline, progressive], indent=2))
+
+
+if __name__ == "__main__":
+    main()
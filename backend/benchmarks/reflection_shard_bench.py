@@ -0,0 +1,94 @@
+"""検索結果の量に対するリフレクションのレイテンシを、分割の有無で比較するベンチマーク。
+
+検索結果の件数を変えた状態でリフレクションノードを直接実行し、1回のLLM呼び出しで
+分析する場合（`reflection_mode="single"`）と、検索結果を分割して並行に分析する場合
+（`reflection_mode="sharded"`）のレイテンシとトークン数を測定します。
+フェイクLLMのレイテンシは入力トークン数に比例する分を含みます。
+
+使い方:
+    python -m benchmarks.reflection_shard_bench --results 5 10 20 40 80
+"""
+
+import argparse
+import json
+import statistics
+import time
+from typing import Any, Dict, List
+
+from langchain_core.messages import HumanMessage
+
+from benchmarks.fakes import FakeChatModel, FakeSearchProvider, use_fake_providers
+from src.nodes import ReflectionNode, WebResearchNode
+from src.states import OverallState
+
+QUESTION = "再生可能エネルギーの導入状況と今後の課題は？"
+
+
+def build_state(count: int, search: FakeSearchProvider) -> OverallState:
+    """`count` 件の検索結果を持つ状態を作成（検索結果は実際のノードで整形）。"""
+    node = WebResearchNode()
+    queries = [f"{QUESTION} {index}" for index in range(count)]
+    results = [
+        node._process_search_results(
+            search.search(query), [(None, None)] * search.max_results, index
+        )[1]
+        for index, query in enumerate(queries)
+    ]
+    return OverallState(
+        messages=[HumanMessage(content=QUESTION)],
+        search_query=queries,
+        web_research_result=results,
+    )
+
+
+def run(args: argparse.Namespace, count: int, mode: str) -> Dict[str, Any]:
+    """1つの検索結果の件数とモードでリフレクションを実行して測定。"""
+    llm = FakeChatModel(
+        latency=args.llm_latency, latency_per_1k_tokens=args.latency_per_1k_tokens
+    )
+    search = FakeSearchProvider()
+    state = build_state(count, search)
+    config = {
+        "configurable": {
+            "reflection_mode": mode,
+            "reflection_shard_tokens": args.shard_tokens,
+            "reflection_max_shards": args.max_shards,
+        }
+    }
+    node = ReflectionNode()
+    seconds: List[float] = []
+    with use_fake_providers(llm, search):
+        for _ in range(args.repeats):
+            start = time.perf_counter()
+            update = node(state, config)
+            seconds.append(time.perf_counter() - start)
+    return {
+        "results": count,
+        "mode": mode,
+        "seconds_median": statistics.median(seconds),
+        "tokens": update.tokens_used,
+        "follow_up_queries": len(update.follow_up_queries or []),
+    }
+
+
+def main() -> None:
+    """検索結果の件数ごと・モードごとの結果をJSONで出力。"""
+    parser = argparse.ArgumentParser(description="Sharded reflection benchmark")
+    parser.add_argument("--results", type=int, nargs="+", default=[5, 10, 20, 40, 80])
+    parser.add_argument("--llm-latency", type=float, default=0.2)
+    parser.add_argument("--latency-per-1k-tokens", type=float, default=0.05)
+    parser.add_argument("--shard-tokens", type=int, default=6000)
+    parser.add_argument("--max-shards", type=int, default=8)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    reports = [
+        run(args, count, mode)
+        for count in args.results
+        for mode in ("single", "sharded")
+    ]
+    print(json.dumps(reports, indent=2))
+
+
+if __name__ == "__main__":
+    main()
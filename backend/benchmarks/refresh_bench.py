@@ -0,0 +1,110 @@
+"""保存した実行の再実行（リフレッシュ）と、同じ質問の最初からの実行を比較するベンチマーク。
+
+研究グラフで質問を1回実行して記録（`build_run_record`）を作り、次の3つを測定します。
+
+- full: 同じ質問を研究グラフで最初から実行
+- refresh_unchanged: 全クエリを期限切れとして検索し直し、結果が変わらない場合
+- refresh_changed: 全クエリを検索し直し、同じURLの本文が更新されていた場合
+
+それぞれの検索回数・消費トークン数・所要時間を集計します。LLM・検索は一定の
+レイテンシを持つフェイクで、本文の更新はフェイク検索の `revision` で再現します。
+
+使い方:
+    python -m benchmarks.refresh_bench --repeats 5
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from typing import Any, Dict, List
+
+from langchain_core.messages import HumanMessage
+
+from benchmarks.fakes import FakeChatModel, FakeSearchProvider, use_fake_providers
+from src.graphs import refresh_graph, research_graph
+from src.utils import build_run_record
+
+QUESTION = "再生可能エネルギーの導入状況と今後の課題は？"
+
+
+def _invoke(graph: Any, inputs: Dict[str, Any], config: Dict[str, Any], args) -> Any:
+    """同期・非同期のどちらかでグラフを実行。"""
+    if args.use_async:
+        return asyncio.run(graph.ainvoke(inputs, config))
+    return graph.invoke(inputs, config)
+
+
+def run(
+    args: argparse.Namespace, mode: str, record: Dict[str, Any]
+) -> Dict[str, Any]:
+    """1つのモードで `--repeats` 回実行して測定。"""
+    llm = FakeChatModel(latency=args.llm_latency, follow_up_queries=2)
+    search = FakeSearchProvider(
+        latency=args.search_latency,
+        revision="v2" if mode == "refresh_changed" else "",
+    )
+    config = {
+        "configurable": {
+            "max_research_loops": args.max_loops,
+            "refresh_ttl_seconds": 0,
+        }
+    }
+    seconds: List[float] = []
+    searches: List[int] = []
+    tokens: List[int] = []
+    report: Dict[str, Any] = {}
+    with use_fake_providers(llm, search):
+        for _ in range(args.repeats):
+            start = time.perf_counter()
+            if mode == "full":
+                inputs = {"messages": [HumanMessage(content=QUESTION)]}
+                output = _invoke(research_graph, inputs, config, args)
+            else:
+                output = _invoke(refresh_graph, {"prior_run": record}, config, args)
+                report = output["refresh_report"]
+            seconds.append(time.perf_counter() - start)
+            searches.append(output["search_count"])
+            tokens.append(output["tokens_used"])
+    return {
+        "mode": mode,
+        "repeats": args.repeats,
+        "searches": statistics.mean(searches),
+        "tokens": statistics.mean(tokens),
+        "seconds_mean": statistics.mean(seconds),
+        "refresh_report": report or None,
+    }
+
+
+def main() -> None:
+    """最初からの実行と再実行の結果をJSONで出力。"""
+    parser = argparse.ArgumentParser(description="Refresh benchmark")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--max-loops", type=int, default=2)
+    parser.add_argument("--llm-latency", type=float, default=0.2)
+    parser.add_argument("--search-latency", type=float, default=0.2)
+    parser.add_argument("--use-async", action="store_true")
+    args = parser.parse_args()
+
+    with use_fake_providers(
+        FakeChatModel(follow_up_queries=2), FakeSearchProvider()
+    ):
+        output = research_graph.invoke(
+            {"messages": [HumanMessage(content=QUESTION)]},
+            {"configurable": {"max_research_loops": args.max_loops}},
+        )
+    record = build_run_record(output)
+
+    results = [
+        run(args, mode, record)
+        for mode in ("full", "refresh_unchanged", "refresh_changed")
+    ]
+    for result in results[1:]:
+        result["token_ratio"] = result["tokens"] / results[0]["tokens"]
+        result["speedup"] = results[0]["seconds_mean"] / result["seconds_mean"]
+    print(json.dumps(results, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
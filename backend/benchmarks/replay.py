@@ -0,0 +1,454 @@
+"""プロバイダー（LLM・検索）の応答の記録と再生。
+
+記録モードでは実際のプロバイダーの応答とレイテンシをカセット（JSONLファイル）に
+追記し、再生モードではカセットの応答を記録したレイテンシ（`time_scale` 倍）で返します。
+カセットに無い呼び出しはフェイクLLM・フェイク検索の応答で補い、その回数を
+`ReplayStats` に数えます。
+
+LLMの応答はモデル名・構造化出力のスキーマ名・プロンプト（日付は置き換えて正規化）、
+検索の結果はクエリで対応付けます。検索は `record_max_results` 件で記録しておき、
+再生時に設定の `max_results` 件に切り詰めます。
+"""
+
+import asyncio
+import contextvars
+import hashlib
+import json
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, replace
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Type
+
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForLLMRun,
+    CallbackManagerForLLMRun,
+)
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.runnables import Runnable, RunnableConfig, RunnableLambda
+from langchain_openai import ChatOpenAI
+from pydantic import BaseModel
+
+from benchmarks.fakes import FakeChatModel, FakeSearchProvider
+from src.config.configuration import Configuration, SearchConfig
+from src.providers import (
+    SearchProvider,
+    SearchResult,
+    call_with_limiter,
+    get_search_provider,
+    register_search_provider,
+    set_chat_model_factory,
+    unregister_search_provider,
+)
+from src.utils.date_utils import get_current_date
+
+# 記録のプロンプトに含まれる日付の置き換え先（記録した日と再生する日が違っても一致させる）
+DATE_PLACEHOLDER = "{current_date}"
+
+
+def _prompt_text(input: Any) -> str:
+    """LLMへの入力を、フェイクLLMと同じ形式の1つのプロンプトにまとめる。"""
+    if isinstance(input, str):
+        return input
+    if isinstance(input, list):
+        return "\n".join(
+            str(message.content if isinstance(message, BaseMessage) else message)
+            for message in input
+        )
+    return str(input)
+
+
+def _structured_text(message: Any) -> str:
+    """構造化出力の応答メッセージからJSONのテキストを取り出す。"""
+    calls = getattr(message, "tool_calls", None) or []
+    if calls:
+        return json.dumps(calls[0]["args"], ensure_ascii=False)
+    invalid = getattr(message, "invalid_tool_calls", None) or []
+    if invalid and invalid[0].get("args"):
+        return str(invalid[0]["args"])
+    return str(getattr(message, "content", ""))
+
+
+@dataclass
+class ReplayStats:
+    """1つの設定の実行で、カセットから再生した呼び出しとフェイクで補った呼び出しの数。"""
+
+    llm_hits: int = 0
+    llm_misses: int = 0
+    search_hits: int = 0
+    search_misses: int = 0
+
+
+# 実行中の設定の再生統計（ノードのスレッドにもコンテキストごと引き継がれる）
+_current_stats: contextvars.ContextVar[Optional[ReplayStats]] = (
+    contextvars.ContextVar("replay_stats", default=None)
+)
+
+
+@contextmanager
+def collect_replay_stats() -> Iterator[ReplayStats]:
+    """このコンテキストで行った呼び出しの再生統計を集計するコンテキストマネージャー。"""
+    stats = ReplayStats()
+    token = _current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_stats.reset(token)
+
+
+def _count(field: str) -> None:
+    """実行中の設定の再生統計を数える。"""
+    stats = _current_stats.get()
+    if stats is not None:
+        setattr(stats, field, getattr(stats, field) + 1)
+
+
+class Cassette:
+    """記録したプロバイダーの応答（1行1件のJSONL）。
+
+    同じ呼び出しは最初に記録した応答だけを保持します。`path` が無ければ
+    メモリ上だけで記録します。
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        """カセットを初期化（ファイルがあれば読み込む）。"""
+        self.path = Path(path) if path else None
+        self._entries: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        if self.path is not None and self.path.is_file():
+            with self.path.open(encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self._entries.setdefault(
+                            (entry["kind"], entry["key"]), entry
+                        )
+
+    def __len__(self) -> int:
+        """記録した応答の数。"""
+        return len(self._entries)
+
+    @staticmethod
+    def llm_key(model: str, schema_name: Optional[str], prompt: str) -> str:
+        """LLMの呼び出しのキー（プロンプトの日付は置き換えて正規化）。"""
+        normalized = prompt.replace(get_current_date(), DATE_PLACEHOLDER)
+        text = f"{model}\0{schema_name or ''}\0{normalized}"
+        return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+    def get(self, kind: str, key: str) -> Optional[Dict[str, Any]]:
+        """記録した応答を取得。"""
+        return self._entries.get((kind, key))
+
+    def put(self, kind: str, key: str, entry: Dict[str, Any]) -> None:
+        """応答を記録（記録済みなら何もしない）。"""
+        entry = {"kind": kind, "key": key, **entry}
+        with self._lock:
+            if (kind, key) in self._entries:
+                return
+            self._entries[(kind, key)] = entry
+            if self.path is not None:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                with self.path.open("a", encoding="utf-8") as f:
+                    f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+
+class RecordingChatModel(BaseChatModel):
+    """実際のチャットモデルを呼び出し、応答とレイテンシをカセットに記録するモデル。"""
+
+    inner: BaseChatModel
+    cassette: Any
+    model_name: str
+
+    @property
+    def _llm_type(self) -> str:
+        return "recording-chat-model"
+
+    def _record(
+        self,
+        input: Any,
+        schema_name: Optional[str],
+        message: Any,
+        latency: float,
+    ) -> None:
+        """応答をカセットに記録。"""
+        content = (
+            _structured_text(message) if schema_name else str(message.content)
+        )
+        self.cassette.put(
+            "llm",
+            Cassette.llm_key(self.model_name, schema_name, _prompt_text(input)),
+            {
+                "model": self.model_name,
+                "schema": schema_name,
+                "content": content,
+                "usage": dict(getattr(message, "usage_metadata", None) or {}),
+                "latency": round(latency, 4),
+            },
+        )
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        start = time.perf_counter()
+        result = self.inner._generate(messages, stop=stop, **kwargs)
+        message = result.generations[0].message
+        self._record(messages, None, message, time.perf_counter() - start)
+        return result
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        start = time.perf_counter()
+        result = await self.inner._agenerate(messages, stop=stop, **kwargs)
+        message = result.generations[0].message
+        self._record(messages, None, message, time.perf_counter() - start)
+        return result
+
+    def with_structured_output(  # type: ignore[override]
+        self, schema: Type[BaseModel], **kwargs: Any
+    ) -> Runnable:
+        """実際のモデルの構造化出力を呼び出し、応答のJSONを記録するランナブル。"""
+        include_raw = kwargs.get("include_raw", False)
+        structured = self.inner.with_structured_output(schema, include_raw=True)
+        name = schema.__name__
+
+        def unwrap(output: Dict[str, Any]) -> Any:
+            if include_raw:
+                return output
+            if output.get("parsing_error") is not None:
+                raise output["parsing_error"]
+            return output["parsed"]
+
+        def invoke(input: Any, config: RunnableConfig) -> Any:
+            start = time.perf_counter()
+            output = structured.invoke(input, config)
+            self._record(input, name, output["raw"], time.perf_counter() - start)
+            return unwrap(output)
+
+        async def ainvoke(input: Any, config: RunnableConfig) -> Any:
+            start = time.perf_counter()
+            output = await structured.ainvoke(input, config)
+            self._record(input, name, output["raw"], time.perf_counter() - start)
+            return unwrap(output)
+
+        return RunnableLambda(invoke, afunc=ainvoke, name=f"Recording{name}")
+
+
+class ReplayChatModel(FakeChatModel):
+    """カセットに記録した応答を返すチャットモデル（記録に無ければフェイクの応答）。
+
+    記録したレイテンシを `time_scale` 倍して待ちます。フェイクで補う場合は
+    `latency` などフェイクLLMの設定に従います。
+    """
+
+    cassette: Any = None
+    time_scale: float = 1.0
+
+    def _lookup(
+        self, messages: List[BaseMessage], kwargs: Dict[str, Any]
+    ) -> Optional[Dict[str, Any]]:
+        """呼び出しに対応する記録を検索し、再生統計を数える。"""
+        key = Cassette.llm_key(
+            self.model_name, kwargs.get("schema_name"), _prompt_text(messages)
+        )
+        entry = self.cassette.get("llm", key) if self.cassette else None
+        _count("llm_hits" if entry else "llm_misses")
+        return entry
+
+    def _replay(self, entry: Dict[str, Any]) -> ChatResult:
+        """記録した応答から結果を作成。"""
+        message = AIMessage(
+            content=entry["content"],
+            usage_metadata=entry.get("usage") or None,
+            response_metadata={"model_name": self.model_name, "replayed": True},
+        )
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        entry = self._lookup(messages, kwargs)
+        if entry is None:
+            return super()._generate(messages, stop, run_manager, **kwargs)
+        time.sleep(entry["latency"] * self.time_scale)
+        return self._replay(entry)
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        entry = self._lookup(messages, kwargs)
+        if entry is None:
+            return await super()._agenerate(messages, stop, run_manager, **kwargs)
+        await asyncio.sleep(entry["latency"] * self.time_scale)
+        return self._replay(entry)
+
+
+class RecordingSearchProvider(SearchProvider):
+    """実際の検索プロバイダーを呼び出し、結果とレイテンシをカセットに記録するプロバイダー。"""
+
+    name = "recording"
+
+    def __init__(self, config: SearchConfig, inner: SearchProvider, cassette: Cassette):
+        """記録用プロバイダーを初期化。"""
+        super().__init__(config)
+        self.inner = inner
+        self.cassette = cassette
+
+    def search(self, query: str) -> List[SearchResult]:
+        """実際のプロバイダーのリミッター経由で検索し、結果を記録。"""
+
+        def timed() -> Tuple[List[SearchResult], float]:
+            start = time.perf_counter()
+            return self.inner.search(query), time.perf_counter() - start
+
+        results, latency = call_with_limiter(self.inner.name, timed)
+        self.cassette.put(
+            "search", query, {"results": results, "latency": round(latency, 4)}
+        )
+        return results[: self.config.max_results]
+
+
+class ReplaySearchProvider(SearchProvider):
+    """カセットに記録した検索結果を返すプロバイダー（記録に無ければフェイクの結果）。"""
+
+    name = "replay"
+
+    def __init__(
+        self,
+        config: SearchConfig,
+        cassette: Optional[Cassette],
+        fallback: FakeSearchProvider,
+        time_scale: float,
+    ):
+        """再生用プロバイダーを初期化。"""
+        super().__init__(config)
+        self.cassette = cassette
+        self.fallback = fallback
+        self.time_scale = time_scale
+
+    def _lookup(self, query: str) -> Optional[Dict[str, Any]]:
+        """クエリに対応する記録を検索し、再生統計を数える。"""
+        entry = self.cassette.get("search", query) if self.cassette else None
+        _count("search_hits" if entry else "search_misses")
+        return entry
+
+    def search(self, query: str) -> List[SearchResult]:
+        """記録した結果を設定の件数に切り詰めて返す。"""
+        entry = self._lookup(query)
+        if entry is None:
+            return self.fallback.search(query)[: self.config.max_results]
+        time.sleep(entry["latency"] * self.time_scale)
+        return entry["results"][: self.config.max_results]
+
+    async def asearch(self, query: str) -> List[SearchResult]:
+        """`search` の非同期版。"""
+        entry = self._lookup(query)
+        if entry is None:
+            return (await self.fallback.asearch(query))[: self.config.max_results]
+        await asyncio.sleep(entry["latency"] * self.time_scale)
+        return entry["results"][: self.config.max_results]
+
+
+def _openai_chat_model(model: str, temperature: float, max_retries: int) -> ChatOpenAI:
+    """記録に使う実際のチャットモデル（`OPENAI_API_KEY` などは環境変数から）。"""
+    return ChatOpenAI(model=model, temperature=temperature, max_retries=max_retries)
+
+
+@contextmanager
+def _use_providers(
+    chat_model_factory: Callable[[str, float, int], BaseChatModel],
+    name: str,
+    search_factory: Callable[[SearchConfig], SearchProvider],
+) -> Iterator[None]:
+    """チャットモデルのファクトリと検索プロバイダーを一時的に差し替える。"""
+    default_config = Configuration.get_config()
+    original_search = default_config.search
+    set_chat_model_factory(chat_model_factory)
+    register_search_provider(name, search_factory)
+    default_config.search = replace(original_search, search_provider=name)
+    try:
+        yield
+    finally:
+        set_chat_model_factory(None)
+        unregister_search_provider(name)
+        default_config.search = original_search
+
+
+@contextmanager
+def use_recording_providers(
+    cassette: Cassette, record_max_results: int
+) -> Iterator[None]:
+    """実際のLLM（OpenAI）・検索プロバイダーの応答を記録するコンテキストマネージャー。
+
+    検索は既定の `search_provider` で `record_max_results` 件を取得して記録します。
+    """
+    source = Configuration.get_config().search.search_provider
+
+    def chat_model_factory(
+        model: str, temperature: float, max_retries: int
+    ) -> BaseChatModel:
+        return RecordingChatModel(
+            inner=_openai_chat_model(model, temperature, max_retries),
+            cassette=cassette,
+            model_name=model,
+        )
+
+    def search_factory(config: SearchConfig) -> SearchProvider:
+        inner_config = replace(
+            config, search_provider=source, max_results=record_max_results
+        )
+        return RecordingSearchProvider(
+            config, get_search_provider(inner_config), cassette
+        )
+
+    name = RecordingSearchProvider.name
+    with _use_providers(chat_model_factory, name, search_factory):
+        yield
+
+
+@contextmanager
+def use_replay_providers(
+    cassette: Optional[Cassette],
+    time_scale: float = 1.0,
+    llm: Optional[FakeChatModel] = None,
+    search: Optional[FakeSearchProvider] = None,
+) -> Iterator[None]:
+    """カセットの応答を再生するコンテキストマネージャー。
+
+    記録に無い呼び出しは `llm` / `search` のフェイクで補います。
+    """
+    llm = llm or FakeChatModel()
+    search = search or FakeSearchProvider()
+    fields = {name: getattr(llm, name) for name in type(llm).model_fields}
+    replay_llm = ReplayChatModel(**fields, cassette=cassette, time_scale=time_scale)
+
+    def chat_model_factory(
+        model: str, temperature: float, max_retries: int
+    ) -> BaseChatModel:
+        return replay_llm.model_copy(update={"model_name": model})
+
+    def search_factory(config: SearchConfig) -> SearchProvider:
+        return ReplaySearchProvider(config, cassette, search, time_scale)
+
+    name = ReplaySearchProvider.name
+    with _use_providers(chat_model_factory, name, search_factory):
+        yield
@@ -0,0 +1,278 @@
+"""フェイクプロバイダーで研究グラフ全体を実行するオフラインベンチマーク。
+
+測定項目:
+    - スーパーステップあたりのグラフオーバーヘッド（レイテンシ0のフェイク使用）
+    - 初期クエリ数 1..256 に対するファンアウトのスケーリング
+    - 研究ループごとの状態サイズ（チェックポイントのシリアライズサイズ）
+    - 1回の実行のメモリピーク（tracemalloc）
+
+使い方:
+    python -m benchmarks.research_graph_bench --output report.json
+    python -m benchmarks.compare baseline.json report.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from langchain_core.messages import HumanMessage
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+from benchmarks.fakes import FakeChatModel, FakeSearchProvider, use_fake_providers
+from src.graphs import research_graph
+from src.observability.metrics import NODE_LATENCY, REGISTRY
+
+QUESTION = "再生可能エネルギーの導入状況と今後の課題は？"
+NODE_NAMES = (
+    "generate_query",
+    "web_research_router",
+    "web_research",
+    "reflection",
+    "research_evaluation",
+    "finalize_answer",
+)
+
+_serializer = JsonPlusSerializer()
+
+
+def _state_bytes(values: Dict[str, Any]) -> int:
+    """状態をチェックポイントと同じ方式でシリアライズしたサイズを取得。"""
+    return len(_serializer.dumps_typed(values)[1])
+
+
+def _git_commit() -> Optional[str]:
+    """現在のgitコミットハッシュを取得。"""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_once(
+    initial_queries: int,
+    max_loops: int,
+    max_concurrency: Optional[int] = None,
+    record_state: bool = False,
+) -> Dict[str, Any]:
+    """研究グラフを1回実行し、ステップごとの計測値を返す。"""
+    state = {
+        "messages": [HumanMessage(content=QUESTION)],
+        "initial_search_query_count": initial_queries,
+        "max_research_loops": max_loops,
+    }
+    config: Dict[str, Any] = {"configurable": {"thread_id": f"bench-{uuid.uuid4()}"}}
+    if max_concurrency:
+        config["max_concurrency"] = max_concurrency
+
+    REGISTRY.reset()
+    steps: List[Dict[str, Any]] = []
+    final_values: Dict[str, Any] = {}
+    start = time.perf_counter()
+    previous = start
+    for values in research_graph.stream(state, config, stream_mode="values"):
+        now = time.perf_counter()
+        step: Dict[str, Any] = {"seconds": now - previous}
+        if record_state:
+            step.update(
+                {
+                    "research_loop_count": values.get("research_loop_count", 0),
+                    "state_bytes": _state_bytes(values),
+                    "search_query": len(values.get("search_query", [])),
+                    "web_research_result": len(values.get("web_research_result", [])),
+                    "sources_gathered": len(values.get("sources_gathered", [])),
+                }
+            )
+        steps.append(step)
+        final_values = values
+        previous = time.perf_counter()
+    wall = time.perf_counter() - start
+
+    node_seconds = sum(NODE_LATENCY.total(name) for name in NODE_NAMES)
+    # 最初の出力は入力状態なのでスーパーステップ数から除外
+    supersteps = max(1, len(steps) - 1)
+    return {
+        "wall_seconds": wall,
+        "supersteps": supersteps,
+        "node_seconds": node_seconds,
+        "searches": NODE_LATENCY.count("web_research"),
+        "sources_gathered": len(final_values.get("sources_gathered", [])),
+        "steps": steps,
+    }
+
+
+def bench_superstep_overhead(repeats: int, max_loops: int) -> Dict[str, Any]:
+    """レイテンシ0のフェイクでスーパーステップあたりのオーバーヘッドを測定。"""
+    runs = []
+    with use_fake_providers(FakeChatModel(), FakeSearchProvider()):
+        run_once(3, max_loops)  # ウォームアップ
+        for _ in range(repeats):
+            runs.append(run_once(3, max_loops))
+
+    per_step = [run["wall_seconds"] / run["supersteps"] for run in runs]
+    framework = [
+        max(0.0, run["wall_seconds"] - run["node_seconds"]) / run["supersteps"]
+        for run in runs
+    ]
+    return {
+        "repeats": repeats,
+        "supersteps": runs[0]["supersteps"],
+        "wall_seconds_median": statistics.median(r["wall_seconds"] for r in runs),
+        "seconds_per_superstep_median": statistics.median(per_step),
+        # ノード内部の処理時間を除いたフレームワーク側の時間（並列ノードは重複計上のため下限値）
+        "framework_seconds_per_superstep_median": statistics.median(framework),
+    }
+
+
+def bench_fanout(
+    fanouts: List[int],
+    repeats: int,
+    llm_latency: float,
+    search_latency: float,
+    results_per_query: int,
+    content_chars: int,
+    max_concurrency: Optional[int],
+) -> List[Dict[str, Any]]:
+    """初期クエリ数を変化させたときの実行時間を測定。"""
+    llm = FakeChatModel(latency=llm_latency, follow_up_queries=0)
+    search = FakeSearchProvider(
+        max_results=results_per_query,
+        content_chars=content_chars,
+        latency=search_latency,
+    )
+    # LLM呼び出しは直列に3回（クエリ生成・リフレクション・最終回答）
+    ideal_seconds = 3 * llm_latency + search_latency
+
+    rows = []
+    with use_fake_providers(llm, search):
+        for fanout in fanouts:
+            runs = [
+                run_once(fanout, 1, max_concurrency=max_concurrency)
+                for _ in range(repeats)
+            ]
+            wall = statistics.median(run["wall_seconds"] for run in runs)
+            rows.append(
+                {
+                    "initial_queries": fanout,
+                    "wall_seconds_median": wall,
+                    "ideal_seconds": ideal_seconds,
+                    "slowdown_vs_ideal": wall / ideal_seconds if ideal_seconds else None,
+                    "searches": runs[0]["searches"],
+                    "sources_gathered": runs[0]["sources_gathered"],
+                }
+            )
+    return rows
+
+
+def bench_state_growth(
+    max_loops: int, results_per_query: int, content_chars: int
+) -> List[Dict[str, Any]]:
+    """研究ループごとの状態サイズを測定。"""
+    llm = FakeChatModel(follow_up_queries=3)
+    search = FakeSearchProvider(max_results=results_per_query, content_chars=content_chars)
+    with use_fake_providers(llm, search):
+        run = run_once(3, max_loops, record_state=True)
+
+    # ループ番号ごとに最後（最大）の状態サイズを採用
+    by_loop: Dict[int, Dict[str, Any]] = {}
+    for step in run["steps"]:
+        by_loop[step["research_loop_count"]] = {
+            key: value for key, value in step.items() if key != "seconds"
+        }
+    return [by_loop[loop] for loop in sorted(by_loop)]
+
+
+def bench_memory(
+    initial_queries: int, max_loops: int, results_per_query: int, content_chars: int
+) -> Dict[str, Any]:
+    """1回の実行中のPythonヒープのピークを測定。"""
+    search = FakeSearchProvider(max_results=results_per_query, content_chars=content_chars)
+    with use_fake_providers(FakeChatModel(follow_up_queries=3), search):
+        run_once(1, 1)  # インポートやキャッシュの初期化分を除外
+        tracemalloc.start()
+        try:
+            run_once(initial_queries, max_loops)
+            current, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+    return {
+        "initial_queries": initial_queries,
+        "max_loops": max_loops,
+        "peak_bytes": peak,
+        "retained_bytes": current,
+    }
+
+
+def build_report(args: argparse.Namespace) -> Dict[str, Any]:
+    """全ベンチマークを実行してレポートを作成。"""
+    fanouts = [int(value) for value in args.fanout.split(",") if value]
+    return {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "git_commit": _git_commit(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "params": vars(args),
+        },
+        "superstep_overhead": bench_superstep_overhead(args.repeats, args.max_loops),
+        "fanout": bench_fanout(
+            fanouts,
+            args.repeats,
+            args.llm_latency,
+            args.search_latency,
+            args.results_per_query,
+            args.content_chars,
+            args.max_concurrency,
+        ),
+        "state_growth": bench_state_growth(
+            args.max_loops, args.results_per_query, args.content_chars
+        ),
+        "memory": bench_memory(
+            args.memory_queries,
+            args.max_loops,
+            args.results_per_query,
+            args.content_chars,
+        ),
+    }
+
+
+def main() -> None:
+    """ベンチマークを実行し、JSONレポートを出力。"""
+    parser = argparse.ArgumentParser(description="Offline research graph benchmark")
+    parser.add_argument("--output", help="Write the JSON report to this path")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--max-loops", type=int, default=3)
+    parser.add_argument("--fanout", default="1,2,4,8,16,32,64,128,256")
+    parser.add_argument("--llm-latency", type=float, default=0.05)
+    parser.add_argument("--search-latency", type=float, default=0.05)
+    parser.add_argument("--results-per-query", type=int, default=5)
+    parser.add_argument("--content-chars", type=int, default=500)
+    parser.add_argument("--memory-queries", type=int, default=32)
+    parser.add_argument("--max-concurrency", type=int, default=None)
+    args = parser.parse_args()
+
+    report = build_report(args)
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""検索結果の書式（verbose / compact）ごとのプロンプトトークン数を比較するベンチマーク。
+
+フェイクプロバイダーで研究グラフを実行し、リフレクションと最終回答の入力トークン数
+（フェイクLLMの概算値）を書式ごとに集計して、verboseに対する削減量を出力します。
+
+使い方:
+    python -m benchmarks.result_format_bench --initial-queries 3 --max-loops 3
+"""
+
+import argparse
+import json
+import uuid
+from typing import Any, Dict, List
+
+from langchain_core.messages import HumanMessage
+
+from benchmarks.fakes import FakeChatModel, FakeSearchProvider, use_fake_providers
+from src.config.configuration import Configuration
+from src.graphs import research_graph
+from src.observability.metrics import LLM_TOKENS, REGISTRY
+
+QUESTION = "再生可能エネルギーの導入状況と今後の課題は？"
+MODES: List[Dict[str, Any]] = [
+    {"result_format": "verbose", "reflection_include_urls": True},
+    {"result_format": "compact", "reflection_include_urls": True},
+    {"result_format": "compact", "reflection_include_urls": False},
+]
+
+
+NODE_MODELS = (
+    ("generate_query", "query_generator_model"),
+    ("reflection", "reflection_model"),
+    ("finalize_answer", "answer_model"),
+)
+
+
+def _input_tokens(node: str, model_field: str) -> float:
+    """ノードのLLM呼び出しの入力トークン数を取得。"""
+    model = getattr(Configuration.get_config().model, model_field)
+    return LLM_TOKENS.get(node, model, "input")
+
+
+def run(args: argparse.Namespace, mode: Dict[str, Any]) -> Dict[str, Any]:
+    """1つの書式で研究グラフを実行し、ノードごとの入力トークン数を集計。"""
+    REGISTRY.reset()
+    state = {
+        "messages": [HumanMessage(content=QUESTION)],
+        "initial_search_query_count": args.initial_queries,
+        "max_research_loops": args.max_loops,
+    }
+    config = {"configurable": {"thread_id": f"bench-{uuid.uuid4()}", **mode}}
+    final_state = research_graph.invoke(state, config)
+    tokens = {node: _input_tokens(node, field) for node, field in NODE_MODELS}
+    return {
+        **mode,
+        "sources": len(final_state["sources_gathered"]),
+        "reflection_input_tokens": tokens["reflection"],
+        "finalize_input_tokens": tokens["finalize_answer"],
+        "total_input_tokens": sum(tokens.values()),
+    }
+
+
+def main() -> None:
+    """書式ごとの結果とverboseに対する削減率をJSONで出力。"""
+    parser = argparse.ArgumentParser(description="Search result format benchmark")
+    parser.add_argument("--initial-queries", type=int, default=3)
+    parser.add_argument("--max-loops", type=int, default=3)
+    parser.add_argument("--follow-up-queries", type=int, default=3)
+    parser.add_argument("--results-per-query", type=int, default=5)
+    parser.add_argument("--content-chars", type=int, default=300)
+    args = parser.parse_args()
+
+    llm = FakeChatModel(follow_up_queries=args.follow_up_queries)
+    search = FakeSearchProvider(
+        max_results=args.results_per_query, content_chars=args.content_chars
+    )
+    with use_fake_providers(llm, search):
+        reports = [run(args, mode) for mode in MODES]
+
+    baseline = reports[0]["total_input_tokens"]
+    for report in reports:
+        saved = baseline - report["total_input_tokens"]
+        report["tokens_saved_per_run"] = saved
+        report["saved_ratio"] = saved / baseline if baseline else 0.0
+    print(json.dumps(reports, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+"""実行アーカイブの形式ごとの書き込み・読み込みの速度、サイズ、メモリを測定するベンチマーク。
+
+研究グラフをフェイクで1回実行して実際の記録を作り、質問・URL・完了時刻・トークン数を
+変えた記録を `--records` 件、この環境で使える形式ごとに書き込みます。
+1件あたりのサイズ（圧縮前のJSONとの比）・書き込み速度・書き込み中のピークメモリと、
+全件の読み込み・条件と列を絞った読み込みの速度とピークメモリを集計します。
+ピークメモリは tracemalloc で測るPythonのヒープの増分です。
+
+使い方:
+    python -m benchmarks.run_archive_bench --records 20000
+"""
+
+import argparse
+import json
+import random
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Dict, Iterator, List
+
+from langchain_core.messages import HumanMessage
+
+from benchmarks.fakes import FakeChatModel, FakeSearchProvider, use_fake_providers
+from src.archive import (
+    RunArchiveWriter,
+    available_formats,
+    get_run_archive,
+    list_archive_chunks,
+    scan_run_archive,
+)
+from src.config.configuration import Configuration
+from src.graphs.research_graph import research_graph
+
+
+def sample_record() -> Dict[str, Any]:
+    """フェイクの研究グラフを1回実行し、アーカイブした記録を取り出す。"""
+    with tempfile.TemporaryDirectory() as path:
+        config = {
+            "configurable": {
+                "archive_enabled": True,
+                "archive_path": path,
+                "archive_format": "jsonl.gz",
+                "archive_flush_records": 1,
+            }
+        }
+        with use_fake_providers(FakeChatModel(), FakeSearchProvider()):
+            research_graph.invoke(
+                {"messages": [HumanMessage(content="再生可能エネルギーの課題は？")]},
+                config,
+            )
+        get_run_archive(Configuration.get_config(config).archive).close()
+        return next(scan_run_archive(path))
+
+
+def synthetic_records(
+    template: Dict[str, Any], count: int, seed: int
+) -> Iterator[Dict[str, Any]]:
+    """記録の質問・URL・完了時刻・トークン数・所要時間を変えた記録を順に作成。
+
+    同じ記録の繰り返しで圧縮率が実際より高くならないよう、実行ごとに
+    クエリとソースのURLを変えます。
+    """
+    rng = random.Random(seed)
+    started = time.time() - count
+    for index in range(count):
+        tag = f"{rng.getrandbits(64):016x}"
+        yield {
+            **template,
+            "run_key": f"run-{index}-{tag}",
+            "queries": [f"{query} {tag}" for query in template["queries"]],
+            "sources": [
+                {
+                    **source,
+                    "url": f"{source['url']}/{tag}",
+                    "query": f"{source['query']} {tag}",
+                    "fetched_at": started + index - rng.uniform(0, 60),
+                    "content_chars": rng.randint(200, 4000),
+                }
+                for source in template["sources"]
+            ],
+            "finished_at": started + index,
+            "question": f"{template['question']} ({index})",
+            "tokens_used": rng.randint(5_000, 60_000),
+            "elapsed_seconds": round(rng.uniform(5, 120), 3),
+        }
+
+
+def _measure(func: Any, trace: bool) -> Dict[str, Any]:
+    """関数の所要時間と、`trace` ならPythonのヒープのピークの増分を測定。
+
+    tracemalloc は処理を大きく遅くするため、時間とメモリは別々の実行で測ります。
+    """
+    if trace:
+        tracemalloc.start()
+    start = time.perf_counter()
+    result = func()
+    seconds = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1] if trace else 0
+    tracemalloc.stop()
+    return {"result": result, "seconds": seconds, "peak_bytes": peak}
+
+
+def _write(path: str, format: str, args: argparse.Namespace, template) -> int:
+    """合成した記録をアーカイブに書き込み、書き込んだ件数を返す。"""
+    writer = RunArchiveWriter(path, format, args.chunk_records, args.flush_records)
+    for record in synthetic_records(template, args.records, args.seed):
+        writer.append(record)
+    writer.close()
+    return args.records
+
+
+def run(
+    format: str, template: Dict[str, Any], args: argparse.Namespace
+) -> Dict[str, Any]:
+    """1つの形式で書き込みと読み込みを測定。"""
+    threshold = 30_000
+    scans = {
+        "full": lambda path: sum(1 for _ in scan_run_archive(path)),
+        "filtered": lambda path: sum(
+            1
+            for _ in scan_run_archive(
+                path,
+                where=lambda record: record["tokens_used"] > threshold,
+                fields=["run_key", "tokens_used", "elapsed_seconds"],
+            )
+        ),
+        "projected": lambda path: sum(
+            record["tokens_used"]
+            for record in scan_run_archive(path, fields=["tokens_used"])
+        ),
+    }
+    results: Dict[str, Any] = {"format": format, "records": args.records}
+    with tempfile.TemporaryDirectory() as path:
+        written = _measure(lambda: _write(path, format, args, template), False)
+        chunks = list_archive_chunks(path)
+        assert not list(Path(path).glob("*.part"))
+        size = sum(chunk.stat().st_size for chunk in chunks)
+        results["chunks"] = len(chunks)
+        results["bytes_per_record"] = size / args.records
+        results["write_records_per_second"] = args.records / written["seconds"]
+        for name, scan in scans.items():
+            timed = _measure(lambda scan=scan: scan(path), False)
+            results[f"{name}_scan_records_per_second"] = (
+                args.records / timed["seconds"]
+            )
+            results[f"{name}_scan_peak_mib"] = (
+                _measure(lambda scan=scan: scan(path), True)["peak_bytes"] / 2**20
+            )
+        results["filtered_matches"] = scans["filtered"](path)
+
+    with tempfile.TemporaryDirectory() as path:
+        traced = _measure(lambda: _write(path, format, args, template), True)
+        results["write_peak_mib"] = traced["peak_bytes"] / 2**20
+
+    raw_bytes = sum(
+        len(json.dumps(record, ensure_ascii=False).encode("utf-8")) + 1
+        for record in synthetic_records(template, args.records, args.seed)
+    )
+    results["compression_ratio"] = raw_bytes / size
+    return results
+
+
+def main() -> None:
+    """形式ごとの結果をJSONで出力。"""
+    parser = argparse.ArgumentParser(description="Run archive benchmark")
+    parser.add_argument("--records", type=int, default=20000)
+    parser.add_argument("--chunk-records", type=int, default=1000)
+    parser.add_argument("--flush-records", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--formats", nargs="*", default=None)
+    args = parser.parse_args()
+
+    template = sample_record()
+    formats: List[str] = args.formats or available_formats()
+    results = [run(format, template, args) for format in formats]
+    print(json.dumps(results, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""クエリ生成と並行して質問そのものを先行検索した場合の、最初の検索結果までの時間を比較するベンチマーク。
+
+研究グラフを `stream_mode="updates"` で実行し、検索結果を含む最初の更新が届くまでの
+時間（time-to-first-evidence）と全体の所要時間・検索回数を、`speculative_search` の
+有効・無効ごとに集計します。`--overlap` では生成したクエリの1件目が質問と重なる
+（先行検索を採用する）場合、`--no-overlap` では重ならない（破棄する）場合を測ります。
+LLM・検索は一定のレイテンシを持つフェイクです。
+
+使い方:
+    python -m benchmarks.speculative_search_bench --runs 10 --llm-latency 0.3
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from typing import Any, Dict, List, Optional
+
+from langchain_core.messages import HumanMessage
+
+from benchmarks.fakes import FakeChatModel, FakeSearchProvider, use_fake_providers
+from src.graphs.research_graph import research_graph
+
+QUESTION = "再生可能エネルギーの導入状況と今後の課題は？"
+
+
+def _has_evidence(update: Dict[str, Any]) -> bool:
+    """ノードの更新に検索結果が含まれるか。"""
+    return any(
+        isinstance(delta, dict) and delta.get("web_research_result")
+        for delta in update.values()
+    )
+
+
+def measure_once(config: Dict[str, Any], use_async: bool) -> Dict[str, Any]:
+    """1回実行して、最初の検索結果までの時間と所要時間・検索回数を測定。"""
+    inputs = {"messages": [HumanMessage(content=QUESTION)]}
+    first_evidence: Optional[float] = None
+    searches = 0
+    start = time.perf_counter()
+
+    def observe(update: Dict[str, Any]) -> None:
+        nonlocal first_evidence, searches
+        if first_evidence is None and _has_evidence(update):
+            first_evidence = time.perf_counter() - start
+        for delta in update.values():
+            if isinstance(delta, dict):
+                searches += delta.get("search_count") or 0
+
+    if use_async:
+
+        async def consume() -> None:
+            async for update in research_graph.astream(
+                inputs, config, stream_mode="updates"
+            ):
+                observe(update)
+
+        asyncio.run(consume())
+    else:
+        for update in research_graph.stream(inputs, config, stream_mode="updates"):
+            observe(update)
+    return {
+        "first_evidence_seconds": first_evidence,
+        "seconds": time.perf_counter() - start,
+        "searches": searches,
+    }
+
+
+def run(args: argparse.Namespace, speculative: bool) -> Dict[str, Any]:
+    """1つの設定で `--runs` 回実行して測定。"""
+    llm = FakeChatModel(latency=args.llm_latency, echo_topic_query=args.overlap)
+    search = FakeSearchProvider(latency=args.search_latency)
+    config = {
+        "configurable": {
+            "speculative_search": speculative,
+            "max_research_loops": args.max_loops,
+            "number_of_initial_queries": args.queries,
+        }
+    }
+    measurements: List[Dict[str, Any]] = []
+    with use_fake_providers(llm, search):
+        for _ in range(args.runs):
+            measurements.append(measure_once(config, args.use_async))
+
+    return {
+        "speculative_search": speculative,
+        "overlap": args.overlap,
+        "runs": args.runs,
+        "first_evidence_seconds_mean": statistics.mean(
+            m["first_evidence_seconds"] for m in measurements
+        ),
+        "seconds_mean": statistics.mean(m["seconds"] for m in measurements),
+        "searches_mean": statistics.mean(m["searches"] for m in measurements),
+    }
+
+
+def main() -> None:
+    """先行検索の有効・無効の結果と、最初の検索結果までの時間の短縮をJSONで出力。"""
+    parser = argparse.ArgumentParser(description="Speculative search benchmark")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=3)
+    parser.add_argument("--max-loops", type=int, default=1)
+    parser.add_argument("--llm-latency", type=float, default=0.3)
+    parser.add_argument("--search-latency", type=float, default=0.2)
+    parser.add_argument(
+        "--overlap", action=argparse.BooleanOptionalAction, default=True
+    )
+    parser.add_argument("--use-async", action="store_true")
+    args = parser.parse_args()
+
+    baseline = run(args, speculative=False)
+    speculative = run(args, speculative=True)
+    speculative["first_evidence_speedup"] = (
+        baseline["first_evidence_seconds_mean"]
+        / speculative["first_evidence_seconds_mean"]
+    )
+    print(json.dumps([baseline, speculative], indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,333 @@
+"""OpenAI・Tavily のAPIを模したローカルのスタンドインHTTPサーバー。
+
+負荷試験でデプロイしたアプリ（`langgraph.json` のグラフと `src/api/app.py`）を
+外部サービス無しで動かすためのサーバーです。応答の内容はフェイクLLM・フェイク検索と
+同じ決定的なもので、レイテンシの分布とエラー（500）・レート制限（429）の割合を
+設定できます。アプリには次の環境変数でスタンドインを指定します。
+
+- OpenAI: `OPENAI_BASE_URL`（`OpenAIStandIn.base_url`）
+- Tavily: `TAVILY_API_URL`（`TavilyStandIn.base_url`）
+"""
+
+import json
+import math
+import random
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from langchain_core.messages import AIMessage
+
+from benchmarks.fakes import FakeChatModel, FakeSearchProvider
+
+DISTRIBUTIONS = ("fixed", "exponential", "lognormal")
+
+
+@dataclass
+class FaultProfile:
+    """スタンドインの応答のレイテンシの分布とエラーの割合。"""
+
+    # 平均レイテンシ（秒）と分布（fixed / exponential / lognormal）
+    latency: float = 0.0
+    distribution: str = "fixed"
+    # lognormal の対数の標準偏差（大きいほどロングテール）
+    sigma: float = 0.75
+    # 500（サーバーエラー）・429（レート制限）を返す割合
+    error_rate: float = 0.0
+    throttle_rate: float = 0.0
+
+    def sample_latency(self, rng: random.Random) -> float:
+        """1回の応答のレイテンシを抽選（平均が `latency` になる分布）。"""
+        if self.latency <= 0:
+            return 0.0
+        if self.distribution == "exponential":
+            return rng.expovariate(1 / self.latency)
+        if self.distribution == "lognormal":
+            mu = math.log(self.latency) - self.sigma**2 / 2
+            return rng.lognormvariate(mu, self.sigma)
+        return self.latency
+
+    def sample_status(self, rng: random.Random) -> int:
+        """1回の応答のステータスコードを抽選。"""
+        draw = rng.random()
+        if draw < self.throttle_rate:
+            return 429
+        if draw < self.throttle_rate + self.error_rate:
+            return 500
+        return 200
+
+
+class _Server(ThreadingHTTPServer):
+    """多数の同時接続を受け付けられるよう待ち行列を大きくしたサーバー。"""
+
+    daemon_threads = True
+    request_queue_size = 4096
+
+
+class StandInServer:
+    """設定したレイテンシ・エラーで応答するスタンドインHTTPサーバーの基底クラス。"""
+
+    name = "stand-in"
+
+    def __init__(self, profile: FaultProfile, seed: int = 0):
+        """サーバーを初期化（`start` で待ち受けを開始）。"""
+        self.profile = profile
+        self.requests = 0
+        self.statuses: Dict[int, int] = {}
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = _Server(("127.0.0.1", 0), self._handler_class())
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        """APIのベースURL。"""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "StandInServer":
+        """待ち受けを開始。"""
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """待ち受けを終了。"""
+        self._server.shutdown()
+        self._server.server_close()
+
+    def stats(self) -> Dict[str, Any]:
+        """リクエスト数・ステータスコードごとの応答数・ピークの同時処理数。"""
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "statuses": {str(code): count for code, count in self.statuses.items()},
+                "peak_in_flight": self.peak_in_flight,
+            }
+
+    def _admit(self) -> Tuple[float, int]:
+        """リクエストを受け付け、レイテンシとステータスコードを抽選。"""
+        with self._lock:
+            self.requests += 1
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+            return (
+                self.profile.sample_latency(self._rng),
+                self.profile.sample_status(self._rng),
+            )
+
+    def _done(self, status: int) -> None:
+        """リクエストの処理を終了。"""
+        with self._lock:
+            self.in_flight -= 1
+            self.statuses[status] = self.statuses.get(status, 0) + 1
+
+    def respond(self, path: str, body: Dict[str, Any]) -> Dict[str, Any]:
+        """正常時の応答ボディを作成（サブクラスで実装）。"""
+        raise NotImplementedError
+
+    def stream(self, payload: Dict[str, Any]) -> Optional[Iterator[Dict[str, Any]]]:
+        """ストリーミングで返す場合のチャンク（サブクラスで実装、既定はストリーミングなし）。"""
+        return None
+
+    def _handler_class(self) -> type:
+        """このサーバーのリクエストハンドラークラス。"""
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format: str, *args: Any) -> None:
+                pass
+
+            def _send_json(self, status: int, payload: Dict[str, Any]) -> None:
+                data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _send_stream(self, chunks: Iterator[Dict[str, Any]]) -> None:
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                for chunk in chunks:
+                    line = f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
+                    self.wfile.write(line.encode("utf-8"))
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.close_connection = True
+
+            def do_GET(self) -> None:
+                self._send_json(200, {"ok": True})
+
+            def do_POST(self) -> None:
+                length = int(self.headers.get("Content-Length") or 0)
+                body = json.loads(self.rfile.read(length) or b"{}")
+                latency, status = server._admit()
+                try:
+                    if latency:
+                        time.sleep(latency)
+                    if status != 200:
+                        self._send_json(
+                            status,
+                            {"error": {"message": "injected", "code": status}},
+                        )
+                        return
+                    payload = server.respond(self.path, body)
+                    chunks = server.stream(payload) if body.get("stream") else None
+                    if chunks is not None:
+                        self._send_stream(chunks)
+                    else:
+                        self._send_json(200, payload)
+                finally:
+                    server._done(status)
+
+        return Handler
+
+
+def _schema_name(body: Dict[str, Any]) -> Tuple[Optional[str], bool]:
+    """リクエストの構造化出力のスキーマ名と、ツール呼び出しで返すかどうか。"""
+    response_format = body.get("response_format") or {}
+    if response_format.get("type") == "json_schema":
+        return response_format.get("json_schema", {}).get("name"), False
+    tools = body.get("tools") or []
+    if tools:
+        return tools[0].get("function", {}).get("name"), True
+    return None, False
+
+
+def _prompt_text(body: Dict[str, Any]) -> str:
+    """リクエストのメッセージを1つのプロンプトにまとめる。"""
+    parts: List[str] = []
+    for message in body.get("messages", []):
+        content = message.get("content") or ""
+        if isinstance(content, list):
+            content = "".join(
+                part.get("text", "") for part in content if isinstance(part, dict)
+            )
+        parts.append(str(content))
+    return "\n".join(parts)
+
+
+class OpenAIStandIn(StandInServer):
+    """OpenAI の Chat Completions API（`/chat/completions`）を模したサーバー。
+
+    構造化出力は `response_format`（json_schema）とツール呼び出しの両方に対応し、
+    フェイクLLMと同じ内容をスキーマ名に応じて返します。
+    """
+
+    name = "openai"
+
+    def __init__(
+        self,
+        profile: FaultProfile,
+        seed: int = 0,
+        llm: Optional[FakeChatModel] = None,
+    ):
+        """サーバーを初期化（応答の内容は `llm` のフェイクLLMで作成）。"""
+        super().__init__(profile, seed)
+        self.llm = llm or FakeChatModel()
+
+    @property
+    def base_url(self) -> str:
+        """OpenAI クライアントの `base_url`（`/v1` まで）。"""
+        return f"{super().base_url}/v1"
+
+    def respond(self, path: str, body: Dict[str, Any]) -> Dict[str, Any]:
+        """Chat Completions の応答を作成。"""
+        schema_name, as_tool = _schema_name(body)
+        message = self.llm.invoke(_prompt_text(body), schema_name=schema_name)
+        assert isinstance(message, AIMessage)
+        content = str(message.content)
+        usage = message.usage_metadata or {}
+        reply: Dict[str, Any] = {"role": "assistant", "content": content}
+        if as_tool:
+            reply = {
+                "role": "assistant",
+                "content": None,
+                "tool_calls": [
+                    {
+                        "id": f"call_{uuid.uuid4().hex[:12]}",
+                        "type": "function",
+                        "function": {"name": schema_name, "arguments": content},
+                    }
+                ],
+            }
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", self.llm.model_name),
+            "choices": [
+                {
+                    "index": 0,
+                    "message": reply,
+                    "finish_reason": "tool_calls" if as_tool else "stop",
+                }
+            ],
+            "usage": {
+                "prompt_tokens": usage.get("input_tokens", 0),
+                "completion_tokens": usage.get("output_tokens", 0),
+                "total_tokens": usage.get("total_tokens", 0),
+            },
+        }
+
+    def stream(self, payload: Dict[str, Any]) -> Optional[Iterator[Dict[str, Any]]]:
+        """応答を1つの差分チャンクと使用量のチャンクに分けて返す。"""
+        choice = payload["choices"][0]
+        delta = {k: v for k, v in choice["message"].items() if v is not None}
+        for call in delta.get("tool_calls", []):
+            call["index"] = 0
+        common = {
+            "id": payload["id"],
+            "object": "chat.completion.chunk",
+            "created": payload["created"],
+            "model": payload["model"],
+        }
+        return iter(
+            [
+                {**common, "choices": [{"index": 0, "delta": delta}]},
+                {
+                    **common,
+                    "choices": [
+                        {
+                            "index": 0,
+                            "delta": {},
+                            "finish_reason": choice["finish_reason"],
+                        }
+                    ],
+                },
+                {**common, "choices": [], "usage": payload["usage"]},
+            ]
+        )
+
+
+class TavilyStandIn(StandInServer):
+    """Tavily の検索API（`/search`）を模したサーバー（結果はフェイク検索と同じ）。"""
+
+    name = "tavily"
+
+    def respond(self, path: str, body: Dict[str, Any]) -> Dict[str, Any]:
+        """検索APIの応答を作成。"""
+        search = FakeSearchProvider(
+            max_results=int(body.get("max_results") or 5),
+            raw_content_chars=2000 if body.get("include_raw_content") else 0,
+        )
+        query = str(body.get("query", ""))
+        results = [
+            {**result, "score": round(1.0 - index * 0.05, 3)}
+            for index, result in enumerate(search.search(query))
+        ]
+        return {
+            "query": query,
+            "answer": None,
+            "images": [],
+            "results": results,
+            "response_time": 0.0,
+        }
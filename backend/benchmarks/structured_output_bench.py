@@ -0,0 +1,114 @@
+"""構造化出力のローカル修復と、LLMの呼び直しだけで対処する場合を比較するベンチマーク。
+
+一定の割合で崩れたJSON（コードフェンス・コメント・末尾のカンマ）や、JSONを含まない
+応答を返すフェイクLLMで、クエリ生成（`SearchQueryList`）とリフレクション
+（`Reflection`）の構造化出力を繰り返し呼び出します。
+
+- retry_only: パースに失敗したら `max_retries` 回までLLMを呼び直す（従来の対処）
+- local_repair: 呼び直す前に応答をローカルで修復してスキーマで検証する
+
+それぞれのLLM呼び出し回数・消費トークン数・失敗数・所要時間と、修復・再試行の
+回数（`research_structured_outputs_total`）を集計します。
+
+使い方:
+    python -m benchmarks.structured_output_bench --calls 200 --malformed-rate 0.2
+"""
+
+import argparse
+import json
+import time
+from typing import Any, Dict, Type
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.exceptions import OutputParserException
+from pydantic import BaseModel
+
+from benchmarks.fakes import FakeChatModel
+from src.observability.metrics import STRUCTURED_OUTPUTS
+from src.providers import invoke_chat_model, with_repaired_structured_output
+from src.schemas import Reflection, SearchQueryList
+
+PROMPTS = {
+    SearchQueryList: "研究トピックについて3個を超えるクエリを生成してください: {index}",
+    Reflection: "要約から知識のギャップを分析してください: {index}",
+}
+
+
+class CallCounter(BaseCallbackHandler):
+    """LLMの呼び出し回数を数えるコールバック。"""
+
+    def __init__(self) -> None:
+        self.calls = 0
+
+    def on_chat_model_start(self, *args: Any, **kwargs: Any) -> None:
+        self.calls += 1
+
+
+def _outcomes(schema: Type[BaseModel]) -> Dict[str, float]:
+    """スキーマごとの構造化出力の結果の回数。"""
+    return {
+        result: STRUCTURED_OUTPUTS.get(schema.__name__, result)
+        for result in ("parsed", "repaired", "retried", "failed")
+    }
+
+
+def run(args: argparse.Namespace, mode: str) -> Dict[str, Any]:
+    """1つの対処方法で `--calls` 回ずつ構造化出力を呼び出して測定。"""
+    counter = CallCounter()
+    llm = FakeChatModel(
+        latency=args.llm_latency,
+        malformed_json_rate=args.malformed_rate,
+        unparseable_json_rate=args.unparseable_rate,
+        callbacks=[counter],
+    )
+    tokens = failures = 0
+    outcomes: Dict[str, Dict[str, float]] = {}
+    start = time.perf_counter()
+    for schema, prompt in PROMPTS.items():
+        before = _outcomes(schema)
+        if mode == "local_repair":
+            runnable = with_repaired_structured_output(llm, schema, args.max_retries)
+        else:
+            runnable = llm.with_structured_output(schema).with_retry(
+                retry_if_exception_type=(ValueError,),
+                stop_after_attempt=args.max_retries + 1,
+                wait_exponential_jitter=False,
+            )
+        for index in range(args.calls):
+            try:
+                _, used = invoke_chat_model(runnable, prompt.format(index=index))
+                tokens += used
+            except (OutputParserException, ValueError):
+                failures += 1
+        after = _outcomes(schema)
+        outcomes[schema.__name__] = {
+            result: after[result] - before[result] for result in after
+        }
+    return {
+        "mode": mode,
+        "requests": args.calls * len(PROMPTS),
+        "llm_calls": counter.calls,
+        "tokens": tokens,
+        "failures": failures,
+        "seconds": time.perf_counter() - start,
+        "outcomes": outcomes if mode == "local_repair" else None,
+    }
+
+
+def main() -> None:
+    """2つの対処方法の結果をJSONで出力。"""
+    parser = argparse.ArgumentParser(description="Structured output repair benchmark")
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--malformed-rate", type=float, default=0.2)
+    parser.add_argument("--unparseable-rate", type=float, default=0.02)
+    parser.add_argument("--max-retries", type=int, default=2)
+    parser.add_argument("--llm-latency", type=float, default=0.01)
+    args = parser.parse_args()
+
+    results = [run(args, mode) for mode in ("retry_only", "local_repair")]
+    results[1]["llm_calls_saved"] = results[0]["llm_calls"] - results[1]["llm_calls"]
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""複数の部分からなる質問で、フラットな計画と階層的な計画（サブ質問）を比較するベンチマーク。
+
+同じ検索回数になるように設定した2つのモードで研究グラフを実行し、所要時間・
+検索回数・トークン数を集計します。フラットな計画ではすべての検索が1つの研究ループで
+同期するため、各ループが最も遅い検索を待ちます。階層的な計画ではサブ質問ごとの
+研究ループが独立して進みます。検索はロングテールのあるレイテンシを持つフェイクです。
+
+使い方:
+    python -m benchmarks.sub_question_bench --runs 10 --tail-probability 0.1
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+from typing import Any, Dict, List
+
+from langchain_core.messages import HumanMessage
+
+from benchmarks.fakes import FakeChatModel, FakeSearchProvider, use_fake_providers
+from src.graphs.research_graph import research_graph
+
+QUESTION = "日本とドイツとフランスの再生可能エネルギーの導入率と、それぞれの主な政策を比較して"
+
+
+def run(args: argparse.Namespace, mode: str) -> Dict[str, Any]:
+    """1つの計画モードで `--runs` 回実行して測定。"""
+    sub_questions = args.sub_questions
+    queries = args.queries_per_part
+    if mode == "hierarchical":
+        # サブ質問ごとにリフレクションするため、フォローアップはサブ質問ごとに1件
+        llm = FakeChatModel(
+            latency=args.llm_latency,
+            follow_up_queries=args.follow_ups_per_part,
+            sub_questions=sub_questions,
+        )
+        configurable = {
+            "planning_mode": "hierarchical",
+            "sub_question_queries": queries,
+            "sub_question_max_loops": args.max_loops,
+            "max_follow_up_queries": args.follow_ups_per_part,
+        }
+    else:
+        llm = FakeChatModel(
+            latency=args.llm_latency,
+            follow_up_queries=args.follow_ups_per_part * sub_questions,
+        )
+        configurable = {
+            "planning_mode": "flat",
+            "number_of_initial_queries": queries * sub_questions,
+            "max_research_loops": args.max_loops,
+            "max_follow_up_queries": args.follow_ups_per_part * sub_questions,
+        }
+    search = FakeSearchProvider(
+        latency=args.search_latency,
+        tail_latency=args.tail_latency,
+        tail_probability=args.tail_probability,
+    )
+
+    random.seed(args.seed)
+    seconds: List[float] = []
+    searches: List[int] = []
+    tokens: List[int] = []
+    with use_fake_providers(llm, search):
+        for _ in range(args.runs):
+            inputs = {"messages": [HumanMessage(content=QUESTION)]}
+            config = {"configurable": configurable}
+            start = time.perf_counter()
+            if args.use_async:
+                final_state = asyncio.run(research_graph.ainvoke(inputs, config))
+            else:
+                final_state = research_graph.invoke(inputs, config)
+            seconds.append(time.perf_counter() - start)
+            searches.append(final_state["budget_usage"]["search_count"])
+            tokens.append(final_state["budget_usage"]["tokens_used"])
+
+    return {
+        "planning_mode": mode,
+        "runs": args.runs,
+        "seconds_mean": statistics.mean(seconds),
+        "seconds_p90": sorted(seconds)[int(0.9 * (len(seconds) - 1))],
+        "searches_mean": statistics.mean(searches),
+        "tokens_mean": statistics.mean(tokens),
+    }
+
+
+def main() -> None:
+    """フラットな計画と階層的な計画の結果と速度向上をJSONで出力。"""
+    parser = argparse.ArgumentParser(description="Sub-question planning benchmark")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--sub-questions", type=int, default=3)
+    parser.add_argument("--queries-per-part", type=int, default=2)
+    parser.add_argument("--follow-ups-per-part", type=int, default=1)
+    parser.add_argument("--max-loops", type=int, default=3)
+    parser.add_argument("--llm-latency", type=float, default=0.05)
+    parser.add_argument("--search-latency", type=float, default=0.05)
+    parser.add_argument("--tail-latency", type=float, default=0.5)
+    parser.add_argument("--tail-probability", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--use-async", action="store_true")
+    args = parser.parse_args()
+
+    flat = run(args, "flat")
+    hierarchical = run(args, "hierarchical")
+    hierarchical["speedup"] = flat["seconds_mean"] / hierarchical["seconds_mean"]
+    print(json.dumps([flat, hierarchical], indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""長いスレッドで会話履歴をまとめた場合のプロンプトの大きさを比較するベンチマーク。
+
+チェックポインター付きの研究グラフで長い回答が続くスレッドを実行し、会話履歴を
+そのまま入れる場合（`topic_recent_turns` を十分大きく、`topic_max_tokens=0`）と、
+古いターンをまとめて上限に収める場合とで、ターンごとの研究トピックの大きさ・
+消費トークン数・所要時間を集計します。LLM・検索は一定のレイテンシを持つフェイクです。
+
+使い方:
+    python -m benchmarks.topic_bench --turns 8 --answer-chars 6000
+"""
+
+import argparse
+import json
+import time
+import uuid
+from typing import Any, Dict, List
+
+from langchain_core.messages import HumanMessage
+from langgraph.checkpoint.memory import MemorySaver
+
+from benchmarks.fakes import FakeChatModel, FakeSearchProvider, use_fake_providers
+from src.graphs.research_graph import builder
+from src.utils import estimate_tokens
+
+QUESTIONS = (
+    "再生可能エネルギーの導入状況と今後の課題は？",
+    "太陽光発電の導入状況は？",
+    "風力発電の課題は？",
+    "蓄電池のコストの見通しは？",
+)
+
+# 会話履歴をそのまま入れる（まとめない）設定
+VERBATIM = {"topic_recent_turns": 1_000_000, "topic_max_tokens": 0}
+
+
+def run(args: argparse.Namespace, topic_config: Dict[str, Any]) -> Dict[str, Any]:
+    """1つのスレッドで `--turns` ターンを実行して測定。"""
+    graph = builder.compile(checkpointer=MemorySaver())
+    thread_id = f"topic-{uuid.uuid4()}"
+    llm = FakeChatModel(latency=args.llm_latency, answer_chars=args.answer_chars)
+    search = FakeSearchProvider(latency=args.search_latency)
+    turns: List[Dict[str, Any]] = []
+    with use_fake_providers(llm, search):
+        for index in range(args.turns):
+            config = {
+                "configurable": {
+                    "thread_id": thread_id,
+                    # 各ターンで全ノードを通るように前のターンのソースは再利用しない
+                    "reuse_prior_sources": False,
+                    "max_research_loops": args.max_loops,
+                    **topic_config,
+                }
+            }
+            question = QUESTIONS[index % len(QUESTIONS)]
+            start = time.perf_counter()
+            inputs = {"messages": [HumanMessage(content=question)]}
+            final_state = graph.invoke(inputs, config)
+            turns.append(
+                {
+                    "seconds": time.perf_counter() - start,
+                    "topic_tokens": estimate_tokens(final_state["research_topic"]),
+                    "tokens": final_state["budget_usage"]["tokens_used"],
+                }
+            )
+
+    last = turns[-1]
+    return {
+        "topic_config": topic_config,
+        "last_turn_topic_tokens": last["topic_tokens"],
+        "last_turn_tokens": last["tokens"],
+        "last_turn_seconds": last["seconds"],
+        "topic_tokens_by_turn": [turn["topic_tokens"] for turn in turns],
+    }
+
+
+def main() -> None:
+    """会話履歴をそのまま入れる場合とまとめる場合の結果をJSONで出力。"""
+    parser = argparse.ArgumentParser(description="Conversation topic benchmark")
+    parser.add_argument("--turns", type=int, default=8)
+    parser.add_argument("--answer-chars", type=int, default=6000)
+    parser.add_argument("--llm-latency", type=float, default=0.05)
+    parser.add_argument("--search-latency", type=float, default=0.05)
+    parser.add_argument("--max-loops", type=int, default=1)
+    parser.add_argument("--topic-max-tokens", type=int, default=2000)
+    args = parser.parse_args()
+
+    baseline = run(args, VERBATIM)
+    compacted = run(args, {"topic_max_tokens": args.topic_max_tokens})
+    compacted["last_turn_token_reduction"] = 1 - (
+        compacted["last_turn_tokens"] / baseline["last_turn_tokens"]
+    )
+    print(json.dumps([baseline, compacted], indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
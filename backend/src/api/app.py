@@ -4,6 +4,8 @@ from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 
+from src.observability import REGISTRY
+
 # Define the FastAPI app
 app = FastAPI()
 
@@ -22,6 +24,15 @@ app.add_middleware(
 )
 
 
+@app.get("/metrics")
+def metrics() -> Response:
+    """Expose the research metrics in the Prometheus text format."""
+    return Response(
+        REGISTRY.render(),
+        media_type="text/plain; version=0.0.4; charset=utf-8",
+    )
+
+
 def create_frontend_router(build_dir="../frontend/dist"):
     """Creates a router to serve the React frontend.
 
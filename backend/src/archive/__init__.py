@@ -0,0 +1,14 @@
+"""Run archive for analytics across many completed research runs."""
+
+from .formats import available_formats
+from .reader import list_archive_chunks, scan_run_archive
+from .writer import RunArchiveWriter, build_archive_record, get_run_archive
+
+__all__ = [
+    "RunArchiveWriter",
+    "available_formats",
+    "build_archive_record",
+    "get_run_archive",
+    "list_archive_chunks",
+    "scan_run_archive",
+]
@@ -0,0 +1,92 @@
+"""実行アーカイブのファイル形式（JSONL.zst / Parquet / JSONL.gz）"""
+
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - 任意の依存
+    zstandard = None  # type: ignore[assignment]
+
+try:
+    import pyarrow
+    import pyarrow.parquet as parquet
+except ImportError:  # pragma: no cover - 任意の依存
+    pyarrow = None  # type: ignore[assignment]
+    parquet = None  # type: ignore[assignment]
+
+FORMATS = ("parquet", "jsonl.zst", "jsonl.gz")
+# 書き込み中のチャンクの拡張子（閉じたときに外し、読み込み時は対象外）
+PARTIAL_SUFFIX = ".part"
+
+# 1実行の記録の列（Parquetでは入れ子の値をJSON文字列で保存）
+SCALAR_COLUMNS: Tuple[Tuple[str, str], ...] = (
+    ("run_key", "string"),
+    ("finished_at", "float64"),
+    ("question", "string"),
+    ("answer", "string"),
+    ("elapsed_seconds", "float64"),
+    ("first_answer_seconds", "float64"),
+    ("tokens_used", "int64"),
+    ("search_count", "int64"),
+    ("research_loops", "int64"),
+    ("source_count", "int64"),
+    ("budget_exhausted", "string"),
+)
+NESTED_COLUMNS: Tuple[str, ...] = ("queries", "sources", "config", "refresh_report")
+
+
+def available_formats() -> List[str]:
+    """この環境で書き込める形式（優先順）。"""
+    formats = []
+    if pyarrow is not None:
+        formats.append("parquet")
+    if zstandard is not None:
+        formats.append("jsonl.zst")
+    formats.append("jsonl.gz")
+    return formats
+
+
+def resolve_format(name: str) -> str:
+    """設定の形式名を実際に使う形式に解決（`auto` は使える中で最も優先度の高い形式）。"""
+    formats = available_formats()
+    if name == "auto":
+        return formats[0]
+    if name not in FORMATS:
+        raise ValueError(f"未知のアーカイブ形式です: {name}")
+    if name not in formats:
+        raise ValueError(f"{name} 形式には追加のパッケージが必要です")
+    return name
+
+
+def format_of(filename: str) -> Optional[str]:
+    """チャンクのファイル名から形式を判定（書き込み中のチャンクはNone）。"""
+    for name in FORMATS:
+        if filename.endswith(f".{name}"):
+            return name
+    return None
+
+
+def parquet_schema() -> Any:
+    """Parquetのスキーマ（入れ子の値はJSON文字列の列）。"""
+    fields = [(name, getattr(pyarrow, kind)()) for name, kind in SCALAR_COLUMNS]
+    fields.extend((name, pyarrow.string()) for name in NESTED_COLUMNS)
+    return pyarrow.schema(fields)
+
+
+def to_row(record: Dict[str, Any]) -> Dict[str, Any]:
+    """記録をParquetの行に変換。"""
+    row = {name: record.get(name) for name, _ in SCALAR_COLUMNS}
+    for name in NESTED_COLUMNS:
+        value = record.get(name)
+        row[name] = None if value is None else json.dumps(value, ensure_ascii=False)
+    return row
+
+
+def from_row(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Parquetの行を記録に戻す。"""
+    record = dict(row)
+    for name in NESTED_COLUMNS:
+        if record.get(name) is not None:
+            record[name] = json.loads(record[name])
+    return record
@@ -0,0 +1,126 @@
+"""実行アーカイブのチャンクファイルを順に読み込むリーダー"""
+
+import gzip
+import io
+import json
+from pathlib import Path
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+)
+
+from . import formats
+from .formats import (
+    NESTED_COLUMNS,
+    PARTIAL_SUFFIX,
+    SCALAR_COLUMNS,
+    format_of,
+    from_row,
+)
+
+
+def list_archive_chunks(path: str, include_partial: bool = False) -> List[Path]:
+    """アーカイブのチャンクファイルを名前（最初の記録の完了時刻）の順に列挙。
+
+    `include_partial` なら書き込み中のJSONLのチャンクも含めます（Parquetは閉じるまで
+    読み込めないため含めません）。
+    """
+    directory = Path(path)
+    if not directory.is_dir():
+        return []
+    chunks = []
+    for chunk in directory.glob("runs-*"):
+        name = chunk.name
+        if name.endswith(PARTIAL_SUFFIX):
+            if not include_partial or name.endswith(f".parquet{PARTIAL_SUFFIX}"):
+                continue
+            name = name[: -len(PARTIAL_SUFFIX)]
+        if format_of(name) is not None:
+            chunks.append(chunk)
+    return sorted(chunks, key=lambda chunk: chunk.name)
+
+
+def _chunk_started_at(chunk: Path) -> Optional[float]:
+    """チャンクの最初の記録の完了時刻（ファイル名から取得）。"""
+    try:
+        return int(chunk.name.split("-")[1]) / 1000
+    except (IndexError, ValueError):
+        return None
+
+
+def _read_jsonl(chunk: Path, compressed_format: str) -> Iterator[Dict[str, Any]]:
+    """JSONLのチャンクを1行ずつ読み込む（途中で切れた末尾は読み飛ばす）。"""
+    with chunk.open("rb") as f:
+        if compressed_format == "jsonl.zst":
+            stream: Any = formats.zstandard.ZstdDecompressor().stream_reader(
+                f, read_across_frames=True
+            )
+            errors: tuple = (formats.zstandard.ZstdError, EOFError)
+        else:
+            stream = gzip.GzipFile(fileobj=f)
+            errors = (EOFError, gzip.BadGzipFile)
+        text = io.TextIOWrapper(stream, encoding="utf-8")
+        try:
+            for line in text:
+                if line.endswith("\n"):
+                    yield json.loads(line)
+        except errors:
+            return
+
+
+def _read_parquet(
+    chunk: Path, columns: Optional[List[str]], batch_size: int
+) -> Iterator[Dict[str, Any]]:
+    """ParquetのチャンクをRow Groupのバッチごとに読み込む。"""
+    parquet_file = formats.parquet.ParquetFile(str(chunk))
+    for batch in parquet_file.iter_batches(batch_size=batch_size, columns=columns):
+        for row in batch.to_pylist():
+            yield from_row(row)
+
+
+def scan_run_archive(
+    path: str,
+    where: Optional[Callable[[Dict[str, Any]], bool]] = None,
+    fields: Optional[Sequence[str]] = None,
+    since: Optional[float] = None,
+    until: Optional[float] = None,
+    include_partial: bool = False,
+    batch_size: int = 1000,
+) -> Iterator[Dict[str, Any]]:
+    """アーカイブの記録を順に読み込むジェネレーター（メモリに全体を読み込まない）。
+
+    `since` / `until`（完了時刻のUNIX時刻）と `where` の条件に合う記録だけを返し、
+    `fields` を指定するとその項目だけに絞ります。最初の記録が `until` より後の
+    チャンクは開きません。Parquetでは `where` が無ければ必要な列だけを読み込みます。
+    """
+    columns = None
+    if fields is not None and where is None:
+        known = {name for name, _ in SCALAR_COLUMNS} | set(NESTED_COLUMNS)
+        columns = [
+            name for name in dict.fromkeys([*fields, "finished_at"]) if name in known
+        ]
+    for chunk in list_archive_chunks(path, include_partial):
+        started_at = _chunk_started_at(chunk)
+        if until is not None and started_at is not None and started_at > until:
+            continue
+        chunk_format = format_of(chunk.name.removesuffix(PARTIAL_SUFFIX))
+        if chunk_format == "parquet":
+            records = _read_parquet(chunk, columns, batch_size)
+        else:
+            records = _read_jsonl(chunk, chunk_format or "jsonl.gz")
+        for record in records:
+            finished_at = record.get("finished_at") or 0.0
+            if since is not None and finished_at < since:
+                continue
+            if until is not None and finished_at > until:
+                continue
+            if where is not None and not where(record):
+                continue
+            if fields is not None:
+                record = {name: record.get(name) for name in fields}
+            yield record
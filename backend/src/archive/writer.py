@@ -0,0 +1,194 @@
+"""完了した実行を圧縮したチャンクファイルに追記する実行アーカイブ"""
+
+import atexit
+import gzip
+import json
+import os
+import threading
+import time
+from dataclasses import asdict
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from src.config.configuration import ArchiveConfig
+from src.states import OverallState
+from src.utils import get_latest_question, get_turn_offset
+
+from . import formats
+from .formats import PARTIAL_SUFFIX, parquet_schema, resolve_format, to_row
+
+
+def build_archive_record(
+    state: OverallState,
+    answer: str,
+    budget_usage: Dict[str, Any],
+    config_obj,
+    run_key: str,
+) -> Dict[str, Any]:
+    """完了したターンの分析用の記録を作成。
+
+    ソースは本文の代わりに文字数だけを記録します。実行時の設定（モデル・研究・検索）も
+    含めるため、設定ごとのコストやレイテンシを比べられます。
+    """
+    sources = [
+        {
+            "url": source.get("value"),
+            "title": source.get("title"),
+            "query": source.get("query"),
+            "fetched_at": source.get("fetched_at"),
+            "content_chars": len(source.get("content") or ""),
+            "duplicate_of": source.get("duplicate_of"),
+        }
+        for source in state.sources_gathered[
+            get_turn_offset(state, "sources_gathered") :
+        ]
+    ]
+    return {
+        "run_key": run_key,
+        "finished_at": time.time(),
+        "question": get_latest_question(state.messages),
+        "answer": answer,
+        "elapsed_seconds": budget_usage.get("elapsed_seconds"),
+        "first_answer_seconds": budget_usage.get("first_answer_seconds"),
+        "tokens_used": budget_usage.get("tokens_used"),
+        "search_count": budget_usage.get("search_count"),
+        "research_loops": state.research_loop_count
+        - get_turn_offset(state, "research_loop_count"),
+        "source_count": len(sources),
+        "budget_exhausted": budget_usage.get("budget_exhausted"),
+        "queries": state.search_query[get_turn_offset(state, "search_query") :],
+        "sources": sources,
+        "config": {
+            "model": asdict(config_obj.model),
+            "research": asdict(config_obj.research),
+            "search": asdict(config_obj.search),
+        },
+        "refresh_report": state.refresh_report,
+    }
+
+
+class RunArchiveWriter:
+    """実行の記録を圧縮したチャンクファイルに追記するライター。
+
+    記録は `flush_records` 件ごとにまとめて圧縮して書き込みます（JSONLは独立した
+    zstdフレーム・gzipメンバー、ParquetはRow Group）。メモリに保持するのは未書き込みの
+    記録だけです。チャンクが `chunk_records` 件に達したら閉じて次のチャンクに移ります。
+    書き込み中のチャンクは `.part` 付きの名前で、閉じたときに外します。
+    ファイル名にはプロセスIDを含むため、複数のプロセスが同じディレクトリに書き込めます。
+    """
+
+    def __init__(
+        self,
+        path: str,
+        format: str = "auto",
+        chunk_records: int = 1000,
+        flush_records: int = 50,
+    ):
+        """ライターを初期化（チャンクは最初の書き込み時に作成）。"""
+        self.path = Path(path)
+        self.format = resolve_format(format)
+        self.chunk_records = max(1, chunk_records)
+        self.flush_records = max(1, flush_records)
+        self._buffer: List[Dict[str, Any]] = []
+        self._chunk: Optional[Path] = None
+        self._chunk_size = 0
+        self._parquet_writer: Any = None
+        self._sequence = 0
+        self._lock = threading.Lock()
+
+    def append(self, record: Dict[str, Any]) -> None:
+        """記録を追加（`flush_records` 件たまったら書き込む）。"""
+        with self._lock:
+            self._buffer.append(record)
+            if len(self._buffer) >= self.flush_records:
+                self._flush()
+
+    def flush(self) -> None:
+        """未書き込みの記録を書き込む（チャンクは閉じない）。"""
+        with self._lock:
+            self._flush()
+
+    def close(self) -> None:
+        """未書き込みの記録を書き込み、書き込み中のチャンクを閉じる。"""
+        with self._lock:
+            self._flush()
+            self._close_chunk()
+
+    def _open_chunk(self, first: Dict[str, Any]) -> None:
+        """新しいチャンクを作成（名前は最初の記録の完了時刻とプロセスID）。"""
+        self.path.mkdir(parents=True, exist_ok=True)
+        started_ms = int(first.get("finished_at", time.time()) * 1000)
+        name = f"runs-{started_ms:013d}-{os.getpid()}-{self._sequence:04d}"
+        self._sequence += 1
+        self._chunk = self.path / f"{name}.{self.format}{PARTIAL_SUFFIX}"
+        self._chunk_size = 0
+        if self.format == "parquet":
+            self._parquet_writer = formats.parquet.ParquetWriter(
+                str(self._chunk), parquet_schema(), compression="zstd"
+            )
+
+    def _write(self, batch: List[Dict[str, Any]]) -> None:
+        """記録をまとめて圧縮し、書き込み中のチャンクに追記。"""
+        assert self._chunk is not None
+        if self.format == "parquet":
+            table = formats.pyarrow.Table.from_pylist(
+                [to_row(record) for record in batch], schema=parquet_schema()
+            )
+            self._parquet_writer.write_table(table)
+            return
+        lines = "".join(
+            json.dumps(record, ensure_ascii=False) + "\n" for record in batch
+        ).encode("utf-8")
+        if self.format == "jsonl.zst":
+            data = formats.zstandard.ZstdCompressor().compress(lines)
+        else:
+            data = gzip.compress(lines)
+        with self._chunk.open("ab") as f:
+            f.write(data)
+
+    def _flush(self) -> None:
+        """バッファの記録をチャンクに書き込み、いっぱいになったチャンクを閉じる。"""
+        while self._buffer:
+            if self._chunk is None:
+                self._open_chunk(self._buffer[0])
+            batch = self._buffer[: self.chunk_records - self._chunk_size]
+            del self._buffer[: len(batch)]
+            self._write(batch)
+            self._chunk_size += len(batch)
+            if self._chunk_size >= self.chunk_records:
+                self._close_chunk()
+
+    def _close_chunk(self) -> None:
+        """書き込み中のチャンクを閉じ、読み込めるように `.part` を外す。"""
+        if self._chunk is None:
+            return
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+            self._parquet_writer = None
+        closed = self._chunk.name[: -len(PARTIAL_SUFFIX)]
+        self._chunk.rename(self._chunk.with_name(closed))
+        self._chunk = None
+
+
+_writers: Dict[str, RunArchiveWriter] = {}
+_writers_lock = threading.Lock()
+
+
+def get_run_archive(config: ArchiveConfig) -> RunArchiveWriter:
+    """ディレクトリごとの実行アーカイブのライターを取得（プロセス内で共有）。
+
+    ライターの形式とチャンクの大きさは、そのディレクトリで最初に取得したときの
+    設定を使います。プロセスの終了時に書き込み中のチャンクを閉じます。
+    """
+    key = str(Path(config.archive_path).resolve())
+    with _writers_lock:
+        writer = _writers.get(key)
+        if writer is None:
+            writer = _writers[key] = RunArchiveWriter(
+                key,
+                config.archive_format,
+                config.archive_chunk_records,
+                config.archive_flush_records,
+            )
+            atexit.register(writer.close)
+        return writer
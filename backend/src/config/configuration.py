@@ -8,22 +8,76 @@ from langchain_core.runnables import RunnableConfig
 @dataclass
 class ModelConfig:
     """LLMモデル設定"""
+
     query_generator_model: str = "gpt-4o"
     reflection_model: str = "gpt-4o"
     answer_model: str = "gpt-4o"
+    # 段階的な回答で先に返す暫定回答のモデル（高速なモデル）
+    draft_model: str = "gpt-4o-mini"
 
 
 @dataclass
 class ResearchConfig:
     """研究プロセス設定"""
+
     number_of_initial_queries: int = 3
     max_research_loops: int = 2
     max_follow_up_queries: int = 3
+    # 実行全体の予算（0は無制限）
+    max_run_seconds: float = 0.0
+    max_total_tokens: int = 0
+    max_searches: int = 0
+    # 検索1件あたりのタイムアウト秒数（0は無制限）
+    search_timeout_seconds: float = 0.0
+    # 最終回答の生成のために残しておく時間・トークン
+    finalize_reserve_seconds: float = 10.0
+    finalize_reserve_tokens: int = 0
+    # フォローアップの質問では前のターンで収集したソースを再利用し、足りない観点だけを検索
+    # （再利用したソースだけで回答する場合があるため、既定では無効）
+    reuse_prior_sources: bool = False
+    prior_sources_top_k: int = 8
+    # プロンプトに入れる会話履歴：直近のターンはそのまま、それより古いターンは短くまとめ、
+    # 全体を概算トークン数の上限（0は無制限）に収める
+    topic_recent_turns: int = 2
+    topic_max_tokens: int = 2000
+    topic_summary_chars: int = 300
+    # 計画モード: "flat"（トピック全体のクエリを1つの研究ループで調べる）または
+    # "hierarchical"（サブ質問に分解し、独立したものをそれぞれの研究ループで並列に調べる）
+    planning_mode: str = "flat"
+    max_sub_questions: int = 4
+    # サブ質問ごとの初期検索クエリ数と研究ループ数
+    sub_question_queries: int = 2
+    sub_question_max_loops: int = 1
+    # 依存するサブ質問に渡す調査結果の最大文字数
+    sub_question_context_chars: int = 4000
+    # リフレクションのモード: "single"（すべての検索結果を1回のLLM呼び出しで分析）または
+    # "sharded"（検索結果を概算トークン数で分割して並行に分析し、結果を1つの判断にまとめる）
+    reflection_mode: str = "single"
+    reflection_shard_tokens: int = 6000
+    reflection_max_shards: int = 8
+    # 分割したうち、この割合以上が十分と判断した場合に研究を十分とみなす
+    reflection_shard_quorum: float = 0.5
+    # クエリ生成のLLM呼び出しと並行してユーザーの質問そのものを先行して検索する。
+    # 生成したクエリと文字bigramの重なりが閾値以上ならそのクエリの代わりに採用し、
+    # 重ならなければ破棄する（どちらも検索回数の予算に数える）。長すぎる質問は検索しない
+    speculative_search: bool = False
+    speculative_overlap_threshold: float = 0.5
+    speculative_max_chars: int = 200
+    # 段階的な回答：最初の研究ループの後に `draft_model` で暫定回答を作成して先に返し、
+    # 研究を続けた後の最終回答で置き換える（同じメッセージIDで上書き）
+    progressive_answer: bool = False
+    # 保存した実行の再実行（リフレッシュ）：取得から `refresh_ttl_seconds` 秒を過ぎた
+    # クエリだけを検索し直し、結果の変化の割合が `refresh_change_threshold` 以上なら
+    # リフレクションと最終回答を `refresh_max_loops` 回までの研究ループでやり直す
+    refresh_ttl_seconds: float = 86400.0
+    refresh_change_threshold: float = 0.2
+    refresh_max_loops: int = 2
 
 
 @dataclass
 class LLMParameterConfig:
     """LLMパラメータ設定"""
+
     query_generation_temperature: float = 1.0
     reflection_temperature: float = 1.0
     answer_generation_temperature: float = 0.0
@@ -33,71 +87,215 @@ class LLMParameterConfig:
 @dataclass
 class SearchConfig:
     """検索設定"""
+
     max_results: int = 5
     depth: str = "advanced"
     include_images: bool = False
+    search_provider: str = "tavily"
+    local_corpus_path: str = "corpus"
+    # ローカルコーパスのインデックスの保存先と、コーパスの変更を確認する間隔（秒）
+    local_index_dir: str = ".cache/local_corpus"
+    local_index_check_seconds: float = 30.0
+    local_snippet_chars: int = 1000
+    # ページ本文（raw content）から関連パッセージを抽出して結果の本文に使う
+    include_raw_content: bool = False
+    passage_top_k: int = 3
+    passage_max_chars: int = 600
+    passage_ranker: str = "bm25"  # bm25 / tfidf
+    # 転載記事など本文がほぼ同じ結果の除去（SimHashのハミング距離で判定）
+    # 有効にするとプロンプトに渡す検索結果のテキストが変わるため、デフォルトは無効
+    dedup_enabled: bool = False
+    dedup_max_distance: int = 6
+    # 検索結果の書式（verbose: 見出しと引用指示をソースごとに付与 / compact: 1行の見出しと本文のみ）
+    result_format: str = "verbose"
+    # リフレクションのプロンプトに検索結果のURLを含めるか
+    reflection_include_urls: bool = True
+    # 遅い検索へのヘッジ（p90などを超えたら追加リクエストを発行）
+    hedge_enabled: bool = False
+    # duplicate: 同じ検索を再発行 / basic: basic深度で発行
+    hedge_mode: str = "duplicate"
+    hedge_percentile: float = 0.9
+    hedge_min_samples: int = 20
+    hedge_max_extra_ratio: float = 0.1
+
+
+@dataclass
+class KnowledgeBaseConfig:
+    """実行をまたいだローカル知識ベースの設定
+
+    有効にすると、各実行で収集したソースを `kb_path` に蓄積し、検索プロバイダーより先に
+    参照します。クエリの種類（最新の情報が必要なもの・変化の少ないもの・その他）ごとの
+    鮮度の範囲内で、クエリ語の `kb_min_coverage` 以上を含む文書が `kb_min_results` 件
+    以上あればネットワークを呼ばずにそれを検索結果にします。
+    """
+
+    kb_enabled: bool = False
+    kb_path: str = "knowledge_base"
+    # 実行の最後に収集したソースを知識ベースに追加するか
+    kb_ingest: bool = True
+    kb_min_results: int = 2
+    kb_min_coverage: float = 0.6
+    # クエリの種類ごとの鮮度（取得からの秒数）
+    kb_fresh_news_seconds: float = 6 * 3600
+    kb_fresh_default_seconds: float = 7 * 86400
+    kb_fresh_reference_seconds: float = 90 * 86400
+
+
+@dataclass
+class ArchiveConfig:
+    """実行アーカイブの設定
+
+    有効にすると、完了した実行の記録（質問・クエリ・ソース・所要時間・トークン数・回答・
+    設定）を `archive_path` の圧縮したチャンクファイルに追記します。
+    """
+
+    archive_enabled: bool = False
+    archive_path: str = "run_archive"
+    # auto / parquet / jsonl.zst / jsonl.gz（auto は使える中で最も小さくなる形式）
+    archive_format: str = "auto"
+    # 1チャンクの記録数と、まとめて圧縮して書き込む記録数
+    archive_chunk_records: int = 1000
+    archive_flush_records: int = 50
 
 
 @dataclass
 class CitationConfig:
     """引用設定"""
+
     title_max_length: int = 50
 
 
+@dataclass
+class TracingConfig:
+    """トレース出力設定"""
+
+    trace_enabled: bool = False
+    trace_output_dir: str = "traces"
+
+
+@dataclass
+class ProfilingConfig:
+    """プロファイリング設定"""
+
+    profile_enabled: bool = False
+    profile_sample_rate: float = 0.0
+    profile_interval_seconds: float = 0.005
+    profile_output_dir: str = "profiles"
+    profile_max_total_bytes: int = 100 * 1024 * 1024
+    profile_memory: bool = True
+    profile_top_n: int = 50
+
+
+@dataclass
+class RateLimitConfig:
+    """プロバイダー呼び出しの同時実行・レート制限設定（プロセス全体で共有）
+
+    `<provider>_max_concurrency` が0のプロバイダーは制限されません。
+    `<provider>_requests_per_second` が0の場合はレート制限を行いません。
+    """
+
+    tavily_max_concurrency: int = 8
+    tavily_requests_per_second: float = 0.0
+    tavily_burst: int = 8
+    openai_max_concurrency: int = 16
+    openai_requests_per_second: float = 0.0
+    openai_burst: int = 16
+    limiter_min_concurrency: int = 1
+    limiter_decrease_factor: float = 0.5
+    limiter_max_attempts: int = 5
+    limiter_backoff_base_seconds: float = 0.5
+    limiter_backoff_max_seconds: float = 30.0
+
+
+@dataclass
+class ExecutionConfig:
+    """CPU負荷の高い後処理の実行設定（プロセス全体で共有）
+
+    `cpu_pool_size` が0の場合、後処理はノードを実行しているスレッドでそのまま行います
+    （非同期実行では、イベントループをふさがないように大きな処理をスレッドで行います）。
+    """
+
+    cpu_pool_size: int = 0
+    # これより文字数の少ない処理はプロセス間の受け渡しの方が高くつくためその場で実行
+    cpu_pool_min_chars: int = 20000
+
+
 class Configuration:
     """設定管理クラス"""
-    
+
     def __init__(self):
         # デフォルト設定
         self.model = ModelConfig()
         self.research = ResearchConfig()
         self.llm_parameters = LLMParameterConfig()
         self.search = SearchConfig()
+        self.knowledge_base = KnowledgeBaseConfig()
+        self.archive = ArchiveConfig()
         self.citation = CitationConfig()
+        self.tracing = TracingConfig()
+        self.profiling = ProfilingConfig()
+        self.rate_limit = RateLimitConfig()
+        self.execution = ExecutionConfig()
 
-    def override_with_runnable_config(self, config: Optional[RunnableConfig]) -> 'Configuration':
+    def override_with_runnable_config(
+        self, config: Optional[RunnableConfig]
+    ) -> "Configuration":
         """実行時設定でオーバーライドした新しいConfigurationを返す"""
         if not config or "configurable" not in config:
             return deepcopy(self)
-        
+
         configurable = config["configurable"]
         new_config = Configuration()
-        
+
         # 現在の設定をコピー
         new_config.model = replace(self.model)
         new_config.research = replace(self.research)
         new_config.llm_parameters = replace(self.llm_parameters)
         new_config.search = replace(self.search)
+        new_config.knowledge_base = replace(self.knowledge_base)
+        new_config.archive = replace(self.archive)
         new_config.citation = replace(self.citation)
-        
+        new_config.tracing = replace(self.tracing)
+        new_config.profiling = replace(self.profiling)
+        new_config.rate_limit = replace(self.rate_limit)
+        new_config.execution = replace(self.execution)
+
         # 各設定セクションを一括更新
         sections = [
             ("model", new_config.model),
-            ("research", new_config.research), 
+            ("research", new_config.research),
             ("llm_parameters", new_config.llm_parameters),
             ("search", new_config.search),
-            ("citation", new_config.citation)
+            ("knowledge_base", new_config.knowledge_base),
+            ("archive", new_config.archive),
+            ("citation", new_config.citation),
+            ("tracing", new_config.tracing),
+            ("profiling", new_config.profiling),
+            ("rate_limit", new_config.rate_limit),
+            ("execution", new_config.execution),
         ]
-        
+
         for section_name, section_obj in sections:
             # dataclassのフィールドと一致するkeyを探して更新
             field_names = {f.name for f in section_obj.__dataclass_fields__.values()}
-            updates = {key: value for key, value in configurable.items() if key in field_names}
-            
+            updates = {
+                key: value for key, value in configurable.items() if key in field_names
+            }
+
             if updates:
                 setattr(new_config, section_name, replace(section_obj, **updates))
-        
+
         return new_config
 
     @classmethod
-    def get_config(cls, runnable_config: Optional[RunnableConfig] = None) -> 'Configuration':
+    def get_config(
+        cls, runnable_config: Optional[RunnableConfig] = None
+    ) -> "Configuration":
         """設定を取得（実行時オーバーライドを含む）"""
-        if not hasattr(cls, '_default_config') or cls._default_config is None:
+        if not hasattr(cls, "_default_config") or cls._default_config is None:
             cls._default_config = cls()
-        
+
         if runnable_config is None:
             return cls._default_config
-        
-        return cls._default_config.override_with_runnable_config(runnable_config)
-
 
+        return cls._default_config.override_with_runnable_config(runnable_config)
@@ -1,7 +1,9 @@
 """Graph definitions for the LangGraph"""
 
+from .refresh_graph import refresh_graph
 from .research_graph import research_graph
 
 __all__ = [
+    "refresh_graph",
     "research_graph",
 ]
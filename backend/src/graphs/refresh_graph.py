@@ -0,0 +1,92 @@
+from typing import Hashable, Union, cast
+
+from langchain_core.runnables import RunnableConfig, RunnableLambda
+from langgraph.graph import END, START, StateGraph
+from src.nodes import (
+    DraftAnswerNode,
+    FinalizationNode,
+    KeepAnswerNode,
+    ReflectionNode,
+    RefreshDiffNode,
+    RefreshPlanningNode,
+    RefreshRouterNode,
+    WebResearchNode,
+)
+from src.states import OverallState
+
+from .research_graph import aresearch_evaluation_router, research_evaluation_router
+
+
+# Router functions for conditional edges
+def refresh_router(
+    state: OverallState, config: RunnableConfig
+) -> Union[Hashable, list[Hashable]]:
+    """Re-search the stale queries, or keep the stored answer if none are stale."""
+    result = RefreshRouterNode()(state, config)
+    if isinstance(result, list):
+        return cast(list[Hashable], result)
+    return "keep_answer"
+
+
+async def arefresh_router(
+    state: OverallState, config: RunnableConfig
+) -> Union[Hashable, list[Hashable]]:
+    """Async variant of `refresh_router` (runs on the event loop)."""
+    result = await RefreshRouterNode().acall(state, config)
+    if isinstance(result, list):
+        return cast(list[Hashable], result)
+    return "keep_answer"
+
+
+def change_router(state: OverallState, config: RunnableConfig) -> Hashable:
+    """Redo reflection and the answer only when the results changed materially."""
+    if (state.refresh_report or {}).get("material_change"):
+        return "reflection"
+    return "keep_answer"
+
+
+async def achange_router(state: OverallState, config: RunnableConfig) -> Hashable:
+    """Async variant of `change_router` (runs on the event loop)."""
+    return change_router(state, config)
+
+
+# Refresh a stored run (`prior_run`, see `src.utils.build_run_record`):
+# re-search only the queries whose results outlived the TTL, and rerun the
+# research loop from reflection only if the new results differ materially
+builder = StateGraph(OverallState)
+
+builder.add_node("plan_refresh", RefreshPlanningNode().as_runnable())
+builder.add_node("refresh_search", WebResearchNode().as_runnable())
+builder.add_node("detect_changes", RefreshDiffNode().as_runnable())
+builder.add_node("keep_answer", KeepAnswerNode().as_runnable())
+builder.add_node("web_research", WebResearchNode().as_runnable())
+builder.add_node("reflection", ReflectionNode().as_runnable())
+builder.add_node("finalize_answer", FinalizationNode().as_runnable())
+builder.add_node("draft_answer", DraftAnswerNode().as_runnable())
+
+builder.add_edge(START, "plan_refresh")
+# Re-search the stale queries in parallel (fresh ones are reused as-is)
+builder.add_conditional_edges(
+    "plan_refresh",
+    RunnableLambda(refresh_router, afunc=arefresh_router),
+    ["refresh_search", "keep_answer"],
+)
+builder.add_edge("refresh_search", "detect_changes")
+# Compare with the stored results by canonical URL and content hash
+builder.add_conditional_edges(
+    "detect_changes",
+    RunnableLambda(change_router, afunc=achange_router),
+    ["reflection", "keep_answer"],
+)
+# Same research loop as the main graph when the results changed
+builder.add_edge("web_research", "reflection")
+builder.add_conditional_edges(
+    "reflection",
+    RunnableLambda(research_evaluation_router, afunc=aresearch_evaluation_router),
+    ["web_research", "draft_answer", "finalize_answer"],
+)
+builder.add_edge("draft_answer", END)
+builder.add_edge("finalize_answer", END)
+builder.add_edge("keep_answer", END)
+
+refresh_graph = builder.compile(checkpointer=None)
@@ -1,11 +1,19 @@
 from typing import Hashable, Union, cast
 
+from langchain_core.runnables import RunnableConfig, RunnableLambda
 from langgraph.graph import END, START, StateGraph
+from src.config.configuration import Configuration
 from src.nodes import (
+    DraftAnswerNode,
     FinalizationNode,
+    FollowUpNode,
     QueryGenerationNode,
     ReflectionNode,
     ResearchEvaluationNode,
+    SubQuestionJoinNode,
+    SubQuestionPlanningNode,
+    SubQuestionResearchNode,
+    SubQuestionRouterNode,
     WebResearchNode,
     WebResearchRouterNode,
 )
@@ -13,17 +21,50 @@ from src.states import OverallState
 
 
 # Router functions for conditional edges
-def web_research_router(state: OverallState) -> Union[Hashable, list[Hashable]]:
+def turn_router(state: OverallState, config: RunnableConfig) -> Hashable:
+    """Reuse prior sources for follow-up turns, otherwise plan fresh research.
+
+    In hierarchical planning mode the topic is first split into sub-questions;
+    otherwise queries for the whole topic are generated directly.
+    """
+    config_obj = Configuration.get_config(config)
+    if FollowUpNode.should_reuse(state, config_obj):
+        return "plan_follow_up"
+    if config_obj.research.planning_mode == "hierarchical":
+        return "plan_sub_questions"
+    return "generate_query"
+
+
+async def aturn_router(state: OverallState, config: RunnableConfig) -> Hashable:
+    """Async variant of `turn_router` (runs on the event loop)."""
+    return turn_router(state, config)
+
+
+def web_research_router(
+    state: OverallState, config: RunnableConfig
+) -> Union[Hashable, list[Hashable]]:
     """Route to web research based on search queries."""
-    result = WebResearchRouterNode()(state, {})
+    result = WebResearchRouterNode()(state, config)
     if isinstance(result, list):
         return cast(list[Hashable], result)  # Cast Send objects to Hashable
-    return "web_research"
+    return "finalize_answer"
+
+
+async def aweb_research_router(
+    state: OverallState, config: RunnableConfig
+) -> Union[Hashable, list[Hashable]]:
+    """Async variant of `web_research_router` (runs on the event loop)."""
+    result = await WebResearchRouterNode().acall(state, config)
+    if isinstance(result, list):
+        return cast(list[Hashable], result)
+    return "finalize_answer"
 
 
-def research_evaluation_router(state: OverallState) -> Union[Hashable, list[Hashable]]:
+def research_evaluation_router(
+    state: OverallState, config: RunnableConfig
+) -> Union[Hashable, list[Hashable]]:
     """Route based on research evaluation."""
-    result = ResearchEvaluationNode()(state, {})
+    result = ResearchEvaluationNode()(state, config)
     if isinstance(result, str):
         return result
     elif isinstance(result, list):
@@ -31,26 +72,112 @@ def research_evaluation_router(state: OverallState) -> Union[Hashable, list[Hash
     return "finalize_answer"
 
 
+async def aresearch_evaluation_router(
+    state: OverallState, config: RunnableConfig
+) -> Union[Hashable, list[Hashable]]:
+    """Async variant of `research_evaluation_router` (runs on the event loop)."""
+    result = await ResearchEvaluationNode().acall(state, config)
+    if isinstance(result, str):
+        return result
+    elif isinstance(result, list):
+        return cast(list[Hashable], result)
+    return "finalize_answer"
+
+
+def sub_question_router(
+    state: OverallState, config: RunnableConfig
+) -> Union[Hashable, list[Hashable]]:
+    """Route sub-questions whose dependencies are answered to parallel research."""
+    result = SubQuestionRouterNode()(state, config)
+    if isinstance(result, list):
+        return cast(list[Hashable], result)
+    return "finalize_answer"
+
+
+async def asub_question_router(
+    state: OverallState, config: RunnableConfig
+) -> Union[Hashable, list[Hashable]]:
+    """Async variant of `sub_question_router` (runs on the event loop)."""
+    result = await SubQuestionRouterNode().acall(state, config)
+    if isinstance(result, list):
+        return cast(list[Hashable], result)
+    return "finalize_answer"
+
+
+# Research loop for a single sub-question (hierarchical planning mode): the same
+# query generation / search / reflection nodes, ending where the main graph
+# would finalize so that the parent graph merges the findings instead
+sub_question_builder = StateGraph(OverallState)
+sub_question_builder.add_node("generate_query", QueryGenerationNode().as_runnable())
+sub_question_builder.add_node("web_research", WebResearchNode().as_runnable())
+sub_question_builder.add_node("reflection", ReflectionNode().as_runnable())
+sub_question_builder.add_edge(START, "generate_query")
+sub_question_builder.add_conditional_edges(
+    "generate_query",
+    RunnableLambda(web_research_router, afunc=aweb_research_router),
+    {"web_research": "web_research", "finalize_answer": END},
+)
+sub_question_builder.add_edge("web_research", "reflection")
+sub_question_builder.add_conditional_edges(
+    "reflection",
+    RunnableLambda(research_evaluation_router, afunc=aresearch_evaluation_router),
+    {"web_research": "web_research", "finalize_answer": END},
+)
+sub_question_graph = sub_question_builder.compile()
+
 # Create our Research Agent Graph
 builder = StateGraph(OverallState)
 
 # Define the nodes we will cycle between
-builder.add_node("generate_query", QueryGenerationNode())
-builder.add_node("web_research", WebResearchNode()) 
-builder.add_node("reflection", ReflectionNode())
-builder.add_node("finalize_answer", FinalizationNode())
-
-# Set the entrypoint as `generate_query`
-# This means that this node is the first one called
-builder.add_edge(START, "generate_query")
+# (each node runs its async implementation under `ainvoke` / `astream`)
+builder.add_node("generate_query", QueryGenerationNode().as_runnable())
+builder.add_node("plan_follow_up", FollowUpNode().as_runnable())
+builder.add_node("web_research", WebResearchNode().as_runnable())
+builder.add_node("reflection", ReflectionNode().as_runnable())
+builder.add_node("finalize_answer", FinalizationNode().as_runnable())
+builder.add_node("draft_answer", DraftAnswerNode().as_runnable())
+builder.add_node("plan_sub_questions", SubQuestionPlanningNode().as_runnable())
+builder.add_node(
+    "research_sub_question",
+    SubQuestionResearchNode(sub_question_graph).as_runnable(),
+)
+builder.add_node("join_sub_questions", SubQuestionJoinNode().as_runnable())
+
+# Start with `generate_query`, with `plan_follow_up` when a follow-up turn
+# can reuse the sources gathered by earlier turns of the thread, or with
+# `plan_sub_questions` in hierarchical planning mode
+builder.add_conditional_edges(
+    START,
+    RunnableLambda(turn_router, afunc=aturn_router),
+    ["generate_query", "plan_follow_up", "plan_sub_questions"],
+)
 # Add conditional edge to continue with search queries in a parallel branch
-builder.add_conditional_edges("generate_query", web_research_router, ["web_research"])
+# (a follow-up turn whose prior sources suffice goes straight to the answer)
+for planner in ("generate_query", "plan_follow_up"):
+    builder.add_conditional_edges(
+        planner,
+        RunnableLambda(web_research_router, afunc=aweb_research_router),
+        ["web_research", "finalize_answer"],
+    )
 # Reflect on the web research
 builder.add_edge("web_research", "reflection")
-# Evaluate the research
+# Evaluate the research (in progressive mode the first follow-up loop also
+# drafts an answer from the results so far, replaced later by the final answer)
 builder.add_conditional_edges(
-    "reflection", research_evaluation_router, ["web_research", "finalize_answer"]
+    "reflection",
+    RunnableLambda(research_evaluation_router, afunc=aresearch_evaluation_router),
+    ["web_research", "draft_answer", "finalize_answer"],
 )
+builder.add_edge("draft_answer", END)
+# Research ready sub-questions in parallel, each in its own research loop,
+# then schedule the sub-questions that depended on them
+for planner in ("plan_sub_questions", "join_sub_questions"):
+    builder.add_conditional_edges(
+        planner,
+        RunnableLambda(sub_question_router, afunc=asub_question_router),
+        ["research_sub_question", "finalize_answer"],
+    )
+builder.add_edge("research_sub_question", "join_sub_questions")
 # Finalize the answer
 builder.add_edge("finalize_answer", END)
 
@@ -8,8 +8,24 @@ from .research import (
     ResearchEvaluationNode,
 )
 from .finalization import (
+    DraftAnswerNode,
     FinalizationNode,
 )
+from .follow_up import (
+    FollowUpNode,
+)
+from .refresh import (
+    KeepAnswerNode,
+    RefreshDiffNode,
+    RefreshPlanningNode,
+    RefreshRouterNode,
+)
+from .sub_questions import (
+    SubQuestionJoinNode,
+    SubQuestionPlanningNode,
+    SubQuestionResearchNode,
+    SubQuestionRouterNode,
+)
 
 __all__ = [
     # Class definitions
@@ -19,4 +35,14 @@ __all__ = [
     "ReflectionNode",
     "ResearchEvaluationNode",
     "FinalizationNode",
+    "DraftAnswerNode",
+    "FollowUpNode",
+    "SubQuestionPlanningNode",
+    "SubQuestionRouterNode",
+    "SubQuestionResearchNode",
+    "SubQuestionJoinNode",
+    "RefreshPlanningNode",
+    "RefreshRouterNode",
+    "RefreshDiffNode",
+    "KeepAnswerNode",
 ]
\ No newline at end of file
@@ -1,18 +1,46 @@
+import asyncio
 from abc import ABC, abstractmethod
-from typing import List, Union
+from typing import Any, ClassVar, List, Union
 
-from langchain_core.runnables import RunnableConfig
+from langchain_core.runnables import Runnable, RunnableConfig, RunnableLambda
 from langgraph.types import Send
 from pydantic import BaseModel
 
+from src.observability import instrument_node
+
 
 class BaseNode(ABC):
     """LangGraphノードの基底クラス。
 
     すべてのノードはこのクラスを継承し、統一されたインターフェースを提供します。
     各ノードは状態を受け取り、処理を実行し、更新された状態を返す必要があります。
+    サブクラスで定義された `__call__` と `acall` は自動的に計測フックでラップされ、
+    `node_name` をラベルとしてレイテンシ等のメトリクスが記録されます。
+
+    非同期で実行する場合は `acall` が呼ばれます。LLM・検索を待つノードは `acall` を
+    オーバーライドし、`ainvoke` などでイベントループ上で待機してください。
     """
 
+    # メトリクスのラベルに使用するノード名（グラフ上のノード名と揃える）
+    node_name: ClassVar[str] = ""
+    # 実行の最後に呼ばれるノードかどうか（トレースの書き出しタイミングに使用）
+    terminal: ClassVar[bool] = False
+    # `__call__` がI/Oを待つか（Falseならデフォルトの `acall` はイベントループ上で直接呼び出す）
+    blocking: ClassVar[bool] = True
+
+    def __init_subclass__(cls, **kwargs: Any) -> None:
+        """サブクラスの `__call__` と `acall` を計測フックでラップ。"""
+        super().__init_subclass__(**kwargs)
+        for method in ("__call__", "acall"):
+            if method in cls.__dict__:
+                setattr(
+                    cls,
+                    method,
+                    instrument_node(
+                        cls.node_name or cls.__name__, terminal=cls.terminal
+                    )(cls.__dict__[method]),
+                )
+
     def __init__(self):
         """ベースノードを初期化。"""
         pass
@@ -31,3 +59,21 @@ class BaseNode(ABC):
             更新されたグラフ状態、Sendオブジェクトのリスト、または文字列
         """
         pass
+
+    async def acall(
+        self, state: Union[BaseModel, List[Send], str], config: RunnableConfig
+    ) -> Union[BaseModel, List[Send], str]:
+        """ノードロジックを非同期で実行。
+
+        オーバーライドしない場合、`blocking` なノードは `__call__` をスレッドで実行し、
+        そうでないノードはイベントループ上で直接呼び出します。
+        """
+        if not self.blocking:
+            return self(state, config)
+        return await asyncio.to_thread(self, state, config)
+
+    def as_runnable(self) -> Runnable:
+        """同期（`invoke`）・非同期（`ainvoke`）のどちらでも実行できるランナブルに変換。"""
+        return RunnableLambda(
+            self.__call__, afunc=self.acall, name=self.node_name or type(self).__name__
+        )
@@ -1,17 +1,39 @@
-import os
-from typing import Dict, List, Tuple, Union, cast
+import asyncio
+import time
+import uuid
+from functools import partial
+from typing import Any, Dict, List, Optional, Tuple, Union, cast
 
 from dotenv import load_dotenv
-from langchain_core.messages import AIMessage
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, RemoveMessage
 from langchain_core.runnables import RunnableConfig
-from langchain_openai import ChatOpenAI
 from langgraph.types import Send
-from pydantic import BaseModel, SecretStr
+from pydantic import BaseModel
 
+from src.archive import build_archive_record, get_run_archive
 from src.config.configuration import Configuration
-from src.prompts import answer_instructions
+from src.observability import get_run_key
+from src.observability.metrics import CPU_TASKS, TIME_TO_FIRST_ANSWER
+from src.parallel import (
+    arun_in_process_pool,
+    get_process_pool,
+    replace_citation_markers,
+    run_in_process_pool,
+)
+from src.providers import ainvoke_chat_model, create_chat_model, invoke_chat_model
+from src.retrieval import get_knowledge_base, release_fingerprint_index
+from src.prompts import answer_instructions, compact_sources_note, draft_answer_note
 from src.states import OverallState
-from src.utils import get_research_topic
+from src.utils import (
+    BudgetStatus,
+    get_budget_status,
+    get_turn_findings,
+    get_turn_offset,
+    get_turn_results,
+    get_turn_started_at,
+    get_turn_topic,
+)
 from src.utils.date_utils import get_current_date
 from .base_node import BaseNode
 
@@ -21,6 +43,9 @@ load_dotenv()
 class FinalizationNode(BaseNode):
     """研究結果を包括的な回答にまとめるノード。"""
 
+    node_name = "finalize_answer"
+    terminal = True
+
     def __init__(self):
         """最終化ノードを初期化。"""
         super().__init__()
@@ -29,11 +54,22 @@ class FinalizationNode(BaseNode):
         """状態または設定から推論モデルを取得。"""
         return state.reasoning_model or config_obj.model.answer_model
 
-    def _create_final_prompt(self, state: OverallState) -> str:
+    def _create_final_prompt(self, state: OverallState, config_obj) -> str:
         """最終回答生成用のプロンプトを作成。"""
         current_date = get_current_date()
-        research_topic = get_research_topic(state.messages)
-        summaries = "\n---\n\n".join(state.web_research_result)
+        research_topic = get_turn_topic(state)
+        summaries = "\n---\n\n".join(get_turn_results(state))
+        findings = sorted(get_turn_findings(state), key=lambda f: f["index"])
+        if findings:
+            # 階層的な計画モードではサブ質問ごとの調査結果を統合するように指示
+            outline = "".join(f"{f['index'] + 1}. {f['question']}\n" for f in findings)
+            summaries = (
+                "調査したサブ質問（それぞれの調査結果を統合して回答してください）:\n"
+                f"{outline}\n{summaries}"
+            )
+        if config_obj.search.result_format == "compact":
+            # ソースごとに繰り返していた引用指示の代わりに書式の説明を一度だけ付与
+            summaries = compact_sources_note + summaries
 
         return answer_instructions.format(
             current_date=current_date,
@@ -41,14 +77,12 @@ class FinalizationNode(BaseNode):
             summaries=summaries,
         )
 
-    def _initialize_llm(self, model: str, config_obj) -> ChatOpenAI:
+    def _initialize_llm(self, model: str, config_obj) -> BaseChatModel:
         """推論モデルを初期化。"""
-        api_key = os.getenv("OPENAI_API_KEY")
-        return ChatOpenAI(
+        return create_chat_model(
             model=model,
             temperature=config_obj.llm_parameters.answer_generation_temperature,
             max_retries=config_obj.llm_parameters.max_retries,
-            api_key=SecretStr(api_key) if api_key else None,
         )
 
     def _process_citations(
@@ -77,16 +111,124 @@ class FinalizationNode(BaseNode):
         self, text: str, citation_mapping: Dict[str, Tuple[str, str]]
     ) -> str:
         """テキスト内の引用マーカーをマークダウンリンクに変換。"""
-        for marker, (title, url) in citation_mapping.items():
-            # 【1-1】形式のマーカーを[title](url)に置換
-            text = text.replace(marker, f"[{title}]({url})")
+        # 【1-1】形式のマーカーを[title](url)に置換
+        return replace_citation_markers(text, citation_mapping)
+
+    def _is_short_text(self, text: str, config_obj) -> bool:
+        """受け渡しの方が高くつくため、その場で引用を書き換える短い回答かを判定。"""
+        return len(text) < config_obj.execution.cpu_pool_min_chars
+
+    def _link_citations(self, text: str, state: OverallState, config_obj) -> str:
+        """回答の引用マーカーをリンクに変換（長い回答はプロセスプールで処理）。"""
+        citation_mapping = self._process_citations(state.sources_gathered, config_obj)
+        if self._is_short_text(text, config_obj) or get_process_pool() is None:
+            CPU_TASKS.inc("citations", "inline")
+            return self._replace_citations_with_links(text, citation_mapping)
+        results, pooled = run_in_process_pool(
+            [partial(replace_citation_markers, text, citation_mapping)]
+        )
+        CPU_TASKS.inc("citations", "process" if pooled else "inline")
+        return results[0]
+
+    async def _alink_citations(self, text: str, state: OverallState, config_obj) -> str:
+        """`_link_citations` の非同期版（長い回答はプールが無ければスレッドで処理）。"""
+        citation_mapping = self._process_citations(state.sources_gathered, config_obj)
+        if self._is_short_text(text, config_obj):
+            CPU_TASKS.inc("citations", "inline")
+            return self._replace_citations_with_links(text, citation_mapping)
+        results, pooled = await arun_in_process_pool(
+            [partial(replace_citation_markers, text, citation_mapping)]
+        )
+        CPU_TASKS.inc("citations", "process" if pooled else "thread")
+        return results[0]
+
+    def _ingest_sources(self, state: OverallState, config_obj) -> None:
+        """このターンで収集したソースを実行をまたいだ知識ベースに追加。"""
+        kb_config = config_obj.knowledge_base
+        if not (kb_config.kb_enabled and kb_config.kb_ingest):
+            return
+        offset = get_turn_offset(state, "sources_gathered")
+        get_knowledge_base(kb_config.kb_path).ingest(state.sources_gathered[offset:])
+
+    def _archive_run(
+        self,
+        state: OverallState,
+        update: OverallState,
+        config: RunnableConfig,
+        config_obj,
+    ) -> None:
+        """完了したターンの記録を実行アーカイブに追記。"""
+        if not config_obj.archive.archive_enabled:
+            return
+        record = build_archive_record(
+            state,
+            str(update.messages[-1].content),
+            update.budget_usage or {},
+            config_obj,
+            get_run_key(config, state.run_key),
+        )
+        get_run_archive(config_obj.archive).append(record)
+
+    def _generate_comprehensive_answer(
+        self, prompt: str, llm: BaseChatModel
+    ) -> Tuple[str, int]:
+        """包括的な回答を生成（消費トークン数も返す）。"""
+        result, tokens = invoke_chat_model(llm, prompt)
+        return result.content, tokens
+
+    async def _agenerate_comprehensive_answer(
+        self, prompt: str, llm: BaseChatModel
+    ) -> Tuple[str, int]:
+        """包括的な回答を非同期で生成（消費トークン数も返す）。"""
+        result, tokens = await ainvoke_chat_model(llm, prompt)
+        return result.content, tokens
+
+    def _get_stopped_by(self, state: OverallState, config_obj) -> Optional[str]:
+        """研究を打ち切った予算の種類（回答を生成する前の時点で判定）。"""
+        research = config_obj.research
+        return get_budget_status(state, research).exhausted_reason(
+            research.finalize_reserve_seconds, research.finalize_reserve_tokens
+        )
+
+    def _create_budget_usage(
+        self,
+        state: OverallState,
+        answer_tokens: int,
+        stopped_by: Optional[str],
+        config_obj,
+    ) -> Dict[str, Any]:
+        """最終回答と一緒に報告する予算の消費状況を作成。
+
+        `stopped_by` は回答の生成前に `_get_stopped_by` で判定した打ち切り理由です。
+        """
+        status = get_budget_status(state, config_obj.research)
+        status.tokens_used += answer_tokens
+        return {
+            **status.to_dict(),
+            "budget_exhausted": stopped_by,
+            "first_answer_seconds": self._get_first_answer_seconds(state, status),
+        }
+
+    def _record_first_answer(self, state: OverallState, update: OverallState) -> None:
+        """最初の回答までの秒数を記録（暫定回答を返したターンでは暫定回答ノードが記録済み）。"""
+        if state.draft_answer:
+            return
+        TIME_TO_FIRST_ANSWER.observe(
+            (update.budget_usage or {})["first_answer_seconds"], "final"
+        )
 
-        return text
+    def _get_first_answer_seconds(
+        self, state: OverallState, status: BudgetStatus
+    ) -> float:
+        """ターンの開始から最初の回答（暫定回答があればそれ）を返すまでの秒数。
 
-    def _generate_comprehensive_answer(self, prompt: str, llm: ChatOpenAI) -> str:
-        """包括的な回答を生成。"""
-        result = llm.invoke(prompt)
-        return result.content
+        全体の所要時間（`elapsed_seconds`）とは別に報告します。
+        """
+        draft = state.draft_answer or {}
+        started_at = get_turn_started_at(state)
+        if draft and started_at is not None:
+            return round(max(0.0, draft["at"] - started_at), 3)
+        return round(status.elapsed_seconds, 3)
 
     def __call__(
         self, state: Union[BaseModel, List[Send], str], config: RunnableConfig
@@ -99,36 +241,180 @@ class FinalizationNode(BaseNode):
         config_obj = Configuration.get_config(config)
         reasoning_model = self._get_reasoning_model(overall_state, config_obj)
 
+        # 検索はこれ以上行わないため、実行ごとの近似重複インデックスを破棄
+        release_fingerprint_index(get_run_key(config, overall_state.run_key))
+
+        # 回答の生成にかかる時間・トークンを含めずに打ち切り理由を判定
+        stopped_by = self._get_stopped_by(overall_state, config_obj)
+
         # プロンプトを作成し、LLMを初期化
-        formatted_prompt = self._create_final_prompt(overall_state)
+        formatted_prompt = self._create_final_prompt(overall_state, config_obj)
         llm = self._initialize_llm(reasoning_model, config_obj)
 
         # 包括的な回答を生成
-        comprehensive_answer = self._generate_comprehensive_answer(
+        comprehensive_answer, tokens = self._generate_comprehensive_answer(
             formatted_prompt, llm
         )
 
-        # 引用を処理
-        citation_mapping = self._process_citations(
-            overall_state.sources_gathered, config_obj
+        # 引用マーカーをマークダウンリンクに変換
+        final_answer = self._link_citations(
+            comprehensive_answer, overall_state, config_obj
         )
 
-        # 引用マーカーをマークダウンリンクに変換
-        final_answer = self._replace_citations_with_links(
-            comprehensive_answer, citation_mapping
+        # 収集したソースを次の実行のために知識ベースへ追加
+        self._ingest_sources(overall_state, config_obj)
+        update = self._create_update(
+            overall_state, final_answer, tokens, config_obj, stopped_by
         )
+        self._record_first_answer(overall_state, update)
+        self._archive_run(overall_state, update, config, config_obj)
+        return update
+
+    async def acall(
+        self, state: Union[BaseModel, List[Send], str], config: RunnableConfig
+    ) -> Union[BaseModel, List[Send], str]:
+        """研究結果から最終的な包括回答を非同期で生成。"""
+        overall_state = cast(OverallState, state)
+        config_obj = Configuration.get_config(config)
+        reasoning_model = self._get_reasoning_model(overall_state, config_obj)
+        release_fingerprint_index(get_run_key(config, overall_state.run_key))
+        stopped_by = self._get_stopped_by(overall_state, config_obj)
 
-        # 最終的なAIメッセージを作成
-        ai_message = AIMessage(content=final_answer)
+        formatted_prompt = self._create_final_prompt(overall_state, config_obj)
+        llm = self._initialize_llm(reasoning_model, config_obj)
 
-        # 更新された状態を返す
+        comprehensive_answer, tokens = await self._agenerate_comprehensive_answer(
+            formatted_prompt, llm
+        )
+        final_answer = await self._alink_citations(
+            comprehensive_answer, overall_state, config_obj
+        )
+        await asyncio.to_thread(self._ingest_sources, overall_state, config_obj)
+        update = self._create_update(
+            overall_state, final_answer, tokens, config_obj, stopped_by
+        )
+        self._record_first_answer(overall_state, update)
+        await asyncio.to_thread(
+            self._archive_run, overall_state, update, config, config_obj
+        )
+        return update
+
+    def _create_update(
+        self,
+        overall_state: OverallState,
+        final_answer: str,
+        tokens: int,
+        config_obj,
+        stopped_by: Optional[str] = None,
+    ) -> OverallState:
+        """引用をリンクに変換した回答から状態の差分を作成。
+
+        最終回答には専用のメッセージIDを付けます。このターンで暫定回答を返している
+        場合は暫定回答のメッセージを削除し、そのIDを `replaces_draft` として
+        メタデータに記録します（クライアントは暫定回答を最終回答に差し替えられます）。
+        """
+        budget_usage = self._create_budget_usage(
+            overall_state, tokens, stopped_by, config_obj
+        )
+        metadata: Dict[str, Any] = {"budget_usage": budget_usage}
+        messages: List[Any] = []
+        draft_id = (overall_state.draft_answer or {}).get("id")
+        if draft_id:
+            metadata["replaces_draft"] = draft_id
+            messages.append(RemoveMessage(id=draft_id))
+
+        # 最終的なAIメッセージを作成（予算の消費状況をメタデータに添付）
+        messages.append(
+            AIMessage(
+                content=final_answer,
+                id=f"answer-{uuid.uuid4()}",
+                response_metadata=metadata,
+            )
+        )
+
+        # 状態の差分を返す
+        return OverallState(
+            messages=messages,
+            tokens_used=tokens,
+            budget_usage=budget_usage,
+        )
+
+
+class DraftAnswerNode(FinalizationNode):
+    """段階的な回答モードで、研究の途中に高速なモデルで暫定回答を作成するノード。
+
+    最初の研究ループの結果から回答を作成し、引用マーカーを最終回答と同じ方法で
+    リンクに変換して先に返します。最終回答は別のメッセージIDで返し、暫定回答の
+    メッセージは削除されます。暫定回答は次の研究ループの検索と並行して作成されます。
+    """
+
+    node_name = "draft_answer"
+    terminal = False
+
+    def __call__(
+        self, state: Union[BaseModel, List[Send], str], config: RunnableConfig
+    ) -> Union[BaseModel, List[Send], str]:
+        """ここまでの研究結果から暫定回答を生成。"""
+        overall_state = cast(OverallState, state)
+        config_obj = Configuration.get_config(config)
+
+        formatted_prompt = draft_answer_note + self._create_final_prompt(
+            overall_state, config_obj
+        )
+        llm = self._initialize_llm(config_obj.model.draft_model, config_obj)
+        draft, tokens = self._generate_comprehensive_answer(formatted_prompt, llm)
+        draft_answer = self._link_citations(draft, overall_state, config_obj)
+        update = self._create_update(overall_state, draft_answer, tokens, config_obj)
+        self._record_first_answer(overall_state, update)
+        return update
+
+    async def acall(
+        self, state: Union[BaseModel, List[Send], str], config: RunnableConfig
+    ) -> Union[BaseModel, List[Send], str]:
+        """ここまでの研究結果から暫定回答を非同期で生成。"""
+        overall_state = cast(OverallState, state)
+        config_obj = Configuration.get_config(config)
+
+        formatted_prompt = draft_answer_note + self._create_final_prompt(
+            overall_state, config_obj
+        )
+        llm = self._initialize_llm(config_obj.model.draft_model, config_obj)
+        draft, tokens = await self._agenerate_comprehensive_answer(
+            formatted_prompt, llm
+        )
+        draft_answer = await self._alink_citations(draft, overall_state, config_obj)
+        update = self._create_update(overall_state, draft_answer, tokens, config_obj)
+        self._record_first_answer(overall_state, update)
+        return update
+
+    def _create_update(
+        self,
+        overall_state: OverallState,
+        final_answer: str,
+        tokens: int,
+        config_obj,
+        stopped_by: Optional[str] = None,
+    ) -> OverallState:
+        """暫定回答のメッセージと、最終回答で削除するためのIDを記録した差分を作成。
+
+        予算の消費状況は最終回答で報告するため、`stopped_by` は使いません。
+        """
+        now = time.time()
+        message_id = f"draft-{uuid.uuid4()}"
         return OverallState(
-            messages=overall_state.messages + [ai_message],
-            search_query=overall_state.search_query,
-            web_research_result=overall_state.web_research_result,
-            sources_gathered=overall_state.sources_gathered,
-            initial_search_query_count=overall_state.initial_search_query_count,
-            max_research_loops=overall_state.max_research_loops,
-            research_loop_count=overall_state.research_loop_count,
-            reasoning_model=overall_state.reasoning_model,
+            messages=[
+                AIMessage(
+                    content=final_answer,
+                    id=message_id,
+                    response_metadata={"draft": True},
+                )
+            ],
+            tokens_used=tokens,
+            draft_answer={"id": message_id, "at": now},
         )
+
+    def _record_first_answer(self, state: OverallState, update: OverallState) -> None:
+        """ターンの開始から暫定回答を返すまでの秒数を記録。"""
+        at = (update.draft_answer or {})["at"]
+        started_at = get_turn_started_at(state) or at
+        TIME_TO_FIRST_ANSWER.observe(max(0.0, at - started_at), "draft")
@@ -0,0 +1,213 @@
+import time
+from typing import Any, Dict, List, Tuple, Union, cast
+
+from dotenv import load_dotenv
+from langchain_core.language_models import BaseChatModel
+from langchain_core.runnables import RunnableConfig
+from langgraph.types import Send
+from pydantic import BaseModel
+
+from src.config.configuration import Configuration
+from src.observability import get_run_key
+from src.prompts import follow_up_instructions
+from src.providers import (
+    ainvoke_chat_model,
+    create_chat_model,
+    invoke_chat_model,
+    with_repaired_structured_output,
+)
+from src.retrieval import get_source_index
+from src.schemas import FollowUpPlan
+from src.states import OverallState
+from src.utils import (
+    build_turn_topic,
+    get_latest_question,
+    get_or_create_run_key,
+    has_prior_turn,
+    start_turn,
+)
+from src.utils.date_utils import get_current_date
+
+from .base_node import BaseNode
+from .research import format_compact_result_text, format_result_text
+
+load_dotenv()
+
+
+class FollowUpNode(BaseNode):
+    """フォローアップの質問で、前のターンで収集したソースを再利用するノード。
+
+    スレッドの `sources_gathered` をインデックスから検索して新しい質問に関連する
+    ソースを取り出し、それだけで答えられるかをLLMに判断させます。十分なら検索せずに
+    最終回答へ進み、不足している場合はカバーされていない観点のクエリだけを検索します。
+    """
+
+    node_name = "plan_follow_up"
+
+    def __init__(self):
+        """フォローアップノードを初期化。"""
+        super().__init__()
+
+    @staticmethod
+    def should_reuse(state: OverallState, config_obj) -> bool:
+        """前のターンのソースを再利用するフォローアップのターンかを判定。"""
+        return (
+            config_obj.research.reuse_prior_sources
+            and bool(state.sources_gathered)
+            and has_prior_turn(state.messages)
+        )
+
+    def _retrieve_prior_sources(
+        self, state: OverallState, config: RunnableConfig, config_obj
+    ) -> List[Dict[str, Any]]:
+        """新しい質問（と直前の質問）に関連する収集済みのソースを検索。"""
+        index = get_source_index(get_run_key(config, state.run_key))
+        index.update(state.sources_gathered)
+        # 「それは？」のような省略の多い質問でも引けるように直前の質問も含める
+        query = get_latest_question(state.messages, count=2)
+        return index.search(query, config_obj.research.prior_sources_top_k)
+
+    def _format_prior_evidence(self, sources: List[Dict[str, Any]], config_obj) -> str:
+        """収集済みのソースを検索結果と同じ書式・引用マーカーでテキストにする。"""
+        format_text = (
+            format_compact_result_text
+            if config_obj.search.result_format == "compact"
+            else format_result_text
+        )
+        return "".join(
+            format_text(
+                {
+                    "title": source.get("title", ""),
+                    "content": source.get("content", ""),
+                    "url": source.get("value", ""),
+                },
+                source.get("short_url", ""),
+            )
+            for source in sources
+        )
+
+    def _get_query_count(self, config_obj) -> int:
+        """追加で検索するクエリ数の上限（検索回数の予算を超えない範囲）。"""
+        query_count = config_obj.research.max_follow_up_queries
+        max_searches = config_obj.research.max_searches
+        return min(query_count, max_searches) if max_searches > 0 else query_count
+
+    def _create_prompt(
+        self,
+        state: OverallState,
+        research_topic: str,
+        evidence: str,
+        query_count: int,
+    ) -> str:
+        """十分性の判断と追加検索クエリの生成用のプロンプトを作成。"""
+        return follow_up_instructions.format(
+            current_date=get_current_date(),
+            research_topic=research_topic,
+            question=get_latest_question(state.messages),
+            summaries=evidence,
+            number_of_queries=query_count,
+        )
+
+    def _initialize_llm(self, config_obj) -> BaseChatModel:
+        """判断用のLLMを初期化（クエリ生成と同じモデル）。"""
+        return create_chat_model(
+            model=config_obj.model.query_generator_model,
+            temperature=config_obj.llm_parameters.query_generation_temperature,
+            max_retries=config_obj.llm_parameters.max_retries,
+        )
+
+    def _plan(
+        self, prompt: str, llm: BaseChatModel, config_obj
+    ) -> Tuple[FollowUpPlan, int]:
+        """収集済みのソースの十分性と追加検索クエリを判断（消費トークン数も返す）。"""
+        result, tokens = invoke_chat_model(
+            with_repaired_structured_output(
+                llm, FollowUpPlan, config_obj.llm_parameters.max_retries
+            ),
+            prompt,
+        )
+        return cast(FollowUpPlan, result), tokens
+
+    async def _aplan(
+        self, prompt: str, llm: BaseChatModel, config_obj
+    ) -> Tuple[FollowUpPlan, int]:
+        """収集済みのソースの十分性と追加検索クエリを非同期で判断。"""
+        result, tokens = await ainvoke_chat_model(
+            with_repaired_structured_output(
+                llm, FollowUpPlan, config_obj.llm_parameters.max_retries
+            ),
+            prompt,
+        )
+        return cast(FollowUpPlan, result), tokens
+
+    def __call__(
+        self, state: Union[BaseModel, List[Send], str], config: RunnableConfig
+    ) -> Union[BaseModel, List[Send], str]:
+        """収集済みのソースを再利用し、足りない観点の検索クエリだけを生成。"""
+        # 型安全性のためにstateをOverallStateとしてキャスト
+        overall_state = cast(OverallState, state)
+        started_at = time.time()
+
+        # 設定を取得
+        config_obj = Configuration.get_config(config)
+        query_count = self._get_query_count(config_obj)
+
+        # 関連する収集済みのソースを取り出してプロンプトを作成
+        sources = self._retrieve_prior_sources(overall_state, config, config_obj)
+        evidence = self._format_prior_evidence(sources, config_obj)
+        topic = build_turn_topic(overall_state, config_obj)
+        formatted_prompt = self._create_prompt(
+            overall_state, topic["research_topic"], evidence, query_count
+        )
+        llm = self._initialize_llm(config_obj)
+
+        # 十分性と追加検索クエリを判断
+        plan, tokens = self._plan(formatted_prompt, llm, config_obj)
+        return self._create_update(
+            plan, tokens, evidence, query_count, started_at, overall_state, topic
+        )
+
+    async def acall(
+        self, state: Union[BaseModel, List[Send], str], config: RunnableConfig
+    ) -> Union[BaseModel, List[Send], str]:
+        """収集済みのソースを再利用し、足りない観点の検索クエリだけを非同期で生成。"""
+        overall_state = cast(OverallState, state)
+        started_at = time.time()
+        config_obj = Configuration.get_config(config)
+        query_count = self._get_query_count(config_obj)
+
+        sources = self._retrieve_prior_sources(overall_state, config, config_obj)
+        evidence = self._format_prior_evidence(sources, config_obj)
+        topic = build_turn_topic(overall_state, config_obj)
+        formatted_prompt = self._create_prompt(
+            overall_state, topic["research_topic"], evidence, query_count
+        )
+        llm = self._initialize_llm(config_obj)
+
+        plan, tokens = await self._aplan(formatted_prompt, llm, config_obj)
+        return self._create_update(
+            plan, tokens, evidence, query_count, started_at, overall_state, topic
+        )
+
+    def _create_update(
+        self,
+        plan: FollowUpPlan,
+        tokens: int,
+        evidence: str,
+        query_count: int,
+        started_at: float,
+        state: OverallState,
+        topic: Dict[str, Any],
+    ) -> OverallState:
+        """判断結果から状態の差分を作成（十分なら検索クエリは追加しない）。"""
+        queries = [] if plan.is_sufficient else plan.queries[:query_count]
+        turn = start_turn(state, now=started_at)
+        turn["prior_evidence"] = evidence
+        return OverallState(
+            search_query=queries,
+            is_sufficient=plan.is_sufficient,
+            run_key=get_or_create_run_key(state),
+            tokens_used=tokens,
+            **topic,
+            **turn,
+        )
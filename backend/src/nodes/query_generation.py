@@ -1,40 +1,91 @@
-import os
-from typing import List, Union, cast
+import asyncio
+import contextvars
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
+from typing import Any, Dict, List, Optional, Tuple, Union, cast
 
 from dotenv import load_dotenv
+from langchain_core.language_models import BaseChatModel
 from langchain_core.runnables import RunnableConfig
-from langchain_openai import ChatOpenAI
 from langgraph.types import Send
 from src.prompts import query_writer_instructions
-from pydantic import BaseModel, SecretStr
+from pydantic import BaseModel
 from src.schemas import SearchQueryList
 from src.states import OverallState, WebSearchState
-from src.utils import get_research_topic
+from src.utils import (
+    build_turn_topic,
+    get_budget_status,
+    get_latest_question,
+    get_or_create_run_key,
+    get_search_deadline,
+    get_turn_offset,
+    get_turn_topic,
+    start_turn,
+)
 from src.utils.date_utils import get_current_date
 from src.config.configuration import Configuration
+from src.observability.metrics import SPECULATIVE_SEARCHES
+from src.parallel import PreparedContent
+from src.providers import (
+    ainvoke_chat_model,
+    create_chat_model,
+    invoke_chat_model,
+    with_repaired_structured_output,
+)
 
 from .base_node import BaseNode
+from .research import WebResearchNode, query_overlap
 
 load_dotenv()
 
+# 先行検索の結果（生の検索結果と準備済みの本文）
+Prefetched = Tuple[List[Dict[str, Any]], List[PreparedContent]]
+
+# 先行検索をLLMの呼び出しと並行して実行するスレッド
+SPECULATIVE_WORKERS = 16
+_speculative_executor: Optional[ThreadPoolExecutor] = None
+_speculative_lock = threading.Lock()
+
+
+def _get_speculative_executor() -> ThreadPoolExecutor:
+    """先行検索用のスレッドプールを取得（最初の先行検索で作成）。"""
+    global _speculative_executor
+    with _speculative_lock:
+        if _speculative_executor is None:
+            _speculative_executor = ThreadPoolExecutor(
+                max_workers=SPECULATIVE_WORKERS, thread_name_prefix="speculative"
+            )
+        return _speculative_executor
+
 
 class QueryGenerationNode(BaseNode):
-    """ユーザーの質問に基づいて検索クエリを生成するノード。"""
+    """ユーザーの質問に基づいて検索クエリを生成するノード。
+
+    先行検索が有効な場合、クエリを生成するLLMの呼び出しと並行してユーザーの質問
+    そのものを検索し、生成したクエリと重なれば結果をこのノードの差分に含めます。
+    """
+
+    node_name = "generate_query"
 
     def __init__(self):
         """クエリ生成ノードを初期化。"""
         super().__init__()
+        self.web_research = WebResearchNode()
 
     def _get_query_count(self, state: OverallState, config_obj) -> int:
-        """初期検索クエリ数を取得または設定。"""
+        """初期検索クエリ数を取得または設定（検索回数の予算を超えない範囲）。"""
         if state.initial_search_query_count is None:
-            return config_obj.research.number_of_initial_queries
-        return state.initial_search_query_count
+            query_count = config_obj.research.number_of_initial_queries
+        else:
+            query_count = state.initial_search_query_count
+        max_searches = config_obj.research.max_searches
+        return min(query_count, max_searches) if max_searches > 0 else query_count
 
-    def _create_query_prompt(self, state: OverallState, query_count: int) -> str:
+    def _create_query_prompt(self, research_topic: str, query_count: int) -> str:
         """クエリ生成プロンプトを作成。"""
         current_date = get_current_date()
-        research_topic = get_research_topic(state.messages)
 
         return query_writer_instructions.format(
             current_date=current_date,
@@ -42,35 +93,145 @@ class QueryGenerationNode(BaseNode):
             number_of_queries=query_count,
         )
 
-    def _initialize_llm(self, config_obj) -> ChatOpenAI:
+    def _initialize_llm(self, config_obj) -> BaseChatModel:
         """クエリ生成LLMを初期化。"""
-        api_key = os.getenv("OPENAI_API_KEY")
-        return ChatOpenAI(
+        return create_chat_model(
             model=config_obj.model.query_generator_model,
             temperature=config_obj.llm_parameters.query_generation_temperature,
             max_retries=config_obj.llm_parameters.max_retries,
-            api_key=SecretStr(api_key) if api_key else None,
         )
 
-    def _generate_queries(self, prompt: str, llm: ChatOpenAI) -> SearchQueryList:
-        """検索クエリを生成。"""
-        result = llm.with_structured_output(SearchQueryList).invoke(prompt)
-        return cast(SearchQueryList, result)
+    def _generate_queries(
+        self, prompt: str, llm: BaseChatModel, config_obj
+    ) -> Tuple[SearchQueryList, int]:
+        """検索クエリを生成（消費トークン数も返す）。"""
+        result, tokens = invoke_chat_model(
+            with_repaired_structured_output(
+                llm, SearchQueryList, config_obj.llm_parameters.max_retries
+            ),
+            prompt,
+        )
+        return cast(SearchQueryList, result), tokens
 
-    def _create_search_tasks(
-        self, queries: List[str], state: OverallState
-    ) -> List[Send]:
-        """並列検索タスクを作成。"""
-        return [
-            Send(
-                "web_research",
-                WebSearchState(
-                    search_query=query,
-                    id=len(state.search_query) + int(idx),
-                ),
+    async def _agenerate_queries(
+        self, prompt: str, llm: BaseChatModel, config_obj
+    ) -> Tuple[SearchQueryList, int]:
+        """検索クエリを非同期で生成（消費トークン数も返す）。"""
+        result, tokens = await ainvoke_chat_model(
+            with_repaired_structured_output(
+                llm, SearchQueryList, config_obj.llm_parameters.max_retries
+            ),
+            prompt,
+        )
+        return cast(SearchQueryList, result), tokens
+
+    def _get_speculative_search(
+        self,
+        state: OverallState,
+        config_obj,
+        topic: Dict[str, Any],
+        run_key: str,
+    ) -> Optional[WebSearchState]:
+        """先行検索が有効な場合、ユーザーの質問そのものを検索するタスクを作成。
+
+        識別子はこのターンの最初のクエリの位置に割り当てます。採用した質問は
+        `search_query` の先頭に置くため、引用マーカーは位置＋オフセットのまま一意です。
+        検索回数の予算が1回しかない場合、破棄すると生成したクエリを検索できなく
+        なるため先行検索は行いません。
+        """
+        research = config_obj.research
+        if not research.speculative_search or research.max_searches == 1:
+            return None
+        question = get_latest_question(state.messages).strip()
+        if not question or len(question) > research.speculative_max_chars:
+            return None
+        return WebSearchState(
+            search_query=question,
+            id=state.search_id_offset + len(state.search_query),
+            research_topic=(
+                topic["research_topic"] if config_obj.search.include_raw_content else ""
+            ),
+            run_key=run_key,
+        )
+
+    def _merge_speculative_query(
+        self, question: str, queries: List[str], threshold: float
+    ) -> Optional[List[str]]:
+        """質問が生成したクエリと重なる場合、最も重なるクエリを質問で置き換える。
+
+        質問を先頭に置いたクエリのリストを返し、どのクエリとも重ならない場合は
+        Noneを返します。
+        """
+        overlaps = [query_overlap(question, query) for query in queries]
+        if not overlaps or max(overlaps) < threshold:
+            return None
+        best = overlaps.index(max(overlaps))
+        return [question, *queries[:best], *queries[best + 1 :]]
+
+    def _create_speculative_update(
+        self,
+        search: WebSearchState,
+        prefetched: Prefetched,
+        queries: List[str],
+        config: RunnableConfig,
+        config_obj,
+    ) -> Dict[str, Any]:
+        """先行検索を採用または破棄して、クエリと検索結果の差分を作成。"""
+        search_results, prepared = prefetched
+        merged = (
+            self._merge_speculative_query(
+                search.search_query,
+                queries,
+                config_obj.research.speculative_overlap_threshold,
             )
-            for idx, query in enumerate(queries)
-        ]
+            if search_results
+            else None
+        )
+        if merged is None:
+            # 検索は発行済みなので予算には数える
+            SPECULATIVE_SEARCHES.inc("discarded")
+            return {"search_query": queries, "speculative_query": "", "search_count": 1}
+        SPECULATIVE_SEARCHES.inc("merged")
+        searched = self.web_research.create_search_update(
+            search_results, prepared, search, config, config_obj
+        )
+        return {
+            "search_query": merged,
+            "speculative_query": search.search_query,
+            "web_research_result": searched.web_research_result,
+            "sources_gathered": searched.sources_gathered,
+            "search_count": searched.search_count,
+        }
+
+    def _create_update(
+        self,
+        query_result: SearchQueryList,
+        tokens: int,
+        query_count: int,
+        started_at: float,
+        state: OverallState,
+        topic: Dict[str, Any],
+        run_key: str,
+        speculative: Optional[Dict[str, Any]] = None,
+    ) -> OverallState:
+        """状態の差分を作成（リスト項目は各reducerで追記される）。
+
+        このターンの研究トピックを記録し、フォローアップのターンでは
+        ターンの開始時点の状態も記録します。先行検索を採用した場合は
+        その検索結果も含めます。
+        """
+        queries = query_result.query[:query_count]
+        update = {
+            **start_turn(state),
+            **(speculative or {"search_query": queries, "speculative_query": ""}),
+        }
+        return OverallState(
+            run_started_at=started_at,
+            run_key=run_key,
+            tokens_used=tokens,
+            **topic,
+            **update,
+        )
 
     def __call__(
         self, state: Union[BaseModel, List[Send], str], config: RunnableConfig
@@ -79,47 +240,142 @@ class QueryGenerationNode(BaseNode):
         # 型安全性のためにstateをOverallStateとしてキャスト
         overall_state = cast(OverallState, state)
 
+        # 予算の計測開始時刻（既に開始済みの実行ではそちらを優先）
+        started_at = overall_state.run_started_at or time.time()
+        run_key = get_or_create_run_key(overall_state)
+
         # 設定を取得
         config_obj = Configuration.get_config(config)
         query_count = self._get_query_count(overall_state, config_obj)
 
+        # このターンの研究トピック（会話履歴をまとめたもの）を作成
+        topic = build_turn_topic(overall_state, config_obj)
+
         # プロンプトを作成し、LLMを初期化
-        formatted_prompt = self._create_query_prompt(overall_state, query_count)
+        formatted_prompt = self._create_query_prompt(
+            topic["research_topic"], query_count
+        )
         llm = self._initialize_llm(config_obj)
 
+        # 先行検索が有効ならクエリの生成と並行して質問そのものを検索
+        search = self._get_speculative_search(overall_state, config_obj, topic, run_key)
+        future: Optional["Future[Prefetched]"] = None
+        if search is not None:
+            future = _get_speculative_executor().submit(
+                contextvars.copy_context().run,
+                partial(self.web_research.search_and_prepare, search, config_obj),
+            )
+
         # クエリを生成
-        query_result = self._generate_queries(formatted_prompt, llm)
+        try:
+            query_result, tokens = self._generate_queries(
+                formatted_prompt, llm, config_obj
+            )
+        except BaseException:
+            if future is not None:
+                future.cancel()
+            raise
+        speculative = None
+        if future is not None:
+            speculative = self._create_speculative_update(
+                search,
+                future.result(),
+                query_result.query[:query_count],
+                config,
+                config_obj,
+            )
+        return self._create_update(
+            query_result,
+            tokens,
+            query_count,
+            started_at,
+            overall_state,
+            topic,
+            run_key,
+            speculative,
+        )
 
-        # 状態を更新して返す
-        return OverallState(
-            messages=overall_state.messages,
-            search_query=query_result.query,
-            web_research_result=overall_state.web_research_result,
-            sources_gathered=overall_state.sources_gathered,
-            initial_search_query_count=overall_state.initial_search_query_count,
-            max_research_loops=overall_state.max_research_loops,
-            research_loop_count=overall_state.research_loop_count,
-            reasoning_model=overall_state.reasoning_model,
+    async def acall(
+        self, state: Union[BaseModel, List[Send], str], config: RunnableConfig
+    ) -> Union[BaseModel, List[Send], str]:
+        """検索クエリを非同期で生成し、状態を更新。"""
+        overall_state = cast(OverallState, state)
+        started_at = overall_state.run_started_at or time.time()
+        run_key = get_or_create_run_key(overall_state)
+        config_obj = Configuration.get_config(config)
+        query_count = self._get_query_count(overall_state, config_obj)
+        topic = build_turn_topic(overall_state, config_obj)
+
+        formatted_prompt = self._create_query_prompt(
+            topic["research_topic"], query_count
+        )
+        llm = self._initialize_llm(config_obj)
+
+        search = self._get_speculative_search(overall_state, config_obj, topic, run_key)
+        task: Optional["asyncio.Task[Prefetched]"] = None
+        if search is not None:
+            task = asyncio.create_task(
+                self.web_research.asearch_and_prepare(search, config_obj)
+            )
+
+        try:
+            query_result, tokens = await self._agenerate_queries(
+                formatted_prompt, llm, config_obj
+            )
+        except BaseException:
+            if task is not None:
+                task.cancel()
+            raise
+        speculative = None
+        if task is not None:
+            speculative = self._create_speculative_update(
+                search,
+                await task,
+                query_result.query[:query_count],
+                config,
+                config_obj,
+            )
+        return self._create_update(
+            query_result,
+            tokens,
+            query_count,
+            started_at,
+            overall_state,
+            topic,
+            run_key,
+            speculative,
         )
 
 
 class WebResearchRouterNode(BaseNode):
     """Web研究のルーティングを行うノード。"""
 
+    node_name = "web_research_router"
+    blocking = False
+
     def __init__(self):
         """Web研究ルーターノードを初期化。"""
         super().__init__()
 
     def _create_search_tasks(
-        self, queries: List[str], state: OverallState
+        self,
+        queries: List[str],
+        first_id: int,
+        deadline: Optional[float] = None,
+        research_topic: str = "",
+        node: str = "web_research",
+        run_key: Optional[str] = None,
     ) -> List[Send]:
-        """並列検索タスクを作成。"""
+        """並列検索タスクを作成（識別子は `search_query` 内のクエリの位置＋オフセット）。"""
         return [
             Send(
-                "web_research",
+                node,
                 WebSearchState(
                     search_query=query,
-                    id=len(state.search_query) + int(idx),
+                    id=first_id + int(idx),
+                    deadline=deadline,
+                    research_topic=research_topic,
+                    run_key=run_key,
                 ),
             )
             for idx, query in enumerate(queries)
@@ -131,10 +387,37 @@ class WebResearchRouterNode(BaseNode):
         """Web研究へのルーティングを決定。"""
         # 型安全性のためにstateをOverallStateとしてキャスト
         overall_state = cast(OverallState, state)
-        
+
+        # このターンのクエリのうち、検索回数の予算に収まるものだけを実行
+        config_obj = Configuration.get_config(config)
+        research = config_obj.research
+        position = get_turn_offset(overall_state, "search_query")
+        queries = overall_state.search_query[position:]
+        # 先行検索で採用した質問（先頭）は検索済み
+        if overall_state.speculative_query and queries[:1] == [
+            overall_state.speculative_query
+        ]:
+            position += 1
+            queries = queries[1:]
+        remaining = get_budget_status(overall_state, research).remaining_searches
+        if remaining is not None:
+            queries = queries[: max(0, remaining)]
+
         # 検索クエリが存在する場合は並列検索タスクを作成
-        if overall_state.search_query:
-            return self._create_search_tasks(overall_state.search_query, overall_state)
-        
+        if queries:
+            # パッセージ抽出が有効な場合のみ研究トピックを検索タスクに渡す
+            research_topic = (
+                get_turn_topic(overall_state)
+                if config_obj.search.include_raw_content
+                else ""
+            )
+            return self._create_search_tasks(
+                queries,
+                overall_state.search_id_offset + position,
+                get_search_deadline(overall_state, research),
+                research_topic,
+                run_key=overall_state.run_key,
+            )
+
         # 検索クエリが無い場合は終了
-        return "finalize_answer"
\ No newline at end of file
+        return "finalize_answer"
@@ -0,0 +1,310 @@
+import asyncio
+import time
+from typing import Any, Dict, List, Optional, Tuple, Union, cast
+
+from dotenv import load_dotenv
+from langchain_core.messages import HumanMessage
+from langchain_core.runnables import RunnableConfig
+from langgraph.types import Send
+from pydantic import BaseModel
+
+from src.config.configuration import Configuration
+from src.observability import get_run_key
+from src.retrieval import (
+    canonical_url,
+    hamming_distance,
+    normalize,
+    release_fingerprint_index,
+    simhash,
+)
+from src.states import OverallState
+from src.utils import get_or_create_run_key, get_search_deadline
+
+from .base_node import BaseNode
+from .finalization import FinalizationNode
+from .query_generation import WebResearchRouterNode
+from .research import format_compact_result_text, format_result_text
+
+load_dotenv()
+
+
+def _group_by_query(sources: List[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+    """記録したソースを検索したクエリごとにまとめる。"""
+    grouped: Dict[str, List[Dict[str, Any]]] = {}
+    for source in sources:
+        grouped.setdefault(source.get("query", ""), []).append(source)
+    return grouped
+
+
+def _get_refreshed_queries(state: OverallState) -> Tuple[int, List[str]]:
+    """検索し直すクエリと、その `search_query` 内の先頭の位置。"""
+    report = state.refresh_report or {}
+    refreshed = report.get("refreshed_queries", 0)
+    position = len(state.search_query) - refreshed - report.get("reused_queries", 0)
+    return position, state.search_query[position : position + refreshed]
+
+
+class RefreshPlanningNode(BaseNode):
+    """保存した実行の記録から、検索し直すクエリと再利用するソースを決めるノード。
+
+    取得から `refresh_ttl_seconds` 秒を過ぎたクエリ（結果の無かったクエリを含む）だけを
+    検索し直します。期限内のクエリのソースは引用マーカーを付け直して検索結果テキストと
+    ともに状態へ戻し、検索し直した結果と同じように最終回答で引用できるようにします。
+    """
+
+    node_name = "plan_refresh"
+    blocking = False
+
+    def __init__(self):
+        """再実行計画ノードを初期化。"""
+        super().__init__()
+
+    def _is_stale(
+        self, sources: List[Dict[str, Any]], now: float, ttl_seconds: float
+    ) -> bool:
+        """クエリの結果が取得から期限を過ぎているか（結果の無いクエリも検索し直す）。"""
+        fetched = [
+            source["fetched_at"] for source in sources if source.get("fetched_at")
+        ]
+        return not fetched or now - max(fetched) > ttl_seconds
+
+    def _reuse_sources(
+        self, sources: List[Dict[str, Any]], search_id: int, config_obj
+    ) -> Tuple[List[Dict[str, Any]], str]:
+        """期限内のソースに新しい識別子の引用マーカーを付け、検索結果テキストを作成。"""
+        format_text = (
+            format_compact_result_text
+            if config_obj.search.result_format == "compact"
+            else format_result_text
+        )
+        representatives = [
+            source for source in sources if not source.get("duplicate_of")
+        ]
+        reused: List[Dict[str, Any]] = []
+        texts: List[str] = []
+        for index, source in enumerate(representatives):
+            marker = f"【{search_id}-{index + 1}】"
+            reused.append({**source, "short_url": marker})
+            texts.append(
+                format_text(
+                    {
+                        "title": source.get("title", ""),
+                        "content": source.get("content", ""),
+                        "url": source.get("value", ""),
+                    },
+                    marker,
+                )
+            )
+        return reused, "".join(texts)
+
+    def __call__(
+        self, state: Union[BaseModel, List[Send], str], config: RunnableConfig
+    ) -> Union[BaseModel, List[Send], str]:
+        """記録したクエリを期限切れのものと再利用するものに分ける。"""
+        overall_state = cast(OverallState, state)
+        config_obj = Configuration.get_config(config)
+        research = config_obj.research
+        record = overall_state.prior_run or {}
+        now = time.time()
+
+        grouped = _group_by_query(record.get("sources", []))
+        queries = list(dict.fromkeys(record.get("queries", [])))
+        stale = [
+            query
+            for query in queries
+            if self._is_stale(grouped.get(query, []), now, research.refresh_ttl_seconds)
+        ]
+        fresh = [query for query in queries if query not in stale]
+
+        # 検索し直すクエリを先頭に並べ、その位置を検索の識別子にする
+        first_id = (
+            overall_state.search_id_offset
+            + len(overall_state.search_query)
+            + len(stale)
+        )
+        sources_gathered: List[Dict[str, Any]] = []
+        results: List[str] = []
+        for position, query in enumerate(fresh):
+            sources, text = self._reuse_sources(
+                grouped[query], first_id + position, config_obj
+            )
+            sources_gathered.extend(sources)
+            if text:
+                results.append(text)
+
+        return OverallState(
+            messages=(
+                []
+                if overall_state.messages
+                else [HumanMessage(content=record.get("question", ""))]
+            ),
+            search_query=stale + fresh,
+            web_research_result=results,
+            sources_gathered=sources_gathered,
+            research_topic=record.get("question", ""),
+            run_started_at=now,
+            run_key=get_or_create_run_key(overall_state),
+            max_research_loops=research.refresh_max_loops,
+            refresh_report={
+                "refreshed_queries": len(stale),
+                "reused_queries": len(fresh),
+            },
+        )
+
+
+class RefreshRouterNode(WebResearchRouterNode):
+    """期限切れのクエリだけを並列に検索し直すルーティングを行うノード。"""
+
+    node_name = "refresh_router"
+
+    def __call__(
+        self, state: Union[BaseModel, List[Send], str], config: RunnableConfig
+    ) -> Union[BaseModel, List[Send], str]:
+        """期限切れのクエリの検索タスクを作成（無ければ記録した回答をそのまま返す）。"""
+        overall_state = cast(OverallState, state)
+        config_obj = Configuration.get_config(config)
+        position, queries = _get_refreshed_queries(overall_state)
+        if not queries:
+            return "keep_answer"
+        research_topic = (
+            overall_state.research_topic or ""
+            if config_obj.search.include_raw_content
+            else ""
+        )
+        return self._create_search_tasks(
+            queries,
+            overall_state.search_id_offset + position,
+            get_search_deadline(overall_state, config_obj.research),
+            research_topic,
+            node="refresh_search",
+            run_key=overall_state.run_key,
+        )
+
+
+class RefreshDiffNode(BaseNode):
+    """検索し直した結果を記録した結果と比べ、回答をやり直すほどの変化かを判定するノード。
+
+    ソースは正規化URLで対応付け、片方にしか無いURLと、本文のSimHashのハミング距離が
+    `dedup_max_distance` を超えたURLを変化として数えます。比べたURLのうち変化した
+    割合が `refresh_change_threshold` 以上なら実質的な変化とみなします。
+    """
+
+    node_name = "detect_changes"
+
+    def __init__(self):
+        """変化検出ノードを初期化。"""
+        super().__init__()
+
+    def _fingerprints(
+        self, sources: List[Dict[str, Any]]
+    ) -> Dict[str, Tuple[Optional[int], str]]:
+        """正規化URLごとの本文の指紋（SimHashと正規化した本文）。"""
+        return {
+            canonical_url(source["value"]): (
+                simhash(source.get("content", "")),
+                normalize(source.get("content", "")),
+            )
+            for source in sources
+            if source.get("value") and not source.get("duplicate_of")
+        }
+
+    def _is_changed(
+        self,
+        old: Tuple[Optional[int], str],
+        new: Tuple[Optional[int], str],
+        max_distance: int,
+    ) -> bool:
+        """同じURLの本文が変わったか（短い本文はSimHashが無いため正規化して比較）。"""
+        if old[0] is None or new[0] is None:
+            return old[1] != new[1]
+        return hamming_distance(old[0], new[0]) > max_distance
+
+    def _compare(
+        self, previous: List[Dict[str, Any]], current: List[Dict[str, Any]], config_obj
+    ) -> Dict[str, Any]:
+        """記録したソースと検索し直したソースの差分を集計。"""
+        old, new = self._fingerprints(previous), self._fingerprints(current)
+        urls = old.keys() | new.keys()
+        max_distance = config_obj.search.dedup_max_distance
+        changed = sum(
+            1
+            for url in urls
+            if url not in old
+            or url not in new
+            or self._is_changed(old[url], new[url], max_distance)
+        )
+        ratio = changed / len(urls) if urls else 0.0
+        return {
+            "changed_sources": changed,
+            "compared_sources": len(urls),
+            "change_ratio": round(ratio, 3),
+            "material_change": ratio >= config_obj.research.refresh_change_threshold,
+        }
+
+    def __call__(
+        self, state: Union[BaseModel, List[Send], str], config: RunnableConfig
+    ) -> Union[BaseModel, List[Send], str]:
+        """検索し直したクエリについて記録した結果との差分を判定。"""
+        overall_state = cast(OverallState, state)
+        config_obj = Configuration.get_config(config)
+        queries = set(_get_refreshed_queries(overall_state)[1])
+        record_sources = (overall_state.prior_run or {}).get("sources", [])
+        previous = [
+            source for source in record_sources if source.get("query") in queries
+        ]
+        current = [
+            source
+            for source in overall_state.sources_gathered
+            if source.get("query") in queries
+        ]
+        return OverallState(
+            refresh_report=self._compare(previous, current, config_obj)
+        )
+
+
+class KeepAnswerNode(FinalizationNode):
+    """結果に実質的な変化が無い再実行で、記録した回答をLLMを呼ばずにそのまま返すノード。"""
+
+    node_name = "keep_answer"
+
+    def __call__(
+        self, state: Union[BaseModel, List[Send], str], config: RunnableConfig
+    ) -> Union[BaseModel, List[Send], str]:
+        """記録した回答を返す（検索し直したソースは知識ベースに追加）。"""
+        overall_state = cast(OverallState, state)
+        config_obj = Configuration.get_config(config)
+        release_fingerprint_index(get_run_key(config, overall_state.run_key))
+        self._ingest_sources(overall_state, config_obj)
+        answer = (overall_state.prior_run or {}).get("answer", "")
+        update = self._create_update(
+            overall_state,
+            answer,
+            0,
+            config_obj,
+            self._get_stopped_by(overall_state, config_obj),
+        )
+        self._record_first_answer(overall_state, update)
+        self._archive_run(overall_state, update, config, config_obj)
+        return update
+
+    async def acall(
+        self, state: Union[BaseModel, List[Send], str], config: RunnableConfig
+    ) -> Union[BaseModel, List[Send], str]:
+        """記録した回答を返す（知識ベース・アーカイブへの追加はスレッドで実行）。"""
+        overall_state = cast(OverallState, state)
+        config_obj = Configuration.get_config(config)
+        release_fingerprint_index(get_run_key(config, overall_state.run_key))
+        await asyncio.to_thread(self._ingest_sources, overall_state, config_obj)
+        answer = (overall_state.prior_run or {}).get("answer", "")
+        update = self._create_update(
+            overall_state,
+            answer,
+            0,
+            config_obj,
+            self._get_stopped_by(overall_state, config_obj),
+        )
+        self._record_first_answer(overall_state, update)
+        await asyncio.to_thread(
+            self._archive_run, overall_state, update, config, config_obj
+        )
+        return update
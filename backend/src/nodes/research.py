@@ -1,49 +1,531 @@
-import os
-from typing import Any, Dict, List, Tuple, Union, cast
+import asyncio
+import re
+import time
+from dataclasses import replace
+from functools import partial
+from itertools import zip_longest
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+    cast,
+)
 
 from dotenv import load_dotenv
-from langchain_community.tools import TavilySearchResults
-from langchain_core.runnables import RunnableConfig
-from langchain_openai import ChatOpenAI
+from langchain_core.language_models import BaseChatModel
+from langchain_core.runnables import Runnable, RunnableConfig
 from langgraph.types import Send
-from src.prompts import reflection_instructions
-from pydantic import BaseModel, SecretStr
+from src.prompts import reflection_instructions, reflection_shard_note
+from pydantic import BaseModel
 from src.schemas import Reflection
 from src.states import OverallState, WebSearchState
-from src.utils import get_research_topic
+from src.utils import (
+    estimate_tokens,
+    get_budget_status,
+    get_search_deadline,
+    get_turn_offset,
+    get_turn_results,
+    get_turn_topic,
+)
 from src.utils.date_utils import get_current_date
 from src.config.configuration import Configuration
+from src.observability import get_run_key, record_search, trace_span
+from src.observability.metrics import (
+    BUDGET_EXHAUSTED,
+    CPU_TASKS,
+    KB_LATENCY_SAVED,
+    KB_LOOKUPS,
+    SEARCH_DUPLICATES,
+    SEARCH_HEDGES,
+    SEARCH_TIMEOUTS,
+)
+from src.providers import (
+    LatencyTracker,
+    SearchProvider,
+    acall_with_limiter,
+    ainvoke_chat_model,
+    ainvoke_chat_model_batch,
+    arun_hedged,
+    call_with_limiter,
+    create_chat_model,
+    get_hedge_budget,
+    get_latency_tracker,
+    get_limiter,
+    get_search_provider,
+    invoke_chat_model,
+    invoke_chat_model_batch,
+    run_hedged,
+    with_repaired_structured_output,
+)
+from src.parallel import (
+    PreparedContent,
+    SharedTexts,
+    arun_in_process_pool,
+    get_process_pool,
+    prepare_search_contents,
+    run_in_process_pool,
+)
+from src.retrieval import (
+    NearDuplicateIndex,
+    classify_query,
+    get_fingerprint_index,
+    get_knowledge_base,
+    normalize,
+    tokenize,
+)
 
 from .base_node import BaseNode
 
 load_dotenv()
 
-if os.getenv("TAVILY_API_KEY") is None:
-    raise ValueError("TAVILY_API_KEY が設定されていません")
+# 検索結果テキスト中のURL（verbose書式の "URL: " 見出し、compact書式の <...> を含む）
+_URL_PATTERN = re.compile(r"[ \t]*(?:URL: )?<?https?://[^\s>]+>?")
+# クエリの比較で無視する空白と記号
+_QUERY_NOISE_PATTERN = re.compile(r"[\s\W_]+")
+# 文字bigramのJaccard係数がこれ以上のクエリは同じクエリとみなす
+QUERY_SIMILARITY_THRESHOLD = 0.8
+
+
+def _dedupe_queries(queries: Sequence[str], searched: Sequence[str]) -> List[str]:
+    """クエリから、同じ（または文字bigramがほぼ同じ）クエリと検索済みのクエリを除く。"""
+    kept: List[str] = []
+    seen: List[set] = [set(tokenize(query)) for query in searched]
+    keys = {_QUERY_NOISE_PATTERN.sub("", normalize(query)) for query in searched}
+    for query in queries:
+        key = _QUERY_NOISE_PATTERN.sub("", normalize(query))
+        tokens = set(tokenize(query))
+        if key in keys or any(
+            len(tokens & other) >= QUERY_SIMILARITY_THRESHOLD * len(tokens | other)
+            for other in seen
+            if tokens and other
+        ):
+            continue
+        kept.append(query)
+        keys.add(key)
+        seen.append(tokens)
+    return kept
+
+
+def query_overlap(query: str, other: str) -> float:
+    """2つのクエリの重なり（共通の文字bigramが小さい方の集合に占める割合）。
+
+    質問文と短い検索クエリのように長さが大きく違っても、一方が他方の観点を
+    ほぼ含んでいれば1に近くなります。
+    """
+    tokens, other_tokens = set(tokenize(query)), set(tokenize(other))
+    if not tokens or not other_tokens:
+        return 0.0
+    return len(tokens & other_tokens) / min(len(tokens), len(other_tokens))
+
+
+def format_result_text(
+    result: Dict[str, Any],
+    citation_marker: str,
+    alternate_markers: Sequence[str] = (),
+) -> str:
+    """単一の検索結果を見出しと引用指示付きの表示テキストにフォーマット。"""
+    title = result.get("title", "タイトルなし")
+    content = result.get("content", "コンテンツなし")
+    url = result.get("url", "")
+    # 同じ内容の別ソースは代表のソースにまとめて表示
+    alternates = f"（同内容: {''.join(alternate_markers)}）" if alternate_markers else ""
+
+    # 明確な引用マーカー付きフォーマット
+    return f"Source {citation_marker}{alternates}:\nTitle: {title}\nContent: {content}\nURL: {url}\n\n引用時は必ず {citation_marker} を使用してください。\n\n"
+
+
+def format_compact_result_text(
+    result: Dict[str, Any],
+    citation_marker: str,
+    alternate_markers: Sequence[str] = (),
+) -> str:
+    """単一の検索結果を見出し1行と本文だけの短い表示テキストにフォーマット。
+
+    引用マーカーの使い方は最終回答のプロンプトで一度だけ説明します。
+    """
+    title = result.get("title", "")
+    content = result.get("content", "")
+    url = result.get("url", "")
+    alternates = f"（同内容: {''.join(alternate_markers)}）" if alternate_markers else ""
+    return f"{citation_marker}{alternates}{title} <{url}>\n{content}\n\n"
+
+
+def format_duplicate_note(representative: str, alternate_markers: Sequence[str]) -> str:
+    """前の検索の結果と同じ内容の結果を、本文を省いて引用マーカーだけ示すテキスト。
+
+    代表の結果は前の検索の結果テキストに含まれているため、どちらのマーカーでも
+    引用できるように対応だけを示します。
+    """
+    return f"{''.join(alternate_markers)}（{representative} と同内容のため本文省略）\n\n"
+
+
+def _never_hedge() -> bool:
+    """ヘッジ検索が無効な場合の判定（常に送らない）。"""
+    return False
+
+
+class _SearchPlan(NamedTuple):
+    """1回の検索の一次検索・ヘッジ検索の関数とヘッジの条件。"""
+
+    provider: SearchProvider
+    primary: Any
+    hedge: Any
+    hedge_delay: Optional[float]
+    allow_hedge: Callable[[], bool]
 
 
 class WebResearchNode(BaseNode):
-    """TavilySearchツールを使用してウェブ研究を実行するノード。"""
+    """設定された検索プロバイダー（Tavily・ローカルコーパスなど）で研究を実行するノード。"""
+
+    node_name = "web_research"
 
     def __init__(self):
         """ウェブ研究ノードを初期化。"""
         super().__init__()
 
-    def _get_tavily_search(self, config_obj) -> TavilySearchResults:
-        """設定に基づいてTavilySearchResultsインスタンスを作成。"""
-        return TavilySearchResults(
-            max_results=config_obj.search.max_results,
-            search_depth=config_obj.search.depth,
-            include_answer=True,
-            include_raw_content=False,
-            include_images=config_obj.search.include_images,
-            api_key=os.getenv("TAVILY_API_KEY"),
+    def _get_search_provider(self, config_obj) -> SearchProvider:
+        """設定に基づいて検索プロバイダーを作成。"""
+        return get_search_provider(config_obj.search)
+
+    def _get_search_timeout(
+        self, state: WebSearchState, config_obj
+    ) -> Optional[float]:
+        """検索1件のタイムアウトと実行の締め切りから、検索に使える秒数を取得。"""
+        timeouts = []
+        if config_obj.research.search_timeout_seconds > 0:
+            timeouts.append(config_obj.research.search_timeout_seconds)
+        if state.deadline is not None:
+            timeouts.append(state.deadline - time.time())
+        return min(timeouts) if timeouts else None
+
+    def _timed_search(
+        self, provider: SearchProvider, query: str, tracker: LatencyTracker
+    ) -> Callable[[], List[Dict[str, Any]]]:
+        """レイテンシを記録しながらリミッター経由で検索する関数を作成。"""
+
+        def search() -> List[Dict[str, Any]]:
+            start = time.monotonic()
+            results = call_with_limiter(provider.name, provider.search, query)
+            tracker.observe(time.monotonic() - start)
+            return results
+
+        return search
+
+    def _atimed_search(
+        self, provider: SearchProvider, query: str, tracker: LatencyTracker
+    ) -> Callable[[], Awaitable[List[Dict[str, Any]]]]:
+        """レイテンシを記録しながらリミッター経由で非同期に検索する関数を作成。"""
+
+        async def search() -> List[Dict[str, Any]]:
+            start = time.monotonic()
+            results = await acall_with_limiter(provider.name, provider.asearch, query)
+            tracker.observe(time.monotonic() - start)
+            return results
+
+        return search
+
+    def _get_hedge_provider(
+        self, provider: SearchProvider, config_obj
+    ) -> SearchProvider:
+        """ヘッジに使う検索プロバイダーを取得（basicモードでは深度を下げる）。"""
+        if config_obj.search.hedge_mode == "basic":
+            return get_search_provider(replace(config_obj.search, depth="basic"))
+        return provider
+
+    def _allow_hedge(self, provider: SearchProvider, config_obj) -> Callable[[], bool]:
+        """追加呼び出しの割合とリミッターの混雑状況からヘッジ可否を判定する関数を作成。"""
+        budget = get_hedge_budget(provider.name, config_obj.search.hedge_max_extra_ratio)
+        budget.record_primary()
+
+        def allow() -> bool:
+            # 混雑しているプロバイダーへの追加呼び出しは逆効果なので行わない
+            limiter = get_limiter(provider.name)
+            if limiter is not None and limiter.in_flight >= int(limiter.limit):
+                return False
+            if not budget.try_spend():
+                return False
+            SEARCH_HEDGES.inc(provider.name, "issued")
+            return True
+
+        return allow
+
+    def _plan_search(
+        self, query: str, config_obj, timed_search: Callable[..., Any]
+    ) -> _SearchPlan:
+        """一次検索・ヘッジ検索の関数とヘッジまでの待ち時間を決定。
+
+        `timed_search` には `_timed_search`（同期）か `_atimed_search`（非同期）を渡します。
+        """
+        search_config = config_obj.search
+        provider = self._get_search_provider(config_obj)
+        tracker = get_latency_tracker(f"{provider.name}:{search_config.depth}")
+        primary = timed_search(provider, query, tracker)
+
+        hedge = None
+        hedge_delay = None
+        allow_hedge: Callable[[], bool] = _never_hedge
+        if search_config.hedge_enabled:
+            allow_hedge = self._allow_hedge(provider, config_obj)
+            hedge_delay = tracker.quantile(
+                search_config.hedge_percentile, search_config.hedge_min_samples
+            )
+            hedge_provider = self._get_hedge_provider(provider, config_obj)
+            hedge_tracker = get_latency_tracker(
+                f"{hedge_provider.name}:{hedge_provider.config.depth}"
+            )
+            hedge = timed_search(hedge_provider, query, hedge_tracker)
+        return _SearchPlan(provider, primary, hedge, hedge_delay, allow_hedge)
+
+    def _hedge_options(
+        self, plan: _SearchPlan, timeout: Optional[float]
+    ) -> Optional[Dict[str, Any]]:
+        """`run_hedged` / `arun_hedged` に渡す引数（タイムアウトもヘッジも無ければNone）。"""
+        if timeout is None and plan.hedge_delay is None:
+            return None
+        return {
+            "timeout": None if timeout is None else max(0.0, timeout),
+            "hedge": plan.hedge,
+            "hedge_delay": plan.hedge_delay,
+            "allow_hedge": plan.allow_hedge,
+        }
+
+    def _record_hedge_win(
+        self, provider: SearchProvider, hedge_won: bool, span_args: Dict[str, Any]
+    ) -> None:
+        """ヘッジした検索が先に返った場合に記録。"""
+        if hedge_won:
+            SEARCH_HEDGES.inc(provider.name, "won")
+            span_args["hedge_won"] = True
+
+    def _record_timeout(
+        self, provider: SearchProvider, span_args: Dict[str, Any]
+    ) -> List[Dict[str, Any]]:
+        """タイムアウトした検索を記録し、空の結果を返す。"""
+        SEARCH_TIMEOUTS.inc(provider.name)
+        span_args["timed_out"] = True
+        return []
+
+    def _record_results(
+        self, provider: SearchProvider, results: Any, span_args: Dict[str, Any]
+    ) -> None:
+        """検索結果の件数をスパンとメトリクスに記録。"""
+        result_count = len(results) if isinstance(results, list) else 0
+        span_args["result_count"] = result_count
+        record_search(provider.name, result_count)
+
+    def _get_max_age(self, query_type: str, config_obj) -> float:
+        """クエリの種類ごとの、知識ベースの文書を使ってよい取得からの秒数。"""
+        kb_config = config_obj.knowledge_base
+        return {
+            "news": kb_config.kb_fresh_news_seconds,
+            "reference": kb_config.kb_fresh_reference_seconds,
+        }.get(query_type, kb_config.kb_fresh_default_seconds)
+
+    def _search_knowledge_base(
+        self, query: str, config_obj
+    ) -> Optional[List[Dict[str, Any]]]:
+        """知識ベースに十分新しい関連文書が十分な数あれば、それを検索結果として返す。"""
+        kb_config = config_obj.knowledge_base
+        if not kb_config.kb_enabled:
+            return None
+        start = time.monotonic()
+        query_type = classify_query(query)
+        with trace_span("search:kb", "search", {"query": query}) as span_args:
+            results, stale = get_knowledge_base(kb_config.kb_path).search(
+                query,
+                config_obj.search.max_results,
+                self._get_max_age(query_type, config_obj),
+                kb_config.kb_min_coverage,
+            )
+            hit = len(results) >= kb_config.kb_min_results
+            span_args["kb_hit"] = hit
+        if not hit:
+            KB_LOOKUPS.inc(query_type, "stale" if stale else "miss")
+            return None
+        KB_LOOKUPS.inc(query_type, "hit")
+        # 検索プロバイダーのレイテンシの中央値から、省いた時間を見積もる
+        search_config = config_obj.search
+        provider_latency = get_latency_tracker(
+            f"{search_config.search_provider}:{search_config.depth}"
+        ).quantile(0.5)
+        if provider_latency is not None:
+            saved = provider_latency - (time.monotonic() - start)
+            KB_LATENCY_SAVED.inc(amount=max(0.0, saved))
+        return results
+
+    def _execute_search(
+        self, query: str, config_obj, timeout: Optional[float] = None
+    ) -> List[Dict[str, Any]]:
+        """検索プロバイダーで検索を実行して生の結果を返す。
+
+        知識ベースが有効で十分新しい関連文書があれば、検索せずにそれを返します。
+        ヘッジが有効な場合、観測したレイテンシのパーセンタイルを超えても終わらない
+        検索には追加のリクエストを発行し、先に返った結果を採用します。
+        タイムアウトを超えた場合は結果を待たずに空のリストを返します。
+        """
+        cached = self._search_knowledge_base(query, config_obj)
+        if cached is not None:
+            return cached
+        plan = self._plan_search(query, config_obj, self._timed_search)
+        options = self._hedge_options(plan, timeout)
+        with trace_span(
+            f"search:{plan.provider.name}", "search", {"query": query}
+        ) as span_args:
+            if options is None:
+                results = plan.primary()
+            else:
+                try:
+                    results, hedge_won = run_hedged(plan.primary, **options)
+                    self._record_hedge_win(plan.provider, hedge_won, span_args)
+                except TimeoutError:
+                    results = self._record_timeout(plan.provider, span_args)
+            self._record_results(plan.provider, results, span_args)
+        return results
+
+    async def _aexecute_search(
+        self, query: str, config_obj, timeout: Optional[float] = None
+    ) -> List[Dict[str, Any]]:
+        """`_execute_search` の非同期版（プロバイダーの `asearch` を使用）。"""
+        if config_obj.knowledge_base.kb_enabled:
+            # ディスクの読み込みとスコア計算はイベントループをふさがないようにスレッドで
+            cached = await asyncio.to_thread(
+                self._search_knowledge_base, query, config_obj
+            )
+            if cached is not None:
+                return cached
+        plan = self._plan_search(query, config_obj, self._atimed_search)
+        options = self._hedge_options(plan, timeout)
+        with trace_span(
+            f"search:{plan.provider.name}", "search", {"query": query}
+        ) as span_args:
+            if options is None:
+                results = await plan.primary()
+            else:
+                try:
+                    results, hedge_won = await arun_hedged(plan.primary, **options)
+                    self._record_hedge_win(plan.provider, hedge_won, span_args)
+                except TimeoutError:
+                    results = self._record_timeout(plan.provider, span_args)
+            self._record_results(plan.provider, results, span_args)
+        return results
+
+    def _content_texts(
+        self, search_results: List[Dict[str, Any]], config_obj
+    ) -> Tuple[List[str], List[str]]:
+        """検索結果ごとのページ本文（使わない場合は空文字）と本文。"""
+        contents = [result.get("content", "") for result in search_results]
+        if not config_obj.search.include_raw_content:
+            return [""] * len(search_results), contents
+        raw_contents = [result.get("raw_content") or "" for result in search_results]
+        return raw_contents, contents
+
+    def _content_task(
+        self, state: WebSearchState, config_obj
+    ) -> Callable[..., List[PreparedContent]]:
+        """本文の準備（パッセージ抽出・SimHash計算）に設定を束縛したタスク関数。"""
+        search_config = config_obj.search
+        return partial(
+            prepare_search_contents,
+            query=state.search_query,
+            topic=state.research_topic,
+            top_k=search_config.passage_top_k,
+            max_chars=search_config.passage_max_chars,
+            method=search_config.passage_ranker,
+            fingerprint=search_config.dedup_enabled,
         )
 
-    def _execute_search(self, query: str, config_obj) -> List[Dict[str, Any]]:
-        """Tavily検索を実行して生の結果を返す。"""
-        tavily_search = self._get_tavily_search(config_obj)
-        return tavily_search.invoke({"query": query})
+    def _is_small_batch(
+        self, raw_contents: List[str], contents: List[str], config_obj
+    ) -> bool:
+        """受け渡しの方が高くつくため、その場で処理する小さなバッチかを判定。"""
+        chars = sum(map(len, raw_contents)) + sum(map(len, contents))
+        return chars < config_obj.execution.cpu_pool_min_chars
+
+    def _split_content_tasks(
+        self,
+        prepare: Callable[..., List[PreparedContent]],
+        shared: SharedTexts,
+        raw_contents: List[str],
+        contents: List[str],
+        config_obj,
+    ) -> List[Callable[[], List[PreparedContent]]]:
+        """本文の準備を、1タスクが `cpu_pool_min_chars` 文字以上になるように分割。
+
+        ページ本文は共有メモリ経由で渡し、プロセス間でコピーするのはハンドルと
+        短い本文だけにします。
+        """
+        min_chars = config_obj.execution.cpu_pool_min_chars
+        tasks = []
+        start = chars = 0
+        for index, (raw_content, content) in enumerate(zip(raw_contents, contents)):
+            chars += len(raw_content) + len(content)
+            if chars >= min_chars or index == len(contents) - 1:
+                handle = shared.handle(start, index + 1)
+                tasks.append(partial(prepare, handle, contents[start : index + 1]))
+                start, chars = index + 1, 0
+        return tasks
+
+    def _prepare_contents(
+        self,
+        search_results: List[Dict[str, Any]],
+        state: WebSearchState,
+        config_obj,
+    ) -> List[PreparedContent]:
+        """検索結果の本文を準備（ページ本文のパッセージ抽出と近似重複判定用のSimHash）。
+
+        大きなバッチはプロセスプールで並列に処理し、GILを他の実行のI/Oに譲ります。
+        """
+        prepare = self._content_task(state, config_obj)
+        raw_contents, contents = self._content_texts(search_results, config_obj)
+        if (
+            self._is_small_batch(raw_contents, contents, config_obj)
+            or get_process_pool() is None
+        ):
+            CPU_TASKS.inc("search_contents", "inline")
+            return prepare(raw_contents, contents)
+        with SharedTexts(raw_contents) as shared:
+            parts, pooled = run_in_process_pool(
+                self._split_content_tasks(
+                    prepare, shared, raw_contents, contents, config_obj
+                )
+            )
+        CPU_TASKS.inc("search_contents", "process" if pooled else "inline")
+        return [item for part in parts for item in part]
+
+    async def _aprepare_contents(
+        self,
+        search_results: List[Dict[str, Any]],
+        state: WebSearchState,
+        config_obj,
+    ) -> List[PreparedContent]:
+        """`_prepare_contents` の非同期版。
+
+        イベントループは他の実行と共有されるため、大きなバッチはプロセスプールが
+        無い場合もスレッドで処理し、プールの結果と同様にイベントループ上で待ちます。
+        """
+        prepare = self._content_task(state, config_obj)
+        raw_contents, contents = self._content_texts(search_results, config_obj)
+        if self._is_small_batch(raw_contents, contents, config_obj):
+            CPU_TASKS.inc("search_contents", "inline")
+            return prepare(raw_contents, contents)
+        if get_process_pool() is None:
+            CPU_TASKS.inc("search_contents", "thread")
+            return await asyncio.to_thread(prepare, raw_contents, contents)
+        with SharedTexts(raw_contents) as shared:
+            parts, pooled = await arun_in_process_pool(
+                self._split_content_tasks(
+                    prepare, shared, raw_contents, contents, config_obj
+                )
+            )
+        CPU_TASKS.inc("search_contents", "process" if pooled else "thread")
+        return [item for part in parts for item in part]
 
     def _create_citation_marker(self, state_id: int, result_index: int) -> str:
         """検索結果の引用マーカーを作成。"""
@@ -51,78 +533,207 @@ class WebResearchNode(BaseNode):
 
     def _format_source(
         self, result: Dict[str, Any], citation_marker: str
-    ) -> Dict[str, str]:
-        """単一の検索結果をソースオブジェクトにフォーマット。"""
+    ) -> Dict[str, Any]:
+        """単一の検索結果をソースオブジェクトにフォーマット。
+
+        取得日時（知識ベースの結果はその文書を取得した日時）も記録します。
+        """
         return {
             "short_url": citation_marker,
             "value": result["url"],
             "title": result.get("title", ""),
             "content": result.get("content", ""),
+            "fetched_at": result.get("fetched_at") or time.time(),
         }
 
-    def _format_result_text(self, result: Dict[str, Any], citation_marker: str) -> str:
+    def _format_result_text(
+        self,
+        result: Dict[str, Any],
+        citation_marker: str,
+        alternate_markers: Sequence[str] = (),
+    ) -> str:
         """単一の検索結果を表示テキストにフォーマット。"""
-        title = result.get("title", "タイトルなし")
-        content = result.get("content", "コンテンツなし")
-        url = result.get("url", "")
+        return format_result_text(result, citation_marker, alternate_markers)
 
-        # 明確な引用マーカー付きフォーマット
-        return f"Source {citation_marker}:\nTitle: {title}\nContent: {content}\nURL: {url}\n\n引用時は必ず {citation_marker} を使用してください。\n\n"
+    def _format_compact_result_text(
+        self,
+        result: Dict[str, Any],
+        citation_marker: str,
+        alternate_markers: Sequence[str] = (),
+    ) -> str:
+        """単一の検索結果を見出し1行と本文だけの短い表示テキストにフォーマット。"""
+        return format_compact_result_text(result, citation_marker, alternate_markers)
+
+    def _get_fingerprint_index(
+        self, state: WebSearchState, config: RunnableConfig, config_obj
+    ) -> Optional[NearDuplicateIndex]:
+        """近似重複の除去が有効な場合、実行ごとのフィンガープリントインデックスを取得。"""
+        if not config_obj.search.dedup_enabled:
+            return None
+        return get_fingerprint_index(
+            get_run_key(config, state.run_key), config_obj.search.dedup_max_distance
+        )
 
     def _process_search_results(
-        self, search_results: List[Dict[str, Any]], state_id: int
-    ) -> Tuple[List[Dict[str, str]], str]:
-        """検索結果を処理してソースとフォーマット済みテキストを返す。"""
+        self,
+        search_results: List[Dict[str, Any]],
+        prepared: List[PreparedContent],
+        state_id: int,
+        index: Optional[NearDuplicateIndex] = None,
+        result_format: str = "verbose",
+    ) -> Tuple[List[Dict[str, Any]], str]:
+        """検索結果を処理してソースとフォーマット済みテキストを返す。
+
+        `prepared` は `_prepare_contents` で準備した結果ごとの本文とSimHashです。
+        `index` を渡すと、同じ実行で既に出現した結果と本文がほぼ同じ結果（転載記事など）は
+        本文を出力せず、ソースに代表の引用マーカーを `duplicate_of` として記録します。
+        同じ検索内の重複は代表のソースに引用マーカーをまとめて表示し、前の検索の結果の
+        重複は代表の引用マーカーとの対応だけを表示します。
+        """
         sources_gathered = []
-        formatted_results = []
+        representatives: List[Tuple[Dict[str, Any], str]] = []
+        alternates: Dict[str, List[str]] = {}
 
-        for idx, result in enumerate(search_results):
+        for idx, (result, (content, fingerprint)) in enumerate(
+            zip(search_results, prepared)
+        ):
             citation_marker = self._create_citation_marker(state_id, idx)
+            # ページ本文は関連パッセージに置き換えたら破棄
+            result = {key: value for key, value in result.items() if key != "raw_content"}
+            if content is not None:
+                result["content"] = content
 
             # ソースに追加
             source = self._format_source(result, citation_marker)
             sources_gathered.append(source)
 
-            # 結果テキストをフォーマット
-            result_text = self._format_result_text(result, citation_marker)
-            formatted_results.append(result_text)
+            duplicate_of = (
+                index.find_or_add(fingerprint, citation_marker)
+                if index is not None and fingerprint is not None
+                else None
+            )
+            if duplicate_of is not None:
+                source["duplicate_of"] = duplicate_of
+                alternates.setdefault(duplicate_of, []).append(citation_marker)
+                SEARCH_DUPLICATES.inc()
+                continue
+
+            representatives.append((result, citation_marker))
+            alternates[citation_marker] = []
 
+        # 結果テキストをフォーマット
+        format_text = (
+            self._format_compact_result_text
+            if result_format == "compact"
+            else self._format_result_text
+        )
+        formatted_results = [
+            format_text(result, marker, alternates.pop(marker))
+            for result, marker in representatives
+        ]
+        # 残りは前の検索の結果を代表とする重複
+        formatted_results.extend(
+            format_duplicate_note(representative, markers)
+            for representative, markers in alternates.items()
+        )
         return sources_gathered, "".join(formatted_results)
 
     def __call__(
         self, state: Union[BaseModel, List[Send], str], config: RunnableConfig
     ) -> Union[BaseModel, List[Send], str]:
-        """TavilySearchツールを使用してウェブ研究を実行。"""
+        """検索プロバイダーを使用してウェブ研究を実行。"""
         # 型安全性のためにstateをWebSearchStateとしてキャスト
         web_search_state = cast(WebSearchState, state)
 
         # 設定を取得
         config_obj = Configuration.get_config(config)
 
-        # 検索を実行
-        search_results = self._execute_search(web_search_state.search_query, config_obj)
+        # 実行の締め切りを過ぎている場合は検索しない
+        timeout = self._get_search_timeout(web_search_state, config_obj)
+        if timeout is not None and timeout <= 0:
+            return OverallState()
 
-        # 結果を処理
+        # 検索を実行して本文を準備
+        search_results, prepared = self.search_and_prepare(
+            web_search_state, config_obj
+        )
+        return self.create_search_update(
+            search_results, prepared, web_search_state, config, config_obj
+        )
+
+    async def acall(
+        self, state: Union[BaseModel, List[Send], str], config: RunnableConfig
+    ) -> Union[BaseModel, List[Send], str]:
+        """検索プロバイダーを使用してウェブ研究を非同期で実行。"""
+        web_search_state = cast(WebSearchState, state)
+        config_obj = Configuration.get_config(config)
+
+        timeout = self._get_search_timeout(web_search_state, config_obj)
+        if timeout is not None and timeout <= 0:
+            return OverallState()
+
+        search_results, prepared = await self.asearch_and_prepare(
+            web_search_state, config_obj
+        )
+        return self.create_search_update(
+            search_results, prepared, web_search_state, config, config_obj
+        )
+
+    def search_and_prepare(
+        self, state: WebSearchState, config_obj
+    ) -> Tuple[List[Dict[str, Any]], List[PreparedContent]]:
+        """検索を実行し、生の結果と準備済みの本文を返す。
+
+        近似重複の判定は行わないため、結果を採用するかを後で決める呼び出し元
+        （先行検索など）もそのまま使えます。採用する場合は `create_search_update` で
+        状態の差分にします。
+        """
+        timeout = self._get_search_timeout(state, config_obj)
+        results = self._execute_search(state.search_query, config_obj, timeout)
+        return results, self._prepare_contents(results, state, config_obj)
+
+    async def asearch_and_prepare(
+        self, state: WebSearchState, config_obj
+    ) -> Tuple[List[Dict[str, Any]], List[PreparedContent]]:
+        """`search_and_prepare` の非同期版。"""
+        timeout = self._get_search_timeout(state, config_obj)
+        results = await self._aexecute_search(state.search_query, config_obj, timeout)
+        return results, await self._aprepare_contents(results, state, config_obj)
+
+    def create_search_update(
+        self,
+        search_results: List[Dict[str, Any]],
+        prepared: List[PreparedContent],
+        web_search_state: WebSearchState,
+        config: RunnableConfig,
+        config_obj,
+    ) -> OverallState:
+        """検索結果を処理して状態の差分を作成。"""
+        # 結果を処理（ページ本文があれば関連パッセージに絞り込み、近似重複を除く）
         sources_gathered, modified_text = self._process_search_results(
-            search_results, web_search_state.id
+            search_results,
+            prepared,
+            web_search_state.id,
+            self._get_fingerprint_index(web_search_state, config, config_obj),
+            config_obj.search.result_format,
         )
+        # 再実行（リフレッシュ）でクエリごとに結果を比べられるようにクエリを記録
+        for source in sources_gathered:
+            source["query"] = web_search_state.search_query
 
-        # 新しい状態オブジェクトを作成
+        # 新しい状態オブジェクトを作成（クエリは生成したノードが記録済み）
         return OverallState(
-            messages=[],
-            search_query=[web_search_state.search_query],
-            web_research_result=[modified_text],
+            web_research_result=[modified_text] if modified_text else [],
             sources_gathered=sources_gathered,
-            initial_search_query_count=None,
-            max_research_loops=None,
-            research_loop_count=0,
-            reasoning_model=None,
+            search_count=1,
         )
 
 
 class ReflectionNode(BaseNode):
     """研究結果を分析し、知識のギャップを特定するノード。"""
 
+    node_name = "reflection"
+
     def __init__(self):
         """リフレクションノードを初期化。"""
         super().__init__()
@@ -131,32 +742,180 @@ class ReflectionNode(BaseNode):
         """状態または設定から推論モデルを取得。"""
         return state.reasoning_model or config_obj.model.reflection_model
 
-    def _create_reflection_prompt(self, state: OverallState) -> str:
-        """状態データからリフレクションプロンプトを作成。"""
-        current_date = get_current_date()
-        research_topic = get_research_topic(state.messages)
-        summaries = "\n\n---\n\n".join(state.web_research_result)
+    def _get_summaries(self, state: OverallState, config_obj) -> List[str]:
+        """このターンの検索結果テキスト（設定によってはURLを除去）。"""
+        summaries = get_turn_results(state)
+        if not config_obj.search.reflection_include_urls:
+            # ギャップの分析にURLは不要なためトークン削減のために除去
+            summaries = [_URL_PATTERN.sub("", summary) for summary in summaries]
+        return summaries
 
+    def _format_prompt(self, state: OverallState, summaries: str) -> str:
+        """検索結果テキストからリフレクションプロンプトを作成。"""
         return reflection_instructions.format(
-            current_date=current_date,
-            research_topic=research_topic,
+            current_date=get_current_date(),
+            research_topic=get_turn_topic(state),
             summaries=summaries,
         )
 
-    def _initialize_llm(self, model: str, config_obj) -> ChatOpenAI:
+    def _create_reflection_prompt(self, state: OverallState, config_obj) -> str:
+        """状態データからリフレクションプロンプトを作成。"""
+        summaries = self._get_summaries(state, config_obj)
+        return self._format_prompt(state, "\n\n---\n\n".join(summaries))
+
+    def _shard_summaries(
+        self, summaries: List[str], config_obj
+    ) -> List[List[str]]:
+        """検索結果テキスト（検索ごと）を、順序を保ったまま概算トークン数で分割。
+
+        1つの分割は `reflection_shard_tokens` を目安とし、分割数が
+        `reflection_max_shards` を超える場合は目安を引き上げます。
+        1件で目安を超える検索結果はそれだけで1つの分割にします。
+        """
+        research = config_obj.research
+        sizes = [estimate_tokens(summary) for summary in summaries]
+        max_shards = max(1, research.reflection_max_shards)
+        target = max(research.reflection_shard_tokens, -(-sum(sizes) // max_shards))
+        shards: List[List[str]] = []
+        shard_tokens = 0
+        for summary, size in zip(summaries, sizes):
+            if shards and shard_tokens + size <= target:
+                shards[-1].append(summary)
+                shard_tokens += size
+            elif len(shards) < max_shards:
+                shards.append([summary])
+                shard_tokens = size
+            else:
+                shards[-1].append(summary)
+        return shards
+
+    def _create_reflection_prompts(
+        self, state: OverallState, config_obj
+    ) -> List[str]:
+        """リフレクションプロンプトを作成（分割モードでは分割ごとに1つ）。"""
+        if config_obj.research.reflection_mode != "sharded":
+            return [self._create_reflection_prompt(state, config_obj)]
+        shards = self._shard_summaries(
+            self._get_summaries(state, config_obj), config_obj
+        )
+        if len(shards) <= 1:
+            return [self._create_reflection_prompt(state, config_obj)]
+        return [
+            self._format_prompt(
+                state,
+                reflection_shard_note.format(shard=index + 1, shard_count=len(shards))
+                + "\n\n---\n\n".join(shard),
+            )
+            for index, shard in enumerate(shards)
+        ]
+
+    def _initialize_llm(self, model: str, config_obj) -> BaseChatModel:
         """推論LLMを初期化。"""
-        api_key = os.getenv("OPENAI_API_KEY")
-        return ChatOpenAI(
+        return create_chat_model(
             model=model,
             temperature=config_obj.llm_parameters.reflection_temperature,
             max_retries=config_obj.llm_parameters.max_retries,
-            api_key=SecretStr(api_key) if api_key else None,
         )
 
-    def _analyze_research_gaps(self, prompt: str, llm: ChatOpenAI) -> Reflection:
-        """研究を分析し、知識のギャップを特定。"""
-        result = llm.with_structured_output(Reflection).invoke(prompt)
-        return cast(Reflection, result)
+    def _structured_llm(self, llm: BaseChatModel, config_obj) -> Runnable:
+        """リフレクションの構造化出力を返すランナブル（崩れたJSONは修復）。"""
+        return with_repaired_structured_output(
+            llm, Reflection, config_obj.llm_parameters.max_retries
+        )
+
+    def _analyze_research_gaps(
+        self, prompts: List[str], llm: BaseChatModel, state: OverallState, config_obj
+    ) -> Tuple[Reflection, int]:
+        """研究を分析し、知識のギャップを特定（消費トークン数も返す）。
+
+        プロンプトが複数（分割モード）の場合は並行に分析して結果をまとめます。
+        """
+        runnable = self._structured_llm(llm, config_obj)
+        if len(prompts) == 1:
+            result, tokens = invoke_chat_model(runnable, prompts[0])
+            return cast(Reflection, result), tokens
+        results, tokens = invoke_chat_model_batch(runnable, prompts)
+        return self._reduce_reflections(results, state, config_obj), tokens
+
+    async def _aanalyze_research_gaps(
+        self, prompts: List[str], llm: BaseChatModel, state: OverallState, config_obj
+    ) -> Tuple[Reflection, int]:
+        """研究を非同期で分析し、知識のギャップを特定（消費トークン数も返す）。"""
+        runnable = self._structured_llm(llm, config_obj)
+        if len(prompts) == 1:
+            result, tokens = await ainvoke_chat_model(runnable, prompts[0])
+            return cast(Reflection, result), tokens
+        results, tokens = await ainvoke_chat_model_batch(runnable, prompts)
+        return self._reduce_reflections(results, state, config_obj), tokens
+
+    def _reduce_reflections(
+        self, results: List[Any], state: OverallState, config_obj
+    ) -> Reflection:
+        """分割ごとのリフレクションを1つの判断にまとめる。
+
+        十分と判断した分割の割合が `reflection_shard_quorum` 以上なら十分とみなします。
+        フォローアップクエリは各分割の優先度の高いものから順に交互に取り出し、
+        同じ（または文字bigramがほぼ同じ）クエリと、検索済みのクエリを除きます。
+        """
+        reflections = [cast(Reflection, result) for result in results]
+        sufficient = sum(1 for reflection in reflections if reflection.is_sufficient)
+        quorum = config_obj.research.reflection_shard_quorum
+        is_sufficient = sufficient >= quorum * len(reflections)
+
+        gaps = [r.knowledge_gap for r in reflections if not r.is_sufficient]
+        candidates = [
+            query
+            for round_queries in zip_longest(
+                *(r.follow_up_queries for r in reflections if not r.is_sufficient)
+            )
+            for query in round_queries
+            if query
+        ]
+        return Reflection(
+            is_sufficient=is_sufficient,
+            knowledge_gap="" if is_sufficient else "\n".join(dict.fromkeys(gaps)),
+            follow_up_queries=(
+                [] if is_sufficient else _dedupe_queries(candidates, state.search_query)
+            ),
+        )
+
+    def _select_follow_up_queries(
+        self,
+        reflection: Reflection,
+        state: OverallState,
+        loop_count: int,
+        tokens: int,
+        config_obj,
+    ) -> List[str]:
+        """リフレクション結果から実際に検索するフォローアップクエリを選択。
+
+        研究評価ノードは選択したクエリをそのまま検索するため、ここで予算を判定し、
+        残りの検索回数に収まるように絞り込みます（このリフレクションの消費トークンも含む）。
+        `search_query` には検索するクエリだけが追記されます。
+        """
+        research = config_obj.research
+        max_loops = (
+            state.max_research_loops
+            if state.max_research_loops is not None
+            else research.max_research_loops
+        )
+        turn_loops = loop_count - get_turn_offset(state, "research_loop_count")
+        if reflection.is_sufficient or turn_loops >= max_loops:
+            return []
+
+        status = get_budget_status(state, research)
+        status.tokens_used += tokens
+        reason = status.exhausted_reason(
+            research.finalize_reserve_seconds, research.finalize_reserve_tokens
+        )
+        if reason is not None:
+            BUDGET_EXHAUSTED.inc(reason)
+            return []
+        queries = reflection.follow_up_queries[: research.max_follow_up_queries]
+        remaining = status.remaining_searches
+        if remaining is not None:
+            queries = queries[: max(0, remaining)]
+        return queries
 
     def __call__(
         self, state: Union[BaseModel, List[Send], str], config: RunnableConfig
@@ -170,29 +929,76 @@ class ReflectionNode(BaseNode):
         reasoning_model = self._get_reasoning_model(overall_state, config_obj)
         current_loop_count = overall_state.research_loop_count + 1
 
-        # プロンプトを作成し、LLMを初期化
-        formatted_prompt = self._create_reflection_prompt(overall_state)
+        # プロンプトを作成し、LLMを初期化（分割モードでは分割ごとにプロンプトを作成）
+        prompts = self._create_reflection_prompts(overall_state, config_obj)
         llm = self._initialize_llm(reasoning_model, config_obj)
 
         # ギャップを分析
-        _result = self._analyze_research_gaps(formatted_prompt, llm)
+        reflection, tokens = self._analyze_research_gaps(
+            prompts, llm, overall_state, config_obj
+        )
+        return self._create_update(
+            reflection,
+            tokens,
+            overall_state,
+            current_loop_count,
+            reasoning_model,
+            config_obj,
+        )
+
+    async def acall(
+        self, state: Union[BaseModel, List[Send], str], config: RunnableConfig
+    ) -> Union[BaseModel, List[Send], str]:
+        """知識のギャップを非同期で特定し、フォローアップクエリを生成。"""
+        overall_state = cast(OverallState, state)
+        config_obj = Configuration.get_config(config)
+        reasoning_model = self._get_reasoning_model(overall_state, config_obj)
+        current_loop_count = overall_state.research_loop_count + 1
 
-        # 状態を更新して返す
+        prompts = self._create_reflection_prompts(overall_state, config_obj)
+        llm = self._initialize_llm(reasoning_model, config_obj)
+
+        reflection, tokens = await self._aanalyze_research_gaps(
+            prompts, llm, overall_state, config_obj
+        )
+        return self._create_update(
+            reflection,
+            tokens,
+            overall_state,
+            current_loop_count,
+            reasoning_model,
+            config_obj,
+        )
+
+    def _create_update(
+        self,
+        reflection: Reflection,
+        tokens: int,
+        state: OverallState,
+        loop_count: int,
+        reasoning_model: str,
+        config_obj,
+    ) -> OverallState:
+        """リフレクション結果から状態の差分を作成（リスト項目は各reducerで追記される）。"""
+        follow_up_queries = self._select_follow_up_queries(
+            reflection, state, loop_count, tokens, config_obj
+        )
         return OverallState(
-            messages=overall_state.messages,
-            search_query=overall_state.search_query,
-            web_research_result=overall_state.web_research_result,
-            sources_gathered=overall_state.sources_gathered,
-            initial_search_query_count=overall_state.initial_search_query_count,
-            max_research_loops=overall_state.max_research_loops,
-            research_loop_count=current_loop_count,
+            search_query=follow_up_queries,
+            follow_up_queries=follow_up_queries,
+            is_sufficient=reflection.is_sufficient,
+            research_loop_count=loop_count,
             reasoning_model=reasoning_model,
+            tokens_used=tokens,
         )
 
 
 class ResearchEvaluationNode(BaseNode):
     """研究の進捗を評価し、次のステップを決定するノード。"""
 
+    node_name = "research_evaluation"
+    blocking = False
+
     def __init__(self):
         """研究評価ノードを初期化。"""
         super().__init__()
@@ -208,26 +1014,57 @@ class ResearchEvaluationNode(BaseNode):
         )
 
     def _should_finalize_research(self, state: OverallState, max_loops: int) -> bool:
-        """研究を終了すべきかどうかを判断。"""
-        return state.research_loop_count >= max_loops
+        """研究を終了すべきかどうかを判断（ループ上限・十分性）。
+
+        予算はリフレクションノードが判定し、使い切った場合はフォローアップクエリを
+        選択しません。
+        """
+        turn_loops = state.research_loop_count - get_turn_offset(
+            state, "research_loop_count"
+        )
+        return turn_loops >= max_loops or bool(state.is_sufficient)
 
-    def _create_follow_up_searches(self, state: OverallState, config_obj) -> List[Send]:
+    def _create_follow_up_searches(
+        self, queries: List[str], state: OverallState, config_obj
+    ) -> List[Send]:
         """知識ギャップのフォローアップ検索タスクを作成。"""
-        max_follow_up = config_obj.research.max_follow_up_queries
-        
+        deadline = get_search_deadline(state, config_obj.research)
+        research_topic = (
+            get_turn_topic(state)
+            if config_obj.search.include_raw_content
+            else ""
+        )
+        # フォローアップクエリはリフレクションが `search_query` の末尾に追加済みのため、
+        # その位置を検索の識別子（引用マーカーの番号）にしてスレッド内で一意にする
+        # （サブ質問の研究ループでは割り当てられた識別子の範囲の先頭をオフセットに持つ）
+        first_id = (
+            state.search_id_offset
+            + len(state.search_query)
+            - len(state.follow_up_queries or [])
+        )
         return [
             Send(
                 "web_research",
                 WebSearchState(
                     search_query=follow_up_query,
-                    id=len(state.search_query) + int(idx),
+                    id=first_id + int(idx),
+                    deadline=deadline,
+                    research_topic=research_topic,
+                    run_key=state.run_key,
                 ),
             )
-            for idx, follow_up_query in enumerate(
-                state.search_query[-max_follow_up:]
-            )
+            for idx, follow_up_query in enumerate(queries)
         ]
 
+    def _create_draft_answer(self, state: OverallState, config_obj) -> List[Send]:
+        """段階的な回答モードで、このターンの暫定回答をまだ返していなければ作成するタスク。
+
+        暫定回答は次の研究ループの検索と並行して作成します。
+        """
+        if not config_obj.research.progressive_answer or state.draft_answer:
+            return []
+        return [Send("draft_answer", state)]
+
     def __call__(
         self, state: Union[BaseModel, List[Send], str], config: RunnableConfig
     ) -> Union[BaseModel, List[Send], str]:
@@ -241,5 +1078,12 @@ class ResearchEvaluationNode(BaseNode):
 
         if self._should_finalize_research(overall_state, max_research_loops):
             return "finalize_answer"
-        else:
-            return self._create_follow_up_searches(overall_state, config_obj)
\ No newline at end of file
+
+        # リフレクションノードが予算に収まるように選択したクエリをすべて検索
+        follow_up_queries = overall_state.follow_up_queries or []
+        if not follow_up_queries:
+            return "finalize_answer"
+        searches = self._create_follow_up_searches(
+            follow_up_queries, overall_state, config_obj
+        )
+        return searches + self._create_draft_answer(overall_state, config_obj)
\ No newline at end of file
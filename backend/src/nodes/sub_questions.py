@@ -0,0 +1,442 @@
+import time
+from typing import Any, Dict, List, Tuple, Union, cast
+
+from dotenv import load_dotenv
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import HumanMessage
+from langchain_core.runnables import Runnable, RunnableConfig
+from langchain_core.runnables.config import merge_configs
+from langgraph.types import Send
+from pydantic import BaseModel
+
+from src.config.configuration import Configuration
+from src.prompts import sub_question_instructions
+from src.providers import (
+    ainvoke_chat_model,
+    create_chat_model,
+    invoke_chat_model,
+    with_repaired_structured_output,
+)
+from src.schemas import SubQuestionPlan
+from src.states import OverallState, SubQuestionState
+from src.utils import (
+    build_turn_topic,
+    get_budget_status,
+    get_latest_question,
+    get_or_create_run_key,
+    get_turn_findings,
+    get_turn_started_at,
+    get_turn_topic,
+    start_turn,
+)
+from src.utils.date_utils import get_current_date
+
+from .base_node import BaseNode
+
+load_dotenv()
+
+
+class SubQuestionPlanningNode(BaseNode):
+    """研究トピックを依存関係付きのサブ質問に分解するノード（階層的な計画モード）。"""
+
+    node_name = "plan_sub_questions"
+
+    def __init__(self):
+        """サブ質問計画ノードを初期化。"""
+        super().__init__()
+
+    def _create_prompt(self, research_topic: str, config_obj) -> str:
+        """サブ質問への分解用のプロンプトを作成。"""
+        return sub_question_instructions.format(
+            current_date=get_current_date(),
+            research_topic=research_topic,
+            max_sub_questions=config_obj.research.max_sub_questions,
+        )
+
+    def _initialize_llm(self, config_obj) -> BaseChatModel:
+        """計画用のLLMを初期化（クエリ生成と同じモデル）。"""
+        return create_chat_model(
+            model=config_obj.model.query_generator_model,
+            temperature=config_obj.llm_parameters.query_generation_temperature,
+            max_retries=config_obj.llm_parameters.max_retries,
+        )
+
+    def _plan(
+        self, prompt: str, llm: BaseChatModel, config_obj
+    ) -> Tuple[SubQuestionPlan, int]:
+        """サブ質問に分解（消費トークン数も返す）。"""
+        result, tokens = invoke_chat_model(
+            with_repaired_structured_output(
+                llm, SubQuestionPlan, config_obj.llm_parameters.max_retries
+            ),
+            prompt,
+        )
+        return cast(SubQuestionPlan, result), tokens
+
+    async def _aplan(
+        self, prompt: str, llm: BaseChatModel, config_obj
+    ) -> Tuple[SubQuestionPlan, int]:
+        """サブ質問に非同期で分解（消費トークン数も返す）。"""
+        result, tokens = await ainvoke_chat_model(
+            with_repaired_structured_output(
+                llm, SubQuestionPlan, config_obj.llm_parameters.max_retries
+            ),
+            prompt,
+        )
+        return cast(SubQuestionPlan, result), tokens
+
+    def _normalize_plan(
+        self, plan: SubQuestionPlan, state: OverallState, config_obj
+    ) -> List[Dict[str, Any]]:
+        """計画を上限数に収め、依存関係を自分より前のサブ質問だけに絞り込む。
+
+        前の番号への依存だけを残すため、依存関係は必ず循環しません。
+        サブ質問が無い場合は最新の質問をそのまま1つのサブ質問にします。
+        """
+        sub_questions: List[Dict[str, Any]] = []
+        for sub_question in plan.sub_questions:
+            question = sub_question.question.strip()
+            if not question:
+                continue
+            index = len(sub_questions)
+            depends_on = sorted(
+                {dep - 1 for dep in sub_question.depends_on if 0 < dep <= index}
+            )
+            sub_questions.append({"question": question, "depends_on": depends_on})
+            if len(sub_questions) >= config_obj.research.max_sub_questions:
+                break
+        if not sub_questions:
+            question = get_latest_question(state.messages)
+            sub_questions.append({"question": question, "depends_on": []})
+        return sub_questions
+
+    def __call__(
+        self, state: Union[BaseModel, List[Send], str], config: RunnableConfig
+    ) -> Union[BaseModel, List[Send], str]:
+        """研究トピックをサブ質問に分解し、状態を更新。"""
+        # 型安全性のためにstateをOverallStateとしてキャスト
+        overall_state = cast(OverallState, state)
+
+        # 予算の計測開始時刻（既に開始済みの実行ではそちらを優先）
+        started_at = overall_state.run_started_at or time.time()
+
+        # 設定を取得し、このターンの研究トピックを作成
+        config_obj = Configuration.get_config(config)
+        topic = build_turn_topic(overall_state, config_obj)
+
+        # プロンプトを作成し、サブ質問に分解
+        formatted_prompt = self._create_prompt(topic["research_topic"], config_obj)
+        llm = self._initialize_llm(config_obj)
+        plan, tokens = self._plan(formatted_prompt, llm, config_obj)
+        return self._create_update(
+            plan, tokens, started_at, overall_state, topic, config_obj
+        )
+
+    async def acall(
+        self, state: Union[BaseModel, List[Send], str], config: RunnableConfig
+    ) -> Union[BaseModel, List[Send], str]:
+        """研究トピックを非同期でサブ質問に分解し、状態を更新。"""
+        overall_state = cast(OverallState, state)
+        started_at = overall_state.run_started_at or time.time()
+        config_obj = Configuration.get_config(config)
+        topic = build_turn_topic(overall_state, config_obj)
+
+        formatted_prompt = self._create_prompt(topic["research_topic"], config_obj)
+        llm = self._initialize_llm(config_obj)
+        plan, tokens = await self._aplan(formatted_prompt, llm, config_obj)
+        return self._create_update(
+            plan, tokens, started_at, overall_state, topic, config_obj
+        )
+
+    def _create_update(
+        self,
+        plan: SubQuestionPlan,
+        tokens: int,
+        started_at: float,
+        state: OverallState,
+        topic: Dict[str, Any],
+        config_obj,
+    ) -> OverallState:
+        """計画から状態の差分を作成（フォローアップのターンでは開始時点の状態も記録）。"""
+        return OverallState(
+            sub_questions=self._normalize_plan(plan, state, config_obj),
+            run_started_at=started_at,
+            run_key=get_or_create_run_key(state),
+            tokens_used=tokens,
+            **topic,
+            **start_turn(state),
+        )
+
+
+class SubQuestionRouterNode(BaseNode):
+    """依存するサブ質問を調べ終えたサブ質問を、並列の研究タスクに振り分けるノード。
+
+    振り分けは計画の直後と、各段（同時に振り分けたサブ質問の組）の合流後に行います。
+    LangGraphは同じステップのタスクがすべて終わってから次のステップに進むため、
+    依存するサブ質問は、依存先だけでなく同じ段のすべてのサブ質問が終わってから
+    振り分けられます。
+    """
+
+    node_name = "sub_question_router"
+    blocking = False
+
+    def __init__(self):
+        """サブ質問ルーターノードを初期化。"""
+        super().__init__()
+
+    def _get_ready(
+        self, state: OverallState
+    ) -> Tuple[List[int], List[int], Dict[int, Dict[str, Any]]]:
+        """未着手のサブ質問と、そのうち依存先を調べ終えたものの番号を取得。"""
+        findings = {finding["index"]: finding for finding in get_turn_findings(state)}
+        sub_questions = state.sub_questions or []
+        pending = [
+            index for index in range(len(sub_questions)) if index not in findings
+        ]
+        ready = [
+            index
+            for index in pending
+            if all(dep in findings for dep in sub_questions[index]["depends_on"])
+        ]
+        return pending, ready, findings
+
+    def _get_search_block(self, config_obj) -> int:
+        """サブ質問1つの検索に割り当てる識別子の数（クエリ数の上限）。
+
+        リフレクションは最後のループ以外でフォローアップクエリを追加します。
+        """
+        research = config_obj.research
+        follow_up_loops = max(1, research.sub_question_max_loops) - 1
+        return (
+            research.sub_question_queries
+            + follow_up_loops * research.max_follow_up_queries
+        )
+
+    def _split_budget(
+        self, state: OverallState, pending: int, config_obj
+    ) -> Dict[str, Any]:
+        """残りのトークン・検索回数の予算を未着手のサブ質問で等分した設定の上書き。
+
+        最終回答の生成のために残すトークンは親の実行で確保するため、サブ質問では0にします。
+        """
+        research = config_obj.research
+        status = get_budget_status(state, research)
+        # サブ質問の研究ループに渡す質問は文脈付きのプロンプトなので先行検索はせず、
+        # 回答は親の実行でまとめるため暫定回答も作らない
+        overrides: Dict[str, Any] = {
+            "finalize_reserve_tokens": 0,
+            "speculative_search": False,
+            "progressive_answer": False,
+        }
+        if status.remaining_tokens is not None:
+            remaining = status.remaining_tokens - research.finalize_reserve_tokens
+            overrides["max_total_tokens"] = max(1, remaining // pending)
+        if status.remaining_searches is not None:
+            overrides["max_searches"] = max(1, status.remaining_searches // pending)
+        return overrides
+
+    def _create_prompt(
+        self,
+        state: OverallState,
+        index: int,
+        findings: Dict[int, Dict[str, Any]],
+    ) -> str:
+        """サブ質問の研究ループに渡す質問（全体の文脈と依存先の調査結果付き）を作成。"""
+        sub_question = (state.sub_questions or [])[index]
+        prompt = (
+            f"全体の質問:\n{get_turn_topic(state)}\n\n"
+            f"このサブ質問: {sub_question['question']}\n"
+        )
+        dependencies = [findings[dep] for dep in sub_question["depends_on"]]
+        if dependencies:
+            prompt += "\n前提となるサブ質問の調査結果:\n" + "".join(
+                f"### {finding['question']}\n{finding['context']}\n\n"
+                for finding in dependencies
+            )
+        return prompt
+
+    def _create_tasks(
+        self,
+        state: OverallState,
+        ready: List[int],
+        pending: List[int],
+        findings: Dict[int, Dict[str, Any]],
+        config_obj,
+    ) -> List[Send]:
+        """サブ質問ごとの研究タスクを作成。
+
+        各タスクには重ならない検索の識別子の範囲を割り当て、並列に調べても
+        引用マーカーが重複しないようにします。
+        """
+        block = self._get_search_block(config_obj)
+        first_id = state.search_id_offset + len(state.search_query)
+        started_at = get_turn_started_at(state)
+        overrides = self._split_budget(state, len(pending), config_obj)
+        sub_questions = state.sub_questions or []
+        return [
+            Send(
+                "research_sub_question",
+                SubQuestionState(
+                    index=index,
+                    question=sub_questions[index]["question"],
+                    prompt=self._create_prompt(state, index, findings),
+                    search_id_offset=first_id + position * block,
+                    search_id_end=first_id + (position + 1) * block,
+                    run_started_at=started_at,
+                    run_key=state.run_key,
+                    config_overrides=overrides,
+                ),
+            )
+            for position, index in enumerate(ready)
+        ]
+
+    def __call__(
+        self, state: Union[BaseModel, List[Send], str], config: RunnableConfig
+    ) -> Union[BaseModel, List[Send], str]:
+        """調べられるサブ質問を並列に振り分け、すべて調べ終えたら最終回答へ進む。"""
+        overall_state = cast(OverallState, state)
+        config_obj = Configuration.get_config(config)
+
+        pending, ready, findings = self._get_ready(overall_state)
+        if not ready:
+            return "finalize_answer"
+
+        # 予算を使い切っている場合は調べ終えた結果だけで回答する
+        research = config_obj.research
+        if get_budget_status(overall_state, research).exhausted_reason(
+            research.finalize_reserve_seconds, research.finalize_reserve_tokens
+        ):
+            return "finalize_answer"
+        return self._create_tasks(overall_state, ready, pending, findings, config_obj)
+
+
+class SubQuestionResearchNode(BaseNode):
+    """1つのサブ質問を、専用の研究ループ（クエリ生成・検索・リフレクション）で調べるノード。
+
+    サブ質問ごとに独立したサブグラフを実行するため、同じ段の他のサブ質問の
+    研究ループの終了を待たずに検索とリフレクションを繰り返せます。
+    """
+
+    node_name = "research_sub_question"
+
+    def __init__(self, research_graph: Runnable):
+        """サブ質問研究ノードを初期化（`research_graph` はサブ質問用の研究グラフ）。"""
+        super().__init__()
+        self.research_graph = research_graph
+
+    def _create_input(self, state: SubQuestionState, config_obj) -> OverallState:
+        """サブ質問の研究グラフの初期状態を作成。"""
+        research = config_obj.research
+        return OverallState(
+            messages=[HumanMessage(content=state.prompt)],
+            initial_search_query_count=research.sub_question_queries,
+            max_research_loops=max(1, research.sub_question_max_loops),
+            run_started_at=state.run_started_at,
+            run_key=state.run_key,
+            search_id_offset=state.search_id_offset,
+        )
+
+    def _create_config(
+        self, state: SubQuestionState, config: RunnableConfig
+    ) -> RunnableConfig:
+        """サブ質問に割り当てた予算で上書きした設定を作成。"""
+        return merge_configs(config, {"configurable": state.config_overrides})
+
+    def __call__(
+        self, state: Union[BaseModel, List[Send], str], config: RunnableConfig
+    ) -> Union[BaseModel, List[Send], str]:
+        """サブ質問の研究グラフを実行し、結果を状態の差分にまとめる。"""
+        sub_question_state = cast(SubQuestionState, state)
+        config_obj = Configuration.get_config(config)
+        started_at = time.time()
+
+        result = self.research_graph.invoke(
+            self._create_input(sub_question_state, config_obj),
+            self._create_config(sub_question_state, config),
+        )
+        return self._create_update(
+            result, sub_question_state, time.time() - started_at, config_obj
+        )
+
+    async def acall(
+        self, state: Union[BaseModel, List[Send], str], config: RunnableConfig
+    ) -> Union[BaseModel, List[Send], str]:
+        """サブ質問の研究グラフを非同期で実行し、結果を状態の差分にまとめる。"""
+        sub_question_state = cast(SubQuestionState, state)
+        config_obj = Configuration.get_config(config)
+        started_at = time.time()
+
+        result = await self.research_graph.ainvoke(
+            self._create_input(sub_question_state, config_obj),
+            self._create_config(sub_question_state, config),
+        )
+        return self._create_update(
+            result, sub_question_state, time.time() - started_at, config_obj
+        )
+
+    def _create_update(
+        self,
+        result: Dict[str, Any],
+        state: SubQuestionState,
+        seconds: float,
+        config_obj,
+    ) -> OverallState:
+        """サブ質問の研究結果から親の状態の差分を作成。
+
+        検索結果はサブ質問の見出しを付けた1つのテキストにまとめ、最終回答で
+        サブ質問ごとの引用付きの調査結果として扱えるようにします。
+        """
+        results = result.get("web_research_result", [])
+        findings = "\n---\n\n".join(results)
+        heading = f"## サブ質問 {state.index + 1}: {state.question}\n\n"
+        context_chars = config_obj.research.sub_question_context_chars
+        return OverallState(
+            search_query=result.get("search_query", []),
+            web_research_result=[heading + findings] if results else [],
+            sources_gathered=result.get("sources_gathered", []),
+            tokens_used=result.get("tokens_used", 0),
+            search_count=result.get("search_count", 0),
+            sub_question_findings=[
+                {
+                    "index": state.index,
+                    "question": state.question,
+                    "context": findings[:context_chars],
+                    "search_id_end": state.search_id_end,
+                    "search_count": result.get("search_count", 0),
+                    "tokens_used": result.get("tokens_used", 0),
+                    "seconds": round(seconds, 3),
+                }
+            ],
+        )
+
+
+class SubQuestionJoinNode(BaseNode):
+    """並列に調べたサブ質問の結果を合流させるノード。
+
+    同じ段のサブ質問がすべて終わった時点で1回だけ実行され、その後のルーターが
+    依存先を調べ終えたサブ質問を次の段として振り分けます。
+    """
+
+    node_name = "join_sub_questions"
+    blocking = False
+
+    def __init__(self):
+        """サブ質問合流ノードを初期化。"""
+        super().__init__()
+
+    def __call__(
+        self, state: Union[BaseModel, List[Send], str], config: RunnableConfig
+    ) -> Union[BaseModel, List[Send], str]:
+        """以降の検索の識別子が、サブ質問に割り当てた範囲の後ろから始まるようにする。
+
+        サブ質問が割り当てた範囲を使い切らなくても、`search_query` の位置＋オフセット
+        による識別子が既に割り当てた識別子と重複しないようにオフセットを進めます。
+        """
+        overall_state = cast(OverallState, state)
+        id_end = max(
+            (finding["search_id_end"] for finding in get_turn_findings(overall_state)),
+            default=0,
+        )
+        return OverallState(
+            search_id_offset=max(0, id_end - len(overall_state.search_query))
+        )
@@ -0,0 +1,28 @@
+"""Observability utilities (metrics, instrumentation, tracing, profiling) for the LangGraph agent."""
+
+from .instrumentation import (
+    LLMUsageCallbackHandler,
+    current_node,
+    instrument_node,
+    llm_usage_callback,
+    record_search,
+)
+from .metrics import REGISTRY, Counter, Histogram, MetricsRegistry
+from .profiling import RunProfile
+from .tracing import RunTrace, get_run_key, trace_span
+
+__all__ = [
+    "Counter",
+    "Histogram",
+    "LLMUsageCallbackHandler",
+    "MetricsRegistry",
+    "REGISTRY",
+    "RunProfile",
+    "RunTrace",
+    "current_node",
+    "get_run_key",
+    "instrument_node",
+    "llm_usage_callback",
+    "record_search",
+    "trace_span",
+]
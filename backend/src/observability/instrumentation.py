@@ -0,0 +1,271 @@
+"""ノード・LLM・検索呼び出しの計測フック"""
+
+import functools
+import inspect
+import threading
+import time
+import uuid
+from contextlib import ExitStack
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Optional, Tuple, TypeVar
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+
+from .metrics import (
+    LLM_CACHE_HITS,
+    LLM_LATENCY,
+    LLM_TOKENS,
+    NODE_ERRORS,
+    NODE_LATENCY,
+    SEARCH_REQUESTS,
+    SEARCH_RESULTS,
+)
+from .profiling import RunProfile, finish_profile, get_or_create_profile
+from .tracing import (
+    RunTrace,
+    current_lane,
+    current_trace,
+    finish_trace,
+    get_or_create_trace,
+    node_span,
+)
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+# 現在実行中のノード名（LLM・検索の計測値をノードに帰属させるために使用）
+current_node: ContextVar[str] = ContextVar("current_node", default="unknown")
+
+
+def _get_state_run_key(state: Any) -> Optional[str]:
+    """トレース・プロファイルのキーの代わりに使う状態の `run_key` を取得。
+
+    ターンの最初のノードではまだ `run_key` が無いため、ここで作成して状態に設定
+    します。ノードは `get_or_create_run_key` で同じキーを使って状態に記録するので、
+    最初のノードとそれ以降のノードが同じトレースに記録されます。
+    """
+    if not hasattr(state, "run_key"):
+        return None
+    if not state.run_key:
+        state.run_key = uuid.uuid4().hex
+    return state.run_key
+
+
+def _finish_run(
+    trace: Optional[RunTrace],
+    profile: Optional[RunProfile],
+    config: Any,
+    run_key: Optional[str],
+) -> None:
+    """実行終了時にトレースとプロファイルを書き出す。"""
+    if trace is not None:
+        finish_trace(trace)
+    if profile is not None:
+        finish_profile(config, run_key)
+
+
+def instrument_node(node_name: str, terminal: bool = False) -> Callable[[F], F]:
+    """ノードの `__call__` をラップしてレイテンシとエラー数を記録するデコレータ。
+
+    トレース・プロファイリングが有効な場合はノード呼び出しをスパンとして記録・
+    プロファイルし、`terminal` なノード（実行の最後のノード）の完了時に書き出します。
+    コルーチン関数（非同期ノード）もラップできますが、イベントループのスレッドは
+    複数の実行で共有されるため、CPUサンプリングは行わずメモリの差分のみ記録します。
+    """
+
+    def decorator(func: F) -> F:
+        if inspect.iscoroutinefunction(func):
+            return _instrument_async_node(func, node_name, terminal)
+
+        @functools.wraps(func)
+        def wrapper(self: Any, state: Any, config: Any) -> Any:
+            token = current_node.set(node_name)
+            run_key = _get_state_run_key(state)
+            trace = get_or_create_trace(config, run_key)
+            profile = get_or_create_profile(config, run_key)
+            start = time.perf_counter()
+            try:
+                if trace is None and profile is None:
+                    return func(self, state, config)
+                with ExitStack() as stack:
+                    if trace is not None:
+                        stack.enter_context(node_span(trace, node_name, config))
+                    if profile is not None:
+                        stack.enter_context(profile.capture())
+                    result = func(self, state, config)
+                if terminal:
+                    _finish_run(trace, profile, config, run_key)
+                return result
+            except BaseException:
+                NODE_ERRORS.inc(node_name)
+                _finish_run(trace, profile, config, run_key)
+                raise
+            finally:
+                NODE_LATENCY.observe(time.perf_counter() - start, node_name)
+                current_node.reset(token)
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorator
+
+
+def _instrument_async_node(func: F, node_name: str, terminal: bool) -> F:
+    """非同期ノードの呼び出しを計測するラッパーを作成。"""
+
+    @functools.wraps(func)
+    async def wrapper(self: Any, state: Any, config: Any) -> Any:
+        token = current_node.set(node_name)
+        run_key = _get_state_run_key(state)
+        trace = get_or_create_trace(config, run_key)
+        profile = get_or_create_profile(config, run_key)
+        start = time.perf_counter()
+        try:
+            if trace is None:
+                result = await func(self, state, config)
+            else:
+                with node_span(trace, node_name, config):
+                    result = await func(self, state, config)
+            if terminal:
+                _finish_run(trace, profile, config, run_key)
+            return result
+        except BaseException:
+            NODE_ERRORS.inc(node_name)
+            _finish_run(trace, profile, config, run_key)
+            raise
+        finally:
+            NODE_LATENCY.observe(time.perf_counter() - start, node_name)
+            current_node.reset(token)
+
+    return wrapper  # type: ignore[return-value]
+
+
+def record_search(provider: str, result_count: int) -> None:
+    """検索リクエスト数と結果件数を記録。"""
+    node_name = current_node.get()
+    SEARCH_REQUESTS.inc(node_name, provider)
+    SEARCH_RESULTS.inc(node_name, provider, amount=result_count)
+
+
+def extract_token_usage(response: LLMResult) -> Tuple[int, int, int]:
+    """LLMレスポンスから (入力, 出力, キャッシュ済み入力) トークン数を抽出。"""
+    for generations in response.generations:
+        for generation in generations:
+            message = getattr(generation, "message", None)
+            usage = getattr(message, "usage_metadata", None)
+            if usage:
+                input_details = usage.get("input_token_details") or {}
+                return (
+                    usage.get("input_tokens", 0),
+                    usage.get("output_tokens", 0),
+                    input_details.get("cache_read", 0) or 0,
+                )
+
+    # usage_metadataが無い場合はOpenAI形式のllm_outputにフォールバック
+    token_usage = (response.llm_output or {}).get("token_usage") or {}
+    prompt_details = token_usage.get("prompt_tokens_details") or {}
+    return (
+        token_usage.get("prompt_tokens", 0),
+        token_usage.get("completion_tokens", 0),
+        prompt_details.get("cached_tokens", 0) or 0,
+    )
+
+
+class LLMUsageCallbackHandler(BaseCallbackHandler):
+    """LLM呼び出しのレイテンシとトークン使用量をノード・モデル別に記録するコールバック。"""
+
+    # 処理は軽くスレッドセーフなため、非同期実行時もスレッドに移さずその場で呼び出す
+    run_inline = True
+
+    def __init__(self) -> None:
+        """コールバックハンドラーを初期化。"""
+        super().__init__()
+        self._runs: Dict[
+            UUID, Tuple[float, str, str, Optional[RunTrace], int]
+        ] = {}
+        self._lock = threading.Lock()
+
+    def _start(
+        self,
+        run_id: UUID,
+        metadata: Optional[Dict[str, Any]],
+        kwargs: Dict[str, Any],
+    ) -> None:
+        """呼び出し開始を記録。"""
+        model = (metadata or {}).get("ls_model_name") or (
+            kwargs.get("invocation_params") or {}
+        ).get("model", "unknown")
+        with self._lock:
+            self._runs[run_id] = (
+                time.perf_counter(),
+                current_node.get(),
+                str(model),
+                current_trace.get(),
+                current_lane.get(),
+            )
+
+    def on_chat_model_start(
+        self,
+        serialized: Dict[str, Any],
+        messages: Any,
+        *,
+        run_id: UUID,
+        metadata: Optional[Dict[str, Any]] = None,
+        **kwargs: Any,
+    ) -> None:
+        """チャットモデル呼び出し開始時の処理。"""
+        self._start(run_id, metadata, kwargs)
+
+    def on_llm_start(
+        self,
+        serialized: Dict[str, Any],
+        prompts: Any,
+        *,
+        run_id: UUID,
+        metadata: Optional[Dict[str, Any]] = None,
+        **kwargs: Any,
+    ) -> None:
+        """LLM呼び出し開始時の処理。"""
+        self._start(run_id, metadata, kwargs)
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        """LLM呼び出し終了時にレイテンシとトークン数を記録。"""
+        with self._lock:
+            started = self._runs.pop(run_id, None)
+        if started is None:
+            return
+
+        start, node_name, model, trace, lane = started
+        end = time.perf_counter()
+        LLM_LATENCY.observe(end - start, node_name, model)
+
+        input_tokens, output_tokens, cached_tokens = extract_token_usage(response)
+        LLM_TOKENS.inc(node_name, model, "input", amount=input_tokens)
+        LLM_TOKENS.inc(node_name, model, "output", amount=output_tokens)
+        if cached_tokens:
+            LLM_TOKENS.inc(node_name, model, "cached_input", amount=cached_tokens)
+            LLM_CACHE_HITS.inc(node_name, model)
+
+        if trace is not None:
+            trace.add_complete_event(
+                f"llm:{model}",
+                "llm",
+                start,
+                end,
+                lane,
+                {
+                    "node": node_name,
+                    "input_tokens": input_tokens,
+                    "output_tokens": output_tokens,
+                    "cached_input_tokens": cached_tokens,
+                },
+            )
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        """LLM呼び出し失敗時に開始記録を破棄。"""
+        with self._lock:
+            self._runs.pop(run_id, None)
+
+
+# プロセス全体で共有するコールバックハンドラー
+llm_usage_callback = LLMUsageCallbackHandler()
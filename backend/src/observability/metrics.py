@@ -0,0 +1,345 @@
+"""Prometheus形式のメトリクス収集ユーティリティ"""
+
+import threading
+from bisect import bisect_left
+from typing import Dict, List, Sequence, Tuple
+
+DEFAULT_LATENCY_BUCKETS: Tuple[float, ...] = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    20.0,
+    40.0,
+    80.0,
+)
+
+
+def _escape_label_value(value: str) -> str:
+    """Prometheusのラベル値をエスケープ。"""
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    """ラベル名と値を `{a="x",b="y"}` 形式に整形。"""
+    if not names:
+        return ""
+    pairs = ",".join(
+        f'{name}="{_escape_label_value(value)}"' for name, value in zip(names, values)
+    )
+    return "{" + pairs + "}"
+
+
+def _format_value(value: float) -> str:
+    """メトリクス値を文字列化（整数値は小数点なしで出力）。"""
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Counter:
+    """単調増加するカウンター。"""
+
+    metric_type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        """カウンターを初期化。"""
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labelvalues: str, amount: float = 1.0) -> None:
+        """指定ラベルの値を加算。"""
+        key = tuple(labelvalues)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def get(self, *labelvalues: str) -> float:
+        """指定ラベルの現在値を取得。"""
+        with self._lock:
+            return self._values.get(tuple(labelvalues), 0.0)
+
+    def reset(self) -> None:
+        """全ての値をクリア。"""
+        with self._lock:
+            self._values.clear()
+
+    def samples(self) -> List[str]:
+        """エクスポジション形式のサンプル行を生成。"""
+        with self._lock:
+            items = sorted(self._values.items())
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in items
+        ]
+
+
+class Gauge(Counter):
+    """任意の値に設定できるゲージ。"""
+
+    metric_type = "gauge"
+
+    def set(self, value: float, *labelvalues: str) -> None:
+        """指定ラベルの値を設定。"""
+        with self._lock:
+            self._values[tuple(labelvalues)] = value
+
+
+class Histogram:
+    """固定バケットのヒストグラム。"""
+
+    metric_type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS,
+    ):
+        """ヒストグラムを初期化。"""
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # ラベルごとに [バケット別件数..., +Inf件数], 合計値 を保持
+        self._counts: Dict[Tuple[str, ...], List[int]] = {}
+        self._sums: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labelvalues: str) -> None:
+        """観測値を記録。"""
+        key = tuple(labelvalues)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._counts.get(key)
+            if counts is None:
+                counts = [0] * (len(self.buckets) + 1)
+                self._counts[key] = counts
+                self._sums[key] = 0.0
+            counts[index] += 1
+            self._sums[key] += value
+
+    def count(self, *labelvalues: str) -> int:
+        """指定ラベルの観測回数を取得。"""
+        with self._lock:
+            return sum(self._counts.get(tuple(labelvalues), ()))
+
+    def total(self, *labelvalues: str) -> float:
+        """指定ラベルの観測値合計を取得。"""
+        with self._lock:
+            return self._sums.get(tuple(labelvalues), 0.0)
+
+    def reset(self) -> None:
+        """全ての値をクリア。"""
+        with self._lock:
+            self._counts.clear()
+            self._sums.clear()
+
+    def samples(self) -> List[str]:
+        """エクスポジション形式のサンプル行を生成。"""
+        with self._lock:
+            items = sorted((key, list(counts)) for key, counts in self._counts.items())
+            sums = dict(self._sums)
+
+        lines = []
+        bucket_labelnames = self.labelnames + ("le",)
+        for key, counts in items:
+            cumulative = 0
+            for upper, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                labels = _format_labels(bucket_labelnames, key + (_format_value(upper),))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(sums[key])}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """メトリクスを登録し、Prometheus形式で出力するレジストリ。"""
+
+    def __init__(self):
+        """レジストリを初期化。"""
+        self._metrics: Dict[str, "Counter | Histogram"] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: "Counter | Histogram") -> "Counter | Histogram":
+        """メトリクスを登録（同名のメトリクスは既存のものを返す）。"""
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(
+        self, name: str, documentation: str, labelnames: Sequence[str] = ()
+    ) -> Counter:
+        """カウンターを作成して登録。"""
+        metric = self.register(Counter(name, documentation, labelnames))
+        assert isinstance(metric, Counter)
+        return metric
+
+    def gauge(
+        self, name: str, documentation: str, labelnames: Sequence[str] = ()
+    ) -> Gauge:
+        """ゲージを作成して登録。"""
+        metric = self.register(Gauge(name, documentation, labelnames))
+        assert isinstance(metric, Gauge)
+        return metric
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS,
+    ) -> Histogram:
+        """ヒストグラムを作成して登録。"""
+        metric = self.register(Histogram(name, documentation, labelnames, buckets))
+        assert isinstance(metric, Histogram)
+        return metric
+
+    def reset(self) -> None:
+        """登録済みメトリクスの値をすべてクリア。"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            metric.reset()
+
+    def render(self) -> str:
+        """Prometheusテキストエクスポジション形式で出力。"""
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda m: m.name)
+
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.metric_type}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+NODE_LATENCY = REGISTRY.histogram(
+    "research_node_latency_seconds",
+    "Latency of graph node invocations.",
+    ("node",),
+)
+NODE_ERRORS = REGISTRY.counter(
+    "research_node_errors_total",
+    "Number of graph node invocations that raised an exception.",
+    ("node",),
+)
+LLM_LATENCY = REGISTRY.histogram(
+    "research_llm_latency_seconds",
+    "Latency of LLM calls.",
+    ("node", "model"),
+)
+LLM_TOKENS = REGISTRY.counter(
+    "research_llm_tokens_total",
+    "Tokens consumed by LLM calls.",
+    ("node", "model", "type"),
+)
+LLM_CACHE_HITS = REGISTRY.counter(
+    "research_llm_prompt_cache_hits_total",
+    "LLM calls whose prompt was (partially) served from the provider prompt cache.",
+    ("node", "model"),
+)
+SEARCH_REQUESTS = REGISTRY.counter(
+    "research_search_requests_total",
+    "Number of search requests issued.",
+    ("node", "provider"),
+)
+SEARCH_RESULTS = REGISTRY.counter(
+    "research_search_results_total",
+    "Number of search results returned.",
+    ("node", "provider"),
+)
+SEARCH_TIMEOUTS = REGISTRY.counter(
+    "research_search_timeouts_total",
+    "Search branches abandoned because of the per-branch timeout or run deadline.",
+    ("provider",),
+)
+SEARCH_HEDGES = REGISTRY.counter(
+    "research_search_hedges_total",
+    "Hedged search requests issued after the latency percentile, and how many won.",
+    ("provider", "result"),
+)
+SEARCH_DUPLICATES = REGISTRY.counter(
+    "research_search_duplicates_total",
+    "Search results dropped as near-duplicates of a result already seen in the run.",
+)
+SPECULATIVE_SEARCHES = REGISTRY.counter(
+    "research_speculative_searches_total",
+    "Searches for the raw question issued alongside query generation, by outcome.",
+    ("result",),
+)
+TIME_TO_FIRST_ANSWER = REGISTRY.histogram(
+    "research_time_to_first_answer_seconds",
+    "Time from the start of a turn to the first answer shown (draft or final).",
+    ("answer",),
+)
+KB_LOOKUPS = REGISTRY.counter(
+    "research_kb_lookups_total",
+    "Knowledge-base lookups before searching, by query type and hit/miss/stale.",
+    ("query_type", "result"),
+)
+KB_LATENCY_SAVED = REGISTRY.counter(
+    "research_kb_latency_saved_seconds_total",
+    "Search latency saved by knowledge-base hits (provider median minus lookup).",
+)
+STRUCTURED_OUTPUTS = REGISTRY.counter(
+    "research_structured_outputs_total",
+    "Structured LLM outputs by schema and outcome (parsed/repaired/retried/failed).",
+    ("schema", "result"),
+)
+CPU_TASKS = REGISTRY.counter(
+    "research_cpu_tasks_total",
+    "CPU-bound post-processing batches, by execution lane (inline/thread/process).",
+    ("task", "lane"),
+)
+BUDGET_EXHAUSTED = REGISTRY.counter(
+    "research_budget_exhausted_total",
+    "Runs that stopped researching early because a budget was exhausted.",
+    ("budget",),
+)
+PROVIDER_QUEUED = REGISTRY.histogram(
+    "research_provider_queued_seconds",
+    "Time provider calls spent waiting for a concurrency slot or rate-limit token.",
+    ("provider",),
+)
+PROVIDER_CALL = REGISTRY.histogram(
+    "research_provider_call_seconds",
+    "Duration of individual provider call attempts.",
+    ("provider", "outcome"),
+)
+PROVIDER_THROTTLED = REGISTRY.counter(
+    "research_provider_throttled_total",
+    "Provider call attempts rejected with 429/503 or timed out.",
+    ("provider",),
+)
+PROVIDER_RETRIES = REGISTRY.counter(
+    "research_provider_retries_total",
+    "Provider call attempts retried after a backoff.",
+    ("provider",),
+)
+PROVIDER_CONCURRENCY_LIMIT = REGISTRY.gauge(
+    "research_provider_concurrency_limit",
+    "Current adaptive concurrency limit per provider.",
+    ("provider",),
+)
+PROVIDER_IN_FLIGHT = REGISTRY.gauge(
+    "research_provider_in_flight",
+    "Provider calls currently in flight.",
+    ("provider",),
+)
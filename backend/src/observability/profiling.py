@@ -0,0 +1,336 @@
+"""研究実行ごとのオプトインCPU（統計的サンプリング）/メモリプロファイリング"""
+
+import os
+import random
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from datetime import datetime
+from types import FrameType
+from typing import Any, Dict, Iterator, List, Optional
+
+from src.config.configuration import Configuration
+
+from .tracing import get_run_key
+
+# リクエストヘッダー（langgraph.json の configurable_headers で configurable に渡される）
+PROFILE_HEADER = "x-profile-run"
+# サンプリング判定結果を保持する実行数の上限
+MAX_TRACKED_RUNS = 1024
+# tracemallocで保存するスタックフレーム数
+TRACEMALLOC_FRAMES = 10
+# 記録するスタックの最大深さ
+MAX_STACK_DEPTH = 64
+
+_TRUTHY = {"1", "true", "yes", "on"}
+
+
+def _is_truthy(value: Any) -> bool:
+    """設定値・ヘッダー値を真偽値として解釈。"""
+    if isinstance(value, str):
+        return value.strip().lower() in _TRUTHY
+    return bool(value)
+
+
+def _frame_label(frame: FrameType) -> str:
+    """フレームを `module:function:line` 形式のラベルに変換。"""
+    code = frame.f_code
+    module = frame.f_globals.get("__name__", os.path.basename(code.co_filename))
+    return f"{module}:{code.co_name}:{code.co_firstlineno}"
+
+
+def _collapse_stack(frame: Optional[FrameType]) -> str:
+    """フレームからルート→リーフ順のセミコロン区切りスタックを作成。"""
+    labels = []
+    while frame is not None and len(labels) < MAX_STACK_DEPTH:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+
+class RunProfile:
+    """1回の研究実行の統計的CPUプロファイルとtracemallocスナップショットを保持するクラス。
+
+    ノード呼び出し中のスレッドを実行に紐付け、共有のサンプラースレッドが
+    一定間隔でスタックを採取します。cProfileと異なりプロセス全体で1つしか
+    有効にできない制約がないため、並列ブランチや複数実行を同時に計測できます。
+    """
+
+    def __init__(
+        self,
+        run_key: str,
+        output_dir: str,
+        max_total_bytes: int,
+        capture_memory: bool,
+        top_n: int,
+        interval: float,
+    ):
+        """プロファイルを初期化。"""
+        self.run_key = run_key
+        self.output_dir = output_dir
+        self.max_total_bytes = max_total_bytes
+        self.top_n = top_n
+        self.interval = interval
+        self.started_at = datetime.now()
+        self.samples: Counter = Counter()
+        self._lock = threading.Lock()
+        self._memory_snapshot: Optional[tracemalloc.Snapshot] = None
+        if capture_memory:
+            _acquire_tracemalloc()
+            self._memory_snapshot = tracemalloc.take_snapshot()
+
+    def add_sample(self, stack: str) -> None:
+        """採取したスタックを加算。"""
+        with self._lock:
+            self.samples[stack] += 1
+
+    @contextmanager
+    def capture(self) -> Iterator[None]:
+        """ブロック実行中の現在のスレッドをサンプリング対象にする。"""
+        _sampler.register(threading.get_ident(), self)
+        try:
+            yield
+        finally:
+            _sampler.unregister(threading.get_ident(), self)
+
+    def _memory_diff(self) -> Optional[str]:
+        """開始時からのメモリ割り当て差分を上位から整形。"""
+        if self._memory_snapshot is None:
+            return None
+        snapshot = tracemalloc.take_snapshot()
+        _release_tracemalloc()
+        diff = snapshot.compare_to(self._memory_snapshot, "lineno")
+        self._memory_snapshot = None
+        return "\n".join(str(stat) for stat in diff[: self.top_n]) + "\n"
+
+    def _summary(self, samples: Counter) -> str:
+        """関数ごとのself/inclusiveサンプル数の上位を整形。"""
+        total = sum(samples.values())
+        self_counts: Counter = Counter()
+        inclusive_counts: Counter = Counter()
+        for stack, count in samples.items():
+            labels = stack.split(";")
+            self_counts[labels[-1]] += count
+            for label in set(labels):
+                inclusive_counts[label] += count
+
+        lines = [
+            f"run: {self.run_key}",
+            f"samples: {total} (interval {self.interval * 1000:.1f} ms)",
+            "",
+            "self samples:",
+        ]
+        for label, count in self_counts.most_common(self.top_n):
+            lines.append(f"{count:8d} {count / total:7.1%}  {label}")
+        lines.extend(["", "inclusive samples:"])
+        for label, count in inclusive_counts.most_common(self.top_n):
+            lines.append(f"{count:8d} {count / total:7.1%}  {label}")
+        return "\n".join(lines) + "\n"
+
+    def write(self) -> List[str]:
+        """プロファイル結果を書き出し、作成したファイルのパスを返す。
+
+        `.collapsed` はflamegraph.plやspeedscopeで読み込める折り畳みスタック形式です。
+        """
+        run_dir = os.path.join(self.output_dir, _safe_name(self.run_key))
+        os.makedirs(run_dir, exist_ok=True)
+        prefix = os.path.join(run_dir, self.started_at.strftime("%Y%m%d%H%M%S%f"))
+
+        paths = []
+        memory_diff = self._memory_diff()
+        with self._lock:
+            samples = Counter(self.samples)
+        if samples:
+            with open(f"{prefix}.collapsed", "w", encoding="utf-8") as f:
+                for stack, count in samples.most_common():
+                    f.write(f"{stack} {count}\n")
+            paths.append(f"{prefix}.collapsed")
+
+            with open(f"{prefix}.txt", "w", encoding="utf-8") as f:
+                f.write(self._summary(samples))
+            paths.append(f"{prefix}.txt")
+
+        if memory_diff is not None:
+            with open(f"{prefix}.memory.txt", "w", encoding="utf-8") as f:
+                f.write(memory_diff)
+            paths.append(f"{prefix}.memory.txt")
+
+        _enforce_size_cap(self.output_dir, self.max_total_bytes)
+        return paths
+
+
+class _StackSampler:
+    """登録されたスレッドのスタックを一定間隔で採取する共有サンプラー。"""
+
+    def __init__(self) -> None:
+        """サンプラーを初期化。"""
+        self._targets: Dict[int, RunProfile] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def register(self, thread_id: int, profile: RunProfile) -> None:
+        """スレッドをサンプリング対象に追加（必要ならサンプラーを起動）。"""
+        with self._lock:
+            self._targets[thread_id] = profile
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="research-profiler", daemon=True
+                )
+                self._thread.start()
+
+    def unregister(self, thread_id: int, profile: RunProfile) -> None:
+        """スレッドをサンプリング対象から除外。"""
+        with self._lock:
+            if self._targets.get(thread_id) is profile:
+                del self._targets[thread_id]
+
+    def _run(self) -> None:
+        """対象が無くなるまでスタックを採取し続ける。"""
+        while True:
+            with self._lock:
+                targets = dict(self._targets)
+                if not targets:
+                    self._thread = None
+                    return
+            frames = sys._current_frames()
+            for thread_id, profile in targets.items():
+                frame = frames.get(thread_id)
+                if frame is not None:
+                    profile.add_sample(_collapse_stack(frame))
+            time.sleep(min(profile.interval for profile in targets.values()))
+
+
+_sampler = _StackSampler()
+
+
+def _safe_name(name: str) -> str:
+    """ファイル名として安全な文字列に変換。"""
+    return "".join(c if c.isalnum() or c in "-_" else "_" for c in name)
+
+
+_tracemalloc_users = 0
+_tracemalloc_started_here = False
+_tracemalloc_lock = threading.Lock()
+
+
+def _acquire_tracemalloc() -> None:
+    """tracemallocの利用を開始（他の用途で起動済みの場合はそれを利用）。"""
+    global _tracemalloc_users, _tracemalloc_started_here
+    with _tracemalloc_lock:
+        if _tracemalloc_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+            _tracemalloc_started_here = True
+        _tracemalloc_users += 1
+
+
+def _release_tracemalloc() -> None:
+    """tracemallocの利用を終了（最後の利用者で、自身が起動した場合のみ停止）。"""
+    global _tracemalloc_users, _tracemalloc_started_here
+    with _tracemalloc_lock:
+        _tracemalloc_users = max(0, _tracemalloc_users - 1)
+        if _tracemalloc_users == 0 and _tracemalloc_started_here:
+            tracemalloc.stop()
+            _tracemalloc_started_here = False
+
+
+def _enforce_size_cap(output_dir: str, max_total_bytes: int) -> None:
+    """出力ディレクトリの合計サイズが上限を超えた場合、古いファイルから削除。"""
+    files = []
+    for root, _, names in os.walk(output_dir):
+        for name in names:
+            path = os.path.join(root, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+
+    total = sum(size for _, size, _ in files)
+    for _, size, path in sorted(files):
+        if total <= max_total_bytes:
+            break
+        try:
+            os.remove(path)
+            total -= size
+        except OSError:
+            continue
+
+
+# 実行キーごとのプロファイル（サンプリング対象外の実行はNone）
+_runs: "OrderedDict[str, Optional[RunProfile]]" = OrderedDict()
+_runs_lock = threading.Lock()
+
+
+def _should_profile(config: Any, config_obj: Configuration) -> bool:
+    """実行をプロファイル対象にするか判定（明示指定またはサンプリング）。"""
+    configurable = (config or {}).get("configurable") or {}
+    if _is_truthy(configurable.get(PROFILE_HEADER)):
+        return True
+    if config_obj.profiling.profile_enabled:
+        return True
+    rate = config_obj.profiling.profile_sample_rate
+    return rate > 0 and random.random() < rate
+
+
+def _is_profiling_possible(config: Any) -> bool:
+    """プロファイリングが有効になり得るかを安価に判定。"""
+    configurable = (config or {}).get("configurable") or {}
+    if (
+        PROFILE_HEADER in configurable
+        or "profile_enabled" in configurable
+        or "profile_sample_rate" in configurable
+    ):
+        return True
+    default = Configuration.get_config().profiling
+    return default.profile_enabled or default.profile_sample_rate > 0
+
+
+def get_or_create_profile(
+    config: Any, fallback: Optional[str] = None
+) -> Optional[RunProfile]:
+    """実行がプロファイル対象の場合、対応するRunProfileを取得または作成。
+
+    サンプリングの判定は実行ごとに1回だけ行われます。`fallback` には状態の
+    `run_key` を渡し、スレッドの識別子が無い実行どうしを区別します。
+    """
+    if not _is_profiling_possible(config):
+        return None
+
+    run_key = get_run_key(config, fallback)
+    with _runs_lock:
+        if run_key in _runs:
+            return _runs[run_key]
+
+        config_obj = Configuration.get_config(config)
+        profile: Optional[RunProfile] = None
+        if _should_profile(config, config_obj):
+            settings = config_obj.profiling
+            profile = RunProfile(
+                run_key,
+                settings.profile_output_dir,
+                settings.profile_max_total_bytes,
+                settings.profile_memory,
+                settings.profile_top_n,
+                settings.profile_interval_seconds,
+            )
+        _runs[run_key] = profile
+        while len(_runs) > MAX_TRACKED_RUNS:
+            _, evicted = _runs.popitem(last=False)
+            if evicted is not None and evicted._memory_snapshot is not None:
+                _release_tracemalloc()
+        return profile
+
+
+def finish_profile(config: Any, fallback: Optional[str] = None) -> List[str]:
+    """実行のプロファイルを書き出し、追跡を終了。"""
+    run_key = get_run_key(config, fallback)
+    with _runs_lock:
+        if run_key not in _runs:
+            return []
+        profile = _runs.pop(run_key)
+    if profile is None:
+        return []
+    return profile.write()
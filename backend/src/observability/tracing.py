@@ -0,0 +1,231 @@
+"""研究実行ごとのトレースをChrome/Perfettoのtrace-event JSONとして出力"""
+
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional
+
+from src.config.configuration import Configuration
+
+# アクティブなトレースの最大保持数（異常終了した実行によるリークを防ぐ）
+MAX_ACTIVE_TRACES = 256
+
+# 現在のトレースとレーン（Chromeトレース上のtid）
+current_trace: ContextVar[Optional["RunTrace"]] = ContextVar(
+    "current_trace", default=None
+)
+current_lane: ContextVar[int] = ContextVar("current_lane", default=0)
+
+
+def get_run_key(config: Any, fallback: Optional[str] = None) -> str:
+    """RunnableConfigから実行を識別するキーを取得。
+
+    スレッドや実行の識別子が無い場合は `fallback`（状態の `run_key` など）を使い、
+    それも無い場合に限り "default" を返します。
+    """
+    configurable = (config or {}).get("configurable") or {}
+    metadata = (config or {}).get("metadata") or {}
+    run_key = (
+        configurable.get("thread_id")
+        or metadata.get("thread_id")
+        or metadata.get("run_id")
+        or fallback
+        or "default"
+    )
+    return str(run_key)
+
+
+class RunTrace:
+    """1回の研究実行のトレースイベントを蓄積するクラス。"""
+
+    def __init__(self, run_key: str, output_dir: str):
+        """トレースを初期化。"""
+        self.run_key = run_key
+        self.output_dir = output_dir
+        self.started_at = datetime.now()
+        self._origin = time.perf_counter()
+        self._events: List[Dict[str, Any]] = []
+        self._busy_lanes: set = set()
+        self._named_lanes: set = set()
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self._events.append(
+            {
+                "name": "process_name",
+                "ph": "M",
+                "pid": self._pid,
+                "tid": 0,
+                "args": {"name": f"research run {run_key}"},
+            }
+        )
+
+    def _timestamp_us(self, perf_time: float) -> float:
+        """perf_counterの値をトレース開始からのマイクロ秒に変換。"""
+        return round((perf_time - self._origin) * 1_000_000, 3)
+
+    def acquire_lane(self) -> int:
+        """空いている最小のレーン番号を確保。"""
+        with self._lock:
+            lane = 1
+            while lane in self._busy_lanes:
+                lane += 1
+            self._busy_lanes.add(lane)
+            if lane not in self._named_lanes:
+                self._named_lanes.add(lane)
+                self._events.append(
+                    {
+                        "name": "thread_name",
+                        "ph": "M",
+                        "pid": self._pid,
+                        "tid": lane,
+                        "args": {"name": f"lane {lane}"},
+                    }
+                )
+            return lane
+
+    def release_lane(self, lane: int) -> None:
+        """レーンを解放。"""
+        with self._lock:
+            self._busy_lanes.discard(lane)
+
+    def add_complete_event(
+        self,
+        name: str,
+        category: str,
+        start: float,
+        end: float,
+        lane: int,
+        args: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        """完了イベント（ph="X"）を追加。"""
+        event = {
+            "name": name,
+            "cat": category,
+            "ph": "X",
+            "ts": self._timestamp_us(start),
+            "dur": round((end - start) * 1_000_000, 3),
+            "pid": self._pid,
+            "tid": lane,
+            "args": args or {},
+        }
+        with self._lock:
+            self._events.append(event)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """trace-event形式の辞書を作成。"""
+        with self._lock:
+            events = list(self._events)
+        return {
+            "traceEvents": events,
+            "displayTimeUnit": "ms",
+            "metadata": {
+                "run_key": self.run_key,
+                "started_at": self.started_at.isoformat(),
+            },
+        }
+
+    def write(self) -> str:
+        """トレースをJSONファイルに書き出し、パスを返す。"""
+        os.makedirs(self.output_dir, exist_ok=True)
+        safe_key = "".join(c if c.isalnum() or c in "-_" else "_" for c in self.run_key)
+        filename = f"{safe_key}-{self.started_at.strftime('%Y%m%d%H%M%S%f')}.json"
+        path = os.path.join(self.output_dir, filename)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False)
+        return path
+
+
+_active_traces: "OrderedDict[str, RunTrace]" = OrderedDict()
+_active_lock = threading.Lock()
+
+
+def is_tracing_enabled(config: Any) -> bool:
+    """RunnableConfig（未指定時はデフォルト設定）でトレースが有効か判定。"""
+    configurable = (config or {}).get("configurable") or {}
+    if "trace_enabled" in configurable:
+        return bool(configurable["trace_enabled"])
+    return Configuration.get_config().tracing.trace_enabled
+
+
+def get_or_create_trace(
+    config: Any, fallback: Optional[str] = None
+) -> Optional[RunTrace]:
+    """トレースが有効な場合、実行に対応するRunTraceを取得または作成。
+
+    `fallback` には状態の `run_key` を渡し、スレッドの識別子が無い実行どうしが
+    同じトレースを共有しないようにします。
+    """
+    if not is_tracing_enabled(config):
+        return None
+
+    run_key = get_run_key(config, fallback)
+    with _active_lock:
+        trace = _active_traces.get(run_key)
+        if trace is None:
+            output_dir = Configuration.get_config(config).tracing.trace_output_dir
+            trace = RunTrace(run_key, output_dir)
+            _active_traces[run_key] = trace
+            while len(_active_traces) > MAX_ACTIVE_TRACES:
+                _active_traces.popitem(last=False)
+        return trace
+
+
+def finish_trace(trace: RunTrace) -> str:
+    """トレースを書き出してアクティブな一覧から除外。"""
+    with _active_lock:
+        if _active_traces.get(trace.run_key) is trace:
+            del _active_traces[trace.run_key]
+    return trace.write()
+
+
+@contextmanager
+def trace_span(
+    name: str, category: str, args: Optional[Dict[str, Any]] = None
+) -> Iterator[Dict[str, Any]]:
+    """現在のトレースにスパンを記録するコンテキストマネージャー。
+
+    トレースが無効な場合は何も記録しません。yieldされた辞書に値を追加すると
+    スパンの引数として記録されます。
+    """
+    span_args: Dict[str, Any] = dict(args or {})
+    trace = current_trace.get()
+    if trace is None:
+        yield span_args
+        return
+
+    lane = current_lane.get()
+    start = time.perf_counter()
+    try:
+        yield span_args
+    finally:
+        trace.add_complete_event(
+            name, category, start, time.perf_counter(), lane, span_args
+        )
+
+
+@contextmanager
+def node_span(trace: RunTrace, node_name: str, config: Any) -> Iterator[None]:
+    """ノード呼び出しを専用レーン上のスパンとして記録。"""
+    lane = trace.acquire_lane()
+    trace_token = current_trace.set(trace)
+    lane_token = current_lane.set(lane)
+    metadata = (config or {}).get("metadata") or {}
+    args: Dict[str, Any] = {"step": metadata.get("langgraph_step")}
+    start = time.perf_counter()
+    try:
+        yield
+    except BaseException as e:
+        args["error"] = repr(e)
+        raise
+    finally:
+        trace.add_complete_event(
+            node_name, "node", start, time.perf_counter(), lane, args
+        )
+        current_lane.reset(lane_token)
+        current_trace.reset(trace_token)
+        trace.release_lane(lane)
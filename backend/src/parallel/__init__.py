@@ -0,0 +1,26 @@
+"""Process-pool execution lane for CPU-heavy post-processing in the LangGraph agent."""
+
+from .pool import (
+    arun_in_process_pool,
+    configure_process_pool,
+    get_process_pool,
+    run_in_process_pool,
+    shutdown_process_pool,
+)
+from .shared_text import SharedTexts, SharedTextsHandle, TextSource, load_texts
+from .tasks import PreparedContent, prepare_search_contents, replace_citation_markers
+
+__all__ = [
+    "PreparedContent",
+    "SharedTexts",
+    "SharedTextsHandle",
+    "TextSource",
+    "arun_in_process_pool",
+    "configure_process_pool",
+    "get_process_pool",
+    "load_texts",
+    "prepare_search_contents",
+    "replace_citation_markers",
+    "run_in_process_pool",
+    "shutdown_process_pool",
+]
@@ -0,0 +1,120 @@
+"""CPU負荷の高い後処理を別プロセスで実行するプロセスプール（プロセス全体で共有）"""
+
+import asyncio
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, List, Optional, Sequence, Tuple, TypeVar
+
+from src.config.configuration import Configuration
+
+T = TypeVar("T")
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_configured = False
+_pool_lock = threading.Lock()
+
+
+def _create_pool(size: int) -> Optional[ProcessPoolExecutor]:
+    """指定サイズのプロセスプールを作成（0以下ならNone）。"""
+    if size <= 0:
+        return None
+    # スレッドを使うワーカープロセスからforkすると子プロセスがロックを引き継いで
+    # 固まることがあるため、spawnで起動する
+    return ProcessPoolExecutor(
+        max_workers=size, mp_context=multiprocessing.get_context("spawn")
+    )
+
+
+def _replace_pool(
+    pool: Optional[ProcessPoolExecutor], configured: bool = True
+) -> Optional[ProcessPoolExecutor]:
+    """共有のプロセスプールを差し替え、以前のプールを返す（ロック内で呼ぶ）。
+
+    `configured` がFalseなら次回の取得時にデフォルト設定から作り直します。
+    """
+    global _pool, _pool_configured
+    previous, _pool, _pool_configured = _pool, pool, configured
+    return previous
+
+
+def get_process_pool() -> Optional[ProcessPoolExecutor]:
+    """共有のプロセスプールを取得（初回はデフォルト設定から作成、無効ならNone）。
+
+    プールはプロセス全体で共有されるため、実行ごとの設定オーバーライドは
+    反映されません。
+    """
+    with _pool_lock:
+        if not _pool_configured:
+            size = Configuration.get_config().execution.cpu_pool_size
+            _replace_pool(_create_pool(size))
+        return _pool
+
+
+def configure_process_pool(size: int) -> Optional[ProcessPoolExecutor]:
+    """共有のプロセスプールを指定サイズで作り直す（0でプールを使わない）。"""
+    pool = _create_pool(size)
+    with _pool_lock:
+        previous = _replace_pool(pool)
+    if previous is not None:
+        previous.shutdown(wait=False, cancel_futures=True)
+    return pool
+
+
+def shutdown_process_pool() -> None:
+    """共有のプロセスプールを停止（次回利用時に設定から再作成）。"""
+    with _pool_lock:
+        previous = _replace_pool(None, configured=False)
+    if previous is not None:
+        previous.shutdown(wait=True)
+
+
+def _discard_broken_pool(pool: ProcessPoolExecutor) -> None:
+    """ワーカーが異常終了して使えなくなったプールを破棄（次回利用時に再作成）。"""
+    with _pool_lock:
+        if _pool is pool:
+            _replace_pool(None, configured=False)
+    pool.shutdown(wait=False)
+
+
+def _run_tasks(tasks: Sequence[Callable[[], T]]) -> List[T]:
+    """タスクを順にその場で実行。"""
+    return [task() for task in tasks]
+
+
+def run_in_process_pool(tasks: Sequence[Callable[[], T]]) -> Tuple[List[T], bool]:
+    """タスク（引数を束縛したモジュールレベルの関数）をプロセスプールで並列に実行。
+
+    結果をタスクの順に返し、プロセスプールで実行できたかも返します。
+    プールが無効な場合や、ワーカーの異常終了でプールが壊れた場合はその場で実行します。
+    """
+    pool = get_process_pool()
+    if pool is not None:
+        try:
+            futures = [pool.submit(task) for task in tasks]
+            return [future.result() for future in futures], True
+        except BrokenProcessPool:
+            _discard_broken_pool(pool)
+    return _run_tasks(tasks), False
+
+
+async def arun_in_process_pool(
+    tasks: Sequence[Callable[[], T]],
+) -> Tuple[List[T], bool]:
+    """`run_in_process_pool` の非同期版（イベントループを止めずに結果を待つ）。
+
+    プールが無効な場合や壊れた場合は、イベントループをふさがないようにスレッドで
+    実行します。
+    """
+    pool = get_process_pool()
+    if pool is not None:
+        loop = asyncio.get_running_loop()
+        try:
+            results = await asyncio.gather(
+                *(loop.run_in_executor(pool, task) for task in tasks)
+            )
+            return list(results), True
+        except BrokenProcessPool:
+            _discard_broken_pool(pool)
+    return await asyncio.to_thread(_run_tasks, tasks), False
@@ -0,0 +1,82 @@
+"""共有メモリによる大きなテキストのプロセス間受け渡し"""
+
+import sys
+from dataclasses import dataclass
+from multiprocessing.shared_memory import SharedMemory
+from typing import List, Optional, Sequence, Tuple, Union
+
+
+@dataclass(frozen=True)
+class SharedTextsHandle:
+    """共有メモリ上のテキスト群を子プロセスで読むためのハンドル（pickle可能）。"""
+
+    name: str
+    spans: Tuple[Tuple[int, int], ...]
+
+
+# タスクに渡すテキスト（プロセス内ではリスト、プロセス間では共有メモリのハンドル）
+TextSource = Union[Sequence[str], SharedTextsHandle]
+
+
+class SharedTexts:
+    """複数のテキストをUTF-8で1つの共有メモリにまとめて配置する。
+
+    ページ本文のような大きなテキストをpickleしてパイプ経由で送る代わりに、
+    子プロセスには名前と位置だけを渡し、子プロセスは共有メモリから直接デコードします。
+    作成したプロセスが `close` で解放します（コンテキストマネージャーとしても使えます）。
+    """
+
+    def __init__(self, texts: Sequence[str]):
+        """テキストを共有メモリに書き込む。"""
+        encoded = [text.encode("utf-8") for text in texts]
+        self._memory = SharedMemory(create=True, size=max(1, sum(map(len, encoded))))
+        spans = []
+        position = 0
+        for data in encoded:
+            self._memory.buf[position : position + len(data)] = data
+            spans.append((position, len(data)))
+            position += len(data)
+        self._spans = tuple(spans)
+
+    def handle(self, start: int = 0, stop: Optional[int] = None) -> SharedTextsHandle:
+        """`start` 番目から `stop` 番目の手前までのテキストのハンドルを作成。"""
+        return SharedTextsHandle(self._memory.name, self._spans[start:stop])
+
+    def close(self) -> None:
+        """共有メモリを解放。"""
+        self._memory.close()
+        self._memory.unlink()
+
+    def __enter__(self) -> "SharedTexts":
+        """コンテキストに入る。"""
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        """コンテキストを抜ける際に共有メモリを解放。"""
+        self.close()
+
+
+def _attach(name: str) -> SharedMemory:
+    """既存の共有メモリを開く（解放は作成したプロセスに任せる）。"""
+    if sys.version_info >= (3, 13):
+        return SharedMemory(name=name, track=False)
+    # 3.12以前は開くだけでリソーストラッカーに登録されるが、プールのワーカーは
+    # 作成元とトラッカーを共有するため、作成元の `unlink` で登録も取り消される
+    return SharedMemory(name=name)
+
+
+def load_texts(source: TextSource) -> List[str]:
+    """タスクに渡されたテキストを取得（共有メモリのハンドルならデコード）。"""
+    if not isinstance(source, SharedTextsHandle):
+        return list(source)
+    memory = _attach(source.name)
+    try:
+        buffer = memory.buf
+        texts = [
+            str(buffer[start : start + length], "utf-8")
+            for start, length in source.spans
+        ]
+        del buffer
+        return texts
+    finally:
+        memory.close()
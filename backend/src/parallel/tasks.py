@@ -0,0 +1,69 @@
+"""プロセスプールで実行するCPU負荷の高い後処理タスク
+
+いずれもモジュールレベルの純粋な関数で、その場でもプロセスプールでも同じ結果を返します。
+"""
+
+import re
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from src.retrieval import rank_passages, simhash
+
+from .shared_text import TextSource, load_texts
+
+# 検索結果ごとの (置き換えた本文（置き換えなければNone）, SimHash)
+PreparedContent = Tuple[Optional[str], Optional[int]]
+
+
+def prepare_search_contents(
+    raw_contents: TextSource,
+    contents: Sequence[str],
+    query: str,
+    topic: str = "",
+    top_k: int = 3,
+    max_chars: int = 600,
+    method: str = "bm25",
+    fingerprint: bool = False,
+) -> List[PreparedContent]:
+    """検索結果ごとに、プロンプトに使う本文とそのSimHashを計算。
+
+    `raw_contents` と `contents` は検索結果ごとのページ本文（無ければ空文字）と本文です。
+    ページ本文がある結果はクエリ・研究トピックに関連する上位パッセージを本文とし、
+    置き換えなかった結果の本文はNoneを返します。
+    `fingerprint` がFalseの場合、SimHashは計算せずNoneを返します。
+    """
+    prepared: List[PreparedContent] = []
+    for raw_content, content in zip(load_texts(raw_contents), contents):
+        passages = (
+            rank_passages(
+                raw_content,
+                query,
+                topic=topic,
+                top_k=top_k,
+                max_chars=max_chars,
+                method=method,
+            )
+            if raw_content
+            else []
+        )
+        replaced = "\n\n".join(passages) if passages else None
+        prepared.append(
+            (replaced, simhash(replaced or content) if fingerprint else None)
+        )
+    return prepared
+
+
+def replace_citation_markers(
+    text: str, citation_mapping: Dict[str, Tuple[str, str]]
+) -> str:
+    """テキスト内の引用マーカー（【1-1】形式）をマークダウンリンクに一括で置換。"""
+    markers = sorted(filter(None, citation_mapping), key=len, reverse=True)
+    if not markers:
+        return text
+    # 長いマーカーを先に照合し、1回の走査ですべてのマーカーを置換
+    pattern = re.compile("|".join(map(re.escape, markers)))
+
+    def link(match: "re.Match[str]") -> str:
+        title, url = citation_mapping[match.group(0)]
+        return f"[{title}]({url})"
+
+    return pattern.sub(link, text)
@@ -1,12 +1,22 @@
 """Prompt templates for the LangGraph agent."""
 
-from .answer import answer_instructions
-from .query import query_writer_instructions
-from .research import reflection_instructions, web_searcher_instructions
+from .answer import answer_instructions, compact_sources_note, draft_answer_note
+from .query import query_writer_instructions, sub_question_instructions
+from .research import (
+    follow_up_instructions,
+    reflection_instructions,
+    reflection_shard_note,
+    web_searcher_instructions,
+)
 
 __all__ = [
     "answer_instructions",
+    "compact_sources_note",
+    "draft_answer_note",
+    "follow_up_instructions",
     "query_writer_instructions", 
     "reflection_instructions",
+    "reflection_shard_note",
+    "sub_question_instructions",
     "web_searcher_instructions",
 ]
\ No newline at end of file
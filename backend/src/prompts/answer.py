@@ -25,4 +25,14 @@ answer_instructions = """提供された要約に基づいて、ユーザーの
 引用マーカー付き研究要約:
 {summaries}
 
-以下に、要約のマーカーを使用してすべての事実が適切に引用された包括的な回答を生成してください:"""
\ No newline at end of file
+以下に、要約のマーカーを使用してすべての事実が適切に引用された包括的な回答を生成してください:"""
+
+# 段階的な回答で、研究の途中に先に返す暫定回答のプロンプトの前に付ける指示
+draft_answer_note = """これは研究の途中でユーザーに先に示す暫定の回答です。ここまでに収集した要約だけに基づき、要点を簡潔にまとめてください。引用要件は以下の指示と同じです。
+
+"""
+
+# compact書式の検索結果の前に一度だけ付ける、書式と引用マーカーの説明
+compact_sources_note = """各ソースは「【マーカー】タイトル <URL>」の行と、それに続く本文で構成されています。引用時は各ソースの【マーカー】をそのまま使用してください。
+
+"""
\ No newline at end of file
@@ -25,4 +25,34 @@ query_writer_instructions = """あなたの目標は、洗練された多様な
 }}
 ```
 
-コンテキスト: {research_topic}"""
\ No newline at end of file
+コンテキスト: {research_topic}"""
+
+sub_question_instructions = """あなたの目標は、複数の部分からなる研究トピックを、それぞれ独立してウェブ検索で調べられるサブ質問に分解することです。各サブ質問は別々の研究担当者が並行して調べ、最後に結果をまとめて1つの回答にします。
+
+指示事項:
+- 現在の日付は {current_date} です。
+- {max_sub_questions}個を超えるサブ質問を生成しないでください。トピックが単純な場合は1つで構いません。
+- 各サブ質問は自己完結型で、他のサブ質問を読まなくても調べられるようにしてください。
+- 内容が重複するサブ質問を生成しないでください。
+- あるサブ質問が別のサブ質問の答えを知らないと調べられない場合だけ、"depends_on" にそのサブ質問の番号（1始まり、自分より前の番号のみ）を指定してください。それ以外は空のリストにしてください。
+
+フォーマット:
+- 回答を以下の2つの必須キーを持つJSONオブジェクトとしてフォーマットしてください:
+   - "rationale": この分解が研究トピックに適している理由の簡潔な説明
+   - "sub_questions": "question" と "depends_on" を持つオブジェクトのリスト
+
+例:
+
+トピック: 日本とドイツの再生可能エネルギーの導入率を比較し、差が生じた政策上の理由を説明して
+```json
+{{
+    "rationale": "両国の導入率は独立して調べられ、政策上の理由は両国の数値が分かってから比較する必要があります。",
+    "sub_questions": [
+        {{"question": "日本の再生可能エネルギーの導入率（2024年）", "depends_on": []}},
+        {{"question": "ドイツの再生可能エネルギーの導入率（2024年）", "depends_on": []}},
+        {{"question": "日本とドイツの再生可能エネルギー導入率の差の政策上の理由", "depends_on": [1, 2]}}
+    ]
+}}
+```
+
+コンテキスト: {research_topic}"""
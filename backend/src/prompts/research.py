@@ -43,4 +43,41 @@ reflection_instructions = """あなたは「{research_topic}」に関する要
 
 要約:
 {summaries}
-"""
\ No newline at end of file
+"""
+follow_up_instructions = """あなたは研究アシスタントです。ユーザーとの会話の続きとして新しい質問が届きました。これまでのターンで収集したソースのうち、新しい質問に関連するものが以下に示されています。
+
+指示事項:
+- 現在の日付は {current_date} です。
+- 収集済みのソースだけで新しい質問に十分に答えられるかを判断してください。
+- 十分な場合は "is_sufficient" を true とし、検索クエリは生成しないでください。
+- 不足している場合は、収集済みのソースでカバーされていない新しい観点だけを調べる検索クエリを {number_of_queries}個以内で生成してください。
+- 収集済みのソースで既にカバーされている内容を再び調べるクエリは生成しないでください。
+- 検索クエリは自己完結型で、ウェブ検索に必要なコンテキストを含むようにしてください。
+
+出力フォーマット:
+- 回答を以下の必須キーを持つJSONオブジェクトとしてフォーマットしてください:
+   - "is_sufficient": true または false
+   - "missing_aspects": 収集済みのソースでカバーされていない観点の説明（is_sufficient が true の場合は ""）
+   - "queries": カバーされていない観点を調べるための検索クエリのリスト（is_sufficient が true の場合は []）
+
+例:
+```json
+{{
+    "is_sufficient": false,
+    "missing_aspects": "収集済みのソースには導入コストの推移に関する情報がありません",
+    "queries": ["太陽光発電 導入コスト 推移 2024年"]
+}}
+```
+
+会話:
+{research_topic}
+
+新しい質問: {question}
+
+収集済みのソース:
+{summaries}
+"""
+
+reflection_shard_note = """以下は収集した要約を{shard_count}個に分けたうちの{shard}番目です。他の部分は別途分析されるため、この部分に含まれる情報だけで判断し、この部分の内容に関する知識のギャップだけを挙げてください。
+
+"""
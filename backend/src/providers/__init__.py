@@ -0,0 +1,82 @@
+"""Model and search providers for the LangGraph agent."""
+
+from .hedging import (
+    HedgeBudget,
+    LatencyTracker,
+    arun_hedged,
+    get_hedge_budget,
+    get_latency_tracker,
+    run_hedged,
+)
+from .limiter import (
+    AdaptiveLimiter,
+    LimiterSettings,
+    acall_with_limiter,
+    call_with_limiter,
+    configure_limiter,
+    get_limiter,
+    reset_limiters,
+)
+from .llm import (
+    LLM_PROVIDER,
+    ChatModelFactory,
+    ainvoke_chat_model,
+    ainvoke_chat_model_batch,
+    create_chat_model,
+    invoke_chat_model,
+    invoke_chat_model_batch,
+    set_chat_model_factory,
+)
+from .local_corpus import LocalCorpusSearchProvider
+from .search import (
+    SearchProvider,
+    SearchProviderFactory,
+    SearchResult,
+    get_search_provider,
+    register_search_provider,
+    unregister_search_provider,
+)
+from .structured_output import (
+    parse_structured_output,
+    repair_json,
+    with_repaired_structured_output,
+)
+from .tavily import TavilySearchProvider
+
+register_search_provider(TavilySearchProvider.name, TavilySearchProvider)
+register_search_provider(LocalCorpusSearchProvider.name, LocalCorpusSearchProvider)
+
+__all__ = [
+    "AdaptiveLimiter",
+    "ChatModelFactory",
+    "HedgeBudget",
+    "LLM_PROVIDER",
+    "LatencyTracker",
+    "LimiterSettings",
+    "LocalCorpusSearchProvider",
+    "SearchProvider",
+    "SearchProviderFactory",
+    "SearchResult",
+    "TavilySearchProvider",
+    "acall_with_limiter",
+    "ainvoke_chat_model",
+    "ainvoke_chat_model_batch",
+    "arun_hedged",
+    "call_with_limiter",
+    "configure_limiter",
+    "create_chat_model",
+    "get_hedge_budget",
+    "get_latency_tracker",
+    "get_limiter",
+    "get_search_provider",
+    "invoke_chat_model",
+    "invoke_chat_model_batch",
+    "parse_structured_output",
+    "register_search_provider",
+    "repair_json",
+    "reset_limiters",
+    "run_hedged",
+    "set_chat_model_factory",
+    "unregister_search_provider",
+    "with_repaired_structured_output",
+]
@@ -0,0 +1,216 @@
+"""検索呼び出しの締め切り制御とヘッジ（遅い呼び出しに対する追加リクエスト）"""
+
+import asyncio
+import contextvars
+import math
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Awaitable, Callable, Deque, Dict, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+# 締め切り・ヘッジ付きの呼び出しを実行するスレッド数の上限
+HEDGE_WORKERS = 64
+# パーセンタイル計算に使う直近のレイテンシ数
+LATENCY_WINDOW = 256
+# ヘッジに使えるクレジットの上限（短時間に集中して追加呼び出しが出るのを防ぐ）
+HEDGE_CREDIT_BURST = 10.0
+
+_executor = ThreadPoolExecutor(max_workers=HEDGE_WORKERS, thread_name_prefix="hedge")
+
+
+class LatencyTracker:
+    """直近の呼び出しレイテンシを保持し、パーセンタイルを計算するクラス。"""
+
+    def __init__(self, window: int = LATENCY_WINDOW):
+        """トラッカーを初期化。"""
+        self._samples: Deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float) -> None:
+        """レイテンシを記録。"""
+        with self._lock:
+            self._samples.append(seconds)
+
+    def quantile(self, q: float, min_samples: int = 1) -> Optional[float]:
+        """パーセンタイルを計算（サンプルが足りない場合はNone）。"""
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples or len(samples) < min_samples:
+            return None
+        index = min(len(samples) - 1, max(0, math.ceil(q * len(samples)) - 1))
+        return samples[index]
+
+
+class HedgeBudget:
+    """ヘッジによる追加呼び出しを一次呼び出しの一定割合に制限するクレジット。
+
+    一次呼び出しごとに `max_extra_ratio` ずつクレジットが貯まり、
+    ヘッジ1回につき1クレジットを消費します。
+    """
+
+    def __init__(self, max_extra_ratio: float):
+        """クレジットを初期化。"""
+        self.max_extra_ratio = max_extra_ratio
+        self._credits = 0.0
+        self._lock = threading.Lock()
+
+    def record_primary(self) -> None:
+        """一次呼び出しを記録してクレジットを加算。"""
+        with self._lock:
+            self._credits = min(
+                HEDGE_CREDIT_BURST, self._credits + self.max_extra_ratio
+            )
+
+    def try_spend(self) -> bool:
+        """クレジットがあれば1消費してTrueを返す。"""
+        with self._lock:
+            if self._credits < 1.0:
+                return False
+            self._credits -= 1.0
+            return True
+
+
+_trackers: Dict[str, LatencyTracker] = {}
+_budgets: Dict[str, HedgeBudget] = {}
+_registry_lock = threading.Lock()
+
+
+def get_latency_tracker(key: str) -> LatencyTracker:
+    """キー（プロバイダー名と検索深度など）ごとのレイテンシトラッカーを取得。"""
+    with _registry_lock:
+        tracker = _trackers.get(key)
+        if tracker is None:
+            tracker = _trackers[key] = LatencyTracker()
+        return tracker
+
+
+def get_hedge_budget(key: str, max_extra_ratio: float) -> HedgeBudget:
+    """キーごとのヘッジ用クレジットを取得（割合は最新の設定で更新）。"""
+    with _registry_lock:
+        budget = _budgets.get(key)
+        if budget is None:
+            budget = _budgets[key] = HedgeBudget(max_extra_ratio)
+        budget.max_extra_ratio = max_extra_ratio
+        return budget
+
+
+def _always_hedge() -> bool:
+    """ヘッジの可否を判定しない場合の既定値（常に送る）。"""
+    return True
+
+
+def _submit(
+    func: Callable[[], T], started: Optional[threading.Event] = None
+) -> "Future[T]":
+    """呼び出し元のコンテキスト（計測用のContextVar）を引き継いでスレッドで実行。
+
+    `started` を渡すと、スレッドで実行が始まった時点でセットします。
+    """
+
+    def run() -> T:
+        if started is not None:
+            started.set()
+        return func()
+
+    return _executor.submit(contextvars.copy_context().run, run)
+
+
+def run_hedged(
+    primary: Callable[[], T],
+    timeout: Optional[float] = None,
+    hedge: Optional[Callable[[], T]] = None,
+    hedge_delay: Optional[float] = None,
+    allow_hedge: Callable[[], bool] = _always_hedge,
+) -> Tuple[T, bool]:
+    """締め切りとヘッジ付きで呼び出しを実行し、(結果, ヘッジが勝ったか) を返す。
+
+    `hedge_delay` 秒以内に一次呼び出しが終わらず `allow_hedge()` が真なら
+    `hedge` を追加で発行し、先に成功した方の結果を採用します。
+    `timeout` 秒を過ぎると TimeoutError を送出します。締め切りとヘッジまでの待ち時間は
+    一次呼び出しがスレッドで実行され始めた時点から数えます（スレッドの空き待ちは含めません）。
+    採用されなかった呼び出しは開始前ならキャンセルされ、実行中なら結果が破棄されます。
+    """
+    started = threading.Event()
+    pending: Dict["Future[T]", bool] = {_submit(primary, started): False}
+    started.wait()
+    start = time.monotonic()
+    deadline = None if timeout is None else start + timeout
+    hedge_at = None if hedge is None or hedge_delay is None else start + hedge_delay
+    error: Optional[BaseException] = None
+    try:
+        while pending:
+            waits = [
+                t - time.monotonic() for t in (deadline, hedge_at) if t is not None
+            ]
+            done, _ = wait(
+                pending,
+                timeout=max(0.0, min(waits)) if waits else None,
+                return_when=FIRST_COMPLETED,
+            )
+            for future in done:
+                is_hedge = pending.pop(future)
+                if future.exception() is None:
+                    return future.result(), is_hedge
+                error = future.exception()
+
+            now = time.monotonic()
+            if deadline is not None and now >= deadline and pending:
+                raise TimeoutError("search deadline exceeded")
+            if hedge_at is not None and now >= hedge_at and pending:
+                hedge_at = None
+                if allow_hedge():
+                    pending[_submit(hedge)] = True  # type: ignore[arg-type]
+        assert error is not None
+        raise error
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+async def arun_hedged(
+    primary: Callable[[], Awaitable[T]],
+    timeout: Optional[float] = None,
+    hedge: Optional[Callable[[], Awaitable[T]]] = None,
+    hedge_delay: Optional[float] = None,
+    allow_hedge: Callable[[], bool] = _always_hedge,
+) -> Tuple[T, bool]:
+    """`run_hedged` の非同期版。呼び出しはスレッドを使わずタスクとして実行します。
+
+    採用されなかった呼び出しは実行中でもキャンセルされます。
+    """
+    start = time.monotonic()
+    deadline = None if timeout is None else start + timeout
+    hedge_at = None if hedge is None or hedge_delay is None else start + hedge_delay
+    pending: Dict["asyncio.Future[T]", bool] = {asyncio.ensure_future(primary()): False}
+    error: Optional[BaseException] = None
+    try:
+        while pending:
+            waits = [
+                t - time.monotonic() for t in (deadline, hedge_at) if t is not None
+            ]
+            done, _ = await asyncio.wait(
+                pending,
+                timeout=max(0.0, min(waits)) if waits else None,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            for task in done:
+                is_hedge = pending.pop(task)
+                if task.exception() is None:
+                    return task.result(), is_hedge
+                error = task.exception()
+
+            now = time.monotonic()
+            if deadline is not None and now >= deadline and pending:
+                raise TimeoutError("search deadline exceeded")
+            if hedge_at is not None and now >= hedge_at and pending:
+                hedge_at = None
+                if allow_hedge():
+                    pending[asyncio.ensure_future(hedge())] = True  # type: ignore[misc]
+        assert error is not None
+        raise error
+    finally:
+        for task in pending:
+            task.cancel()
@@ -0,0 +1,338 @@
+"""プロバイダー呼び出しの適応的な同時実行制限（AIMD）・レート制限・バックオフ"""
+
+import asyncio
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+
+from src.config.configuration import Configuration, RateLimitConfig
+from src.observability.metrics import (
+    PROVIDER_CALL,
+    PROVIDER_CONCURRENCY_LIMIT,
+    PROVIDER_IN_FLIGHT,
+    PROVIDER_QUEUED,
+    PROVIDER_RETRIES,
+    PROVIDER_THROTTLED,
+)
+
+T = TypeVar("T")
+
+# 混雑を示すHTTPステータス（同時実行数を減らす）
+THROTTLE_STATUS_CODES = frozenset({429, 503})
+# 同時実行数の空きを待つ際のポーリング間隔（秒）
+CONCURRENCY_POLL_SECONDS = 0.05
+
+
+@dataclass(frozen=True)
+class LimiterSettings:
+    """1プロバイダー分のリミッター設定。"""
+
+    max_concurrency: int
+    requests_per_second: float = 0.0
+    burst: int = 1
+    min_concurrency: int = 1
+    decrease_factor: float = 0.5
+    max_attempts: int = 5
+    backoff_base_seconds: float = 0.5
+    backoff_max_seconds: float = 30.0
+
+
+def _status_code(error: BaseException) -> Optional[int]:
+    """例外（またはそのレスポンス）からHTTPステータスコードを取得。"""
+    for obj in (error, getattr(error, "response", None)):
+        code = getattr(obj, "status_code", None)
+        if isinstance(code, int):
+            return code
+    return None
+
+
+def is_throttle_error(error: BaseException) -> bool:
+    """レート制限・過負荷・タイムアウトを示す例外かを判定。"""
+    if _status_code(error) in THROTTLE_STATUS_CODES:
+        return True
+    return isinstance(error, TimeoutError) or "Timeout" in type(error).__name__
+
+
+def is_retryable_error(error: BaseException) -> bool:
+    """再試行すべき一時的な例外かを判定。"""
+    if is_throttle_error(error):
+        return True
+    code = _status_code(error)
+    if code is not None:
+        return code >= 500
+    return isinstance(error, ConnectionError) or "Connection" in type(error).__name__
+
+
+def _retry_after(error: BaseException) -> Optional[float]:
+    """レスポンスの Retry-After ヘッダー（秒）を取得。"""
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if not headers:
+        return None
+    try:
+        return max(0.0, float(headers.get("retry-after")))
+    except (TypeError, ValueError):
+        return None
+
+
+class AdaptiveLimiter:
+    """1プロバイダーへの呼び出しを制御するリミッター。
+
+    - 同時実行数: 成功ごとに 1/limit ずつ増やし、429/503/タイムアウトで
+      `decrease_factor` 倍に減らす（AIMD）。同じ混雑で同時に失敗した呼び出しに
+      よって何度も減らさないよう、前回の減少後に開始した呼び出しの失敗のみ反映
+    - レート: トークンバケット（`requests_per_second` / `burst`）
+    - 再試行: Retry-After があればそれに従い、なければフルジッター付き指数バックオフ
+    """
+
+    def __init__(self, name: str, settings: LimiterSettings):
+        """リミッターを初期化。"""
+        self.name = name
+        self.settings = settings
+        self.limit = float(settings.max_concurrency)
+        self.in_flight = 0
+        self._tokens = float(settings.burst)
+        self._last_refill = time.monotonic()
+        self._last_decrease = float("-inf")
+        self._blocked_until = 0.0
+        self._condition = threading.Condition()
+        PROVIDER_CONCURRENCY_LIMIT.set(self.limit, name)
+
+    def _try_acquire(self, now: float) -> Optional[float]:
+        """枠を確保できればNone、できなければ再確認までの待ち時間を返す（ロック内で呼ぶ）。"""
+        if now < self._blocked_until:
+            return self._blocked_until - now
+        if self.in_flight >= max(1, int(self.limit)):
+            return CONCURRENCY_POLL_SECONDS
+
+        rate = self.settings.requests_per_second
+        if rate > 0:
+            elapsed = now - self._last_refill
+            self._tokens = min(
+                float(self.settings.burst), self._tokens + elapsed * rate
+            )
+            self._last_refill = now
+            if self._tokens < 1.0:
+                return (1.0 - self._tokens) / rate
+            self._tokens -= 1.0
+
+        self.in_flight += 1
+        PROVIDER_IN_FLIGHT.set(self.in_flight, self.name)
+        return None
+
+    def acquire(self) -> float:
+        """呼び出し枠を確保するまで待機し、待機時間を返す。"""
+        start = time.monotonic()
+        with self._condition:
+            while True:
+                wait = self._try_acquire(time.monotonic())
+                if wait is None:
+                    break
+                self._condition.wait(wait)
+        queued = time.monotonic() - start
+        PROVIDER_QUEUED.observe(queued, self.name)
+        return queued
+
+    async def aacquire(self) -> float:
+        """呼び出し枠を確保するまで非同期に待機し、待機時間を返す。"""
+        start = time.monotonic()
+        while True:
+            with self._condition:
+                wait = self._try_acquire(time.monotonic())
+            if wait is None:
+                break
+            await asyncio.sleep(wait)
+        queued = time.monotonic() - start
+        PROVIDER_QUEUED.observe(queued, self.name)
+        return queued
+
+    def release(
+        self,
+        started: float,
+        error: Optional[BaseException] = None,
+        cancelled: bool = False,
+    ) -> None:
+        """呼び出し枠を解放し、結果に応じて同時実行数を調整。
+
+        キャンセルされた呼び出し（ヘッジの負けやタイムアウト）は成功・失敗のどちらでも
+        ないため、枠を返すだけで同時実行数は調整しません。
+        """
+        now = time.monotonic()
+        throttled = error is not None and is_throttle_error(error)
+        if cancelled:
+            outcome = "cancelled"
+        else:
+            outcome = (
+                "success" if error is None else "throttled" if throttled else "error"
+            )
+        PROVIDER_CALL.observe(now - started, self.name, outcome)
+
+        with self._condition:
+            self.in_flight -= 1
+            if outcome == "success":
+                self.limit = min(
+                    float(self.settings.max_concurrency),
+                    self.limit + 1.0 / max(self.limit, 1.0),
+                )
+            elif throttled:
+                PROVIDER_THROTTLED.inc(self.name)
+                if started >= self._last_decrease:
+                    self.limit = max(
+                        float(self.settings.min_concurrency),
+                        self.limit * self.settings.decrease_factor,
+                    )
+                    self._last_decrease = now
+                retry_after = _retry_after(error)  # type: ignore[arg-type]
+                if retry_after:
+                    self._blocked_until = max(self._blocked_until, now + retry_after)
+            PROVIDER_CONCURRENCY_LIMIT.set(self.limit, self.name)
+            PROVIDER_IN_FLIGHT.set(self.in_flight, self.name)
+            self._condition.notify_all()
+
+    def backoff_delay(self, attempt: int, error: BaseException) -> float:
+        """再試行までの待ち時間を計算。"""
+        retry_after = _retry_after(error)
+        if retry_after is not None:
+            return min(retry_after, self.settings.backoff_max_seconds)
+        ceiling = self.settings.backoff_base_seconds * (2**attempt)
+        return random.uniform(0.0, min(self.settings.backoff_max_seconds, ceiling))
+
+    def _should_retry(self, attempt: int, attempts: int, error: BaseException) -> bool:
+        """再試行するかを判定し、する場合は再試行数を記録。"""
+        if attempt + 1 >= attempts or not is_retryable_error(error):
+            return False
+        PROVIDER_RETRIES.inc(self.name)
+        return True
+
+    def call(
+        self,
+        func: Callable[..., T],
+        *args: Any,
+        max_attempts: Optional[int] = None,
+        **kwargs: Any,
+    ) -> T:
+        """リミッター経由で関数を呼び出し、一時的なエラーはバックオフして再試行。"""
+        attempts = max(1, max_attempts or self.settings.max_attempts)
+        attempt = 0
+        while True:
+            self.acquire()
+            started = time.monotonic()
+            finished = False
+            error: Optional[Exception] = None
+            try:
+                result = func(*args, **kwargs)
+                finished = True
+            except Exception as e:
+                error = e
+                finished = True
+            finally:
+                # 例外以外（KeyboardInterruptなど）で中断された場合も枠を返す
+                self.release(started, error, cancelled=not finished)
+            if error is None:
+                return result
+            if not self._should_retry(attempt, attempts, error):
+                raise error
+            time.sleep(self.backoff_delay(attempt, error))
+            attempt += 1
+
+    async def acall(
+        self,
+        func: Callable[..., Awaitable[T]],
+        *args: Any,
+        max_attempts: Optional[int] = None,
+        **kwargs: Any,
+    ) -> T:
+        """リミッター経由でコルーチン関数を呼び出し、一時的なエラーはバックオフして再試行。"""
+        attempts = max(1, max_attempts or self.settings.max_attempts)
+        attempt = 0
+        while True:
+            await self.aacquire()
+            started = time.monotonic()
+            finished = False
+            error: Optional[Exception] = None
+            try:
+                result = await func(*args, **kwargs)
+                finished = True
+            except Exception as e:
+                error = e
+                finished = True
+            finally:
+                # キャンセル（CancelledError）された場合も枠を返す
+                self.release(started, error, cancelled=not finished)
+            if error is None:
+                return result
+            if not self._should_retry(attempt, attempts, error):
+                raise error
+            await asyncio.sleep(self.backoff_delay(attempt, error))
+            attempt += 1
+
+
+def limiter_settings(name: str, config: RateLimitConfig) -> Optional[LimiterSettings]:
+    """設定からプロバイダーのリミッター設定を作成（制限しない場合はNone）。"""
+    max_concurrency = getattr(config, f"{name}_max_concurrency", 0)
+    if max_concurrency <= 0:
+        return None
+    return LimiterSettings(
+        max_concurrency=max_concurrency,
+        requests_per_second=getattr(config, f"{name}_requests_per_second", 0.0),
+        burst=max(1, getattr(config, f"{name}_burst", max_concurrency)),
+        min_concurrency=config.limiter_min_concurrency,
+        decrease_factor=config.limiter_decrease_factor,
+        max_attempts=config.limiter_max_attempts,
+        backoff_base_seconds=config.limiter_backoff_base_seconds,
+        backoff_max_seconds=config.limiter_backoff_max_seconds,
+    )
+
+
+_limiters: Dict[str, Optional[AdaptiveLimiter]] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(name: str) -> Optional[AdaptiveLimiter]:
+    """プロバイダーのリミッターを取得（初回はデフォルト設定から作成）。
+
+    リミッターはプロセス全体で共有されるため、実行ごとの設定オーバーライドは
+    反映されません。
+    """
+    with _limiters_lock:
+        if name not in _limiters:
+            settings = limiter_settings(name, Configuration.get_config().rate_limit)
+            _limiters[name] = AdaptiveLimiter(name, settings) if settings else None
+        return _limiters[name]
+
+
+def configure_limiter(
+    name: str, settings: Optional[LimiterSettings]
+) -> Optional[AdaptiveLimiter]:
+    """プロバイダーのリミッターを明示的な設定で作り直す（Noneで制限なし）。"""
+    limiter = AdaptiveLimiter(name, settings) if settings else None
+    with _limiters_lock:
+        _limiters[name] = limiter
+    return limiter
+
+
+def reset_limiters() -> None:
+    """全てのリミッターを破棄（次回利用時に設定から再作成）。"""
+    with _limiters_lock:
+        _limiters.clear()
+
+
+def call_with_limiter(
+    name: str, func: Callable[..., T], *args: Any, **kwargs: Any
+) -> T:
+    """プロバイダーのリミッター経由で関数を呼び出す（制限なしなら直接呼び出す）。"""
+    limiter = get_limiter(name)
+    if limiter is None:
+        return func(*args, **kwargs)
+    return limiter.call(func, *args, **kwargs)
+
+
+async def acall_with_limiter(
+    name: str, func: Callable[..., Awaitable[T]], *args: Any, **kwargs: Any
+) -> T:
+    """プロバイダーのリミッター経由でコルーチン関数を呼び出す。"""
+    limiter = get_limiter(name)
+    if limiter is None:
+        return await func(*args, **kwargs)
+    return await limiter.acall(func, *args, **kwargs)
@@ -0,0 +1,124 @@
+"""チャットモデルの生成"""
+
+import asyncio
+import contextvars
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+
+from dotenv import load_dotenv
+from langchain_core.callbacks import UsageMetadataCallbackHandler
+from langchain_core.language_models import BaseChatModel
+from langchain_core.runnables import Runnable
+from langchain_openai import ChatOpenAI
+from pydantic import SecretStr
+
+from src.observability import llm_usage_callback
+
+from .limiter import acall_with_limiter, call_with_limiter, get_limiter
+
+load_dotenv()
+
+# LLM呼び出しのリミッター名
+LLM_PROVIDER = "openai"
+
+# (model, temperature, max_retries) からチャットモデルを生成するファクトリ
+ChatModelFactory = Callable[[str, float, int], BaseChatModel]
+
+_chat_model_factory: Optional[ChatModelFactory] = None
+
+
+def set_chat_model_factory(factory: Optional[ChatModelFactory]) -> None:
+    """チャットモデルのファクトリを差し替え（Noneでデフォルトに戻す）。
+
+    ベンチマークやオフライン実行でフェイクモデルを注入するために使用します。
+    """
+    global _chat_model_factory
+    _chat_model_factory = factory
+
+
+def create_chat_model(
+    model: str, temperature: float, max_retries: int
+) -> BaseChatModel:
+    """チャットモデルを生成（計測用コールバック付き）。
+
+    OpenAI用のリミッターが有効な場合は再試行をリミッターに任せるため、
+    クライアント自体の再試行は無効にします。
+    """
+    if _chat_model_factory is not None:
+        chat_model = _chat_model_factory(model, temperature, max_retries)
+        callbacks = list(chat_model.callbacks or [])  # type: ignore[arg-type]
+        if llm_usage_callback not in callbacks:
+            chat_model.callbacks = [*callbacks, llm_usage_callback]
+        return chat_model
+
+    api_key = os.getenv("OPENAI_API_KEY")
+    return ChatOpenAI(
+        model=model,
+        temperature=temperature,
+        max_retries=0 if get_limiter(LLM_PROVIDER) else max_retries,
+        api_key=SecretStr(api_key) if api_key else None,
+        callbacks=[llm_usage_callback],
+    )
+
+
+def invoke_chat_model(runnable: Runnable, input: Any) -> Tuple[Any, int]:
+    """チャットモデル（または構造化出力のチェーン）をリミッター経由で呼び出す。
+
+    結果と、再試行分を含めて消費した合計トークン数を返します。
+    """
+    usage = UsageMetadataCallbackHandler()
+    result = call_with_limiter(
+        LLM_PROVIDER, runnable.invoke, input, config={"callbacks": [usage]}
+    )
+    tokens = sum(
+        metadata.get("total_tokens", 0) for metadata in usage.usage_metadata.values()
+    )
+    return result, tokens
+
+
+async def ainvoke_chat_model(runnable: Runnable, input: Any) -> Tuple[Any, int]:
+    """`invoke_chat_model` の非同期版（`ainvoke` でイベントループ上で呼び出す）。"""
+    usage = UsageMetadataCallbackHandler()
+    # 同期コールバックは既定でスレッドプールに移されるため、その場で呼び出させる
+    usage.run_inline = True
+    result = await acall_with_limiter(
+        LLM_PROVIDER, runnable.ainvoke, input, config={"callbacks": [usage]}
+    )
+    tokens = sum(
+        metadata.get("total_tokens", 0) for metadata in usage.usage_metadata.values()
+    )
+    return result, tokens
+
+
+def invoke_chat_model_batch(
+    runnable: Runnable, inputs: Sequence[Any]
+) -> Tuple[List[Any], int]:
+    """複数の入力で `invoke_chat_model` をスレッドで並行に呼び出す。
+
+    結果を入力の順に、消費した合計トークン数と一緒に返します。
+    同時実行数はプロバイダーのリミッターで制御されます。
+    """
+    if len(inputs) <= 1:
+        results = [invoke_chat_model(runnable, input) for input in inputs]
+    else:
+        # 実行中のノード名やトレースを引き継ぐため、呼び出し元のコンテキストで実行する
+        with ThreadPoolExecutor(max_workers=len(inputs)) as executor:
+            futures = [
+                executor.submit(
+                    contextvars.copy_context().run, invoke_chat_model, runnable, input
+                )
+                for input in inputs
+            ]
+            results = [future.result() for future in futures]
+    return [result for result, _ in results], sum(tokens for _, tokens in results)
+
+
+async def ainvoke_chat_model_batch(
+    runnable: Runnable, inputs: Sequence[Any]
+) -> Tuple[List[Any], int]:
+    """`invoke_chat_model_batch` の非同期版（イベントループ上で並行に待つ）。"""
+    results = await asyncio.gather(
+        *(ainvoke_chat_model(runnable, input) for input in inputs)
+    )
+    return [result for result, _ in results], sum(tokens for _, tokens in results)
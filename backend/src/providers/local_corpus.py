@@ -0,0 +1,195 @@
+"""ローカル文書コーパスを検索するプロバイダー"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Set, Tuple
+
+from src.config.configuration import SearchConfig
+from src.retrieval import BM25Index, tokenize
+
+from .search import SearchProvider, SearchResult
+
+TEXT_SUFFIXES = {".txt", ".md"}
+JSONL_SUFFIXES = {".jsonl"}
+
+
+class _CachedIndex(NamedTuple):
+    """プロセス内にキャッシュしたインデックスと、コーパスの変更を最後に確認した時刻。"""
+
+    signature: Tuple[int, int, float]
+    index: BM25Index
+    checked_at: float
+
+
+_index_cache: Dict[str, _CachedIndex] = {}
+_index_lock = threading.Lock()
+
+
+def _corpus_files(root: Path) -> List[Path]:
+    """コーパス内の対象ファイルを列挙。"""
+    return sorted(
+        path
+        for path in root.rglob("*")
+        if path.is_file() and path.suffix.lower() in TEXT_SUFFIXES | JSONL_SUFFIXES
+    )
+
+
+def _corpus_signature(files: List[Path]) -> Tuple[int, int, float]:
+    """ファイル数・合計サイズ・最終更新時刻からコーパスの変更検知用シグネチャを作成。"""
+    stats = [path.stat() for path in files]
+    return (
+        len(stats),
+        sum(stat.st_size for stat in stats),
+        max((stat.st_mtime for stat in stats), default=0.0),
+    )
+
+
+def _iter_documents(path: Path) -> Iterator[Dict[str, Any]]:
+    """ファイルから文書（url, title, content）を読み出す。"""
+    if path.suffix.lower() in JSONL_SUFFIXES:
+        with path.open(encoding="utf-8") as f:
+            for line_number, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                content = record.get("content") or record.get("text") or ""
+                yield {
+                    "url": record.get("url")
+                    or f"{path.resolve().as_uri()}#L{line_number}",
+                    "title": record.get("title") or path.stem,
+                    "content": content,
+                }
+        return
+
+    content = path.read_text(encoding="utf-8")
+    first_line = next((line for line in content.splitlines() if line.strip()), "")
+    yield {
+        "url": path.resolve().as_uri(),
+        "title": first_line.lstrip("#").strip() or path.stem,
+        "content": content,
+    }
+
+
+def build_corpus_index(
+    corpus_path: str, files: Optional[List[Path]] = None
+) -> BM25Index:
+    """コーパスディレクトリの全文書からインデックスを構築（`files` は列挙済みのファイル）。"""
+    index = BM25Index()
+    for path in files if files is not None else _corpus_files(Path(corpus_path)):
+        for document in _iter_documents(path):
+            index.add(f"{document['title']}\n{document['content']}", document)
+    return index
+
+
+def _index_path(root: Path, index_dir: str) -> Path:
+    """コーパスごとのインデックスファイルのパス（キャッシュディレクトリ内）。"""
+    digest = hashlib.sha1(str(root).encode("utf-8")).hexdigest()[:16]
+    return Path(index_dir) / f"{root.name}-{digest}.json"
+
+
+def load_corpus_index(
+    corpus_path: str, index_dir: str, check_seconds: float = 0.0
+) -> BM25Index:
+    """コーパスのインデックスを取得（プロセス内・ディスク上のキャッシュを利用）。
+
+    プロセス内のインデックスは `check_seconds` 秒ごとにだけコーパスの変更を確認し、
+    その間はファイルを走査せずに返します。変更があれば、`index_dir` に保存した
+    インデックスを読み込むか、再構築して保存します（コーパスのディレクトリには書き込みません）。
+    """
+    root = Path(corpus_path).resolve()
+    key = str(root)
+    now = time.monotonic()
+    with _index_lock:
+        cached = _index_cache.get(key)
+        if cached is not None and now - cached.checked_at < check_seconds:
+            return cached.index
+
+    if not root.is_dir():
+        raise ValueError(f"ローカルコーパスが見つかりません: {root}")
+    files = _corpus_files(root)
+    signature = _corpus_signature(files)
+    with _index_lock:
+        cached = _index_cache.get(key)
+        if cached is not None and cached.signature == signature:
+            _index_cache[key] = cached._replace(checked_at=now)
+            return cached.index
+
+        index_path = _index_path(root, index_dir)
+        index = None
+        if index_path.is_file():
+            with index_path.open(encoding="utf-8") as f:
+                saved_signature = tuple(json.load(f).get("signature", ()))
+            if saved_signature == signature:
+                index = BM25Index.load(str(index_path))
+        if index is None:
+            index = build_corpus_index(str(root), files)
+            index.save(str(index_path))
+            _write_signature(index_path, signature)
+
+        _index_cache[key] = _CachedIndex(signature, index, now)
+        return index
+
+
+def _write_signature(index_path: Path, signature: Tuple[int, int, float]) -> None:
+    """保存済みインデックスにコーパスのシグネチャを記録。"""
+    with index_path.open(encoding="utf-8") as f:
+        payload = json.load(f)
+    payload["signature"] = list(signature)
+    tmp_path = index_path.with_suffix(".tmp")
+    with tmp_path.open("w", encoding="utf-8") as f:
+        json.dump(payload, f, ensure_ascii=False)
+    os.replace(tmp_path, index_path)
+
+
+def best_snippet(content: str, query_terms: Set[str], max_chars: int) -> str:
+    """クエリ語を最も多く含む段落を抜粋として返す。"""
+    paragraphs = [p.strip() for p in content.split("\n\n") if p.strip()] or [content]
+    best = max(
+        paragraphs,
+        key=lambda paragraph: len(query_terms.intersection(tokenize(paragraph))),
+    )
+    return best if len(best) <= max_chars else best[: max_chars - 1] + "…"
+
+
+class LocalCorpusSearchProvider(SearchProvider):
+    """ディスク上の文書コーパスをBM25転置インデックスで検索するプロバイダー。
+
+    `local_corpus_path` 配下の `.txt` / `.md`（1ファイル1文書）と
+    `.jsonl`（1行1文書、`url` / `title` / `content` キー）を対象にします。
+    """
+
+    name = "local"
+
+    def __init__(self, config: SearchConfig):
+        """コーパスのインデックスを取得（通常はプロセス内のキャッシュから返る）。"""
+        super().__init__(config)
+        self.index = load_corpus_index(
+            config.local_corpus_path,
+            config.local_index_dir,
+            config.local_index_check_seconds,
+        )
+
+    def search(self, query: str) -> List[SearchResult]:
+        """ローカルコーパスを検索。"""
+        query_terms = set(tokenize(query))
+        results = []
+        for score, doc_id in self.index.search(query, self.config.max_results):
+            document = self.index.documents[doc_id]
+            result = {
+                "url": document["url"],
+                "title": document["title"],
+                "content": best_snippet(
+                    document["content"],
+                    query_terms,
+                    self.config.local_snippet_chars,
+                ),
+                "score": score,
+            }
+            if self.config.include_raw_content:
+                result["raw_content"] = document["content"]
+            results.append(result)
+        return results
@@ -0,0 +1,59 @@
+"""検索プロバイダーのインターフェースとレジストリ"""
+
+import asyncio
+from abc import ABC, abstractmethod
+from typing import Any, Callable, ClassVar, Dict, List
+
+from src.config.configuration import SearchConfig
+
+# 検索結果は Tavily と同じ `url` / `title` / `content` キーを持つ辞書のリスト
+SearchResult = Dict[str, Any]
+
+
+class SearchProvider(ABC):
+    """検索プロバイダーの基底クラス。
+
+    同期の `search` を実装すれば、`asearch` はスレッド上で実行されます。
+    非同期クライアントを持つプロバイダーは `asearch` をオーバーライドしてください。
+    """
+
+    # メトリクス・トレースのラベルに使用するプロバイダー名
+    name: ClassVar[str] = ""
+
+    def __init__(self, config: SearchConfig):
+        """プロバイダーを初期化。"""
+        self.config = config
+
+    @abstractmethod
+    def search(self, query: str) -> List[SearchResult]:
+        """検索を実行して結果を返す。"""
+
+    async def asearch(self, query: str) -> List[SearchResult]:
+        """検索を非同期で実行して結果を返す。"""
+        return await asyncio.to_thread(self.search, query)
+
+
+SearchProviderFactory = Callable[[SearchConfig], SearchProvider]
+
+_search_providers: Dict[str, SearchProviderFactory] = {}
+
+
+def register_search_provider(name: str, factory: SearchProviderFactory) -> None:
+    """検索プロバイダーのファクトリを名前で登録（同名は上書き）。"""
+    _search_providers[name] = factory
+
+
+def unregister_search_provider(name: str) -> None:
+    """検索プロバイダーの登録を解除。"""
+    _search_providers.pop(name, None)
+
+
+def get_search_provider(config: SearchConfig) -> SearchProvider:
+    """`SearchConfig.search_provider` で指定された検索プロバイダーを生成。"""
+    factory = _search_providers.get(config.search_provider)
+    if factory is None:
+        available = ", ".join(sorted(_search_providers))
+        raise ValueError(
+            f"未知の検索プロバイダーです: {config.search_provider}（利用可能: {available}）"
+        )
+    return factory(config)
@@ -0,0 +1,211 @@
+"""構造化出力（スキーマ付きのJSON応答）の修復とパース"""
+
+import json
+import re
+from typing import Any, Dict, List, Optional, Type, TypeVar
+
+from langchain_core.exceptions import OutputParserException
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import BaseMessage
+from langchain_core.runnables import Runnable, RunnableConfig, RunnableLambda
+from pydantic import BaseModel, ValidationError
+
+from src.observability.metrics import STRUCTURED_OUTPUTS
+
+M = TypeVar("M", bound=BaseModel)
+
+# ```json ... ``` のようなコードフェンス
+_CODE_FENCE = re.compile(r"```[\w-]*\s*\n?(.*?)(?:```|$)", re.DOTALL)
+# 文字列の外に現れるPythonのリテラル
+_PYTHON_LITERALS = {"True": "true", "False": "false", "None": "null"}
+_WORD = re.compile(r"[A-Za-z]+")
+_CLOSING = {"{": "}", "[": "]"}
+
+
+def _strip_fence(text: str) -> str:
+    """コードフェンスがあれば中身だけを取り出す。"""
+    match = _CODE_FENCE.search(text)
+    return match.group(1) if match else text
+
+
+def _scan(text: str) -> str:
+    """文字列の外のコメント・末尾のカンマ・Pythonのリテラルを直し、閉じ忘れを補う。
+
+    最初の `{` または `[` から、それに対応する括弧までを取り出します
+    （前後の説明文は除きます）。応答が途中で切れている場合は、開いたままの
+    文字列と括弧を閉じます。
+    """
+    start = min(
+        (index for index in (text.find("{"), text.find("[")) if index >= 0),
+        default=-1,
+    )
+    if start < 0:
+        return text
+    out: List[str] = []
+    stack: List[str] = []
+    in_string = False
+    index = start
+    while index < len(text):
+        char = text[index]
+        if in_string:
+            out.append(char)
+            if char == "\\" and index + 1 < len(text):
+                out.append(text[index + 1])
+                index += 1
+            elif char == '"':
+                in_string = False
+            index += 1
+            continue
+        if char == '"':
+            in_string = True
+            out.append(char)
+        elif text.startswith("//", index) or char == "#":
+            newline = text.find("\n", index)
+            index = len(text) if newline < 0 else newline
+            continue
+        elif text.startswith("/*", index):
+            end = text.find("*/", index + 2)
+            index = len(text) if end < 0 else end + 2
+            continue
+        elif char in _CLOSING:
+            stack.append(_CLOSING[char])
+            out.append(char)
+        elif char in "}]":
+            # 閉じ括弧の直前のカンマ（末尾のカンマ）を除く
+            while out and out[-1].isspace():
+                out.pop()
+            if out and out[-1] == ",":
+                out.pop()
+            if stack and stack[-1] == char:
+                stack.pop()
+            out.append(char)
+            if not stack:
+                break
+        elif char.isascii() and char.isalpha():
+            word = _WORD.match(text, index).group(0)  # type: ignore[union-attr]
+            out.append(_PYTHON_LITERALS.get(word, word))
+            index += len(word)
+            continue
+        else:
+            out.append(char)
+        index += 1
+
+    # 途中で切れた応答は開いたままの文字列と括弧を閉じる
+    if in_string:
+        out.append('"')
+    while stack:
+        while out and (out[-1].isspace() or out[-1] in ",:"):
+            out.pop()
+        out.append(stack.pop())
+    return "".join(out)
+
+
+def repair_json(text: str) -> str:
+    """LLMの応答によくあるJSONの崩れを修復。
+
+    コードフェンス・前後の説明文・`//` `#` `/* */` のコメント・末尾のカンマ・
+    Pythonのリテラル（`True` / `False` / `None`）・途中で切れた応答の閉じ忘れを直します。
+    """
+    return _scan(_strip_fence(text.strip()))
+
+
+def parse_structured_output(text: str, schema: Type[M]) -> Optional[M]:
+    """応答のテキストをスキーマで検証し、失敗したら修復してから検証し直す。
+
+    修復しても検証できない場合はNoneを返します。
+    """
+    for candidate in (text, repair_json(text)):
+        try:
+            return schema.model_validate_json(candidate)
+        except (ValidationError, ValueError):
+            continue
+    return None
+
+
+def _raw_texts(message: Any) -> List[str]:
+    """応答メッセージから、構造化出力のJSONが入っている可能性のあるテキストを取り出す。
+
+    ツール呼び出し（関数呼び出し方式）の引数と、本文（JSONモード）が対象です。
+    """
+    if not isinstance(message, BaseMessage):
+        return []
+    texts = [
+        call["args"]
+        for call in getattr(message, "invalid_tool_calls", None) or []
+        if call.get("args")
+    ]
+    texts.extend(
+        json.dumps(call["args"], ensure_ascii=False)
+        for call in getattr(message, "tool_calls", None) or []
+    )
+    content = message.content
+    if isinstance(content, list):
+        content = "".join(
+            part if isinstance(part, str) else str(part.get("text", ""))
+            for part in content
+        )
+    if content:
+        texts.append(str(content))
+    return texts
+
+
+def _recover(output: Dict[str, Any], schema: Type[M]) -> Optional[M]:
+    """`include_raw=True` の構造化出力の結果から、パース済みまたは修復した値を取り出す。"""
+    name = schema.__name__
+    parsed = output.get("parsed")
+    if isinstance(parsed, schema):
+        STRUCTURED_OUTPUTS.inc(name, "parsed")
+        return parsed
+    for text in _raw_texts(output.get("raw")):
+        repaired = parse_structured_output(text, schema)
+        if repaired is not None:
+            STRUCTURED_OUTPUTS.inc(name, "repaired")
+            return repaired
+    return None
+
+
+def _unparseable(output: Dict[str, Any], schema: Type[BaseModel]) -> Exception:
+    """修復できなかった応答の例外（再試行の上限に達した場合に送出）。"""
+    STRUCTURED_OUTPUTS.inc(schema.__name__, "failed")
+    error = output.get("parsing_error")
+    if isinstance(error, Exception):
+        return error
+    return OutputParserException(
+        f"{schema.__name__} の構造化出力をパースできませんでした",
+        llm_output=str(getattr(output.get("raw"), "content", "")),
+    )
+
+
+def with_repaired_structured_output(
+    llm: BaseChatModel, schema: Type[M], max_retries: int
+) -> Runnable:
+    """崩れたJSONをローカルで修復してから検証する構造化出力のランナブルを作成。
+
+    `with_structured_output` のパースに失敗した応答は、LLMを呼び直す前に修復して
+    スキーマで検証します。修復できない場合だけ `max_retries` 回まで呼び直します。
+    パース・修復・再試行の回数は `research_structured_outputs_total` で確認できます。
+    """
+    structured = llm.with_structured_output(schema, include_raw=True)
+    name = schema.__name__
+
+    def invoke(input: Any, config: RunnableConfig) -> M:
+        for attempt in range(max_retries + 1):
+            output = structured.invoke(input, config)
+            result = _recover(output, schema)
+            if result is not None:
+                return result
+            if attempt < max_retries:
+                STRUCTURED_OUTPUTS.inc(name, "retried")
+        raise _unparseable(output, schema)
+
+    async def ainvoke(input: Any, config: RunnableConfig) -> M:
+        for attempt in range(max_retries + 1):
+            output = await structured.ainvoke(input, config)
+            result = _recover(output, schema)
+            if result is not None:
+                return result
+            if attempt < max_retries:
+                STRUCTURED_OUTPUTS.inc(name, "retried")
+        raise _unparseable(output, schema)
+
+    return RunnableLambda(invoke, afunc=ainvoke, name=f"{name}StructuredOutput")
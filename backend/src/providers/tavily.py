@@ -0,0 +1,106 @@
+"""Tavily検索プロバイダー"""
+
+import asyncio
+import os
+import weakref
+from typing import Any, Dict, List
+
+import httpx
+import requests
+from dotenv import load_dotenv
+from langchain_community.tools import TavilySearchResults
+from langchain_community.utilities.tavily_search import TAVILY_API_URL
+
+from src.config.configuration import SearchConfig
+
+from .search import SearchProvider, SearchResult
+
+load_dotenv()
+
+# 検索リクエストのタイムアウト（advanced深度の検索は数十秒かかることがある）
+REQUEST_TIMEOUT_SECONDS = 60.0
+
+# イベントループごとのHTTPクライアント（接続プールはループをまたいで共有できない）
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_tavily_api_url() -> str:
+    """Tavily APIのベースURL（`TAVILY_API_URL` 環境変数でスタンドインなどに差し替え可能）。"""
+    return os.getenv("TAVILY_API_URL", TAVILY_API_URL).rstrip("/")
+
+
+def _get_async_client() -> httpx.AsyncClient:
+    """実行中のイベントループのHTTPクライアントを取得または作成。"""
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = _async_clients[loop] = httpx.AsyncClient(
+            timeout=REQUEST_TIMEOUT_SECONDS
+        )
+    return client
+
+
+class TavilySearchProvider(SearchProvider):
+    """TavilySearchResultsを使用する検索プロバイダー。"""
+
+    name = "tavily"
+
+    def __init__(self, config: SearchConfig):
+        """Tavilyクライアントを初期化。"""
+        super().__init__(config)
+        api_key = os.getenv("TAVILY_API_KEY")
+        if api_key is None:
+            raise ValueError("TAVILY_API_KEY が設定されていません")
+
+        self.tool = TavilySearchResults(
+            max_results=config.max_results,
+            search_depth=config.depth,
+            include_answer=True,
+            include_raw_content=config.include_raw_content,
+            include_images=config.include_images,
+            api_key=api_key,
+        )
+
+    def search(self, query: str) -> List[SearchResult]:
+        """Tavily検索を実行。
+
+        ツールの `invoke` はHTTPエラーを文字列に変換してしまうため、
+        リミッターが429などを検知できるよう、APIラッパーと同じリクエストを
+        直接送ります（送信先は `get_tavily_api_url` で差し替え可能）。
+        """
+        response = requests.post(
+            f"{get_tavily_api_url()}/search",
+            json=self._request_body(query),
+            timeout=REQUEST_TIMEOUT_SECONDS,
+        )
+        response.raise_for_status()
+        return self.tool.api_wrapper.clean_results(response.json()["results"])
+
+    def _request_body(self, query: str) -> Dict[str, Any]:
+        """検索APIのリクエストボディを作成（同期版のAPIラッパーと同じパラメーター）。"""
+        tool = self.tool
+        return {
+            "api_key": tool.api_wrapper.tavily_api_key.get_secret_value(),
+            "query": query,
+            "max_results": tool.max_results,
+            "search_depth": tool.search_depth,
+            "include_domains": tool.include_domains,
+            "exclude_domains": tool.exclude_domains,
+            "include_answer": tool.include_answer,
+            "include_raw_content": tool.include_raw_content,
+            "include_images": tool.include_images,
+        }
+
+    async def asearch(self, query: str) -> List[SearchResult]:
+        """Tavily検索を非同期で実行。
+
+        APIラッパーの非同期版は呼び出しごとにセッションを作り、HTTPエラーの
+        ステータスコードも失うため、共有のHTTPクライアントで直接呼び出します。
+        """
+        response = await _get_async_client().post(
+            f"{get_tavily_api_url()}/search", json=self._request_body(query)
+        )
+        response.raise_for_status()
+        return self.tool.api_wrapper.clean_results(response.json()["results"])
@@ -0,0 +1,41 @@
+"""Text retrieval utilities (tokenization, inverted indexes, passage ranking, near-duplicate detection, prior-source lookup, cross-run knowledge base) for the LangGraph agent."""
+
+from .bm25 import BM25Index
+from .knowledge_base import (
+    KnowledgeBase,
+    canonical_url,
+    classify_query,
+    get_knowledge_base,
+)
+from .passages import Passage, is_boilerplate, iter_passages, rank_passages
+from .simhash import (
+    NearDuplicateIndex,
+    get_fingerprint_index,
+    hamming_distance,
+    release_fingerprint_index,
+    simhash,
+)
+from .source_index import SourceIndex, get_source_index, release_source_index
+from .tokenizer import normalize, tokenize
+
+__all__ = [
+    "BM25Index",
+    "KnowledgeBase",
+    "NearDuplicateIndex",
+    "Passage",
+    "SourceIndex",
+    "canonical_url",
+    "classify_query",
+    "get_fingerprint_index",
+    "get_knowledge_base",
+    "get_source_index",
+    "hamming_distance",
+    "is_boilerplate",
+    "iter_passages",
+    "normalize",
+    "rank_passages",
+    "release_fingerprint_index",
+    "release_source_index",
+    "simhash",
+    "tokenize",
+]
@@ -0,0 +1,106 @@
+"""BM25スコアリングによる転置インデックス"""
+
+import heapq
+import json
+import math
+import os
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .tokenizer import tokenize
+
+
+class BM25Index:
+    """文書を追加して BM25 で検索できる転置インデックス。
+
+    ポスティングは `term -> {文書番号: 出現回数}` の形で保持し、
+    クエリに含まれる語のポスティングだけを走査してスコアを計算します。
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        """インデックスを初期化。"""
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, Dict[int, int]] = {}
+        self.doc_lengths: List[int] = []
+        self.documents: List[Dict[str, Any]] = []
+        self._total_length = 0
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+    def add(self, text: str, document: Optional[Dict[str, Any]] = None) -> int:
+        """文書を追加し、文書番号を返す。"""
+        doc_id = len(self.documents)
+        terms = Counter(tokenize(text))
+        for term, count in terms.items():
+            self.postings.setdefault(term, {})[doc_id] = count
+        length = sum(terms.values())
+        self.doc_lengths.append(length)
+        self._total_length += length
+        self.documents.append(document if document is not None else {})
+        return doc_id
+
+    def _idf(self, term: str) -> float:
+        """語の逆文書頻度（BM25+の非負版）を計算。"""
+        n = len(self.postings.get(term, ()))
+        return math.log(1 + (len(self.documents) - n + 0.5) / (n + 0.5))
+
+    def score_terms(self, query_terms: Iterable[str]) -> Dict[int, float]:
+        """クエリ語の集合に対する文書ごとのBM25スコアを計算。"""
+        if not self.documents:
+            return {}
+        average_length = self._total_length / len(self.documents) or 1.0
+        scores: Dict[int, float] = {}
+        for term in set(query_terms):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = self._idf(term)
+            for doc_id, tf in postings.items():
+                norm = self.k1 * (
+                    1 - self.b + self.b * self.doc_lengths[doc_id] / average_length
+                )
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / (
+                    tf + norm
+                )
+        return scores
+
+    def search(self, query: str, top_k: int = 10) -> List[Tuple[float, int]]:
+        """クエリに対するスコア上位の (スコア, 文書番号) を返す。"""
+        scores = self.score_terms(tokenize(query))
+        return heapq.nlargest(
+            top_k, ((score, doc_id) for doc_id, score in scores.items())
+        )
+
+    def save(self, path: str) -> None:
+        """インデックスをJSONファイルに保存。"""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        payload = {
+            "k1": self.k1,
+            "b": self.b,
+            "postings": self.postings,
+            "doc_lengths": self.doc_lengths,
+            "documents": self.documents,
+        }
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(payload, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "BM25Index":
+        """JSONファイルからインデックスを読み込み。"""
+        with open(path, encoding="utf-8") as f:
+            payload = json.load(f)
+        index = cls(k1=payload["k1"], b=payload["b"])
+        index.postings = {
+            term: {int(doc_id): tf for doc_id, tf in postings.items()}
+            for term, postings in payload["postings"].items()
+        }
+        index.doc_lengths = payload["doc_lengths"]
+        index.documents = payload["documents"]
+        index._total_length = sum(index.doc_lengths)
+        return index
@@ -0,0 +1,272 @@
+"""実行をまたいで収集済みのソースを保持するローカル知識ベース（ディスク上の転置インデックス）"""
+
+import json
+import re
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from .bm25 import BM25Index
+from .tokenizer import tokenize
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None  # type: ignore[assignment]
+
+# 知識ベースのディレクトリに保存するファイル
+SNAPSHOT_FILENAME = "index.json"
+LOG_FILENAME = "log.jsonl"
+LOCK_FILENAME = ".lock"
+# 追記ログの文書数がこれを超えたらスナップショットにまとめる
+COMPACT_THRESHOLD = 1000
+
+# 重複判定で無視するトラッキング用のクエリパラメータ
+_TRACKING_PARAM = re.compile(r"^(?:utm_\w+|fbclid|gclid|mc_cid|mc_eid|ref_src)$")
+# クエリの種類の判定に使うキーワード（最新の情報が必要なもの・変化の少ないもの）
+_NEWS_PATTERN = re.compile(
+    r"最新|速報|今日|昨日|今週|現在|ニュース|株価|為替|天気"
+    r"|\b(?:latest|today|news|breaking|current|price)\b",
+    re.IGNORECASE,
+)
+_REFERENCE_PATTERN = re.compile(
+    r"とは|定義|意味|歴史|仕組み|原理|由来"
+    r"|\b(?:what is|definition|history|how does)\b",
+    re.IGNORECASE,
+)
+
+
+def canonical_url(url: str) -> str:
+    """重複判定用にURLを正規化。
+
+    スキームとホストを小文字にし、`www.`・既定のポート・フラグメント・
+    トラッキング用のパラメータ・末尾のスラッシュを除き、パラメータを並べ替えます。
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if host.startswith("www."):
+        host = host[4:]
+    try:
+        port = parts.port
+    except ValueError:
+        port = None
+    if port is not None and (scheme, port) not in (("http", 80), ("https", 443)):
+        host = f"{host}:{port}"
+    query = urlencode(
+        sorted(
+            (key, value)
+            for key, value in parse_qsl(parts.query, keep_blank_values=True)
+            if not _TRACKING_PARAM.match(key)
+        )
+    )
+    return urlunsplit((scheme, host, parts.path.rstrip("/"), query, ""))
+
+
+def classify_query(query: str) -> str:
+    """鮮度の要件を決めるクエリの種類（"news" / "reference" / "default"）を判定。"""
+    if _NEWS_PATTERN.search(query):
+        return "news"
+    if _REFERENCE_PATTERN.search(query):
+        return "reference"
+    return "default"
+
+
+class KnowledgeBase:
+    """実行をまたいでソースを保持し、BM25で検索するディスク上の知識ベース。
+
+    ディレクトリにはインデックス全体のスナップショット（`index.json`）と、それ以降に
+    追加した文書の追記ログ（`log.jsonl`）を保存します。追加は追記ログへの書き込みだけで
+    済み、ログが大きくなったらスナップショットにまとめます。他のプロセスが追記した文書は
+    検索時にログの続きを読み込んで反映します。
+    同じ正規化URLの文書は取得日時の新しい方だけを検索対象にします。
+    """
+
+    def __init__(self, path: str, compact_threshold: int = COMPACT_THRESHOLD):
+        """知識ベースを初期化（ディスク上の内容は最初の検索・追加時に読み込み）。"""
+        self.path = Path(path)
+        self.compact_threshold = compact_threshold
+        self._index = BM25Index()
+        self._latest: Dict[str, int] = {}
+        self._snapshot_version: Optional[int] = None
+        self._log_offset = 0
+        self._log_documents = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        """検索対象の文書数。"""
+        with self._lock:
+            self._refresh()
+            return len(self._latest)
+
+    @contextmanager
+    def _file_lock(self) -> Iterator[None]:
+        """他のプロセスの追加・まとめと排他するファイルロック。"""
+        self.path.mkdir(parents=True, exist_ok=True)
+        with (self.path / LOCK_FILENAME).open("a") as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _add(self, document: Dict[str, Any]) -> bool:
+        """文書をインデックスに追加（同じURLのより新しい文書があれば追加しない）。"""
+        key = document["canonical_url"]
+        current = self._latest.get(key)
+        if current is not None:
+            existing = self._index.documents[current]
+            if existing["fetched_at"] >= document["fetched_at"]:
+                return False
+            existing["superseded"] = True
+        text = f"{document['title']}\n{document['content']}"
+        self._latest[key] = self._index.add(text, document)
+        return True
+
+    def _refresh(self) -> None:
+        """ディスク上のスナップショットの変更と、追記ログの続きを反映。"""
+        snapshot = self.path / SNAPSHOT_FILENAME
+        version = snapshot.stat().st_mtime_ns if snapshot.is_file() else None
+        if version != self._snapshot_version:
+            # スナップショットには検索対象の文書だけが入っている
+            self._index = (
+                BM25Index.load(str(snapshot)) if version is not None else BM25Index()
+            )
+            self._latest = {
+                document["canonical_url"]: doc_id
+                for doc_id, document in enumerate(self._index.documents)
+            }
+            self._snapshot_version = version
+            self._log_offset = 0
+            self._log_documents = 0
+
+        log = self.path / LOG_FILENAME
+        if not log.is_file() or log.stat().st_size <= self._log_offset:
+            return
+        with log.open("rb") as f:
+            f.seek(self._log_offset)
+            data = f.read()
+        # 書き込み途中の最後の行は次回に読む
+        end = data.rfind(b"\n") + 1
+        for line in data[:end].splitlines():
+            if line.strip():
+                self._add(json.loads(line))
+                self._log_documents += 1
+        self._log_offset += end
+
+    def _compact(self) -> None:
+        """検索対象の文書だけでスナップショットを作り直し、追記ログを空にする。"""
+        index = BM25Index()
+        for doc_id in sorted(self._latest.values()):
+            document = self._index.documents[doc_id]
+            index.add(f"{document['title']}\n{document['content']}", document)
+        index.save(str(self.path / SNAPSHOT_FILENAME))
+        (self.path / LOG_FILENAME).write_bytes(b"")
+        # 保存したスナップショットを次の反映で読み込む（他のプロセスと同じ手順）
+        self._snapshot_version = None
+        self._index = BM25Index()
+        self._refresh()
+
+    def ingest(
+        self, sources: Iterable[Dict[str, Any]], now: Optional[float] = None
+    ) -> int:
+        """ソース（`value`・`title`・`content`・`fetched_at`）を追加し、追加した数を返す。
+
+        近似重複として除いたソース（`duplicate_of` 付き）と本文の無いソースは追加しません。
+        """
+        now = time.time() if now is None else now
+        documents = [
+            {
+                "url": source["value"],
+                "canonical_url": canonical_url(source["value"]),
+                "title": source.get("title", ""),
+                "content": source["content"],
+                "fetched_at": source.get("fetched_at") or now,
+            }
+            for source in sources
+            if source.get("value")
+            and source.get("content")
+            and not source.get("duplicate_of")
+        ]
+        if not documents:
+            return 0
+        with self._lock, self._file_lock():
+            self._refresh()
+            added = [document for document in documents if self._add(document)]
+            if added:
+                lines = "".join(
+                    json.dumps(document, ensure_ascii=False) + "\n"
+                    for document in added
+                ).encode("utf-8")
+                with (self.path / LOG_FILENAME).open("ab") as f:
+                    f.write(lines)
+                # ファイルロック中は他のプロセスが追記しないため、書いた分だけ読み進める
+                self._log_offset += len(lines)
+                self._log_documents += len(added)
+            if self._log_documents > self.compact_threshold:
+                self._compact()
+        return len(added)
+
+    def search(
+        self,
+        query: str,
+        top_k: int,
+        max_age_seconds: float,
+        min_coverage: float = 0.0,
+        now: Optional[float] = None,
+    ) -> Tuple[List[Dict[str, Any]], int]:
+        """クエリに関連する、取得から `max_age_seconds` 秒以内の文書を検索結果の形式で返す。
+
+        クエリ語のうち `min_coverage` 以上の割合を含む文書だけを対象にします。
+        条件を満たすが古すぎた文書の数も返します。
+        """
+        now = time.time() if now is None else now
+        terms = set(tokenize(query))
+        if not terms:
+            return [], 0
+        results: List[Dict[str, Any]] = []
+        stale = 0
+        with self._lock:
+            self._refresh()
+            postings = self._index.postings
+            for score, doc_id in self._index.search(query, top_k * 4):
+                document = self._index.documents[doc_id]
+                if document.get("superseded"):
+                    continue
+                matched = sum(1 for term in terms if doc_id in postings.get(term, ()))
+                if matched < min_coverage * len(terms):
+                    continue
+                if now - document["fetched_at"] > max_age_seconds:
+                    stale += 1
+                    continue
+                results.append(
+                    {
+                        "url": document["url"],
+                        "title": document["title"],
+                        "content": document["content"],
+                        "score": score,
+                        "fetched_at": document["fetched_at"],
+                    }
+                )
+                if len(results) >= top_k:
+                    break
+        return results, stale
+
+
+_knowledge_bases: Dict[str, KnowledgeBase] = {}
+_knowledge_bases_lock = threading.Lock()
+
+
+def get_knowledge_base(path: str) -> KnowledgeBase:
+    """ディレクトリごとの知識ベースを取得（プロセス内で共有）。"""
+    key = str(Path(path).resolve())
+    with _knowledge_bases_lock:
+        knowledge_base = _knowledge_bases.get(key)
+        if knowledge_base is None:
+            knowledge_base = _knowledge_bases[key] = KnowledgeBase(key)
+        return knowledge_base
@@ -0,0 +1,198 @@
+"""ページ本文からのボイラープレート除去・パッセージ分割・関連度ランキング"""
+
+import re
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Tuple
+
+import numpy as np
+
+from .tokenizer import tokenize
+
+# これより短く文末記号も無い行はメニューや見出しとみなして除外
+MIN_LINE_CHARS = 20
+# 研究トピックの語の重み（検索クエリの語を1とする）
+TOPIC_WEIGHT = 0.5
+# 同一ページ内で重複を検出する短い行の最大長
+DUPLICATE_LINE_MAX_CHARS = 200
+
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+_LINE_PATTERN = re.compile(r"[^\n]*\n?")
+_SENTENCE_PATTERN = re.compile(r"[^。！？.!?]+[。！？.!?]*\s*")
+_SENTENCE_END = ("。", "．", ".", "！", "!", "？", "?", "」", ")", "）")
+_MARKDOWN_LINK_ONLY = re.compile(r"^(?:!?\[[^\]]*\]\([^)]*\)\s*)+$")
+_BOILERPLATE_KEYWORDS = (
+    "©",
+    "copyright",
+    "all rights reserved",
+    "cookie",
+    "javascript",
+    "プライバシーポリシー",
+    "利用規約",
+    "ログイン",
+    "会員登録",
+    "シェアする",
+    "ツイート",
+    "関連記事",
+    "広告",
+)
+
+
+@dataclass
+class Passage:
+    """元テキスト上の範囲と、整形済みのテキストを持つパッセージ。"""
+
+    start: int
+    end: int
+    text: str
+
+
+def is_boilerplate(line: str) -> bool:
+    """ナビゲーション・フッター・リンク列などのボイラープレート行かを判定。"""
+    if len(line) < MIN_LINE_CHARS and not line.endswith(_SENTENCE_END):
+        return True
+    if _MARKDOWN_LINK_ONLY.match(line) or line.count("|") >= 3:
+        return True
+    if len(line) < 100:
+        lowered = line.lower()
+        return any(keyword in lowered for keyword in _BOILERPLATE_KEYWORDS)
+    return False
+
+
+def _iter_lines(text: str, max_chars: int) -> Iterator[Tuple[int, int, str]]:
+    """テキストを (開始, 終了, 行) に分割（長い行は文単位に分割）。"""
+    for match in _LINE_PATTERN.finditer(text):
+        line = match.group()
+        if len(line) <= max_chars:
+            yield match.start(), match.end(), line
+            continue
+        for sentence in _SENTENCE_PATTERN.finditer(line):
+            yield (
+                match.start() + sentence.start(),
+                match.start() + sentence.end(),
+                sentence.group(),
+            )
+
+
+def iter_passages(text: str, max_chars: int = 600) -> Iterator[Passage]:
+    """ボイラープレートを除いた行を段落ごとに `max_chars` 程度のパッセージにまとめる。
+
+    ジェネレーターなので、ページ全体を行やパッセージのリストに展開しません。
+    """
+    seen_lines = set()
+    parts: List[str] = []
+    size = 0
+    start = end = 0
+
+    for line_start, line_end, raw_line in _iter_lines(text, max_chars):
+        line = raw_line.strip()
+        if not line:
+            # 空行は段落の区切り
+            if parts:
+                yield Passage(start, end, " ".join(parts))
+                parts, size = [], 0
+            continue
+        if is_boilerplate(line):
+            continue
+        if len(line) <= DUPLICATE_LINE_MAX_CHARS:
+            if line in seen_lines:
+                continue
+            seen_lines.add(line)
+
+        if parts and size + len(line) > max_chars:
+            yield Passage(start, end, " ".join(parts))
+            parts, size = [], 0
+        if not parts:
+            start = line_start
+        parts.append(line)
+        size += len(line)
+        end = line_end
+
+    if parts:
+        yield Passage(start, end, " ".join(parts))
+
+
+def _query_weights(query: str, topic: str) -> Dict[str, float]:
+    """クエリと研究トピックから語ごとの重みを作成。"""
+    weights = {term: TOPIC_WEIGHT for term in tokenize(topic)}
+    weights.update({term: 1.0 for term in tokenize(query)})
+    return weights
+
+
+def _score(
+    counts: np.ndarray, lengths: np.ndarray, weights: np.ndarray, method: str
+) -> np.ndarray:
+    """パッセージ×クエリ語の出現回数行列から各パッセージのスコアを計算。"""
+    n = counts.shape[0]
+    df = (counts > 0).sum(axis=0)
+    if method == "tfidf":
+        idf = np.log((1 + n) / (1 + df)) + 1.0
+        tf = np.where(counts > 0, 1.0 + np.log(np.maximum(counts, 1)), 0.0)
+        return (tf * idf * weights).sum(axis=1) / np.sqrt(np.maximum(lengths, 1))
+
+    idf = np.log(1.0 + (n - df + 0.5) / (df + 0.5))
+    average = lengths.mean() or 1.0
+    norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths / average)
+    return (counts * (BM25_K1 + 1) / (counts + norm[:, None]) * idf * weights).sum(
+        axis=1
+    )
+
+
+def rank_passages(
+    text: str,
+    query: str,
+    topic: str = "",
+    top_k: int = 3,
+    max_chars: int = 600,
+    method: str = "bm25",
+) -> List[str]:
+    """本文をパッセージに分割し、クエリ（と研究トピック）に関連する上位K件を返す。
+
+    ランキング中はパッセージごとにクエリ語の出現回数と元テキスト上の範囲だけを保持し、
+    選ばれたパッセージのみを元テキストから再構成します。結果は本文中の順序で返します。
+    """
+    weights_by_term = _query_weights(query, topic)
+    terms = list(weights_by_term)
+    term_index = {term: i for i, term in enumerate(terms)}
+
+    spans: List[Tuple[int, int]] = []
+    rows: List[List[int]] = []
+    lengths: List[int] = []
+    for passage in iter_passages(text, max_chars):
+        tokens = tokenize(passage.text)
+        row = [0] * len(terms)
+        for term, count in Counter(tokens).items():
+            index = term_index.get(term)
+            if index is not None:
+                row[index] = count
+        spans.append((passage.start, passage.end))
+        rows.append(row)
+        lengths.append(len(tokens))
+
+    if not spans:
+        return []
+
+    selected: List[int]
+    if terms:
+        scores = _score(
+            np.array(rows, dtype=float).reshape(len(rows), len(terms)),
+            np.array(lengths, dtype=float),
+            np.array([weights_by_term[term] for term in terms]),
+            method,
+        )
+        order = np.argsort(-scores, kind="stable")[:top_k]
+        selected = sorted(int(i) for i in order if scores[i] > 0)
+    else:
+        selected = []
+    if not selected:
+        # クエリ語を含むパッセージが無い場合は冒頭のパッセージを使用
+        selected = list(range(min(top_k, len(spans))))
+
+    return [_rebuild(text, *spans[i], max_chars) for i in selected]
+
+
+def _rebuild(text: str, start: int, end: int, max_chars: int) -> str:
+    """元テキストの範囲から整形済みのパッセージを再構成。"""
+    return " ".join(passage.text for passage in iter_passages(text[start:end], max_chars))
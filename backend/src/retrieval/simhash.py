@@ -0,0 +1,104 @@
+"""SimHashによる近似重複テキストの検出"""
+
+import hashlib
+import threading
+from collections import Counter, OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .tokenizer import tokenize
+
+FINGERPRINT_BITS = 64
+# これより語数の少ないテキストはフィンガープリントが不安定なため判定しない
+MIN_FINGERPRINT_TOKENS = 8
+# 保持する実行ごとのインデックス数の上限（最終回答まで進まなかった実行によるリークを防ぐ）
+MAX_ACTIVE_INDEXES = 256
+
+
+def _hash_token(token: str) -> int:
+    """語を64bitのハッシュ値に変換。"""
+    return int.from_bytes(
+        hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "big"
+    )
+
+
+def simhash(text: str) -> Optional[int]:
+    """テキストの64bit SimHashフィンガープリントを計算（語数が少なければNone）。"""
+    counts = Counter(tokenize(text))
+    if sum(counts.values()) < MIN_FINGERPRINT_TOKENS:
+        return None
+    hashes = np.array([_hash_token(token) for token in counts], dtype=">u8")
+    weights = np.array(list(counts.values()), dtype=float)
+    # 各ハッシュを上位bitから並べたbit列に展開し、語の出現回数で重み付けして投票
+    bits = np.unpackbits(hashes.view(np.uint8)).reshape(len(hashes), FINGERPRINT_BITS)
+    votes = weights @ (bits.astype(float) * 2 - 1)
+    return int.from_bytes(np.packbits(votes > 0).tobytes(), "big")
+
+
+def hamming_distance(a: int, b: int) -> int:
+    """2つのフィンガープリントのハミング距離。"""
+    return (a ^ b).bit_count()
+
+
+class NearDuplicateIndex:
+    """フィンガープリントから近似重複の代表を引くインデックス。
+
+    ハミング距離 `max_distance` 以内のフィンガープリントは、`max_distance + 1` 個に
+    分割したbit帯のいずれかが必ず一致するため、帯ごとのハッシュ表で候補を
+    期待O(1)で絞り込めます。
+    """
+
+    def __init__(self, max_distance: int = 6):
+        """インデックスを初期化。"""
+        self.max_distance = max_distance
+        band_count = max_distance + 1
+        width, extra = divmod(FINGERPRINT_BITS, band_count)
+        self._bands: List[Tuple[int, int]] = []
+        shift = FINGERPRINT_BITS
+        for i in range(band_count):
+            bits = width + (1 if i < extra else 0)
+            shift -= bits
+            self._bands.append((shift, (1 << bits) - 1))
+        self._table: Dict[Tuple[int, int], List[Tuple[int, str]]] = {}
+        self._lock = threading.Lock()
+
+    def _keys(self, fingerprint: int) -> List[Tuple[int, int]]:
+        """フィンガープリントの各bit帯のキー。"""
+        return [
+            (i, (fingerprint >> shift) & mask)
+            for i, (shift, mask) in enumerate(self._bands)
+        ]
+
+    def find_or_add(self, fingerprint: int, key: str) -> Optional[str]:
+        """近似重複があればその代表のキーを返し、無ければ代表として登録してNoneを返す。"""
+        keys = self._keys(fingerprint)
+        with self._lock:
+            for band_key in keys:
+                for candidate, candidate_key in self._table.get(band_key, ()):
+                    if hamming_distance(fingerprint, candidate) <= self.max_distance:
+                        return candidate_key
+            for band_key in keys:
+                self._table.setdefault(band_key, []).append((fingerprint, key))
+        return None
+
+
+_indexes: "OrderedDict[str, NearDuplicateIndex]" = OrderedDict()
+_indexes_lock = threading.Lock()
+
+
+def get_fingerprint_index(run_key: str, max_distance: int = 6) -> NearDuplicateIndex:
+    """実行ごとのフィンガープリントインデックスを取得または作成。"""
+    with _indexes_lock:
+        index = _indexes.get(run_key)
+        if index is None or index.max_distance != max_distance:
+            index = _indexes[run_key] = NearDuplicateIndex(max_distance)
+            while len(_indexes) > MAX_ACTIVE_INDEXES:
+                _indexes.popitem(last=False)
+        return index
+
+
+def release_fingerprint_index(run_key: str) -> None:
+    """実行の終了時にフィンガープリントインデックスを破棄。"""
+    with _indexes_lock:
+        _indexes.pop(run_key, None)
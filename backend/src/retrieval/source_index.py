@@ -0,0 +1,91 @@
+"""スレッドで収集済みのソースに対するBM25インデックス（フォローアップでの再利用用）"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Sequence
+
+from .bm25 import BM25Index
+
+# 保持するスレッドごとのインデックス数の上限
+MAX_ACTIVE_SOURCE_INDEXES = 256
+
+
+class SourceIndex:
+    """`sources_gathered` のソースをタイトルと本文で検索するインデックス。
+
+    ソースのリストは追記のみのため、前回から増えた分だけを追加します。
+    索引済みのソースの引用マーカーとURLのハッシュを保持し、渡されたリストの先頭が
+    一致しない場合（分岐・再実行したスレッドの状態など）は作り直します。
+    近似重複として除いたソース（`duplicate_of` 付き）は代表と同じ内容なので索引しません。
+    """
+
+    def __init__(self):
+        """インデックスを初期化。"""
+        self._index = BM25Index()
+        self._indexed = 0
+        self._digest = _new_digest().digest()
+        self._lock = threading.Lock()
+
+    def update(self, sources: Sequence[Dict[str, Any]]) -> None:
+        """まだ索引していないソースを追加（索引済みの分と先頭が異なれば作り直す）。"""
+        with self._lock:
+            digest = _new_digest()
+            if len(sources) >= self._indexed:
+                for source in sources[: self._indexed]:
+                    digest.update(_source_key(source))
+            if len(sources) < self._indexed or digest.digest() != self._digest:
+                # 別の時点の状態から再開された場合
+                self._index = BM25Index()
+                self._indexed = 0
+                digest = _new_digest()
+            for source in sources[self._indexed :]:
+                digest.update(_source_key(source))
+                if not source.get("duplicate_of"):
+                    text = f"{source.get('title', '')}\n{source.get('content', '')}"
+                    self._index.add(text, source)
+            self._indexed = len(sources)
+            self._digest = digest.digest()
+
+    def search(self, query: str, top_k: int = 8) -> List[Dict[str, Any]]:
+        """クエリに関連するソースをスコアの高い順に返す。"""
+        with self._lock:
+            hits = self._index.search(query, top_k)
+            return [self._index.documents[doc_id] for _, doc_id in hits]
+
+
+def _new_digest() -> Any:
+    """索引済みのソースの並びを表すハッシュを作成。"""
+    return hashlib.blake2b(digest_size=16)
+
+
+def _source_key(source: Dict[str, Any]) -> bytes:
+    """ハッシュに含めるソースの識別情報（引用マーカーとURL）。"""
+    return f"{source.get('short_url', '')}\t{source.get('value', '')}\n".encode()
+
+
+_indexes: "OrderedDict[str, SourceIndex]" = OrderedDict()
+_indexes_lock = threading.Lock()
+
+
+def get_source_index(thread_key: str) -> SourceIndex:
+    """スレッドごとのソースインデックスを取得または作成。
+
+    インデックスはターンをまたいで保持し、古いスレッドのものから破棄します。
+    破棄されたりプロセスが変わったりした場合は状態のソースから作り直されます。
+    """
+    with _indexes_lock:
+        index = _indexes.get(thread_key)
+        if index is None:
+            index = _indexes[thread_key] = SourceIndex()
+            while len(_indexes) > MAX_ACTIVE_SOURCE_INDEXES:
+                _indexes.popitem(last=False)
+        else:
+            _indexes.move_to_end(thread_key)
+        return index
+
+
+def release_source_index(thread_key: str) -> None:
+    """スレッドのソースインデックスを破棄。"""
+    with _indexes_lock:
+        _indexes.pop(thread_key, None)
@@ -0,0 +1,35 @@
+"""日本語を含むテキストの検索用トークナイザー"""
+
+import re
+import unicodedata
+from typing import List
+
+# 英数字の単語、またはひらがな・カタカナ・漢字の連続
+_TOKEN_PATTERN = re.compile(
+    r"[a-z0-9]+(?:[._'-][a-z0-9]+)*"
+    r"|[ぁ-ゟ]+"
+    r"|[゠-ヿㇰ-ㇿ]+"
+    r"|[㐀-䶿一-鿿豈-﫿]+"
+)
+_ASCII_WORD = re.compile(r"[a-z0-9]")
+
+
+def normalize(text: str) -> str:
+    """NFKC正規化と小文字化（全角英数字・半角カナを統一）。"""
+    return unicodedata.normalize("NFKC", text).lower()
+
+
+def tokenize(text: str) -> List[str]:
+    """テキストを検索用のトークン列に分割。
+
+    形態素解析器に依存せず日本語を扱うため、英数字は単語単位、
+    ひらがな・カタカナ・漢字の連続は文字bigram（1文字の場合はunigram）に分割します。
+    """
+    tokens: List[str] = []
+    for match in _TOKEN_PATTERN.finditer(normalize(text)):
+        run = match.group()
+        if _ASCII_WORD.match(run) or len(run) == 1:
+            tokens.append(run)
+        else:
+            tokens.extend(run[i : i + 2] for i in range(len(run) - 1))
+    return tokens
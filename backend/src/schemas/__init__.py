@@ -1,8 +1,17 @@
 """Tool and schema definitions for the LangGraph agent."""
 
-from .schemas import SearchQueryList, Reflection
+from .schemas import (
+    FollowUpPlan,
+    Reflection,
+    SearchQueryList,
+    SubQuestion,
+    SubQuestionPlan,
+)
 
 __all__ = [
+    "FollowUpPlan",
     "SearchQueryList",
     "Reflection",
+    "SubQuestion",
+    "SubQuestionPlan",
 ]
\ No newline at end of file
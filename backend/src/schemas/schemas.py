@@ -24,3 +24,36 @@ class Reflection(BaseModel):
     follow_up_queries: List[str] = Field(
         description="知識のギャップに対処するためのフォローアップクエリのリスト"
     )
+
+
+class FollowUpPlan(BaseModel):
+    """フォローアップの質問に対する、収集済みソースの十分性と追加検索の判断の出力用スキーマ"""
+
+    is_sufficient: bool = Field(
+        description="収集済みのソースだけで新しい質問に答えられるかどうか"
+    )
+    missing_aspects: str = Field(
+        description="収集済みのソースでカバーされていない観点の説明"
+    )
+    queries: List[str] = Field(
+        description="カバーされていない観点だけを調べるための検索クエリのリスト"
+    )
+
+
+class SubQuestion(BaseModel):
+    """分解したサブ質問のスキーマ"""
+
+    question: str = Field(description="独立して調べられる自己完結型のサブ質問")
+    depends_on: List[int] = Field(
+        default_factory=list,
+        description="このサブ質問の前に調べる必要があるサブ質問の番号（1始まり）のリスト",
+    )
+
+
+class SubQuestionPlan(BaseModel):
+    """研究トピックをサブ質問に分解した計画の出力用スキーマ"""
+
+    sub_questions: List[SubQuestion] = Field(
+        description="研究トピックに答えるために調べるサブ質問のリスト"
+    )
+    rationale: str = Field(description="この分解が研究トピックに適している理由の簡潔な説明")
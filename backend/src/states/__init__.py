@@ -2,8 +2,10 @@
 
 from .overall import OverallState
 from .search import WebSearchState
+from .sub_question import SubQuestionState
 
 __all__ = [
     "OverallState",
+    "SubQuestionState",
     "WebSearchState",
 ]
\ No newline at end of file
@@ -45,6 +45,80 @@ class OverallState(BaseModel):
         default=None,
         description="Model to use for reasoning tasks"
     )
+    follow_up_queries: Annotated[
+        Optional[List[str]], lambda x, y: y if y is not None else x
+    ] = Field(
+        default=None,
+        description="Follow-up queries proposed by the latest reflection"
+    )
+    is_sufficient: Annotated[Optional[bool], lambda x, y: y if y is not None else x] = Field(
+        default=None,
+        description="Whether the latest reflection judged the research sufficient"
+    )
+    run_started_at: Annotated[Optional[float], lambda x, y: x or y] = Field(
+        default=None,
+        description="Epoch seconds at which the research run started"
+    )
+    run_key: Annotated[Optional[str], lambda x, y: x or y] = Field(
+        default=None,
+        description="Unique key of the run for per-run indexes when the config has no thread id"
+    )
+    tokens_used: Annotated[int, operator.add] = Field(
+        default=0,
+        description="Total LLM tokens consumed by the run"
+    )
+    search_count: Annotated[int, operator.add] = Field(
+        default=0,
+        description="Number of searches issued by the run"
+    )
+    budget_usage: Annotated[Optional[dict], lambda x, y: y or x] = Field(
+        default=None,
+        description="Budget consumption reported with the final answer"
+    )
+    turn_baseline: Annotated[Optional[dict], lambda x, y: y or x] = Field(
+        default=None,
+        description="Counters and list lengths at the start of the current follow-up turn"
+    )
+    prior_evidence: Annotated[Optional[str], lambda x, y: y if y is not None else x] = Field(
+        default=None,
+        description="Sources from earlier turns relevant to the current question"
+    )
+    research_topic: Annotated[Optional[str], lambda x, y: y if y is not None else x] = Field(
+        default=None,
+        description="Conversation history for prompts, compacted once per turn"
+    )
+    topic_summaries: Annotated[Optional[List[str]], lambda x, y: y if y is not None else x] = Field(
+        default=None,
+        description="Compacted older turns reused when building the next turn's topic"
+    )
+    sub_questions: Annotated[Optional[List[dict]], lambda x, y: y if y is not None else x] = Field(
+        default=None,
+        description="Sub-questions planned for the current turn in hierarchical mode"
+    )
+    sub_question_findings: Annotated[List[dict], operator.add] = Field(
+        default_factory=list,
+        description="Summaries of the sub-questions researched so far"
+    )
+    search_id_offset: Annotated[int, lambda x, y: y if y > x else x] = Field(
+        default=0,
+        description="Offset added to query positions to form search ids (citation markers)"
+    )
+    draft_answer: Annotated[Optional[dict], lambda x, y: y if y is not None else x] = Field(
+        default=None,
+        description="Message id and time of the draft answer returned earlier this turn"
+    )
+    prior_run: Annotated[Optional[dict], lambda x, y: y if y is not None else x] = Field(
+        default=None,
+        description="Stored run (question, queries, sources, answer) being refreshed"
+    )
+    refresh_report: Annotated[Optional[dict], lambda x, y: {**(x or {}), **y} if y is not None else x] = Field(
+        default=None,
+        description="Queries re-searched or reused by a refresh and the detected changes"
+    )
+    speculative_query: Annotated[Optional[str], lambda x, y: y if y is not None else x] = Field(
+        default=None,
+        description="Raw question searched ahead of query generation and merged this turn"
+    )
 
     class Config:
         arbitrary_types_allowed = True
\ No newline at end of file
@@ -1,3 +1,5 @@
+from typing import Optional
+
 from pydantic import BaseModel, Field
 
 
@@ -6,3 +8,12 @@ class WebSearchState(BaseModel):
 
     id: int = Field(description="この検索操作の一意識別子")
     search_query: str = Field(description="実行する検索クエリ")
+    deadline: Optional[float] = Field(
+        default=None, description="検索を打ち切る時刻（エポック秒、Noneは無制限）"
+    )
+    research_topic: str = Field(
+        default="", description="パッセージのランキングに使う研究トピック"
+    )
+    run_key: Optional[str] = Field(
+        default=None, description="実行ごとのインデックスに使う実行のキー（親の状態の値）"
+    )
@@ -0,0 +1,22 @@
+from typing import Any, Dict, Optional
+
+from pydantic import BaseModel, Field
+
+
+class SubQuestionState(BaseModel):
+    """サブ質問の研究タスクを格納するState"""
+
+    index: int = Field(description="計画内のサブ質問の番号（0始まり）")
+    question: str = Field(description="調べるサブ質問")
+    prompt: str = Field(description="サブ質問の研究ループに渡す質問（全体の文脈と前提を含む）")
+    search_id_offset: int = Field(description="このサブ質問の検索に割り当てた識別子の先頭")
+    search_id_end: int = Field(description="このサブ質問の検索に割り当てた識別子の末尾（含まない）")
+    run_started_at: Optional[float] = Field(
+        default=None, description="予算の計測開始時刻（親のターンの開始時刻）"
+    )
+    run_key: Optional[str] = Field(
+        default=None, description="実行ごとのインデックスに使う実行のキー（親の状態の値）"
+    )
+    config_overrides: Dict[str, Any] = Field(
+        default_factory=dict, description="このサブ質問に割り当てた予算などの設定の上書き"
+    )
@@ -1,14 +1,48 @@
 """Utility functions for the LangGraph agent."""
 
+from .budget_utils import BudgetStatus, get_budget_status, get_search_deadline
 from .citation_utils import get_citations, insert_citation_markers
 from .date_utils import get_current_date
-from .message_utils import get_research_topic
+from .message_utils import (
+    compact_research_topic,
+    estimate_tokens,
+    get_research_topic,
+)
+from .turn_utils import (
+    build_turn_topic,
+    get_latest_question,
+    get_or_create_run_key,
+    get_turn_findings,
+    get_turn_offset,
+    get_turn_results,
+    get_turn_started_at,
+    get_turn_topic,
+    has_prior_turn,
+    start_turn,
+)
+from .run_record import build_run_record
 from .url_utils import resolve_urls
 
 __all__ = [
+    "BudgetStatus",
+    "build_run_record",
+    "build_turn_topic",
+    "compact_research_topic",
+    "estimate_tokens",
+    "get_budget_status",
     "get_citations",
     "get_current_date",
+    "get_latest_question",
+    "get_or_create_run_key",
     "insert_citation_markers", 
     "get_research_topic",
+    "get_search_deadline",
+    "get_turn_findings",
+    "get_turn_offset",
+    "get_turn_results",
+    "get_turn_started_at",
+    "get_turn_topic",
+    "has_prior_turn",
     "resolve_urls",
+    "start_turn",
 ]
\ No newline at end of file
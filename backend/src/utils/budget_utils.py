@@ -0,0 +1,106 @@
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+from src.config.configuration import ResearchConfig
+from src.states import OverallState
+
+from .turn_utils import get_turn_offset, get_turn_started_at
+
+
+@dataclass
+class BudgetStatus:
+    """研究実行の予算（時間・トークン・検索回数）の消費状況。
+
+    上限が0の予算は無制限として扱います。
+    """
+
+    elapsed_seconds: float
+    tokens_used: int
+    search_count: int
+    max_run_seconds: float
+    max_total_tokens: int
+    max_searches: int
+
+    @property
+    def remaining_seconds(self) -> Optional[float]:
+        """残り時間（無制限ならNone）。"""
+        if self.max_run_seconds <= 0:
+            return None
+        return self.max_run_seconds - self.elapsed_seconds
+
+    @property
+    def remaining_tokens(self) -> Optional[int]:
+        """残りトークン数（無制限ならNone）。"""
+        if self.max_total_tokens <= 0:
+            return None
+        return self.max_total_tokens - self.tokens_used
+
+    @property
+    def remaining_searches(self) -> Optional[int]:
+        """残り検索回数（無制限ならNone）。"""
+        if self.max_searches <= 0:
+            return None
+        return self.max_searches - self.search_count
+
+    def exhausted_reason(
+        self, reserve_seconds: float = 0.0, reserve_tokens: int = 0
+    ) -> Optional[str]:
+        """使い切った予算の種類（"time" / "tokens" / "searches"）を返す。
+
+        最終回答の生成分として予約した時間・トークンを残せない場合も使い切ったとみなします。
+        """
+        remaining_seconds = self.remaining_seconds
+        if remaining_seconds is not None and remaining_seconds <= reserve_seconds:
+            return "time"
+        remaining_tokens = self.remaining_tokens
+        if remaining_tokens is not None and remaining_tokens <= reserve_tokens:
+            return "tokens"
+        remaining_searches = self.remaining_searches
+        if remaining_searches is not None and remaining_searches <= 0:
+            return "searches"
+        return None
+
+    def to_dict(self) -> Dict[str, Any]:
+        """最終回答と一緒に報告する辞書形式に変換。"""
+        return {
+            "elapsed_seconds": round(self.elapsed_seconds, 3),
+            "max_run_seconds": self.max_run_seconds or None,
+            "tokens_used": self.tokens_used,
+            "max_total_tokens": self.max_total_tokens or None,
+            "search_count": self.search_count,
+            "max_searches": self.max_searches or None,
+        }
+
+
+def get_budget_status(
+    state: OverallState, research: ResearchConfig, now: Optional[float] = None
+) -> BudgetStatus:
+    """状態と設定から予算の消費状況を取得。
+
+    フォローアップのターンでは、そのターンの開始時点からの消費量を数えます。
+    """
+    now = time.time() if now is None else now
+    started_at = get_turn_started_at(state) or now
+    return BudgetStatus(
+        elapsed_seconds=max(0.0, now - started_at),
+        tokens_used=state.tokens_used - get_turn_offset(state, "tokens_used"),
+        search_count=state.search_count - get_turn_offset(state, "search_count"),
+        max_run_seconds=research.max_run_seconds,
+        max_total_tokens=research.max_total_tokens,
+        max_searches=research.max_searches,
+    )
+
+
+def get_search_deadline(
+    state: OverallState, research: ResearchConfig
+) -> Optional[float]:
+    """検索を打ち切る時刻（最終回答の生成時間を残した実行の締め切り）を取得。"""
+    started_at = get_turn_started_at(state)
+    if research.max_run_seconds <= 0 or started_at is None:
+        return None
+    return (
+        started_at
+        + research.max_run_seconds
+        - research.finalize_reserve_seconds
+    )
@@ -1,31 +1,38 @@
-from typing import List, Union
+import math
+import re
+from typing import List, Optional, Sequence, Tuple, Union
 
 from langchain_core.messages import AIMessage, AnyMessage, HumanMessage
 
+# マークダウンのリンク（引用を書き換えたもの）と、書き換える前の引用マーカー
+_MARKDOWN_LINK_PATTERN = re.compile(r"\[([^\]]*)\]\([^)\s]*\)")
+_CITATION_MARKER_PATTERN = re.compile(r"【\d+-\d+】")
+_WHITESPACE_PATTERN = re.compile(r"\s+")
+
+
+def content_to_str(content: Union[str, list]) -> str:
+    """メッセージ内容を文字列に変換します。"""
+    if isinstance(content, str):
+        return content
+    elif isinstance(content, list):
+        # コンテンツブロックのリストを処理
+        text_parts = []
+        for item in content:
+            if isinstance(item, str):
+                text_parts.append(item)
+            elif isinstance(item, dict) and "text" in item:
+                text_parts.append(str(item["text"]))
+            else:
+                text_parts.append(str(item))
+        return " ".join(text_parts)
+    else:
+        return str(content)
+
 
 def get_research_topic(messages: List[AnyMessage]) -> str:
     """
     メッセージから研究トピックを取得します。
     """
-
-    def content_to_str(content: Union[str, list]) -> str:
-        """メッセージ内容を文字列に変換します。"""
-        if isinstance(content, str):
-            return content
-        elif isinstance(content, list):
-            # コンテンツブロックのリストを処理
-            text_parts = []
-            for item in content:
-                if isinstance(item, str):
-                    text_parts.append(item)
-                elif isinstance(item, dict) and "text" in item:
-                    text_parts.append(str(item["text"]))
-                else:
-                    text_parts.append(str(item))
-            return " ".join(text_parts)
-        else:
-            return str(content)
-
     # リクエストに履歴があるかチェックし、メッセージを1つの文字列に結合
     if len(messages) == 1:
         research_topic = content_to_str(messages[-1].content)
@@ -37,3 +44,91 @@ def get_research_topic(messages: List[AnyMessage]) -> str:
             elif isinstance(message, AIMessage):
                 research_topic += f"Assistant: {content_to_str(message.content)}\n"
     return research_topic
+
+
+def estimate_tokens(text: str) -> int:
+    """トークン数を概算（ASCIIは4文字、それ以外は1文字を1トークンとみなす）。"""
+    ascii_chars = sum(1 for char in text if char.isascii())
+    return math.ceil(ascii_chars / 4) + len(text) - ascii_chars
+
+
+def _split_turns(messages: Sequence[AnyMessage]) -> List[Tuple[str, str]]:
+    """メッセージを (ユーザーの質問, アシスタントの回答) のターンに分割。"""
+    turns: List[Tuple[str, str]] = []
+    for message in messages:
+        if isinstance(message, HumanMessage):
+            turns.append((content_to_str(message.content), ""))
+        elif isinstance(message, AIMessage) and turns:
+            question, answer = turns[-1]
+            turns[-1] = (question, answer + content_to_str(message.content))
+    return turns
+
+
+def _shorten(text: str, max_chars: int) -> str:
+    """テキストを1行にまとめ、`max_chars` 文字を超える分を省略。"""
+    text = _WHITESPACE_PATTERN.sub(" ", text).strip()
+    return text if len(text) <= max_chars else text[: max_chars - 1] + "…"
+
+
+def compact_turn(question: str, answer: str, max_chars: int = 300) -> str:
+    """古いターンを、引用リンクを除いて短くした質問と回答の冒頭にまとめる。"""
+    answer = _CITATION_MARKER_PATTERN.sub("", _MARKDOWN_LINK_PATTERN.sub("", answer))
+    return (
+        f"User: {_shorten(question, max_chars)}\n"
+        f"Assistant（要約）: {_shorten(answer, max_chars)}\n"
+    )
+
+
+def _verbatim_turn(question: str, answer: str) -> str:
+    """ターンを `get_research_topic` と同じ形式でそのまま書き出す。"""
+    text = f"User: {question}\n"
+    return text + f"Assistant: {answer}\n" if answer else text
+
+
+def compact_research_topic(
+    messages: List[AnyMessage],
+    max_tokens: int = 2000,
+    recent_turns: int = 2,
+    summary_chars: int = 300,
+    compacted: Optional[Sequence[str]] = None,
+) -> Tuple[str, List[str]]:
+    """会話履歴から上限付きの研究トピックを作成。
+
+    直近 `recent_turns` ターン（現在の質問を含む）はそのまま残し、それより古いターンは
+    `compact_turn` で短くまとめます。合計が `max_tokens`（概算、0は無制限）を超える場合は
+    直近のターンの回答も古い順にまとめ、残りに収まらない古いまとめを古い順に省略します。
+    現在の質問は省略しません。
+
+    `compacted` に前のターンで作成したまとめを渡すと、新たに古くなったターンだけを
+    まとめます。研究トピックと、次のターンに引き継ぐまとめのリストを返します。
+    """
+    if len(messages) == 1:
+        return get_research_topic(messages), []
+
+    turns = _split_turns(messages)
+    older = max(0, len(turns) - max(1, recent_turns))
+    summaries = list(compacted or [])[:older]
+    summaries.extend(
+        compact_turn(question, answer, summary_chars)
+        for question, answer in turns[len(summaries) : older]
+    )
+    recent = [_verbatim_turn(q, a) for q, a in turns[older:]]
+
+    def total(items: Sequence[str]) -> int:
+        return sum(map(estimate_tokens, items))
+
+    dropped = 0
+    if max_tokens > 0:
+        # 直近のターンだけで上限を超える場合は古い順に回答をまとめる（現在の質問は除く）
+        for index in range(len(recent) - 1):
+            if total(recent) <= max_tokens:
+                break
+            question, answer = turns[older + index]
+            recent[index] = compact_turn(question, answer, summary_chars)
+        budget = max_tokens - total(recent)
+        while dropped < len(summaries) and total(summaries[dropped:]) > budget:
+            dropped += 1
+
+    omitted = f"（それ以前の会話 {dropped} ターンは省略）\n" if dropped else ""
+    topic = omitted + "".join(summaries[dropped:]) + "".join(recent)
+    return topic, summaries
@@ -0,0 +1,40 @@
+import time
+from typing import Any, Dict, Mapping, Union
+
+from langchain_core.messages import AIMessage
+
+from src.states import OverallState
+
+from .turn_utils import get_latest_question, get_turn_offset
+
+
+def build_run_record(
+    state: Union[OverallState, Mapping[str, Any]],
+) -> Dict[str, Any]:
+    """完了した実行の最後のターンから、再実行（リフレッシュ）に使う記録を作成。
+
+    記録は質問・検索クエリ・ソース（クエリと取得日時付き）・回答だけのJSONに
+    変換できる辞書で、`refresh_graph` に `prior_run` として渡します。
+    """
+    if not isinstance(state, OverallState):
+        state = OverallState(**state)
+    answer = next(
+        (
+            str(message.content)
+            for message in reversed(state.messages)
+            if isinstance(message, AIMessage)
+        ),
+        "",
+    )
+    return {
+        "question": get_latest_question(state.messages),
+        "answer": answer,
+        "queries": state.search_query[get_turn_offset(state, "search_query") :],
+        "sources": [
+            dict(source)
+            for source in state.sources_gathered[
+                get_turn_offset(state, "sources_gathered") :
+            ]
+        ],
+        "recorded_at": time.time(),
+    }
@@ -0,0 +1,118 @@
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+from langchain_core.messages import AIMessage, AnyMessage, HumanMessage
+
+from src.states import OverallState
+
+from .message_utils import compact_research_topic, get_research_topic
+
+# ターンの開始時点の値を記録する状態の項目（リストは長さを記録）
+TURN_COUNTERS = ("tokens_used", "search_count", "research_loop_count")
+TURN_LISTS = (
+    "search_query",
+    "web_research_result",
+    "sources_gathered",
+    "sub_question_findings",
+)
+
+
+def has_prior_turn(messages: List[AnyMessage]) -> bool:
+    """最後のユーザーメッセージより前にアシスタントの回答があるか（フォローアップか）を判定。"""
+    for message in reversed(messages[:-1]):
+        if isinstance(message, AIMessage):
+            return True
+    return False
+
+
+def get_latest_question(messages: List[AnyMessage], count: int = 1) -> str:
+    """直近 `count` 件のユーザーメッセージを古い順に改行で結合して返す。"""
+    questions: List[str] = []
+    for message in reversed(messages):
+        if isinstance(message, HumanMessage):
+            questions.append(str(message.content))
+            if len(questions) >= count:
+                break
+    return "\n".join(reversed(questions))
+
+
+def get_or_create_run_key(state: OverallState) -> str:
+    """実行ごとのインデックス（近似重複など）に使う実行のキーを取得または作成。
+
+    設定にスレッドの識別子が無いステートレスな実行どうしが "default" のキーで
+    インデックスを共有しないよう、ターンの開始時に一意のキーを作成して状態に記録します。
+    """
+    return state.run_key or uuid.uuid4().hex
+
+
+def start_turn(state: OverallState, now: Optional[float] = None) -> Dict[str, Any]:
+    """フォローアップのターンの開始時に状態へ書き込む項目を作成。
+
+    スレッドの状態は前のターンから引き継がれるため、ターンの開始時点の
+    カウンターとリストの長さを `turn_baseline` に記録し、予算・ループ回数・
+    検索結果をこのターンの分だけで数えられるようにします。
+    最初のターンでは何も記録しません（空の辞書を返します）。
+    """
+    if not has_prior_turn(state.messages):
+        return {}
+    baseline: Dict[str, Any] = {"started_at": time.time() if now is None else now}
+    for name in TURN_COUNTERS:
+        baseline[name] = getattr(state, name)
+    for name in TURN_LISTS:
+        baseline[name] = len(getattr(state, name))
+    return {
+        "turn_baseline": baseline,
+        "prior_evidence": "",
+        "speculative_query": "",
+        "draft_answer": {},
+    }
+
+
+def get_turn_offset(state: OverallState, name: str) -> int:
+    """このターンの開始時点のカウンターの値またはリストの長さ（最初のターンは0）。"""
+    return (state.turn_baseline or {}).get(name, 0)
+
+
+def get_turn_results(state: OverallState) -> List[str]:
+    """このターンの検索結果テキスト（前のターンから再利用するソースがあれば先頭に付与）。"""
+    results = state.web_research_result[get_turn_offset(state, "web_research_result") :]
+    return [state.prior_evidence, *results] if state.prior_evidence else results
+
+
+def get_turn_findings(state: OverallState) -> List[Dict[str, Any]]:
+    """このターンで調べ終えたサブ質問の結果（階層的な計画モード）。"""
+    offset = get_turn_offset(state, "sub_question_findings")
+    return state.sub_question_findings[offset:]
+
+
+def get_turn_started_at(state: OverallState) -> Optional[float]:
+    """このターン（最初のターンは実行）の開始時刻。"""
+    return (state.turn_baseline or {}).get("started_at") or state.run_started_at
+
+
+def build_turn_topic(state: OverallState, config_obj) -> Dict[str, Any]:
+    """ターンの開始時に、プロンプトに入れる研究トピックを作成して状態へ書き込む項目を返す。
+
+    前のターンでまとめた古いターンを `topic_summaries` から再利用し、新たに古くなった
+    ターンだけをまとめます（`compact_research_topic` を参照）。
+    """
+    research = config_obj.research
+    topic, summaries = compact_research_topic(
+        state.messages,
+        max_tokens=research.topic_max_tokens,
+        recent_turns=research.topic_recent_turns,
+        summary_chars=research.topic_summary_chars,
+        compacted=state.topic_summaries,
+    )
+    return {"research_topic": topic, "topic_summaries": summaries}
+
+
+def get_turn_topic(state: OverallState) -> str:
+    """このターンの研究トピック（ターンの開始時に作成したもの）。
+
+    開始ノードを経由せずに呼ばれた場合は会話履歴全体から作成します。
+    """
+    if state.research_topic is not None:
+        return state.research_topic
+    return get_research_topic(state.messages)
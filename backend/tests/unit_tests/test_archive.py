@@ -0,0 +1,119 @@
+import pytest
+from langchain_core.messages import HumanMessage
+
+from benchmarks.fakes import FakeChatModel, FakeSearchProvider, use_fake_providers
+from src.archive import (
+    RunArchiveWriter,
+    available_formats,
+    get_run_archive,
+    list_archive_chunks,
+    scan_run_archive,
+)
+from src.archive.formats import resolve_format
+from src.config.configuration import Configuration
+from src.graphs import research_graph
+
+NOW = 1_000_000.0
+
+
+def _record(index):
+    return {
+        "run_key": f"run-{index}",
+        "finished_at": NOW + index,
+        "question": f"question {index}",
+        "answer": f"answer {index}",
+        "tokens_used": index * 10,
+        "queries": [f"query {index}"],
+        "sources": [],
+        "config": {},
+    }
+
+
+def _write(path, archive_format, count, **options):
+    writer = RunArchiveWriter(str(path), archive_format, **options)
+    for index in range(count):
+        writer.append(_record(index))
+    return writer
+
+
+def test_unknown_format_is_rejected():
+    assert resolve_format("auto") == available_formats()[0]
+    with pytest.raises(ValueError):
+        resolve_format("csv")
+
+
+@pytest.mark.parametrize("archive_format", available_formats())
+def test_records_are_split_into_chunks_in_order(tmp_path, archive_format):
+    writer = _write(tmp_path, archive_format, 7, chunk_records=3, flush_records=2)
+    writer.close()
+
+    chunks = list_archive_chunks(str(tmp_path))
+    assert len(chunks) == 3
+    assert [record["run_key"] for record in scan_run_archive(str(tmp_path))] == [
+        f"run-{index}" for index in range(7)
+    ]
+
+
+@pytest.mark.parametrize("archive_format", available_formats())
+def test_filters_and_projection(tmp_path, archive_format):
+    _write(tmp_path, archive_format, 5, chunk_records=2).close()
+
+    records = scan_run_archive(
+        str(tmp_path),
+        where=lambda record: record["tokens_used"] >= 20,
+        fields=["question", "tokens_used"],
+        until=NOW + 3,
+    )
+    assert list(records) == [
+        {"question": "question 2", "tokens_used": 20},
+        {"question": "question 3", "tokens_used": 30},
+    ]
+    assert len(list(scan_run_archive(str(tmp_path), since=NOW + 4))) == 1
+
+
+def test_open_chunk_is_read_only_when_partial_is_included(tmp_path):
+    writer = _write(tmp_path, "jsonl.gz", 3, chunk_records=10, flush_records=2)
+
+    # 書き込み済みの2件だけが書き込み中のチャンクから読める
+    assert list_archive_chunks(str(tmp_path)) == []
+    assert len(list(scan_run_archive(str(tmp_path), include_partial=True))) == 2
+
+    writer.close()
+    assert len(list(scan_run_archive(str(tmp_path)))) == 3
+
+
+def test_truncated_chunk_tail_is_skipped(tmp_path):
+    _write(tmp_path, "jsonl.gz", 2, flush_records=1).close()
+    (chunk,) = list_archive_chunks(str(tmp_path))
+    data = chunk.read_bytes()
+    # 2件目のgzipメンバーの途中で切れたチャンク（書き込み中のクラッシュ）
+    second = data.index(b"\x1f\x8b", 1)
+    chunk.write_bytes(data[: second + (len(data) - second) // 2])
+
+    assert [record["run_key"] for record in scan_run_archive(str(tmp_path))] == [
+        "run-0"
+    ]
+
+
+def test_completed_run_is_archived(tmp_path):
+    config = {
+        "configurable": {
+            "archive_enabled": True,
+            "archive_path": str(tmp_path),
+            "archive_format": "jsonl.gz",
+            "archive_flush_records": 1,
+        }
+    }
+    with use_fake_providers(FakeChatModel(), FakeSearchProvider()):
+        state = research_graph.invoke(
+            {"messages": [HumanMessage(content="question")]}, config
+        )
+    get_run_archive(Configuration.get_config(config).archive).close()
+
+    (record,) = scan_run_archive(str(tmp_path))
+    assert record["question"] == "question"
+    assert record["answer"] == state["messages"][-1].content
+    assert record["queries"] == state["search_query"]
+    assert record["source_count"] == len(state["sources_gathered"])
+    assert "content" not in record["sources"][0]
+    assert record["config"]["research"]["max_research_loops"] == 2
@@ -0,0 +1,48 @@
+import pytest
+
+from src.retrieval.bm25 import BM25Index
+
+
+@pytest.fixture
+def index():
+    index = BM25Index()
+    index.add("太陽光発電のコストは年々低下している", {"id": "solar"})
+    index.add("風力発電は洋上での導入が進む", {"id": "wind"})
+    index.add("原子力発電所の再稼働をめぐる議論", {"id": "nuclear"})
+    return index
+
+
+def test_search_ranks_matching_document_first(index):
+    hits = index.search("太陽光のコスト")
+    assert hits
+    assert index.documents[hits[0][1]]["id"] == "solar"
+
+
+def test_search_matches_japanese_bigrams_inside_words(index):
+    # 「洋上風力」は文書に連続して現れないが、bigramの「洋上」「風力」で一致する
+    hits = index.search("洋上風力")
+    assert [index.documents[doc_id]["id"] for _, doc_id in hits] == ["wind"]
+
+
+def test_common_terms_score_lower_than_rare_terms(index):
+    # 「発電」は全文書に現れるため、1文書にしか無い語より寄与が小さい
+    common = index.score_terms(["発電"])
+    rare = index.score_terms(["洋上"])
+    assert max(common.values()) < max(rare.values())
+
+
+def test_search_without_matches_or_documents_is_empty(index):
+    assert index.search("量子コンピューター") == []
+    assert BM25Index().search("太陽光") == []
+
+
+def test_top_k_limits_results(index):
+    assert len(index.search("発電", top_k=2)) == 2
+
+
+def test_save_and_load_round_trip(index, tmp_path):
+    path = str(tmp_path / "index" / "bm25.json")
+    index.save(path)
+    loaded = BM25Index.load(path)
+    assert len(loaded) == len(index)
+    assert loaded.search("風力発電") == index.search("風力発電")
@@ -0,0 +1,103 @@
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+
+from src.config.configuration import ResearchConfig
+from src.states import OverallState
+from src.utils import BudgetStatus, get_budget_status, get_search_deadline
+
+
+def _status(**overrides):
+    values = {
+        "elapsed_seconds": 0.0,
+        "tokens_used": 0,
+        "search_count": 0,
+        "max_run_seconds": 0.0,
+        "max_total_tokens": 0,
+        "max_searches": 0,
+    }
+    return BudgetStatus(**{**values, **overrides})
+
+
+def test_unlimited_budgets_are_never_exhausted():
+    status = _status(elapsed_seconds=1e6, tokens_used=10**9, search_count=10**6)
+    assert status.remaining_seconds is None
+    assert status.remaining_tokens is None
+    assert status.remaining_searches is None
+    assert status.exhausted_reason(10.0, 1000) is None
+
+
+@pytest.mark.parametrize(
+    ("overrides", "expected"),
+    [
+        ({"elapsed_seconds": 59.0, "max_run_seconds": 60.0}, None),
+        ({"elapsed_seconds": 60.0, "max_run_seconds": 60.0}, "time"),
+        ({"tokens_used": 999, "max_total_tokens": 1000}, None),
+        ({"tokens_used": 1000, "max_total_tokens": 1000}, "tokens"),
+        ({"search_count": 4, "max_searches": 5}, None),
+        ({"search_count": 5, "max_searches": 5}, "searches"),
+        ({"search_count": 7, "max_searches": 5}, "searches"),
+    ],
+)
+def test_exhausted_reason_without_reserve(overrides, expected):
+    assert _status(**overrides).exhausted_reason() == expected
+
+
+def test_reserve_counts_as_exhausted():
+    status = _status(
+        elapsed_seconds=50.0,
+        max_run_seconds=60.0,
+        tokens_used=9000,
+        max_total_tokens=10000,
+    )
+    assert status.exhausted_reason(reserve_seconds=5.0) is None
+    assert status.exhausted_reason(reserve_seconds=10.0) == "time"
+    assert status.exhausted_reason(reserve_tokens=1000) == "tokens"
+
+
+def test_time_is_reported_before_tokens_and_searches():
+    status = _status(
+        elapsed_seconds=60.0,
+        max_run_seconds=60.0,
+        tokens_used=1000,
+        max_total_tokens=1000,
+        search_count=5,
+        max_searches=5,
+    )
+    assert status.exhausted_reason() == "time"
+    status.max_run_seconds = 0.0
+    assert status.exhausted_reason() == "tokens"
+
+
+def test_to_dict_reports_unlimited_as_none():
+    usage = _status(elapsed_seconds=1.23456, tokens_used=10, max_searches=3).to_dict()
+    assert usage == {
+        "elapsed_seconds": 1.235,
+        "max_run_seconds": None,
+        "tokens_used": 10,
+        "max_total_tokens": None,
+        "search_count": 0,
+        "max_searches": 3,
+    }
+
+
+def test_budget_status_counts_only_the_current_turn():
+    research = ResearchConfig(max_total_tokens=1000, max_searches=4)
+    state = OverallState(
+        messages=[HumanMessage("q1"), AIMessage("a1"), HumanMessage("q2")],
+        run_started_at=100.0,
+        tokens_used=1500,
+        search_count=5,
+        turn_baseline={"started_at": 200.0, "tokens_used": 1200, "search_count": 3},
+    )
+    status = get_budget_status(state, research, now=230.0)
+    assert status.elapsed_seconds == 30.0
+    assert status.tokens_used == 300
+    assert status.search_count == 2
+    assert status.exhausted_reason() is None
+
+
+def test_search_deadline_leaves_finalize_reserve():
+    research = ResearchConfig(max_run_seconds=60.0, finalize_reserve_seconds=10.0)
+    state = OverallState(run_started_at=100.0)
+    assert get_search_deadline(state, research) == 150.0
+    assert get_search_deadline(state, ResearchConfig(max_run_seconds=0)) is None
@@ -0,0 +1,114 @@
+import re
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.checkpoint.memory import MemorySaver
+
+from benchmarks.fakes import FakeChatModel, FakeSearchProvider, use_fake_providers
+from src.config.configuration import Configuration
+from src.graphs.research_graph import builder
+from src.nodes.follow_up import FollowUpNode
+from src.retrieval.source_index import SourceIndex
+from src.states import OverallState
+
+
+def _source(marker, title, content="", **fields):
+    return {
+        "short_url": marker,
+        "value": f"https://example.com/{marker}",
+        "title": title,
+        "content": content,
+        **fields,
+    }
+
+
+def _run_two_turns(thread_id, sufficient):
+    """同じスレッドで2ターン実行し、2ターン目の最終状態を返す。"""
+    graph = builder.compile(checkpointer=MemorySaver())
+    config = {"configurable": {"thread_id": thread_id, "reuse_prior_sources": True}}
+    llm = FakeChatModel(prior_sources_sufficient=sufficient)
+    with use_fake_providers(llm, FakeSearchProvider()):
+        first = graph.invoke(
+            {"messages": [HumanMessage(content="再生可能エネルギーの課題は？")]}, config
+        )
+        second = graph.invoke(
+            {"messages": [HumanMessage(content="再生可能エネルギーのコストは？")]},
+            config,
+        )
+    return first, second
+
+
+def test_index_adds_only_new_sources():
+    index = SourceIndex()
+    sources = [_source("【0-0】", "solar cost")]
+    index.update(sources)
+    index.update(sources + [_source("【1-0】", "wind power")])
+
+    assert [s["short_url"] for s in index.search("wind")] == ["【1-0】"]
+    assert [s["short_url"] for s in index.search("solar")] == ["【0-0】"]
+
+
+def test_index_is_rebuilt_when_the_prefix_differs():
+    index = SourceIndex()
+    index.update([_source("【0-0】", "solar cost"), _source("【0-1】", "wind power")])
+    # 分岐したスレッドの状態では先頭のソースが異なる
+    index.update([_source("【0-0】", "battery storage")])
+
+    assert index.search("wind") == []
+    assert [s["short_url"] for s in index.search("battery")] == ["【0-0】"]
+
+
+def test_index_skips_near_duplicates():
+    index = SourceIndex()
+    index.update(
+        [
+            _source("【0-0】", "solar cost"),
+            _source("【0-1】", "solar cost", duplicate_of="【0-0】"),
+        ]
+    )
+    assert [s["short_url"] for s in index.search("solar")] == ["【0-0】"]
+
+
+def test_reuse_requires_a_prior_turn_with_sources():
+    config_obj = Configuration.get_config(
+        {"configurable": {"reuse_prior_sources": True}}
+    )
+    sources = [_source("【0-0】", "solar cost")]
+    first_turn = OverallState(
+        messages=[HumanMessage(content="q1")], sources_gathered=sources
+    )
+    follow_up = OverallState(
+        messages=[
+            HumanMessage(content="q1"),
+            AIMessage(content="a1"),
+            HumanMessage(content="q2"),
+        ],
+        sources_gathered=sources,
+    )
+
+    assert not FollowUpNode.should_reuse(first_turn, config_obj)
+    assert FollowUpNode.should_reuse(follow_up, config_obj)
+    assert not FollowUpNode.should_reuse(follow_up, Configuration.get_config())
+
+
+def test_query_count_stays_within_the_search_budget():
+    config_obj = Configuration.get_config(
+        {"configurable": {"max_follow_up_queries": 3, "max_searches": 2}}
+    )
+    assert FollowUpNode()._get_query_count(config_obj) == 2
+
+
+@pytest.mark.parametrize("sufficient, searches", [(True, 0), (False, 2)])
+def test_follow_up_turn_reuses_prior_sources(sufficient, searches):
+    first, second = _run_two_turns(f"follow-up-{sufficient}", sufficient)
+
+    assert second["is_sufficient"] is sufficient
+    assert second["budget_usage"]["search_count"] == searches
+    # 再利用したソースは前のターンと同じ引用マーカーで参照される
+    markers = re.findall(r"【\d+-\d+】", second["prior_evidence"])
+    gathered = {source["short_url"] for source in first["sources_gathered"]}
+    assert markers and set(markers) <= gathered
+    if sufficient:
+        assert second["sources_gathered"] == first["sources_gathered"]
+    else:
+        assert len(second["sources_gathered"]) > len(first["sources_gathered"])
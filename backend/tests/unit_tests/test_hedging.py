@@ -0,0 +1,179 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src.providers import hedging
+from src.providers.hedging import HedgeBudget, LatencyTracker, arun_hedged, run_hedged
+from src.providers.limiter import AdaptiveLimiter, LimiterSettings
+
+
+def _sleep_then(seconds, value):
+    def call():
+        time.sleep(seconds)
+        return value
+
+    return call
+
+
+def test_fast_primary_wins_without_hedging():
+    hedges = []
+    result = run_hedged(
+        _sleep_then(0.0, "primary"),
+        hedge=lambda: hedges.append(1),
+        hedge_delay=1.0,
+    )
+    assert result == ("primary", False)
+    assert hedges == []
+
+
+def test_slow_primary_is_hedged():
+    result = run_hedged(
+        _sleep_then(1.0, "primary"),
+        timeout=5.0,
+        hedge=_sleep_then(0.0, "hedge"),
+        hedge_delay=0.05,
+    )
+    assert result == ("hedge", True)
+
+
+def test_hedge_is_skipped_when_not_allowed():
+    result = run_hedged(
+        _sleep_then(0.2, "primary"),
+        hedge=_sleep_then(0.0, "hedge"),
+        hedge_delay=0.01,
+        allow_hedge=lambda: False,
+    )
+    assert result == ("primary", False)
+
+
+def test_timeout_raises():
+    with pytest.raises(TimeoutError):
+        run_hedged(_sleep_then(1.0, "primary"), timeout=0.05)
+
+
+def test_failed_primary_falls_back_to_hedge():
+    def fail():
+        time.sleep(0.1)
+        raise ConnectionError("down")
+
+    result = run_hedged(fail, hedge=_sleep_then(0.2, "hedge"), hedge_delay=0.01)
+    assert result == ("hedge", True)
+
+
+def test_error_is_raised_when_every_call_fails():
+    def fail():
+        raise ValueError("bad request")
+
+    with pytest.raises(ValueError):
+        run_hedged(fail)
+
+
+def test_queue_time_is_not_counted_against_timeout(monkeypatch):
+    executor = ThreadPoolExecutor(max_workers=1)
+    monkeypatch.setattr(hedging, "_executor", executor)
+    release = threading.Event()
+    busy = executor.submit(release.wait)
+    threading.Timer(0.2, release.set).start()
+    try:
+        # スレッドの空きを0.2秒待つが、締め切りは実行開始から数える
+        assert run_hedged(_sleep_then(0.05, "primary"), timeout=0.15) == (
+            "primary",
+            False,
+        )
+    finally:
+        release.set()
+        busy.result()
+        executor.shutdown()
+
+
+def test_latency_tracker_quantile():
+    tracker = LatencyTracker(window=4)
+    assert tracker.quantile(0.5) is None
+    for seconds in (5.0, 1.0, 2.0, 3.0, 4.0):
+        tracker.observe(seconds)
+    # 最も古いサンプル（5.0）は窓から外れる
+    assert tracker.quantile(0.5) == 2.0
+    assert tracker.quantile(1.0) == 4.0
+    assert tracker.quantile(0.5, min_samples=5) is None
+
+
+def test_hedge_budget_limits_extra_calls():
+    budget = HedgeBudget(max_extra_ratio=0.5)
+    assert not budget.try_spend()
+    budget.record_primary()
+    assert not budget.try_spend()
+    budget.record_primary()
+    assert budget.try_spend()
+    assert not budget.try_spend()
+
+
+@pytest.fixture
+def limiter():
+    limiter = AdaptiveLimiter(
+        "hedge-test", LimiterSettings(max_concurrency=2, backoff_base_seconds=0.0)
+    )
+    yield limiter
+    assert limiter.in_flight == 0
+
+
+def _limited(limiter, seconds, value):
+    async def call():
+        await asyncio.sleep(seconds)
+        return value
+
+    return lambda: limiter.acall(call)
+
+
+async def _settle():
+    # キャンセルしたタスクの後処理（枠の解放）を進める
+    for _ in range(3):
+        await asyncio.sleep(0)
+
+
+def test_async_hedge_loser_releases_limiter_slot(limiter):
+    async def main():
+        for _ in range(5):
+            result = await asyncio.wait_for(
+                arun_hedged(
+                    _limited(limiter, 1.0, "primary"),
+                    timeout=5.0,
+                    hedge=_limited(limiter, 0.0, "hedge"),
+                    hedge_delay=0.01,
+                ),
+                2.0,
+            )
+            assert result == ("hedge", True)
+            await _settle()
+            assert limiter.in_flight == 0
+
+    asyncio.run(main())
+
+
+def test_async_timeouts_release_limiter_slots(limiter):
+    async def main():
+        # 枠（2）より多くの呼び出しがタイムアウトしても枠を使い切らない
+        for _ in range(5):
+            with pytest.raises(TimeoutError):
+                await arun_hedged(_limited(limiter, 1.0, "primary"), timeout=0.02)
+            await _settle()
+            assert limiter.in_flight == 0
+        result = await asyncio.wait_for(
+            arun_hedged(_limited(limiter, 0.0, "primary"), timeout=1.0), 1.0
+        )
+        assert result == ("primary", False)
+
+    asyncio.run(main())
+
+
+def test_async_hedge_not_sent_when_primary_is_fast(limiter):
+    async def main():
+        return await arun_hedged(
+            _limited(limiter, 0.0, "primary"),
+            hedge=_limited(limiter, 0.0, "hedge"),
+            hedge_delay=0.5,
+        )
+
+    assert asyncio.run(main()) == ("primary", False)
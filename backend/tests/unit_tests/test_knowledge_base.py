@@ -0,0 +1,106 @@
+from langchain_core.messages import HumanMessage
+
+from benchmarks.fakes import FakeChatModel, FakeSearchProvider, use_fake_providers
+from src.config.configuration import Configuration
+from src.graphs.research_graph import research_graph
+from src.nodes.research import WebResearchNode
+from src.observability.metrics import KB_LOOKUPS
+from src.retrieval import KnowledgeBase, canonical_url, classify_query
+
+NOW = 1_000_000.0
+QUERY = "再生可能エネルギー 導入状況"
+
+
+def _sources(count, fetched_at=NOW, suffix=""):
+    return [
+        {
+            "value": f"https://example.com/p{i}{suffix}",
+            "title": f"再生可能エネルギー 記事{i}",
+            "content": "太陽光発電の導入状況",
+            "fetched_at": fetched_at,
+        }
+        for i in range(count)
+    ]
+
+
+def test_canonical_url_ignores_tracking_and_formatting():
+    assert (
+        canonical_url("HTTPS://www.Example.com:443/a/b/?utm_source=x&b=2&a=1#frag")
+        == "https://example.com/a/b?a=1&b=2"
+    )
+    assert canonical_url("http://example.com:8080/") == "http://example.com:8080"
+
+
+def test_classify_query():
+    assert classify_query("最新の株価") == "news"
+    assert classify_query("光合成とは") == "reference"
+    assert classify_query("renewable energy") == "default"
+
+
+def test_ingest_skips_duplicates_and_empty_sources(tmp_path):
+    knowledge_base = KnowledgeBase(str(tmp_path))
+    sources = _sources(3) + [
+        {"value": "https://example.com/empty", "content": ""},
+        {**_sources(1)[0], "value": "https://example.com/dup", "duplicate_of": "x"},
+    ]
+
+    assert knowledge_base.ingest(sources) == 3
+    assert knowledge_base.ingest(sources) == 0
+    assert len(knowledge_base) == 3
+
+
+def test_search_filters_by_age_and_coverage(tmp_path):
+    knowledge_base = KnowledgeBase(str(tmp_path))
+    knowledge_base.ingest(_sources(3, fetched_at=NOW - 100))
+
+    results, stale = knowledge_base.search(QUERY, 5, 3600, 0.6, now=NOW)
+    assert (len(results), stale) == (3, 0)
+    assert knowledge_base.search(QUERY, 5, 50, 0.6, now=NOW) == ([], 3)
+    assert knowledge_base.search("風力 洋上 送電網", 5, 3600, 0.6, now=NOW) == ([], 0)
+
+
+def test_newer_copy_supersedes_and_is_seen_by_other_instances(tmp_path):
+    writer = KnowledgeBase(str(tmp_path), compact_threshold=5)
+    reader = KnowledgeBase(str(tmp_path))
+    writer.ingest(_sources(4, fetched_at=NOW - 100))
+    assert len(reader) == 4
+
+    # トラッキング用のパラメータだけが異なるURLは同じ文書として扱う
+    assert writer.ingest(_sources(4, suffix="/?utm_medium=a")) == 4
+    # 追記ログの文書数が閾値を超えたのでスナップショットにまとめられている
+    assert (tmp_path / "log.jsonl").read_bytes() == b""
+    assert len(reader) == 4
+    results, _ = reader.search(QUERY, 5, 50, 0.5, now=NOW)
+    assert [result["fetched_at"] for result in results] == [NOW] * 4
+
+
+def test_freshness_depends_on_the_query_type():
+    config_obj = Configuration.get_config(
+        {
+            "configurable": {
+                "kb_fresh_news_seconds": 1,
+                "kb_fresh_default_seconds": 2,
+                "kb_fresh_reference_seconds": 3,
+            }
+        }
+    )
+    node = WebResearchNode()
+    assert [
+        node._get_max_age(query_type, config_obj)
+        for query_type in ("news", "default", "reference")
+    ] == [1, 2, 3]
+
+
+def test_second_run_is_answered_from_the_knowledge_base(tmp_path):
+    config = {"configurable": {"kb_enabled": True, "kb_path": str(tmp_path)}}
+    question = {"messages": [HumanMessage(content="再生可能エネルギーの課題は？")]}
+    hits = KB_LOOKUPS.get("default", "hit")
+
+    with use_fake_providers(FakeChatModel(), FakeSearchProvider()):
+        first = research_graph.invoke(question, config)
+        assert KB_LOOKUPS.get("default", "hit") == hits
+        second = research_graph.invoke(question, config)
+
+    # 最初の実行で追加したソースから、同じクエリの検索が省かれる
+    assert KB_LOOKUPS.get("default", "hit") > hits
+    assert len(second["sources_gathered"]) == len(first["sources_gathered"])
@@ -0,0 +1,128 @@
+import asyncio
+
+import pytest
+
+from src.providers.limiter import AdaptiveLimiter, LimiterSettings
+
+
+class Throttled(Exception):
+    status_code = 429
+
+
+class BadRequest(Exception):
+    status_code = 400
+
+
+def _limiter(**overrides):
+    settings = {"max_concurrency": 4, "backoff_base_seconds": 0.0, **overrides}
+    return AdaptiveLimiter("test", LimiterSettings(**settings))
+
+
+def test_cancelled_call_releases_its_slot():
+    limiter = _limiter(max_concurrency=1)
+
+    async def main():
+        started = asyncio.Event()
+
+        async def slow():
+            started.set()
+            await asyncio.sleep(10)
+
+        task = asyncio.create_task(limiter.acall(slow))
+        await started.wait()
+        assert limiter.in_flight == 1
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert limiter.in_flight == 0
+
+        # 枠が返っていれば次の呼び出しはすぐに実行できる
+        async def fast():
+            return "ok"
+
+        assert await asyncio.wait_for(limiter.acall(fast), 1.0) == "ok"
+
+    asyncio.run(main())
+    assert limiter.in_flight == 0
+    # キャンセルは成功・混雑のどちらとしても同時実行数を調整しない
+    assert limiter.limit == 1.0
+
+
+def test_timed_out_calls_do_not_exhaust_slots():
+    limiter = _limiter(max_concurrency=2)
+
+    async def slow():
+        await asyncio.sleep(10)
+
+    async def main():
+        for _ in range(5):
+            with pytest.raises(asyncio.TimeoutError):
+                await asyncio.wait_for(limiter.acall(slow), 0.01)
+        assert limiter.in_flight == 0
+
+    asyncio.run(main())
+
+
+def test_async_errors_release_slots_and_are_not_retried_when_permanent():
+    limiter = _limiter()
+    calls = []
+
+    async def fail():
+        calls.append(1)
+        raise BadRequest()
+
+    with pytest.raises(BadRequest):
+        asyncio.run(limiter.acall(fail))
+    assert calls == [1]
+    assert limiter.in_flight == 0
+
+
+def test_throttle_is_retried_and_decreases_limit():
+    limiter = _limiter(max_concurrency=8, decrease_factor=0.5)
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise Throttled()
+        return "done"
+
+    assert limiter.call(flaky) == "done"
+    assert len(attempts) == 3
+    assert limiter.in_flight == 0
+    # 1回目の失敗で半分に減り、2回目は減少後に開始した呼び出しなので更に半分
+    assert 2.0 <= limiter.limit < 3.0
+
+
+def test_success_increases_limit_up_to_maximum():
+    limiter = _limiter(max_concurrency=4)
+    limiter.limit = 2.0
+    for _ in range(20):
+        limiter.call(lambda: None)
+    assert limiter.limit == 4.0
+
+
+def test_retries_stop_at_max_attempts():
+    limiter = _limiter(max_attempts=2)
+    attempts = []
+
+    def always_throttled():
+        attempts.append(1)
+        raise Throttled()
+
+    with pytest.raises(Throttled):
+        limiter.call(always_throttled)
+    assert len(attempts) == 2
+    assert limiter.in_flight == 0
+
+
+def test_sync_interrupt_releases_its_slot():
+    limiter = _limiter()
+
+    def interrupted():
+        raise KeyboardInterrupt()
+
+    with pytest.raises(KeyboardInterrupt):
+        limiter.call(interrupted)
+    assert limiter.in_flight == 0
+    assert limiter.limit == 4.0
@@ -0,0 +1,30 @@
+import asyncio
+
+from langchain_core.runnables import RunnableLambda
+
+from src.observability.instrumentation import current_node
+from src.providers.llm import ainvoke_chat_model_batch, invoke_chat_model_batch
+
+# 入力と、呼び出し時点で実行中のノード名を返すランナブル
+echo_node = RunnableLambda(lambda input: (input, current_node.get()))
+
+
+def test_batch_keeps_input_order_and_caller_context():
+    token = current_node.set("reflection")
+    try:
+        results, tokens = invoke_chat_model_batch(echo_node, ["a", "b", "c"])
+    finally:
+        current_node.reset(token)
+
+    assert results == [("a", "reflection"), ("b", "reflection"), ("c", "reflection")]
+    assert tokens == 0
+
+
+def test_batch_with_single_input_runs_inline():
+    results, _ = invoke_chat_model_batch(echo_node, ["only"])
+    assert results == [("only", "unknown")]
+
+
+def test_async_batch_keeps_input_order():
+    results, _ = asyncio.run(ainvoke_chat_model_batch(echo_node, ["a", "b"]))
+    assert [input for input, _ in results] == ["a", "b"]
@@ -0,0 +1,98 @@
+import json
+import os
+
+import pytest
+
+from src.config.configuration import SearchConfig
+from src.providers import local_corpus
+from src.providers.local_corpus import LocalCorpusSearchProvider, load_corpus_index
+
+
+@pytest.fixture
+def corpus(tmp_path, monkeypatch):
+    root = tmp_path / "corpus"
+    root.mkdir()
+    (root / "solar.md").write_text(
+        "# 太陽光発電\n\n太陽光発電のコストは年々低下している。", encoding="utf-8"
+    )
+    (root / "docs.jsonl").write_text(
+        json.dumps(
+            {"url": "https://example.com/wind", "title": "風力", "content": "洋上風力"},
+            ensure_ascii=False,
+        )
+        + "\n",
+        encoding="utf-8",
+    )
+    monkeypatch.setattr(local_corpus, "_index_cache", {})
+    return root
+
+
+def _count_scans(monkeypatch):
+    scans = []
+    original = local_corpus._corpus_files
+
+    def counting(root):
+        scans.append(root)
+        return original(root)
+
+    monkeypatch.setattr(local_corpus, "_corpus_files", counting)
+    return scans
+
+
+def test_index_is_saved_outside_the_corpus(corpus, tmp_path):
+    index_dir = tmp_path / "cache"
+    index = load_corpus_index(str(corpus), str(index_dir))
+    assert len(index) == 2
+    assert sorted(path.name for path in corpus.iterdir()) == ["docs.jsonl", "solar.md"]
+    assert len(list(index_dir.glob("*.json"))) == 1
+
+
+def test_cached_index_skips_scans_until_check_interval(corpus, tmp_path, monkeypatch):
+    scans = _count_scans(monkeypatch)
+    index_dir = str(tmp_path / "cache")
+    first = load_corpus_index(str(corpus), index_dir, check_seconds=60.0)
+    for _ in range(5):
+        assert load_corpus_index(str(corpus), index_dir, check_seconds=60.0) is first
+    assert len(scans) == 1
+
+
+def test_changes_are_picked_up_after_check_interval(corpus, tmp_path):
+    index_dir = str(tmp_path / "cache")
+    first = load_corpus_index(str(corpus), index_dir, check_seconds=0.0)
+    assert load_corpus_index(str(corpus), index_dir, check_seconds=0.0) is first
+
+    new_file = corpus / "nuclear.txt"
+    new_file.write_text("原子力発電所の再稼働", encoding="utf-8")
+    os.utime(new_file, (1e10, 1e10))
+    updated = load_corpus_index(str(corpus), index_dir, check_seconds=0.0)
+    assert updated is not first
+    assert len(updated) == 3
+
+
+def test_saved_index_is_reused_by_a_new_process(corpus, tmp_path, monkeypatch):
+    index_dir = str(tmp_path / "cache")
+    load_corpus_index(str(corpus), index_dir)
+    monkeypatch.setattr(local_corpus, "_index_cache", {})
+
+    def fail(root, files=None):
+        raise AssertionError("index should be loaded from disk")
+
+    monkeypatch.setattr(local_corpus, "build_corpus_index", fail)
+    assert len(load_corpus_index(str(corpus), index_dir)) == 2
+
+
+def test_missing_corpus_raises(tmp_path):
+    with pytest.raises(ValueError):
+        load_corpus_index(str(tmp_path / "missing"), str(tmp_path / "cache"))
+
+
+def test_provider_search_returns_snippets(corpus, tmp_path):
+    config = SearchConfig(
+        search_provider="local",
+        local_corpus_path=str(corpus),
+        local_index_dir=str(tmp_path / "cache"),
+    )
+    results = LocalCorpusSearchProvider(config).search("太陽光のコスト")
+    assert results[0]["title"] == "太陽光発電"
+    assert "コスト" in results[0]["content"]
+    assert results[0]["url"].startswith("file://")
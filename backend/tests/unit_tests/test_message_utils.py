@@ -0,0 +1,99 @@
+from langchain_core.messages import AIMessage, HumanMessage
+
+from src.config.configuration import Configuration
+from src.states import OverallState
+from src.utils import build_turn_topic
+from src.utils.message_utils import (
+    compact_research_topic,
+    compact_turn,
+    estimate_tokens,
+)
+
+
+def _conversation(turns, answer_chars=50):
+    """`turns` ターン分の会話（最後は回答前の現在の質問）を作成。"""
+    messages = []
+    for turn in range(turns - 1):
+        messages.append(HumanMessage(content=f"question {turn}"))
+        messages.append(AIMessage(content=f"answer {turn} " + "x" * answer_chars))
+    messages.append(HumanMessage(content=f"question {turns - 1}"))
+    return messages
+
+
+def test_single_question_is_used_as_is():
+    topic, summaries = compact_research_topic([HumanMessage(content="question")])
+    assert (topic, summaries) == ("question", [])
+
+
+def test_compact_turn_drops_citations_and_shortens():
+    summary = compact_turn(
+        "question",
+        "fact[source](https://example.com/a)【0-1】 " + "y" * 100,
+        max_chars=20,
+    )
+    assert "https://" not in summary and "【" not in summary
+    assert summary.endswith("…\n")
+    assert summary.startswith("User: question\nAssistant（要約）: fact")
+
+
+def test_older_turns_are_summarized_and_recent_turns_kept():
+    topic, summaries = compact_research_topic(
+        _conversation(4), max_tokens=0, recent_turns=2, summary_chars=10
+    )
+
+    assert len(summaries) == 2
+    assert topic == "".join(summaries) + (
+        "User: question 2\nAssistant: answer 2 " + "x" * 50 + "\nUser: question 3\n"
+    )
+
+
+def test_previous_summaries_are_reused():
+    messages = _conversation(4)
+    reused = ["reused 0\n", "reused 1\n"]
+
+    topic, new_summaries = compact_research_topic(
+        messages, max_tokens=0, recent_turns=2, compacted=reused
+    )
+    assert new_summaries == reused
+    assert topic.startswith("reused 0\nreused 1\n")
+
+    # 次のターンでは新たに古くなったターンだけをまとめる
+    messages += [AIMessage(content="answer 3"), HumanMessage(content="question 4")]
+    _, next_summaries = compact_research_topic(
+        messages, max_tokens=0, recent_turns=2, compacted=reused
+    )
+    assert next_summaries[:2] == reused
+    assert next_summaries[2] == compact_turn("question 2", "answer 2 " + "x" * 50)
+
+
+def test_topic_stays_within_the_token_budget():
+    messages = _conversation(20, answer_chars=400)
+    topic, summaries = compact_research_topic(
+        messages, max_tokens=300, recent_turns=2, summary_chars=100
+    )
+
+    omitted, body = topic.split("\n", 1)
+    assert omitted.startswith("（それ以前の会話")
+    assert estimate_tokens(body) <= 300
+    assert topic.endswith("User: question 19\n")
+    # 省略したまとめも次のターンへ引き継ぐ
+    assert len(summaries) == 18
+
+
+def test_current_question_is_never_dropped():
+    messages = _conversation(2) + [AIMessage(content="a"), HumanMessage(content="z")]
+    messages[-1] = HumanMessage(content="q" * 500)
+    topic, _ = compact_research_topic(messages, max_tokens=10, recent_turns=2)
+    assert topic.endswith("q" * 500 + "\n")
+
+
+def test_build_turn_topic_uses_the_configured_limits():
+    state = OverallState(messages=_conversation(4), topic_summaries=["kept\n"])
+    config_obj = Configuration.get_config(
+        {"configurable": {"topic_max_tokens": 0, "topic_recent_turns": 3}}
+    )
+
+    topic = build_turn_topic(state, config_obj)
+
+    assert topic["topic_summaries"] == ["kept\n"]
+    assert topic["research_topic"].startswith("kept\nUser: question 1\n")
@@ -0,0 +1,51 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from src.api.app import app
+from src.observability.metrics import MetricsRegistry
+
+
+def test_counter_and_gauge_render_with_escaped_labels():
+    registry = MetricsRegistry()
+    requests = registry.counter("requests_total", "Requests.", ("path",))
+    requests.inc('a"b')
+    requests.inc('a"b', amount=2)
+    in_flight = registry.gauge("in_flight", "In flight.")
+    in_flight.set(1.5)
+
+    assert requests.get('a"b') == 3
+    rendered = registry.render()
+    assert "# TYPE requests_total counter" in rendered
+    assert 'requests_total{path="a\\"b"} 3' in rendered
+    assert "in_flight 1.5" in rendered
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = MetricsRegistry()
+    latency = registry.histogram("latency_seconds", "Latency.", ("node",), (0.1, 1.0))
+    for value in (0.05, 0.5, 5.0):
+        latency.observe(value, "n")
+
+    assert latency.count("n") == 3
+    assert latency.total("n") == pytest.approx(5.55)
+    lines = latency.samples()
+    assert 'latency_seconds_bucket{node="n",le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{node="n",le="1"} 2' in lines
+    assert 'latency_seconds_bucket{node="n",le="+Inf"} 3' in lines
+    assert 'latency_seconds_count{node="n"} 3' in lines
+
+
+def test_registering_the_same_name_returns_the_existing_metric():
+    registry = MetricsRegistry()
+    first = registry.counter("events_total", "Events.")
+    assert registry.counter("events_total", "Events.") is first
+    first.inc()
+    registry.reset()
+    assert first.get() == 0
+
+
+def test_metrics_endpoint_serves_the_registry():
+    response = TestClient(app).get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert "# TYPE research_node_latency_seconds histogram" in response.text
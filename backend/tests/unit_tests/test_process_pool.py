@@ -0,0 +1,106 @@
+import asyncio
+import threading
+from functools import partial
+
+from benchmarks.fakes import fake_page
+from src.config.configuration import Configuration
+from src.nodes.research import WebResearchNode
+from src.observability.metrics import CPU_TASKS
+from src.parallel import (
+    SharedTexts,
+    arun_in_process_pool,
+    configure_process_pool,
+    load_texts,
+    run_in_process_pool,
+    shutdown_process_pool,
+)
+from src.states import WebSearchState
+
+
+def _thread_name():
+    return threading.current_thread().name
+
+
+def _results(count, raw_content_chars):
+    return [
+        {
+            "url": f"https://example.com/{i}",
+            "title": f"title {i}",
+            "content": f"content {i}",
+            "raw_content": fake_page(f"page-{i}", raw_content_chars),
+        }
+        for i in range(count)
+    ]
+
+
+def _config_obj(**configurable):
+    return Configuration.get_config(
+        {"configurable": {"include_raw_content": True, **configurable}}
+    )
+
+
+def test_async_fallback_without_pool_runs_off_the_event_loop():
+    configure_process_pool(0)
+    try:
+
+        async def main():
+            loop_thread = _thread_name()
+            results, pooled = await arun_in_process_pool([_thread_name, _thread_name])
+            return loop_thread, results, pooled
+
+        loop_thread, results, pooled = asyncio.run(main())
+    finally:
+        shutdown_process_pool()
+
+    assert pooled is False
+    assert len(results) == 2
+    assert loop_thread not in results
+
+
+def test_sync_fallback_without_pool_runs_inline():
+    configure_process_pool(0)
+    try:
+        results, pooled = run_in_process_pool([_thread_name])
+    finally:
+        shutdown_process_pool()
+    assert (results, pooled) == ([_thread_name()], False)
+
+
+def test_pool_runs_tasks_and_reads_shared_texts():
+    configure_process_pool(1)
+    try:
+        with SharedTexts(["alpha", "beta", "gamma"]) as shared:
+            results, pooled = run_in_process_pool(
+                [partial(load_texts, shared.handle(0, 2)), partial(pow, 2, 5)]
+            )
+    finally:
+        shutdown_process_pool()
+    assert pooled is True
+    assert results == [["alpha", "beta"], 32]
+
+
+def test_large_async_batch_without_pool_is_prepared_in_a_thread():
+    configure_process_pool(0)
+    node = WebResearchNode()
+    state = WebSearchState(search_query="query", id=0, research_topic="topic")
+    config_obj = _config_obj(cpu_pool_min_chars=1000)
+    search_results = _results(3, 2000)
+    before = CPU_TASKS.get("search_contents", "thread")
+    try:
+        prepared = asyncio.run(
+            node._aprepare_contents(search_results, state, config_obj)
+        )
+        expected = node._prepare_contents(search_results, state, config_obj)
+    finally:
+        shutdown_process_pool()
+
+    assert CPU_TASKS.get("search_contents", "thread") == before + 1
+    assert prepared == expected
+
+
+def test_small_async_batch_is_prepared_inline():
+    node = WebResearchNode()
+    state = WebSearchState(search_query="query", id=0)
+    before = CPU_TASKS.get("search_contents", "inline")
+    asyncio.run(node._aprepare_contents(_results(1, 100), state, _config_obj()))
+    assert CPU_TASKS.get("search_contents", "inline") == before + 1
@@ -0,0 +1,63 @@
+from langchain_core.messages import HumanMessage
+
+from src.observability.instrumentation import instrument_node
+from src.observability.profiling import finish_profile, get_or_create_profile
+from src.states import OverallState
+from src.utils import get_or_create_run_key
+
+
+class StartNode:
+    @instrument_node("start")
+    def __call__(self, state, config):
+        return {"run_key": get_or_create_run_key(state)}
+
+
+class EndNode:
+    @instrument_node("end", terminal=True)
+    def __call__(self, state, config):
+        return {}
+
+
+def _config(tmp_path, **configurable):
+    return {
+        "configurable": {
+            "profile_enabled": True,
+            "profile_output_dir": str(tmp_path),
+            **configurable,
+        }
+    }
+
+
+def _run(config):
+    state = OverallState(messages=[HumanMessage(content="question")])
+    update = StartNode()(state, config)
+    EndNode()(state.model_copy(update=update), config)
+    return update["run_key"]
+
+
+def test_profile_is_shared_within_a_run_and_keyed_by_fallback(tmp_path):
+    config = _config(tmp_path)
+    first = get_or_create_profile(config, "first")
+    assert get_or_create_profile(config, "first") is first
+    assert get_or_create_profile(config, "second") is not first
+    assert first.run_key == "first"
+
+    finish_profile(config, "first")
+    finish_profile(config, "second")
+    assert get_or_create_profile(config, "first") is not first
+    finish_profile(config, "first")
+
+
+def test_stateless_runs_write_separate_profiles(tmp_path):
+    config = _config(tmp_path)
+    first = _run(config)
+    second = _run(config)
+
+    assert first != second
+    assert {path.name for path in tmp_path.iterdir()} == {first, second}
+
+
+def test_disabled_profiling_creates_nothing(tmp_path):
+    config = _config(tmp_path, profile_enabled=False)
+    assert get_or_create_profile(config, "run") is None
+    assert finish_profile(config, "run") == []
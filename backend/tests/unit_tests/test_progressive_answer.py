@@ -0,0 +1,88 @@
+import asyncio
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage, RemoveMessage
+
+from benchmarks.fakes import FakeChatModel, FakeSearchProvider, use_fake_providers
+from src.config.configuration import Configuration
+from src.graphs.research_graph import research_graph
+from src.nodes.finalization import FinalizationNode
+from src.observability.metrics import TIME_TO_FIRST_ANSWER
+from src.states import OverallState
+
+INPUT = {"messages": [HumanMessage(content="再生可能エネルギーの課題は？")]}
+
+
+def _stream(config, mode):
+    """グラフをストリーミング実行し、メッセージを返したノードと差分を順に返す。"""
+    with use_fake_providers(FakeChatModel(), FakeSearchProvider()):
+        if mode == "async":
+
+            async def collect():
+                return [
+                    update
+                    async for update in research_graph.astream(
+                        INPUT, config, stream_mode="updates"
+                    )
+                ]
+
+            updates = asyncio.run(collect())
+        else:
+            updates = list(research_graph.stream(INPUT, config, stream_mode="updates"))
+    return [
+        (node, value["messages"])
+        for update in updates
+        for node, value in update.items()
+        if isinstance(value, dict) and value.get("messages")
+    ]
+
+
+@pytest.mark.parametrize("mode", ["sync", "async"])
+def test_final_answer_replaces_the_draft_with_its_own_id(mode):
+    config = {"configurable": {"progressive_answer": True, "max_research_loops": 3}}
+    drafts = TIME_TO_FIRST_ANSWER.count("draft")
+    finals = TIME_TO_FIRST_ANSWER.count("final")
+
+    answers = _stream(config, mode)
+
+    assert [node for node, _ in answers] == ["draft_answer", "finalize_answer"]
+    (draft,) = answers[0][1]
+    removed, final = answers[1][1]
+    assert draft.response_metadata["draft"] is True
+    assert isinstance(removed, RemoveMessage) and removed.id == draft.id
+    assert final.id != draft.id
+    assert final.response_metadata["replaces_draft"] == draft.id
+    # 最初の回答までの時間は暫定回答の1回だけ記録する
+    assert TIME_TO_FIRST_ANSWER.count("draft") == drafts + 1
+    assert TIME_TO_FIRST_ANSWER.count("final") == finals
+
+
+def test_run_without_draft_records_the_final_answer_once():
+    config = {"configurable": {"progressive_answer": False, "max_research_loops": 2}}
+    finals = TIME_TO_FIRST_ANSWER.count("final")
+
+    answers = _stream(config, "sync")
+
+    assert [node for node, _ in answers] == ["finalize_answer"]
+    (final,) = answers[0][1]
+    assert "replaces_draft" not in final.response_metadata
+    assert TIME_TO_FIRST_ANSWER.count("final") == finals + 1
+
+
+def test_final_state_keeps_one_answer_per_turn():
+    config = {"configurable": {"progressive_answer": True, "max_research_loops": 3}}
+    with use_fake_providers(FakeChatModel(), FakeSearchProvider()):
+        state = research_graph.invoke(INPUT, config)
+
+    answers = [m for m in state["messages"] if isinstance(m, AIMessage)]
+    assert len(answers) == 1
+    assert "draft" not in answers[0].response_metadata
+    usage = state["budget_usage"]
+    assert usage["first_answer_seconds"] <= usage["elapsed_seconds"]
+
+
+def test_budget_usage_has_no_metric_side_effect():
+    state = OverallState(messages=INPUT["messages"], run_started_at=0.0)
+    finals = TIME_TO_FIRST_ANSWER.count("final")
+    FinalizationNode()._create_budget_usage(state, 0, None, Configuration.get_config())
+    assert TIME_TO_FIRST_ANSWER.count("final") == finals
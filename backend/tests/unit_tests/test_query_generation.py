@@ -0,0 +1,59 @@
+import asyncio
+
+import pytest
+from langchain_core.messages import HumanMessage
+
+from benchmarks.fakes import FakeChatModel, FakeSearchProvider, use_fake_providers
+from src.nodes import query_generation
+from src.nodes.query_generation import QueryGenerationNode
+from src.states import OverallState
+
+QUESTION = "再生可能エネルギーの導入状況と今後の課題は？"
+CONFIG = {"configurable": {"speculative_search": True}}
+
+
+def _generate(echo_topic_query, mode):
+    node = QueryGenerationNode()
+    state = OverallState(messages=[HumanMessage(content=QUESTION)])
+    llm = FakeChatModel(echo_topic_query=echo_topic_query)
+    with use_fake_providers(llm, FakeSearchProvider()):
+        if mode == "async":
+            return asyncio.run(node.acall(state, CONFIG))
+        return node(state, CONFIG)
+
+
+def test_merge_replaces_the_most_overlapping_query():
+    node = QueryGenerationNode()
+    queries = ["風力発電 コスト", "再生可能エネルギー 導入状況 課題", "蓄電池"]
+    merged = node._merge_speculative_query(QUESTION, queries, 0.5)
+    assert merged == [QUESTION, "風力発電 コスト", "蓄電池"]
+    assert node._merge_speculative_query(QUESTION, ["蓄電池"], 0.5) is None
+
+
+@pytest.mark.parametrize("mode", ["sync", "async"])
+def test_overlapping_question_is_merged_with_its_results(mode):
+    update = _generate(echo_topic_query=True, mode=mode)
+
+    assert update.speculative_query == QUESTION
+    assert update.search_query[0] == QUESTION
+    assert update.search_count == 1
+    assert update.web_research_result
+    assert {
+        source["short_url"].split("-")[0] for source in update.sources_gathered
+    } == {"【0"}
+
+
+@pytest.mark.parametrize("mode", ["sync", "async"])
+def test_unrelated_question_is_discarded_but_counted(mode):
+    update = _generate(echo_topic_query=False, mode=mode)
+
+    assert update.speculative_query == ""
+    assert QUESTION not in update.search_query
+    assert update.search_count == 1
+    assert update.web_research_result == []
+    assert update.sources_gathered == []
+
+
+def test_speculative_executor_is_created_once_on_first_use():
+    executor = query_generation._get_speculative_executor()
+    assert query_generation._get_speculative_executor() is executor
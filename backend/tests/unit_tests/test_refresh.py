@@ -0,0 +1,138 @@
+import asyncio
+
+import pytest
+from langchain_core.messages import HumanMessage
+
+from benchmarks.fakes import FakeChatModel, FakeSearchProvider, use_fake_providers
+from src.config.configuration import Configuration
+from src.graphs import refresh_graph, research_graph
+from src.nodes.refresh import RefreshDiffNode, RefreshPlanningNode
+from src.states import OverallState
+from src.utils import build_run_record
+
+NOW = 1_000_000.0
+
+
+@pytest.fixture(scope="module")
+def record():
+    """フェイクのプロバイダーで実行した研究の記録。"""
+    with use_fake_providers(FakeChatModel(), FakeSearchProvider(max_results=3)):
+        state = research_graph.invoke(
+            {"messages": [HumanMessage(content="question")]},
+            {"configurable": {"thread_id": "refresh"}},
+        )
+    return build_run_record(state)
+
+
+def _refresh(record, search, mode="sync", **configurable):
+    config = {"configurable": configurable}
+    with use_fake_providers(FakeChatModel(), search):
+        if mode == "async":
+            return asyncio.run(refresh_graph.ainvoke({"prior_run": record}, config))
+        return refresh_graph.invoke({"prior_run": record}, config)
+
+
+def _source(url, content, fetched_at=NOW):
+    return {"value": url, "content": content, "fetched_at": fetched_at}
+
+
+def test_only_stale_queries_are_searched_again():
+    node = RefreshPlanningNode()
+    assert not node._is_stale([_source("u", "c", NOW - 10)], NOW, 60)
+    assert node._is_stale([_source("u", "c", NOW - 100)], NOW, 60)
+    # 結果の無かったクエリは常に検索し直す
+    assert node._is_stale([], NOW, 60)
+
+
+def test_reused_sources_get_new_markers_and_skip_duplicates():
+    sources = [
+        {**_source("https://a", "alpha"), "short_url": "【0-1】", "title": "A"},
+        {**_source("https://b", "alpha"), "short_url": "【0-2】", "duplicate_of": "x"},
+        {**_source("https://c", "gamma"), "short_url": "【0-3】", "title": "C"},
+    ]
+    reused, text = RefreshPlanningNode()._reuse_sources(
+        sources, 7, Configuration.get_config()
+    )
+    assert [source["short_url"] for source in reused] == ["【7-1】", "【7-2】"]
+    assert "【7-1】" in text and "【7-2】" in text and "【0-" not in text
+
+
+def test_diff_counts_missing_and_rewritten_urls():
+    previous = [
+        _source("https://example.com/a", "same"),
+        _source("https://example.com/b", "old text"),
+        _source("https://example.com/c", "gone"),
+    ]
+    current = [
+        _source("https://www.example.com/a/", "same"),
+        _source("https://example.com/b", "new text"),
+    ]
+    config_obj = Configuration.get_config(
+        {"configurable": {"refresh_change_threshold": 0.5}}
+    )
+
+    report = RefreshDiffNode()._compare(previous, current, config_obj)
+
+    assert report == {
+        "changed_sources": 2,
+        "compared_sources": 3,
+        "change_ratio": 0.667,
+        "material_change": True,
+    }
+
+
+def test_fresh_record_keeps_the_answer_without_searching(record):
+    state = _refresh(record, FakeSearchProvider(max_results=3))
+
+    assert state["refresh_report"] == {
+        "refreshed_queries": 0,
+        "reused_queries": len(record["queries"]),
+    }
+    assert state["search_count"] == 0
+    assert state["tokens_used"] == 0
+    assert state["messages"][-1].content == record["answer"]
+
+
+def test_unchanged_results_keep_the_answer(record):
+    state = _refresh(record, FakeSearchProvider(max_results=3), refresh_ttl_seconds=0)
+
+    report = state["refresh_report"]
+    assert report["refreshed_queries"] == len(record["queries"])
+    assert (report["changed_sources"], report["material_change"]) == (0, False)
+    assert state["tokens_used"] == 0
+    assert state["messages"][-1].content == record["answer"]
+
+
+@pytest.mark.parametrize("mode", ["sync", "async"])
+def test_changed_results_redo_the_answer(record, mode):
+    search = FakeSearchProvider(max_results=3, revision="v2")
+    state = _refresh(record, search, mode, refresh_ttl_seconds=0)
+
+    report = state["refresh_report"]
+    assert report["change_ratio"] == 1.0 and report["material_change"] is True
+    assert state["tokens_used"] > 0
+    assert state["search_count"] > len(record["queries"])
+
+
+def test_partially_stale_record_searches_only_the_missing_query(record):
+    first = record["queries"][0]
+    partial = {
+        **record,
+        "sources": [s for s in record["sources"] if s["query"] != first],
+    }
+    state = _refresh(partial, FakeSearchProvider(max_results=3))
+
+    report = state["refresh_report"]
+    assert (report["refreshed_queries"], report["reused_queries"]) == (
+        1,
+        len(record["queries"]) - 1,
+    )
+    # 再利用したソースの引用マーカーが検索し直した分と重ならない
+    markers = [source["short_url"] for source in state["sources_gathered"]]
+    assert len(markers) == len(set(markers))
+
+
+def test_planning_records_the_question_for_a_new_state(record):
+    update = RefreshPlanningNode()(OverallState(prior_run=record), {})
+    assert update.messages[0].content == record["question"]
+    assert update.search_query[: len(record["queries"])] == record["queries"]
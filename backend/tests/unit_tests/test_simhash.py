@@ -0,0 +1,113 @@
+import random
+
+import pytest
+
+from src.retrieval.simhash import (
+    FINGERPRINT_BITS,
+    NearDuplicateIndex,
+    get_fingerprint_index,
+    hamming_distance,
+    release_fingerprint_index,
+    simhash,
+)
+
+ARTICLE = (
+    "The European Central Bank raised interest rates by a quarter point on "
+    "Thursday, citing persistent inflation in services and wages across the "
+    "euro area economies, and signalled that further tightening may follow."
+)
+
+
+def _flip(fingerprint: int, bits: int, rng: random.Random) -> int:
+    for position in rng.sample(range(FINGERPRINT_BITS), bits):
+        fingerprint ^= 1 << position
+    return fingerprint
+
+
+def test_simhash_is_deterministic_64_bit():
+    fingerprint = simhash(ARTICLE)
+    assert fingerprint is not None
+    assert 0 <= fingerprint < 1 << FINGERPRINT_BITS
+    assert simhash(ARTICLE) == fingerprint
+
+
+def test_simhash_skips_short_text():
+    assert simhash("too short to fingerprint") is None
+
+
+def test_near_duplicates_are_closer_than_unrelated_text():
+    syndicated = simhash(ARTICLE + " Reuters")
+    unrelated = simhash(
+        "量子コンピューターの実用化には誤り訂正と大規模な量子ビットの集積が必要とされる"
+    )
+    original = simhash(ARTICLE)
+    assert hamming_distance(original, syndicated) <= 6
+    assert hamming_distance(original, unrelated) > 6
+
+
+@pytest.mark.parametrize("max_distance", [0, 3, 6, 10])
+def test_bands_partition_all_bits(max_distance):
+    index = NearDuplicateIndex(max_distance)
+    covered = 0
+    for shift, mask in index._bands:
+        band = mask << shift
+        assert covered & band == 0
+        covered |= band
+    assert len(index._bands) == max_distance + 1
+    assert covered == (1 << FINGERPRINT_BITS) - 1
+
+
+@pytest.mark.parametrize("max_distance", [3, 6])
+def test_band_index_finds_every_fingerprint_within_distance(max_distance):
+    rng = random.Random(max_distance)
+    index = NearDuplicateIndex(max_distance)
+    originals = [rng.getrandbits(FINGERPRINT_BITS) for _ in range(200)]
+    for position, fingerprint in enumerate(originals):
+        assert index.find_or_add(fingerprint, f"doc-{position}") is None
+
+    for position, fingerprint in enumerate(originals):
+        near = _flip(fingerprint, rng.randint(0, max_distance), rng)
+        match = index.find_or_add(near, "query")
+        # 近似重複の代表は元の文書か、同じく距離以内の別の文書
+        assert match is not None
+        matched = originals[int(match.split("-")[1])]
+        assert hamming_distance(near, matched) <= max_distance
+
+
+def test_band_index_matches_brute_force():
+    rng = random.Random(0)
+    index = NearDuplicateIndex(6)
+    stored = {}
+    for position in range(300):
+        if stored and rng.random() < 0.5:
+            base = rng.choice(list(stored.values()))
+            fingerprint = _flip(base, rng.randint(0, 12), rng)
+        else:
+            fingerprint = rng.getrandbits(FINGERPRINT_BITS)
+        expected = any(
+            hamming_distance(fingerprint, other) <= 6 for other in stored.values()
+        )
+        key = f"doc-{position}"
+        match = index.find_or_add(fingerprint, key)
+        assert (match is not None) == expected
+        if match is None:
+            stored[key] = fingerprint
+        else:
+            assert hamming_distance(fingerprint, stored[match]) <= 6
+
+
+def test_fingerprint_indexes_are_separate_per_run():
+    fingerprint = simhash(ARTICLE)
+    try:
+        first = get_fingerprint_index("test-run-a")
+        assert first.find_or_add(fingerprint, "【0-1】") is None
+        assert get_fingerprint_index("test-run-a") is first
+        assert get_fingerprint_index("test-run-b").find_or_add(
+            fingerprint, "【0-1】"
+        ) is None
+
+        release_fingerprint_index("test-run-a")
+        assert get_fingerprint_index("test-run-a") is not first
+    finally:
+        release_fingerprint_index("test-run-a")
+        release_fingerprint_index("test-run-b")
@@ -0,0 +1,116 @@
+import json
+
+import pytest
+
+from src.providers.structured_output import parse_structured_output, repair_json
+from src.schemas import Reflection
+
+
+def _loads(text):
+    return json.loads(repair_json(text))
+
+
+def test_valid_json_is_unchanged():
+    text = '{"a": [1, 2, {"b": "c"}], "d": null}'
+    assert repair_json(text) == text
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        '```json\n{"a": 1}\n```',
+        '```\n{"a": 1}\n```',
+        'Here is the result:\n```json\n{"a": 1}\n```\nHope this helps.',
+        '```json\n{"a": 1}',
+    ],
+)
+def test_code_fences_are_stripped(text):
+    assert _loads(text) == {"a": 1}
+
+
+def test_surrounding_prose_is_dropped():
+    assert _loads('Sure! {"a": 1} Let me know if you need more.') == {"a": 1}
+
+
+def test_comments_are_removed():
+    text = """{
+        // line comment
+        "a": 1, # hash comment
+        /* block
+           comment */ "b": 2
+    }"""
+    assert _loads(text) == {"a": 1, "b": 2}
+
+
+def test_comment_markers_inside_strings_are_kept():
+    text = '{"url": "https://example.com/#top", "note": "a /* b */ c"}'
+    assert _loads(text) == {"url": "https://example.com/#top", "note": "a /* b */ c"}
+
+
+def test_trailing_commas_are_removed():
+    assert _loads('{"a": [1, 2, ], "b": {"c": 3,},\n}') == {
+        "a": [1, 2],
+        "b": {"c": 3},
+    }
+
+
+def test_python_literals_are_converted_outside_strings():
+    assert _loads('{"a": True, "b": False, "c": None, "d": "True"}') == {
+        "a": True,
+        "b": False,
+        "c": None,
+        "d": "True",
+    }
+
+
+@pytest.mark.parametrize(
+    ("text", "expected"),
+    [
+        ('{"a": [1, 2', {"a": [1, 2]}),
+        ('{"a": "unfinished', {"a": "unfinished"}),
+        ('{"a": 1, ', {"a": 1}),
+        ('{"a": {"b": [1, {"c": 2}', {"a": {"b": [1, {"c": 2}]}}),
+    ],
+)
+def test_truncated_output_is_closed(text, expected):
+    assert _loads(text) == expected
+
+
+def test_escaped_quotes_do_not_end_strings():
+    assert _loads('{"a": "say \\"hi\\"", "b": [1,]}') == {"a": 'say "hi"', "b": [1]}
+
+
+def test_non_ascii_text_is_preserved():
+    text = '{"query": ["再生可能エネルギー 課題", "Ｔｒｕｅ ☀"], "rationale": "日本語",}'
+    assert _loads(text) == {
+        "query": ["再生可能エネルギー 課題", "Ｔｒｕｅ ☀"],
+        "rationale": "日本語",
+    }
+
+
+def test_non_ascii_letters_outside_strings_do_not_crash():
+    assert repair_json("{é: 1}") == "{é: 1}"
+
+
+def test_text_without_json_is_returned_as_is():
+    assert repair_json("no json here") == "no json here"
+
+
+def test_parse_structured_output_repairs_and_validates():
+    text = """```json
+    {
+      "is_sufficient": False,
+      "knowledge_gap": "最新の統計が不足", // 補足
+      "follow_up_queries": ["太陽光 発電量 2024",
+    """
+    reflection = parse_structured_output(text, Reflection)
+    assert reflection == Reflection(
+        is_sufficient=False,
+        knowledge_gap="最新の統計が不足",
+        follow_up_queries=["太陽光 発電量 2024"],
+    )
+
+
+def test_parse_structured_output_returns_none_when_invalid():
+    assert parse_structured_output('{"is_sufficient": "maybe"}', Reflection) is None
+    assert parse_structured_output("not json", Reflection) is None
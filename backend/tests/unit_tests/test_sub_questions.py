@@ -0,0 +1,127 @@
+from langchain_core.messages import HumanMessage
+
+from benchmarks.fakes import FakeChatModel, FakeSearchProvider, use_fake_providers
+from src.config.configuration import Configuration
+from src.graphs.research_graph import research_graph
+from src.nodes.sub_questions import (
+    SubQuestionJoinNode,
+    SubQuestionPlanningNode,
+    SubQuestionRouterNode,
+)
+from src.schemas import SubQuestion, SubQuestionPlan
+from src.states import OverallState
+
+SUB_QUESTIONS = [
+    {"question": "A", "depends_on": []},
+    {"question": "B", "depends_on": []},
+    {"question": "C", "depends_on": [0, 1]},
+]
+
+
+def _finding(index, search_id_end):
+    return {
+        "index": index,
+        "question": SUB_QUESTIONS[index]["question"],
+        "context": f"findings {index}",
+        "search_id_end": search_id_end,
+    }
+
+
+def _state(**fields):
+    return OverallState(
+        messages=[HumanMessage(content="question")],
+        research_topic="question",
+        sub_questions=SUB_QUESTIONS,
+        **fields,
+    )
+
+
+def test_plan_keeps_only_dependencies_on_earlier_sub_questions():
+    plan = SubQuestionPlan(
+        rationale="",
+        sub_questions=[
+            SubQuestion(question="A", depends_on=[1, 2]),
+            SubQuestion(question=" ", depends_on=[]),
+            SubQuestion(question="B", depends_on=[1, 3, 0]),
+            SubQuestion(question="C", depends_on=[2]),
+        ],
+    )
+    config_obj = Configuration.get_config({"configurable": {"max_sub_questions": 2}})
+    state = OverallState(messages=[HumanMessage(content="question")])
+
+    sub_questions = SubQuestionPlanningNode()._normalize_plan(plan, state, config_obj)
+
+    assert sub_questions == [
+        {"question": "A", "depends_on": []},
+        {"question": "B", "depends_on": [0]},
+    ]
+
+
+def test_empty_plan_falls_back_to_the_question():
+    plan = SubQuestionPlan(rationale="", sub_questions=[])
+    state = OverallState(messages=[HumanMessage(content="question")])
+    sub_questions = SubQuestionPlanningNode()._normalize_plan(
+        plan, state, Configuration.get_config()
+    )
+    assert sub_questions == [{"question": "question", "depends_on": []}]
+
+
+def test_dependents_wait_for_all_their_prerequisites():
+    router = SubQuestionRouterNode()
+
+    pending, ready, _ = router._get_ready(_state())
+    assert (pending, ready) == ([0, 1, 2], [0, 1])
+
+    partial = _state(sub_question_findings=[_finding(0, 4)])
+    assert router._get_ready(partial)[1] == [1]
+
+    done = _state(sub_question_findings=[_finding(0, 4), _finding(1, 8)])
+    pending, ready, _ = router._get_ready(done)
+    assert (pending, ready) == ([2], [2])
+    prompt = router._create_prompt(done, 2, {0: _finding(0, 4), 1: _finding(1, 8)})
+    assert "findings 0" in prompt and "findings 1" in prompt
+
+
+def test_parallel_sub_questions_get_disjoint_id_blocks():
+    config_obj = Configuration.get_config(
+        {
+            "configurable": {
+                "sub_question_queries": 2,
+                "sub_question_max_loops": 2,
+                "max_follow_up_queries": 3,
+            }
+        }
+    )
+    state = _state(search_query=["q0", "q1"], search_id_offset=10)
+    router = SubQuestionRouterNode()
+    assert router._get_search_block(config_obj) == 5
+
+    sends = router._create_tasks(state, [0, 1], [0, 1, 2], {}, config_obj)
+
+    ranges = [(send.arg.search_id_offset, send.arg.search_id_end) for send in sends]
+    assert ranges == [(12, 17), (17, 22)]
+
+
+def test_join_moves_the_offset_past_the_reserved_blocks():
+    state = _state(
+        search_query=["q"] * 6,
+        sub_question_findings=[_finding(0, 17), _finding(1, 22)],
+    )
+    update = SubQuestionJoinNode()(state, {})
+    # 次の検索の識別子（位置＋オフセット）は予約済みの範囲の後ろから始まる
+    assert len(state.search_query) + update.search_id_offset == 22
+
+
+def test_hierarchical_run_researches_dependents_after_prerequisites():
+    llm = FakeChatModel(sub_questions=3, sub_question_dependencies=True)
+    config = {"configurable": {"planning_mode": "hierarchical"}}
+    with use_fake_providers(llm, FakeSearchProvider()):
+        state = research_graph.invoke(
+            {"messages": [HumanMessage(content="question")]}, config
+        )
+
+    order = [finding["index"] for finding in state["sub_question_findings"]]
+    assert sorted(order[:2]) == [0, 1]
+    assert order[2] == 2
+    markers = [source["short_url"] for source in state["sources_gathered"]]
+    assert len(markers) == len(set(markers))
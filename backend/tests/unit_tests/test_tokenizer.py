@@ -0,0 +1,46 @@
+from src.retrieval.tokenizer import normalize, tokenize
+
+
+def test_normalize_unifies_width_and_case():
+    assert normalize("ＡＢＣ１２３ ｶﾀｶﾅ") == "abc123 カタカナ"
+
+
+def test_ascii_words_are_kept_whole():
+    assert tokenize("Hello, GPT-4o world's v1.2") == [
+        "hello",
+        "gpt-4o",
+        "world's",
+        "v1.2",
+    ]
+
+
+def test_cjk_runs_are_split_into_bigrams():
+    assert tokenize("太陽光発電") == ["太陽", "陽光", "光発", "発電"]
+
+
+def test_scripts_are_split_into_separate_runs():
+    # 漢字・ひらがな・カタカナの境界でbigramを作らない
+    assert tokenize("再生可能エネルギーの課題") == [
+        "再生",
+        "生可",
+        "可能",
+        "エネ",
+        "ネル",
+        "ルギ",
+        "ギー",
+        "の",
+        "課題",
+    ]
+
+
+def test_single_character_runs_are_unigrams():
+    assert tokenize("株と債券") == ["株", "と", "債券"]
+
+
+def test_mixed_japanese_and_ascii():
+    assert tokenize("OpenAIの生成AI") == ["openai", "の", "生成", "ai"]
+
+
+def test_punctuation_and_empty_text_produce_no_tokens():
+    assert tokenize("") == []
+    assert tokenize("。、！？「」 ()") == []
@@ -0,0 +1,74 @@
+import json
+
+from langchain_core.messages import HumanMessage
+
+from src.observability.instrumentation import instrument_node
+from src.observability.tracing import get_run_key
+from src.states import OverallState
+from src.utils import get_or_create_run_key
+
+
+class StartNode:
+    @instrument_node("start")
+    def __call__(self, state, config):
+        return {"run_key": get_or_create_run_key(state)}
+
+
+class EndNode:
+    @instrument_node("end", terminal=True)
+    def __call__(self, state, config):
+        return {}
+
+
+def _config(tmp_path, **configurable):
+    return {
+        "configurable": {
+            "trace_enabled": True,
+            "trace_output_dir": str(tmp_path),
+            **configurable,
+        }
+    }
+
+
+def _run(config):
+    state = OverallState(messages=[HumanMessage(content="question")])
+    update = StartNode()(state, config)
+    EndNode()(state.model_copy(update=update), config)
+    return update["run_key"]
+
+
+def _traces(tmp_path):
+    traces = [json.loads(path.read_text()) for path in tmp_path.glob("*.json")]
+    return {trace["metadata"]["run_key"]: trace for trace in traces}
+
+
+def test_get_run_key_prefers_thread_id_over_fallback():
+    config = {"configurable": {"thread_id": "thread"}}
+    assert get_run_key(config, "state-key") == "thread"
+    assert get_run_key({}, "state-key") == "state-key"
+    assert get_run_key({}) == "default"
+
+
+def test_stateless_runs_write_separate_traces(tmp_path):
+    config = _config(tmp_path)
+    first = _run(config)
+    second = _run(config)
+
+    traces = _traces(tmp_path)
+    assert first != second
+    assert set(traces) == {first, second}
+    for trace in traces.values():
+        names = [
+            event["name"]
+            for event in trace["traceEvents"]
+            if event.get("cat") == "node"
+        ]
+        assert names == ["start", "end"]
+
+
+def test_thread_id_keys_the_trace(tmp_path):
+    run_key = _run(_config(tmp_path, thread_id="thread"))
+
+    traces = _traces(tmp_path)
+    assert set(traces) == {"thread"}
+    assert run_key != "thread"
@@ -0,0 +1,57 @@
+from src.config.configuration import Configuration
+from src.nodes.research import WebResearchNode
+from src.retrieval.simhash import NearDuplicateIndex, simhash
+from src.states import WebSearchState
+
+ARTICLE = (
+    "The European Central Bank raised interest rates by a quarter point on "
+    "Thursday, citing persistent inflation in services and wages across the "
+    "euro area economies, and signalled that further tightening may follow."
+)
+OTHER = (
+    "Solar module prices fell again this quarter as new factories came online, "
+    "pushing installers to cut quotes for rooftop systems across several markets."
+)
+
+
+def _process(node, index, state_id, contents):
+    results = [
+        {"title": f"title {i}", "url": f"https://example.com/{state_id}/{i}"}
+        for i in range(len(contents))
+    ]
+    prepared = [(content, simhash(content)) for content in contents]
+    return node._process_search_results(results, prepared, state_id, index)
+
+
+def test_duplicates_within_a_search_are_listed_on_the_representative():
+    node = WebResearchNode()
+    sources, text = _process(node, NearDuplicateIndex(), 0, [ARTICLE, ARTICLE])
+    assert sources[1]["duplicate_of"] == "【0-1】"
+    assert "Source 【0-1】（同内容: 【0-2】）" in text
+    assert text.count(ARTICLE) == 1
+
+
+def test_duplicates_of_an_earlier_search_keep_their_markers():
+    node = WebResearchNode()
+    index = NearDuplicateIndex()
+    _process(node, index, 0, [ARTICLE])
+    sources, text = _process(node, index, 1, [OTHER, ARTICLE + " Reuters"])
+    assert sources[1]["duplicate_of"] == "【0-1】"
+    assert "【1-2】（【0-1】 と同内容のため本文省略）" in text
+    assert ARTICLE not in text
+
+
+def test_dedup_is_off_unless_enabled():
+    node = WebResearchNode()
+    state = WebSearchState(search_query="query", id=0, run_key="dedup-default")
+    assert node._get_fingerprint_index(state, {}, Configuration.get_config()) is None
+
+    config = {"configurable": {"dedup_enabled": True}}
+    index = node._get_fingerprint_index(state, config, Configuration.get_config(config))
+    assert isinstance(index, NearDuplicateIndex)
+
+
+def test_sources_keep_the_fetch_time():
+    node = WebResearchNode()
+    sources, _ = _process(node, None, 0, [ARTICLE])
+    assert isinstance(sources[0]["fetched_at"], float)